@@ -1,16 +1,38 @@
+from contextlib import nullcontext
 from products.models import ProductBrand, Product
 from django.db import transaction
+from django.utils import timezone
+from pipeline.utils.database_updating_utils.bulk_merge import bulk_merge
+from pipeline.database_updating_classes.product_updating.run_report import RunReport
 
 class BrandManager:
     """
     Manages the creation, updating, and linking of ProductBrand objects.
     It is designed to work with the lean, two-tier caching system.
     """
-    def __init__(self, command, caches, cache_updater, brand_translation_cache):
+    def __init__(self, command, caches, cache_updater, brand_translation_cache, writer_lock=None, translation_changes=None, run_report=None):
         self.command = command
         self.caches = caches
         self.cache_updater = cache_updater
         self.brand_translation_cache = brand_translation_cache
+        # Set when other worker processes write brands concurrently (see UpdateOrchestrator).
+        self.writer_lock = writer_lock
+        # A TranslationTableChanges that records brands which are created or change their variations, if any.
+        self.translation_changes = translation_changes
+        self.run_report = run_report or RunReport()
+
+    def _refresh_brand_cache(self, processed_product_data_list, discovered_brand_pairs):
+        """
+        Must be called while holding the writer lock. Re-reads the brands this batch
+        touches, since another worker may have created them or changed their variations
+        after this process built its caches.
+        """
+        names = {p.get('product', {}).get('normalized_brand') for p in processed_product_data_list} - {None, ''}
+        for incoming_brand, existing_brand_canonical in discovered_brand_pairs:
+            names.update((incoming_brand, existing_brand_canonical))
+        names.update([self.brand_translation_cache[name] for name in names if name in self.brand_translation_cache])
+        for brand_obj in ProductBrand.objects.filter(normalized_name__in=names):
+            self.cache_updater('normalized_brand_names', brand_obj.normalized_name, brand_obj)
 
     def process(self, processed_product_data_list, discovered_brand_pairs):
         """
@@ -23,6 +45,17 @@ class BrandManager:
             self.command.stdout.write("    - No products to process. Skipping.")
             return
 
+        # Brands and product brand links are shared rows, so in a parallel run
+        # the whole step happens while holding the writer lock.
+        with self.writer_lock or nullcontext():
+            with self.run_report.stage('brands', rows_in=len(processed_product_data_list)) as stage:
+                if self.writer_lock is not None:
+                    self._refresh_brand_cache(processed_product_data_list, discovered_brand_pairs)
+                stage['rows_out'] = self._process_brands(processed_product_data_list, discovered_brand_pairs)
+
+    def _process_brands(self, processed_product_data_list, discovered_brand_pairs):
+        """Writes brand changes and product brand links. Returns the number of products linked to a new brand."""
+
         # --- Step 1 & 2: Analyze and Prepare DB Changes for Brands ---
         brands_to_update = {}
         temp_translation_updates = {}
@@ -69,15 +102,21 @@ class BrandManager:
             
             if brands_to_bulk_update:
                 self.command.stdout.write(f"    - Updating {len(brands_to_bulk_update)} existing brands.")
-                ProductBrand.objects.bulk_update(brands_to_bulk_update, ['normalized_name_variations'], batch_size=500)
+                bulk_merge(brands_to_bulk_update, ['normalized_name_variations'], batch_size=500)
         
         if brands_to_bulk_create:
             newly_created_brands = ProductBrand.objects.filter(normalized_name__in=brands_to_create_names)
             for brand_obj in newly_created_brands:
                 self.cache_updater('normalized_brand_names', brand_obj.normalized_name, brand_obj)
+            if self.translation_changes is not None:
+                self.translation_changes.mark_brands(b.id for b in newly_created_brands)
+
+        if brands_to_bulk_update and self.translation_changes is not None:
+            self.translation_changes.mark_brands(b.id for b in brands_to_bulk_update)
 
         # --- Step 4: Link Products to Brands (Refactored Logic) ---
         product_brand_links_to_make = {} # {product_id: brand_id}
+        products_to_update_linking = []
 
         for product_data in processed_product_data_list:
             product_dict = product_data.get('product', {})
@@ -98,21 +137,22 @@ class BrandManager:
                 product_brand_links_to_make[product_id] = brand_obj.id
         
         if product_brand_links_to_make:
-            products_to_update_linking = []
             product_ids = list(product_brand_links_to_make.keys())
             
             # Just-in-time fetch for products that need linking
             products_from_db = Product.objects.filter(id__in=product_ids)
             
+            now = timezone.now()
             for product in products_from_db:
                 new_brand_id = product_brand_links_to_make[product.id]
                 if product.brand_id != new_brand_id:
                     product.brand_id = new_brand_id
+                    product.updated_at = now
                     products_to_update_linking.append(product)
             
             if products_to_update_linking:
                 self.command.stdout.write(f"    - Linking {len(products_to_update_linking)} products to their brands.")
-                Product.objects.bulk_update(products_to_update_linking, ['brand'], batch_size=500)
+                bulk_merge(products_to_update_linking, ['brand', 'updated_at'], batch_size=500)
 
         # --- Step 5: Update Master Translation Cache ---
         if temp_translation_updates:
@@ -120,3 +160,4 @@ class BrandManager:
             self.brand_translation_cache.update(temp_translation_updates)
             
         self.command.stdout.write("  - BrandManager: Finished processing brands.")
+        return len(products_to_update_linking)
@@ -0,0 +1,402 @@
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+
+# Barcodes made only of digits are packed into a signed 64-bit int. A leading '1' is
+# prepended so that leading zeros survive the round trip ('0123' -> 10123).
+_MAX_PACKED_BARCODE_DIGITS = 18
+_NO_BRAND = -1
+
+
+def _pack_barcode(barcode):
+    if barcode.isdigit() and barcode.isascii() and len(barcode) <= _MAX_PACKED_BARCODE_DIGITS:
+        return int('1' + barcode)
+    return None
+
+
+def _unpack_barcode(key):
+    return str(key)[1:]
+
+
+def _hash_norm_string(norm_string):
+    return zlib.crc32(norm_string.encode('utf-8'))
+
+
+class CompactProductCache:
+    """
+    A compact, array-backed replacement for the lean product caches.
+
+    Rows loaded from the database (the "base") live in parallel arrays sorted by
+    product id: one norm string per row and an integer brand code that indexes a
+    table of interned brand names. Barcodes are packed into 64-bit ints and norm
+    strings are indexed by a 32-bit hash, each as a sorted array pointing at a row,
+    so there is no per-product dict at all.
+
+    Anything added while the pipeline runs (new products, aliases, SKU-resolved
+    variations) goes into small overflow dicts that are consulted first.
+    replace_products() masks base rows instead of rebuilding the arrays, so
+    `stale_share` says when a rebuild with from_rows() is worth it.
+
+    The three views, `by_id`, `by_barcode` and `by_norm_string`, expose the same
+    lookup API as the dicts they replace ([], get, in, len and item assignment),
+    so they can be dropped into `UpdateOrchestrator.caches` unchanged.
+    """
+    def __init__(self):
+        self._ids = array('q')
+        self._brand_codes = array('i')
+        self._norm_strings = []
+
+        self._brand_names = []
+        self._brand_code_by_name = {}
+
+        self._barcode_keys = array('q')
+        self._barcode_rows = array('i')
+        self._norm_hashes = array('I')
+        self._norm_rows = array('i')
+        self._removed_rows = set()
+
+        self._id_overflow = {}
+        self._barcode_overflow = {}
+        self._norm_overflow = {}
+
+        self.by_id = _ProductsById(self)
+        self.by_barcode = _ProductIdsByBarcode(self)
+        self.by_norm_string = _ProductIdsByNormString(self)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds a cache from an iterable of (product_id, norm_string, brand_normalized_name, barcode)
+        tuples. Later rows win when two rows share a barcode or norm string, as with dict assignment.
+        """
+        cache = cls()
+        rows = sorted(rows, key=lambda row: row[0])
+
+        barcode_entries = {}
+        norm_entries = {}
+        for row_index, (product_id, norm_string, brand_name, barcode) in enumerate(rows):
+            cache._ids.append(product_id)
+            cache._norm_strings.append(norm_string)
+            cache._brand_codes.append(cache._brand_code(brand_name))
+            if barcode:
+                barcode_entries[barcode] = row_index
+            if norm_string:
+                norm_entries[norm_string] = row_index
+
+        packed_barcodes = []
+        for barcode, row_index in barcode_entries.items():
+            key = _pack_barcode(barcode)
+            if key is None:
+                cache._barcode_overflow[barcode] = rows[row_index][0]
+            else:
+                packed_barcodes.append((key, row_index))
+        packed_barcodes.sort()
+        cache._barcode_keys = array('q', (key for key, _ in packed_barcodes))
+        cache._barcode_rows = array('i', (row_index for _, row_index in packed_barcodes))
+
+        hashed_norms = sorted((_hash_norm_string(norm_string), row_index) for norm_string, row_index in norm_entries.items())
+        cache._norm_hashes = array('I', (h for h, _ in hashed_norms))
+        cache._norm_rows = array('i', (row_index for _, row_index in hashed_norms))
+        return cache
+
+    @classmethod
+    def from_values(cls, product_values):
+        """Builds a cache from Product rows as returned by .values(id, barcode, normalized_name_brand_size, brand__normalized_name)."""
+        return cls.from_rows(
+            (p['id'], p['normalized_name_brand_size'], p['brand__normalized_name'], p['barcode'])
+            for p in product_values
+        )
+
+    def _brand_code(self, brand_name):
+        if brand_name is None:
+            return _NO_BRAND
+        code = self._brand_code_by_name.get(brand_name)
+        if code is None:
+            code = len(self._brand_names)
+            self._brand_names.append(sys.intern(brand_name))
+            self._brand_code_by_name[brand_name] = code
+        return code
+
+    def _brand_name(self, code):
+        return None if code == _NO_BRAND else self._brand_names[code]
+
+    def _base_row_for_id(self, product_id):
+        index = bisect_left(self._ids, product_id)
+        if index < len(self._ids) and self._ids[index] == product_id:
+            return index
+        return None
+
+    def _row_for_id(self, product_id):
+        row = self._base_row_for_id(product_id)
+        return None if row in self._removed_rows else row
+
+    def _base_id_for_barcode(self, barcode):
+        key = _pack_barcode(barcode)
+        if key is None:
+            return None
+        index = bisect_left(self._barcode_keys, key)
+        if index < len(self._barcode_keys) and self._barcode_keys[index] == key:
+            row = self._barcode_rows[index]
+            return None if row in self._removed_rows else self._ids[row]
+        return None
+
+    def _base_id_for_norm_string(self, norm_string):
+        h = _hash_norm_string(norm_string)
+        index = bisect_left(self._norm_hashes, h)
+        # Several norm strings can share a hash, so every row in the run is verified.
+        while index < len(self._norm_hashes) and self._norm_hashes[index] == h:
+            row = self._norm_rows[index]
+            if self._norm_strings[row] == norm_string and row not in self._removed_rows:
+                return self._ids[row]
+            index += 1
+        return None
+
+    def _get_row_values(self, product_id):
+        """Returns (norm_string, brand_code) for a cached product id, or None."""
+        overflow = self._id_overflow.get(product_id)
+        if overflow is not None:
+            return overflow
+        row = self._row_for_id(product_id)
+        if row is None:
+            return None
+        return self._norm_strings[row], self._brand_codes[row]
+
+    def _set_row_values(self, product_id, norm_string, brand_code):
+        current = self._get_row_values(product_id)
+        if current is not None:
+            old_norm_string = current[0]
+            if old_norm_string and old_norm_string != norm_string and self.by_norm_string.get(old_norm_string) == product_id:
+                # Keep the old string resolving to this product, as the dict cache did.
+                self._norm_overflow[old_norm_string] = product_id
+
+        row = self._row_for_id(product_id)
+        if row is not None and product_id not in self._id_overflow:
+            self._norm_strings[row] = norm_string
+            self._brand_codes[row] = brand_code
+        else:
+            self._id_overflow[product_id] = (norm_string, brand_code)
+
+    def add_product(self, product_id, norm_string, brand_name, barcode=None):
+        """Caches a product created during this run in all three tiers."""
+        self.by_id[product_id] = {
+            'id': product_id,
+            'normalized_name_brand_size': norm_string,
+            'brand_normalized_name': brand_name,
+        }
+        if barcode:
+            self.by_barcode[barcode] = product_id
+        if norm_string:
+            self.by_norm_string[norm_string] = product_id
+
+    def iter_rows(self):
+        """Yields (product_id, norm_string, brand_normalized_name, barcode) for every cached product."""
+        barcode_by_id = {}
+        for key, row in zip(self._barcode_keys, self._barcode_rows):
+            if row not in self._removed_rows:
+                barcode_by_id[self._ids[row]] = _unpack_barcode(key)
+        for barcode, product_id in self._barcode_overflow.items():
+            barcode_by_id[product_id] = barcode
+
+        for row, product_id in enumerate(self._ids):
+            if product_id in self._id_overflow or row in self._removed_rows:
+                continue
+            yield product_id, self._norm_strings[row], self._brand_name(self._brand_codes[row]), barcode_by_id.get(product_id)
+        for product_id, (norm_string, brand_code) in self._id_overflow.items():
+            yield product_id, norm_string, self._brand_name(brand_code), barcode_by_id.get(product_id)
+
+    def replace_products(self, rows, removed_ids=()):
+        """
+        Brings the cache up to date in place. Every product in `removed_ids` or `rows` is
+        dropped along with its barcode and norm string, then `rows` ((product_id,
+        norm_string, brand_normalized_name, barcode) tuples) are added back through the
+        overflow. Dropped base rows are only masked until the cache is rebuilt.
+        """
+        rows = list(rows)
+        stale_ids = set(removed_ids) | {row[0] for row in rows}
+        for product_id in stale_ids:
+            row = self._base_row_for_id(product_id)
+            if row is not None:
+                self._removed_rows.add(row)
+            self._id_overflow.pop(product_id, None)
+        self._barcode_overflow = {barcode: pid for barcode, pid in self._barcode_overflow.items() if pid not in stale_ids}
+        self._norm_overflow = {norm_string: pid for norm_string, pid in self._norm_overflow.items() if pid not in stale_ids}
+
+        for product_id, norm_string, brand_name, barcode in rows:
+            self.add_product(product_id, norm_string, brand_name, barcode)
+
+    @property
+    def stale_share(self):
+        """The share of products held outside the base arrays, or masked in them."""
+        return (len(self._removed_rows) + len(self._id_overflow)) / max(len(self._ids), 1)
+
+    def without_ids(self, product_ids):
+        """Returns a rebuilt cache that leaves out the given product ids entirely."""
+        product_ids = set(product_ids)
+        return CompactProductCache.from_rows(row for row in self.iter_rows() if row[0] not in product_ids)
+
+
+class _ProductRecord:
+    """
+    A view of one cached product that behaves like the slim dict it replaces:
+    {'id', 'normalized_name_brand_size', 'brand_normalized_name'}. Writes go
+    straight back to the cache.
+    """
+    __slots__ = ('_cache', '_product_id')
+    KEYS = ('id', 'normalized_name_brand_size', 'brand_normalized_name')
+
+    def __init__(self, cache, product_id):
+        self._cache = cache
+        self._product_id = product_id
+
+    def _values(self):
+        norm_string, brand_code = self._cache._get_row_values(self._product_id)
+        return norm_string, self._cache._brand_name(brand_code)
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self._product_id
+        norm_string, brand_name = self._values()
+        if key == 'normalized_name_brand_size':
+            return norm_string
+        if key == 'brand_normalized_name':
+            return brand_name
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        norm_string, brand_name = self._values()
+        if key == 'normalized_name_brand_size':
+            norm_string = value
+        elif key == 'brand_normalized_name':
+            brand_name = value
+        else:
+            raise KeyError(key)
+        self._cache._set_row_values(self._product_id, norm_string, self._cache._brand_code(brand_name))
+
+    def keys(self):
+        return self.KEYS
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, _ProductRecord)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def items(self):
+        return [(key, self[key]) for key in self.KEYS]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class _CacheView:
+    """Shared dict-like behaviour for the three views onto a CompactProductCache."""
+    def __init__(self, cache):
+        self._cache = cache
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, _CacheView)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+
+class _ProductsById(_CacheView):
+    def __getitem__(self, product_id):
+        if self._cache._get_row_values(product_id) is None:
+            raise KeyError(product_id)
+        return _ProductRecord(self._cache, product_id)
+
+    def __setitem__(self, product_id, data):
+        cache = self._cache
+        cache._set_row_values(
+            product_id,
+            data.get('normalized_name_brand_size'),
+            cache._brand_code(data.get('brand_normalized_name')),
+        )
+
+    def __iter__(self):
+        cache = self._cache
+        yield from (pid for row, pid in enumerate(cache._ids) if row not in cache._removed_rows)
+        yield from (pid for pid in cache._id_overflow if cache._row_for_id(pid) is None)
+
+    def __len__(self):
+        cache = self._cache
+        base = len(cache._ids) - len(cache._removed_rows)
+        return base + sum(1 for pid in cache._id_overflow if cache._row_for_id(pid) is None)
+
+
+class _ProductIdsByBarcode(_CacheView):
+    def __getitem__(self, barcode):
+        cache = self._cache
+        product_id = cache._barcode_overflow.get(barcode)
+        if product_id is None and barcode:
+            product_id = cache._base_id_for_barcode(barcode)
+        if product_id is None:
+            raise KeyError(barcode)
+        return product_id
+
+    def __setitem__(self, barcode, product_id):
+        self._cache._barcode_overflow[barcode] = product_id
+
+    def __iter__(self):
+        cache = self._cache
+        yield from (
+            _unpack_barcode(key) for key, row in zip(cache._barcode_keys, cache._barcode_rows)
+            if row not in cache._removed_rows
+        )
+        yield from (barcode for barcode in cache._barcode_overflow if cache._base_id_for_barcode(barcode) is None)
+
+    def __len__(self):
+        cache = self._cache
+        new_keys = sum(1 for barcode in cache._barcode_overflow if cache._base_id_for_barcode(barcode) is None)
+        removed = sum(1 for row in cache._barcode_rows if row in cache._removed_rows) if cache._removed_rows else 0
+        return len(cache._barcode_keys) - removed + new_keys
+
+
+class _ProductIdsByNormString(_CacheView):
+    def __getitem__(self, norm_string):
+        cache = self._cache
+        product_id = cache._norm_overflow.get(norm_string)
+        if product_id is None and norm_string:
+            product_id = cache._base_id_for_norm_string(norm_string)
+        if product_id is None:
+            raise KeyError(norm_string)
+        return product_id
+
+    def __setitem__(self, norm_string, product_id):
+        self._cache._norm_overflow[norm_string] = product_id
+
+    def __iter__(self):
+        cache = self._cache
+        for h, row in zip(cache._norm_hashes, cache._norm_rows):
+            norm_string = cache._norm_strings[row]
+            # Rows renamed at runtime keep their old string in the overflow instead.
+            if norm_string and _hash_norm_string(norm_string) == h and row not in cache._removed_rows:
+                yield norm_string
+        yield from (s for s in cache._norm_overflow if cache._base_id_for_norm_string(s) is None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
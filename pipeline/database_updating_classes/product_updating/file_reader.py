@@ -1,12 +1,44 @@
+import gzip
 import json
 
 class FileReader:
     """
-    Reads and consolidates data from a .jsonl product file.
+    Reads and consolidates data from a .jsonl product file, or a .jsonl.gz as the
+    scraper writes and archives them.
     """
     def __init__(self, file_path):
         self.file_path = file_path
 
+    def _iter_product_lines(self):
+        """
+        Yields every parsed line that carries a 'product' payload, skipping malformed lines.
+        Raises FileNotFoundError if the file does not exist.
+        """
+        opener = gzip.open if str(self.file_path).endswith('.gz') else open
+        with opener(self.file_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    # Ignore malformed lines
+                    continue
+                if not data.get('product'):
+                    continue
+                yield data
+
+    def _iter_unique_products(self):
+        """
+        Yields the first occurrence of each normalized_name_brand_size in the file.
+        Only the keys are held in memory, never the product data itself.
+        """
+        seen_keys = set()
+        for data in self._iter_product_lines():
+            # Use normalized_name_brand_size to ensure uniqueness within the file
+            key = data['product'].get('normalized_name_brand_size')
+            if key and key not in seen_keys:
+                seen_keys.add(key)
+                yield data
+
     def read_and_consolidate(self):
         """
         Reads a .jsonl file, extracts shared metadata from the first line,
@@ -16,26 +48,72 @@ class FileReader:
         consolidated_data = {}
 
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        data = json.loads(line)
-                        if not data.get('product'):
-                            continue
-
-                        # Capture metadata from the first valid line
-                        if first_line_meta is None and data.get('metadata'):
-                            first_line_meta = data['metadata']
-                        
-                        # Use normalized_name_brand_size to ensure uniqueness within the file
-                        key = data['product'].get('normalized_name_brand_size')
-                        if key and key not in consolidated_data:
-                            consolidated_data[key] = data
-
-                    except (json.JSONDecodeError, KeyError):
-                        # Ignore malformed lines or lines missing essential keys
-                        continue
+            for data in self._iter_product_lines():
+                # Capture metadata from the first valid line
+                if first_line_meta is None and data.get('metadata'):
+                    first_line_meta = data['metadata']
+
+                key = data['product'].get('normalized_name_brand_size')
+                if key and key not in consolidated_data:
+                    consolidated_data[key] = data
         except FileNotFoundError:
             return None, []
 
         return first_line_meta, list(consolidated_data.values())
+
+    def read_metadata(self):
+        """
+        Returns the metadata of the first product line that carries any, reading no
+        further than that line. Returns None if the file is missing or has none.
+        """
+        try:
+            for data in self._iter_product_lines():
+                if data.get('metadata'):
+                    return data['metadata']
+        except FileNotFoundError:
+            pass
+        return None
+
+    def read_metadata_and_count(self):
+        """
+        Scans the file once without keeping product data in memory.
+        Returns the metadata and the number of unique products, matching what
+        read_and_consolidate would return for the same file.
+        """
+        first_line_meta = None
+        seen_keys = set()
+
+        try:
+            for data in self._iter_product_lines():
+                if first_line_meta is None and data.get('metadata'):
+                    first_line_meta = data['metadata']
+
+                key = data['product'].get('normalized_name_brand_size')
+                if key:
+                    seen_keys.add(key)
+        except FileNotFoundError:
+            return None, 0
+
+        return first_line_meta, len(seen_keys)
+
+    def iter_chunks(self, chunk_size):
+        """
+        Yields the consolidated product list in lists of at most `chunk_size` items,
+        in the same order as read_and_consolidate. Every call re-reads the file, so
+        peak memory is bounded by the chunk size rather than by the file size.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer.")
+
+        chunk = []
+        try:
+            for data in self._iter_unique_products():
+                chunk.append(data)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        except FileNotFoundError:
+            return
+
+        if chunk:
+            yield chunk
@@ -0,0 +1,32 @@
+import django
+
+
+def init_worker():
+    """Process pool initializer: worker processes are spawned fresh and need Django set up."""
+    django.setup()
+
+
+def process_company_files(file_paths, orchestrator_options, writer_lock):
+    """
+    Runs in a worker process. Ingests one company's files in order with its own
+    UpdateOrchestrator, sharing `writer_lock` with every other worker so that
+    product, brand and category path writes go through a single writer at a time.
+    Returns the number of files handled and the worker's TranslationTableChanges.
+    """
+    # Imported here so that models are only loaded after init_worker has run.
+    from django.core.management.base import BaseCommand
+    from django.db import connections
+    from .update_orchestrator import UpdateOrchestrator
+
+    command = BaseCommand()
+    orchestrator = UpdateOrchestrator(command, writer_lock=writer_lock, **orchestrator_options)
+    try:
+        # The parent has already refreshed the snapshot; workers only read it.
+        orchestrator._build_global_caches(save_snapshot=False)
+
+        current_company_id_in_cache = None
+        for file_path in file_paths:
+            current_company_id_in_cache = orchestrator._process_file(file_path, current_company_id_in_cache)
+    finally:
+        connections.close_all()
+    return len(file_paths), orchestrator.translation_changes
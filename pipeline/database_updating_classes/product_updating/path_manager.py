@@ -1,8 +1,12 @@
+from contextlib import nullcontext
 from django.utils.text import slugify
 from products.models import Product
 from pipeline.utils.path_classifier import classify_path
+from pipeline.utils.database_updating_utils.bulk_merge import bulk_merge
+from pipeline.database_updating_classes.product_updating.run_report import RunReport
 
 BATCH_SIZE = 500
+FETCH_BATCH_SIZE = 5000
 
 
 def _make_path_key(company_name: str, path: list) -> str:
@@ -29,86 +33,112 @@ class PathManager:
     }
     """
 
-    def __init__(self, command, caches, cache_updater):
+    def __init__(self, command, caches, cache_updater, writer_lock=None, run_report=None):
         self.command = command
         self.caches = caches
         self.cache_updater = cache_updater
+        # Set when other worker processes write category paths concurrently (see UpdateOrchestrator).
+        self.writer_lock = writer_lock
+        self.run_report = run_report or RunReport()
 
     def process(self, raw_product_data: list, company_obj) -> None:
+        self.process_chunks([raw_product_data], company_obj)
+
+    def process_chunks(self, raw_product_chunks, company_obj) -> None:
+        """
+        Merges category paths from an iterable of raw product data lists.
+        Only {product_id: path} is kept across chunks (with identical paths shared),
+        and products are fetched and written in fixed-size batches.
+        """
         self.command.stdout.write(f"  - PathManager: Processing category paths for {company_obj.name}...")
 
+        with self.run_report.stage('paths', rows_in=0) as stage:
+            stage['rows_out'] = self._process_path_chunks(raw_product_chunks, company_obj, stage)
+
+    def _process_path_chunks(self, raw_product_chunks, company_obj, stage) -> int:
+        """Does the work of process_chunks, counting rows read on the report `stage`. Returns the number of products updated."""
+
         # Build {product_id: path} for products that have a category_path
         product_id_to_path: dict[int, list] = {}
-        for data in raw_product_data:
-            product_dict = data.get('product', {})
-            path = product_dict.get('category_path')
-            if not path or not isinstance(path, list):
-                continue
-            product_id = self.caches['products_by_norm_string'].get(
-                product_dict.get('normalized_name_brand_size')
-            )
-            if product_id:
-                product_id_to_path[product_id] = path
+        shared_paths: dict[tuple, list] = {}
+        for raw_product_data in raw_product_chunks:
+            stage['rows_in'] += len(raw_product_data)
+            for data in raw_product_data:
+                product_dict = data.get('product', {})
+                path = product_dict.get('category_path')
+                if not path or not isinstance(path, list):
+                    continue
+                product_id = self.caches['products_by_norm_string'].get(
+                    product_dict.get('normalized_name_brand_size')
+                )
+                if product_id:
+                    product_id_to_path[product_id] = shared_paths.setdefault(tuple(path), path)
 
         if not product_id_to_path:
             self.command.stdout.write("    - No category paths found in file.")
-            return
+            return 0
 
         self.command.stdout.write(f"    - Found category paths for {len(product_id_to_path)} products.")
 
-        # Fetch current category_paths for all affected products in one query
-        product_ids = list(product_id_to_path.keys())
-        self.command.stdout.write(f"    - Fetching {len(product_ids)} products for category path update...")
-        products = {
-            p.id: p
-            for p in Product.objects.filter(id__in=product_ids).only('id', 'category_paths')
-        }
-        self.command.stdout.write(f"    - Fetched {len(products)} products.")
-
         company_name = company_obj.name
-        to_update = []
         classification_cache = {}
-        processed_count = 0
-
-        for product_id, path in product_id_to_path.items():
-            product = products.get(product_id)
-            if not product:
-                continue
-
-            path_key = _make_path_key(company_name, path)
-            existing_paths: list = product.category_paths or []
-
-            # Find existing entry for this company+path
-            matched = next((e for e in existing_paths if e.get('path_key') == path_key), None)
-            if matched:
-                matched['evidence_count'] = matched.get('evidence_count', 1) + 1
-            else:
-                classification = classification_cache.get(path_key)
-                if classification is None:
-                    classification = classify_path(company_name, path)
-                    classification_cache[path_key] = classification
-                existing_paths.append({
-                    'company': company_name,
-                    'path': path,
-                    'path_key': path_key,
-                    'root_name': path[0] if path else '',
-                    'leaf_name': path[-1] if path else '',
-                    'path_type': classification['path_type'],
-                    'canonical_key': classification['canonical_key'],
-                    'primary_category_slug': classification['primary_category_slug'],
-                    'evidence_count': 1,
-                })
-
-            product.category_paths = existing_paths
-            to_update.append(product)
-            processed_count += 1
-
-            if processed_count % 5000 == 0:
-                self.command.stdout.write(f"    - Prepared category_paths for {processed_count} products...")
-
-        if to_update:
-            self.command.stdout.write(
-                f"    - Writing category_paths for {len(to_update)} products in batches of {BATCH_SIZE}..."
-            )
-            Product.objects.bulk_update(to_update, ['category_paths'], batch_size=BATCH_SIZE)
-            self.command.stdout.write(f"    - Updated category_paths for {len(to_update)} products.")
+        product_ids = list(product_id_to_path.keys())
+        updated_count = 0
+
+        for i in range(0, len(product_ids), FETCH_BATCH_SIZE):
+            batch_ids = product_ids[i:i + FETCH_BATCH_SIZE]
+
+            # category_paths is read, merged and written back, so in a parallel run
+            # each batch is handled while holding the writer lock.
+            with self.writer_lock or nullcontext():
+                # Fetch current category_paths for this batch of affected products in one query
+                self.command.stdout.write(f"    - Fetching {len(batch_ids)} products for category path update...")
+                products = {
+                    p.id: p
+                    for p in Product.objects.filter(id__in=batch_ids).only('id', 'category_paths')
+                }
+                self.command.stdout.write(f"    - Fetched {len(products)} products.")
+
+                to_update = []
+                for product_id in batch_ids:
+                    product = products.get(product_id)
+                    if not product:
+                        continue
+
+                    path = product_id_to_path[product_id]
+                    path_key = _make_path_key(company_name, path)
+                    existing_paths: list = product.category_paths or []
+
+                    # Find existing entry for this company+path
+                    matched = next((e for e in existing_paths if e.get('path_key') == path_key), None)
+                    if matched:
+                        matched['evidence_count'] = matched.get('evidence_count', 1) + 1
+                    else:
+                        classification = classification_cache.get(path_key)
+                        if classification is None:
+                            classification = classify_path(company_name, path)
+                            classification_cache[path_key] = classification
+                        existing_paths.append({
+                            'company': company_name,
+                            'path': list(path),
+                            'path_key': path_key,
+                            'root_name': path[0] if path else '',
+                            'leaf_name': path[-1] if path else '',
+                            'path_type': classification['path_type'],
+                            'canonical_key': classification['canonical_key'],
+                            'primary_category_slug': classification['primary_category_slug'],
+                            'evidence_count': 1,
+                        })
+
+                    product.category_paths = existing_paths
+                    to_update.append(product)
+
+                if to_update:
+                    self.command.stdout.write(
+                        f"    - Writing category_paths for {len(to_update)} products in batches of {BATCH_SIZE}..."
+                    )
+                    bulk_merge(to_update, ['category_paths'], batch_size=BATCH_SIZE)
+                    updated_count += len(to_update)
+
+        self.command.stdout.write(f"    - Updated category_paths for {updated_count} products.")
+        return updated_count
@@ -1,5 +1,6 @@
 import os
 from django.db import transaction
+from django.utils import timezone
 from products.models import Product, ProductBrand
 from scraping.utils.product_scraping_utils.BaseDataCleaner import BaseDataCleaner
 
@@ -17,9 +18,11 @@ class BrandReconciler:
     Finds and merges duplicate ProductBrand objects based on a translation table.
     This is a self-contained process that runs after all products have been updated.
     """
-    def __init__(self, command):
+    def __init__(self, command, translation_changes=None):
         self.command = command
         self.translation_table_path = TRANSLATION_TABLE_PATH
+        # A TranslationTableChanges that records merged and deleted brands, if any.
+        self.translation_changes = translation_changes
 
     def _load_translation_table(self):
         """Safely loads the translation dictionary from the JSON file."""
@@ -100,7 +103,7 @@ class BrandReconciler:
                 # 1. Update foreign keys on Product table
                 self.command.stdout.write("  - Re-assigning products from duplicate brands...")
                 for canon_id, dupe_ids in fk_updates.items():
-                    Product.objects.filter(brand_id__in=dupe_ids).update(brand_id=canon_id)
+                    Product.objects.filter(brand_id__in=dupe_ids).update(brand_id=canon_id, updated_at=timezone.now())
 
                 # 2. Update canonical brands with new variations
                 if brands_to_update:
@@ -120,6 +123,12 @@ class BrandReconciler:
                 ProductBrand.objects.filter(id__in=brands_to_delete_ids).delete()
                 self.command.stdout.write(f"  - Bulk deleted {len(brands_to_delete_ids)} duplicate brands.")
 
+            if self.translation_changes is not None:
+                self.translation_changes.mark_brands(brands_to_update.keys())
+                self.translation_changes.mark_removed_brands(
+                    b.normalized_name for b in all_brands if b.id in brands_to_delete_ids
+                )
+
             self.command.stdout.write(self.command.style.SUCCESS("Brand reconciliation completed successfully."))
 
         except Exception as e:
@@ -5,8 +5,10 @@ class OrphanProductCleaner:
     """
     A post-processing utility to find and delete products that have no associated prices.
     """
-    def __init__(self, command):
+    def __init__(self, command, translation_changes=None):
         self.command = command
+        # A TranslationTableChanges that records the deleted products, if any.
+        self.translation_changes = translation_changes
 
     def run(self):
         """
@@ -29,6 +31,10 @@ class OrphanProductCleaner:
 
             # .delete() on a queryset is a single, efficient bulk operation.
             with transaction.atomic():
+                if self.translation_changes is not None:
+                    self.translation_changes.mark_removed_products(
+                        orphans_to_delete.values_list('normalized_name_brand_size', flat=True)
+                    )
                 deleted_count, _ = orphans_to_delete.delete()
 
             self.command.stdout.write(self.command.style.SUCCESS(f"  - Successfully deleted {deleted_count} orphan products and associated sku and brand objects."))
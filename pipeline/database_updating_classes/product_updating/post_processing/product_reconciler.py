@@ -1,9 +1,11 @@
 import os
 from django.db import transaction
-from django.db.models import Q
+from django.utils import timezone
+from django.db.models import Q, Case, When, Value, IntegerField
 from products.models import Product, Price
 from .product_enricher import ProductEnricher
 from scraping.utils.product_scraping_utils.BaseDataCleaner import BaseDataCleaner
+from pipeline.utils.database_updating_utils.bulk_merge import bulk_merge
 
 TRANSLATION_TABLE_PATH = os.path.abspath(os.path.join(
     os.path.dirname(__file__),
@@ -19,9 +21,11 @@ class ProductReconciler:
     Finds and merges duplicate Product objects based on a translation table.
     This is a self-contained process that runs after all products have been updated.
     """
-    def __init__(self, command):
+    def __init__(self, command, translation_changes=None):
         self.command = command
         self.translation_table_path = TRANSLATION_TABLE_PATH
+        # A TranslationTableChanges that records merged and deleted products, if any.
+        self.translation_changes = translation_changes
 
     def _load_translation_table(self):
         """Safely loads the translation dictionary from the JSON file."""
@@ -31,6 +35,63 @@ class ProductReconciler:
             self.command.stderr.write(self.command.style.ERROR(f"Error loading product translation table: {e}"))
             return {}
 
+    def _final_canonical_ids(self, fk_updates):
+        """
+        Follows chains in {duplicate_id: canonical_id} (a canonical that is itself a
+        duplicate in the same chunk) so that every duplicate maps to a product that is
+        kept. A cycle is left pointing at its first step.
+        """
+        resolved = {}
+        for dupe_id, canon_id in fk_updates.items():
+            seen = {dupe_id}
+            final_id = canon_id
+            while final_id in fk_updates and final_id not in seen:
+                seen.add(final_id)
+                final_id = fk_updates[final_id]
+            resolved[dupe_id] = canon_id if final_id in seen else final_id
+        return resolved
+
+    def _merge_prices(self, fk_updates):
+        """
+        Moves the prices of every duplicate in a chunk onto its canonical product with a
+        fixed number of statements, however many products are merged: one fetch of the
+        involved prices, one delete of the prices that lose and one update repointing the
+        ones that win. For each canonical product and company, the most recently scraped
+        price is kept. Must be called inside a transaction.
+        """
+        canonical_ids = self._final_canonical_ids(fk_updates)
+        involved_ids = set(canonical_ids) | set(canonical_ids.values())
+        involved_prices = Price.objects.filter(product_id__in=involved_ids).values_list(
+            'pk', 'product_id', 'company_id', 'scraped_date'
+        )
+
+        prices_by_group = {}
+        for price in involved_prices:
+            pk, product_id, company_id, scraped_date = price
+            canon_id = canonical_ids.get(product_id, product_id)
+            prices_by_group.setdefault((canon_id, company_id), []).append(price)
+
+        prices_to_delete_pks = []
+        pks_to_repoint = {}  # {canonical_id: [price pks]}
+        for (canon_id, _), price_group in prices_by_group.items():
+            price_group.sort(key=lambda p: p[3], reverse=True)
+            winner, losers = price_group[0], price_group[1:]
+            prices_to_delete_pks.extend(p[0] for p in losers)
+            if winner[1] != canon_id:
+                pks_to_repoint.setdefault(canon_id, []).append(winner[0])
+
+        # Losers go first: the winner may take over a (product, company) pair that a loser still holds.
+        if prices_to_delete_pks:
+            Price.objects.filter(pk__in=prices_to_delete_pks).delete()
+
+        if pks_to_repoint:
+            Price.objects.filter(pk__in=[pk for pks in pks_to_repoint.values() for pk in pks]).update(
+                product_id=Case(
+                    *[When(pk__in=pks, then=Value(canon_id)) for canon_id, pks in pks_to_repoint.items()],
+                    output_field=IntegerField(),
+                )
+            )
+
     def run(self):
         """
         Orchestrates the entire product reconciliation process.
@@ -66,7 +127,7 @@ class ProductReconciler:
             product_map = {p.normalized_name_brand_size: p for p in all_products}
             
             products_to_update = {}
-            fk_updates = {}
+            fk_updates = {}  # {duplicate_id: canonical_id}
             products_to_delete_ids = set()
 
             for variation_name, canonical_name in chunk_translations.items():
@@ -76,7 +137,7 @@ class ProductReconciler:
                 if not duplicate_product or not canonical_product or duplicate_product.id == canonical_product.id:
                     continue
 
-                fk_updates.setdefault(canonical_product.id, []).append(duplicate_product.id)
+                fk_updates[duplicate_product.id] = canonical_product.id
                 products_to_delete_ids.add(duplicate_product.id)
 
                 if canonical_product.id not in products_to_update:
@@ -93,48 +154,26 @@ class ProductReconciler:
 
             try:
                 with transaction.atomic():
-                    for canon_id, dupe_ids in fk_updates.items():
-                        involved_prices = list(Price.objects.filter(
-                            Q(product_id=canon_id) | Q(product_id__in=dupe_ids)
-                        ))
-
-                        prices_by_company = {}
-                        for p in involved_prices:
-                            prices_by_company.setdefault(p.company_id, []).append(p)
-
-                        prices_to_delete_pks = []
-                        prices_to_update_pks = []
-
-                        for company_id, price_group in prices_by_company.items():
-                            if len(price_group) == 1:
-                                price = price_group[0]
-                                if price.product_id in dupe_ids:
-                                    prices_to_update_pks.append(price.pk)
-                            else:
-                                price_group.sort(key=lambda x: x.scraped_date, reverse=True)
-                                winner = price_group[0]
-                                losers = price_group[1:]
-                                
-                                for loser in losers:
-                                    prices_to_delete_pks.append(loser.pk)
-                                
-                                if winner.product_id in dupe_ids:
-                                    prices_to_update_pks.append(winner.pk)
-                        
-                        if prices_to_delete_pks:
-                            Price.objects.filter(pk__in=prices_to_delete_pks).delete()
-                        
-                        if prices_to_update_pks:
-                            Price.objects.filter(pk__in=prices_to_update_pks).update(product_id=canon_id)
+                    self._merge_prices(fk_updates)
 
                     Product.objects.filter(id__in=products_to_delete_ids).delete()
                     
                     if products_to_update:
                         update_fields = [
                             'barcode', 'url', 'aldi_image_url', 'has_no_coles_barcode',
-                            'sizes', 'normalized_name_brand_size_variations', 'brand_name_company_pairs'
+                            'sizes', 'normalized_name_brand_size_variations', 'brand_name_company_pairs',
+                            'updated_at'
                         ]
-                        Product.objects.bulk_update(list(products_to_update.values()), update_fields, batch_size=500)
+                        now = timezone.now()
+                        for product in products_to_update.values():
+                            product.updated_at = now
+                        bulk_merge(list(products_to_update.values()), update_fields, batch_size=500)
+
+                if self.translation_changes is not None:
+                    self.translation_changes.mark_products(products_to_update.keys())
+                    self.translation_changes.mark_removed_products(
+                        p.normalized_name_brand_size for p in all_products if p.id in products_to_delete_ids
+                    )
 
             except Exception as e:
                 self.command.stderr.write(self.command.style.ERROR(f"An error occurred during product reconciliation chunk: {e}"))
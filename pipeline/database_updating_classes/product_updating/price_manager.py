@@ -3,49 +3,45 @@ from django.db import transaction
 from products.models import Price
 from datetime import datetime
 from decimal import Decimal
+from pipeline.utils.database_updating_utils.bulk_merge import bulk_merge
+from pipeline.database_updating_classes.product_updating.run_report import RunReport
 
 class PriceManager:
     """
     Manages the creation, updating, and deletion of Price objects for a specific company.
     """
-    def __init__(self, command, caches, cache_updater):
+    def __init__(self, command, caches, cache_updater, run_report=None):
         self.command = command
         self.caches = caches
         self.cache_updater = cache_updater
+        self.run_report = run_report or RunReport()
 
-    def process(self, raw_product_data, company):
+    def _parse_scraped_date(self, raw_product_data):
         """
-        Processes raw product data to create, update, or delete Price objects for the given company.
+        Returns the scraped date from the metadata of the first product in the consolidated data,
+        or None if it is missing or cannot be parsed.
         """
-        self.command.stdout.write(f"  - PriceManager: Processing prices for company {company.name}...")
-
-        # Step 1: Reset was_price for all prices in this company
-        self.command.stdout.write(f"    - Resetting was_price for all existing prices in company {company.name}...")
-        Price.objects.filter(company=company).update(was_price=None)
-
-        company_price_cache = self.caches['prices_by_company'].get(company.id, {})
-        hash_to_pk_cache = company_price_cache.get('hash_to_pk', {})
-        product_id_to_pk_cache = company_price_cache.get('product_id_to_pk', {})
-
-        prices_to_create = []
-        prices_to_update = []
-        seen_hashes = set()
-        
-        # Get the scraped_date from the metadata of the first product in the consolidated data
         scraped_date_str = None
         if raw_product_data:
             scraped_date_str = raw_product_data[0].get('metadata', {}).get('scraped_date')
 
-        scraped_datetime = None
         try:
             scraped_datetime = datetime.fromisoformat(scraped_date_str)
             # Make the datetime timezone-aware if it's naive
             if timezone.is_naive(scraped_datetime):
                 scraped_datetime = timezone.make_aware(scraped_datetime)
-            scraped_date = scraped_datetime.date()
+            return scraped_datetime.date()
         except (ValueError, TypeError):
             self.command.stderr.write(self.command.style.ERROR(f"    - Could not parse scraped_date: {scraped_date_str}. Cannot process prices."))
-            return
+            return None
+
+    def _build_price_changes(self, raw_product_data, company, scraped_date, hash_to_pk_cache, product_id_to_pk_cache, seen_hashes):
+        """
+        Sorts one batch of raw product data into new and changed Price objects.
+        Hashes found in the batch are added to `seen_hashes`.
+        """
+        prices_to_create = []
+        prices_to_update = []
 
         # Collect PKs of prices that will be updated to fetch their old prices
         pks_of_prices_to_update = []
@@ -102,38 +98,26 @@ class PriceManager:
                     # No existing price for this product -> CREATE
                     price_obj = Price(**price_data)
                     prices_to_create.append(price_obj)
-        
-        # Step 3: Get old prices for those that will be updated
+
+        # Get old prices for those that will be updated
         old_prices_map = {p.pk: p.price for p in Price.objects.filter(pk__in=pks_of_prices_to_update)}
 
-        # Step 4: Set new was_price and calculate save_amount for prices to update
+        # Set new was_price and calculate save_amount for prices to update
         for price_obj in prices_to_update:
             old_price = old_prices_map.get(price_obj.pk)
             if old_price is not None: # Should always be true for prices_to_update
                 price_obj.was_price = old_price
                 price_obj.save_amount = old_price - price_obj.price # Calculate save_amount
             else:
-                price_obj.was_price = None 
+                price_obj.was_price = None
                 price_obj.save_amount = None
 
-        # Identify prices to delete (delisted products)
-        # Exclude PKs that are already being updated to avoid deleting then failing to update
-        pks_being_updated = {p.pk for p in prices_to_update}
-        initial_hashes_in_db = set(hash_to_pk_cache.keys())
-        hashes_to_delete = initial_hashes_in_db - seen_hashes
-        pks_to_delete = [hash_to_pk_cache[h] for h in hashes_to_delete if hash_to_pk_cache[h] not in pks_being_updated]
+        return prices_to_create, prices_to_update
 
-        if not prices_to_create and not prices_to_update and not pks_to_delete:
-            self.command.stdout.write("    - No price changes to persist.")
-            return
-
-        # Persistence
+    def _persist_price_changes(self, prices_to_create, prices_to_update):
+        """Writes one batch of new and changed prices in a single transaction."""
         try:
             with transaction.atomic():
-                if pks_to_delete:
-                    self.command.stdout.write(f"    - Deleting {len(pks_to_delete)} delisted prices.")
-                    Price.objects.filter(pk__in=pks_to_delete).delete()
-
                 if prices_to_create:
                     self.command.stdout.write(f"    - Creating {len(prices_to_create)} new prices.")
                     Price.objects.bulk_create(prices_to_create, batch_size=500)
@@ -145,8 +129,102 @@ class PriceManager:
                         'unit_of_measure', 'per_unit_price_string', 'is_on_special',
                         'price_hash', 'save_amount' # Add save_amount to update fields
                     ]
-                    Price.objects.bulk_update(prices_to_update, update_fields, batch_size=500)
-            
+                    bulk_merge(prices_to_update, update_fields, batch_size=500)
+
         except Exception as e:
             self.command.stderr.write(self.command.style.ERROR(f"    - Error processing prices: {e}"))
             raise
+
+    def _clear_was_prices(self, pks_to_clear):
+        """Resets was_price and save_amount on the given prices only, in batches."""
+        self.command.stdout.write(f"    - Clearing stale was_price on {len(pks_to_clear)} unchanged prices.")
+        pks_to_clear = list(pks_to_clear)
+        with transaction.atomic():
+            for i in range(0, len(pks_to_clear), 500):
+                Price.objects.filter(pk__in=pks_to_clear[i:i + 500]).update(was_price=None, save_amount=None)
+
+    def process(self, raw_product_data, company):
+        """
+        Processes raw product data to create, update, or delete Price objects for the given company.
+        """
+        self.process_chunks([raw_product_data], company)
+
+    def process_chunks(self, raw_product_chunks, company):
+        """
+        Processes an iterable of raw product data lists for the given company.
+        New and changed prices are written chunk by chunk; delisted prices are only
+        deleted once every chunk has been seen, since that requires the full set of hashes.
+        Only rows in the hash diff are written: unchanged prices are never touched.
+        """
+        self.command.stdout.write(f"  - PriceManager: Processing prices for company {company.name}...")
+
+        with self.run_report.stage('prices', rows_in=0) as stage:
+            self._process_price_chunks(raw_product_chunks, company, stage)
+
+    def _process_price_chunks(self, raw_product_chunks, company, stage):
+        """Does the work of process_chunks, counting rows read and written on the report `stage`."""
+        stage['rows_out'] = 0
+
+        # Step 1: Load the price cache for this company
+        company_price_cache = self.caches['prices_by_company'].get(company.id, {})
+        hash_to_pk_cache = company_price_cache.get('hash_to_pk', {})
+        product_id_to_pk_cache = company_price_cache.get('product_id_to_pk', {})
+        pks_with_was_price = company_price_cache.get('pks_with_was_price')
+
+        seen_hashes = set()
+        pks_being_updated = set()
+        scraped_date = None
+        has_changes = False
+
+        for raw_product_data in raw_product_chunks:
+            if scraped_date is None:
+                scraped_date = self._parse_scraped_date(raw_product_data)
+                if scraped_date is None:
+                    return
+
+            stage['rows_in'] += len(raw_product_data)
+
+            # Step 2: Sort this chunk into creations and updates
+            prices_to_create, prices_to_update = self._build_price_changes(
+                raw_product_data, company, scraped_date,
+                hash_to_pk_cache, product_id_to_pk_cache, seen_hashes
+            )
+
+            if prices_to_create or prices_to_update:
+                has_changes = True
+                pks_being_updated.update(p.pk for p in prices_to_update)
+                self._persist_price_changes(prices_to_create, prices_to_update)
+                stage['rows_out'] += len(prices_to_create) + len(prices_to_update)
+
+        if scraped_date is None:
+            self.command.stdout.write("    - No product data supplied. Skipping prices.")
+            return
+
+        # Step 3: Identify prices to delete (delisted products)
+        # Exclude PKs that are already being updated to avoid deleting then failing to update
+        initial_hashes_in_db = set(hash_to_pk_cache.keys())
+        hashes_to_delete = initial_hashes_in_db - seen_hashes
+        pks_to_delete = [hash_to_pk_cache[h] for h in hashes_to_delete if hash_to_pk_cache[h] not in pks_being_updated]
+
+        # Step 4: Clear was_price left over from an earlier run on prices that did not change in this one.
+        if pks_with_was_price is None:
+            pks_with_was_price = Price.objects.filter(company=company, was_price__isnull=False).values_list('pk', flat=True)
+        pks_to_clear = set(pks_with_was_price) - pks_being_updated - set(pks_to_delete)
+
+        if not has_changes and not pks_to_delete and not pks_to_clear:
+            self.command.stdout.write("    - No price changes to persist.")
+            return
+
+        if pks_to_clear:
+            self._clear_was_prices(pks_to_clear)
+            stage['rows_out'] += len(pks_to_clear)
+
+        if pks_to_delete:
+            try:
+                with transaction.atomic():
+                    self.command.stdout.write(f"    - Deleting {len(pks_to_delete)} delisted prices.")
+                    Price.objects.filter(pk__in=pks_to_delete).delete()
+                    stage['rows_out'] += len(pks_to_delete)
+            except Exception as e:
+                self.command.stderr.write(self.command.style.ERROR(f"    - Error processing prices: {e}"))
+                raise
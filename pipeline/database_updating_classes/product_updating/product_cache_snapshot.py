@@ -0,0 +1,147 @@
+import os
+import pickle
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from products.models import Product
+from .compact_product_cache import CompactProductCache
+
+# Bump whenever the layout of the pickled payload changes; older snapshots are then rebuilt.
+SNAPSHOT_VERSION = 3
+
+# Rows written shortly before the previous snapshot's scan started are re-read as well,
+# so that clock skew between writers cannot hide a change from the refresh.
+HIGH_WATER_MARK_OVERLAP = timedelta(minutes=5)
+
+# Once this share of the cached products sits in the overflow or is masked, the
+# refreshed cache is rebuilt into compact arrays instead of patched again.
+REBUILD_STALE_SHARE = 0.2
+
+
+class ProductCacheSnapshot:
+    """
+    Persists the lean product caches (products_by_id, products_by_barcode and
+    products_by_norm_string) to a versioned file on disk, as the single
+    CompactProductCache that backs all three.
+
+    On load, only products written since the snapshot's high-water mark
+    (Product.updated_at) are re-read and patched into the stored cache, which is
+    only rebuilt once REBUILD_STALE_SHARE of it is stale. Deleted products are
+    found with an id-only scan, run only when COUNT(*) shows some are missing.
+    This replaces the full Product table scan that every new UpdateOrchestrator
+    would otherwise run.
+    """
+    def __init__(self, command, snapshot_path):
+        self.command = command
+        self.snapshot_path = os.fspath(snapshot_path)
+
+    def _database_name(self):
+        return str(connection.settings_dict.get('NAME'))
+
+    def _read(self):
+        """Returns the stored payload, or None if it is missing, unreadable or incompatible."""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ValueError) as e:
+            self.command.stderr.write(self.command.style.WARNING(f"  - Could not read product cache snapshot ({e}). Rebuilding."))
+            return None
+
+        if not isinstance(payload, dict) or payload.get('version') != SNAPSHOT_VERSION:
+            self.command.stdout.write("  - Product cache snapshot has an old format. Rebuilding.")
+            return None
+        if payload.get('database') != self._database_name():
+            self.command.stdout.write("  - Product cache snapshot belongs to a different database. Rebuilding.")
+            return None
+        return payload
+
+    def _write(self, product_cache, high_water_mark):
+        """Writes the payload atomically so a crash never leaves a half-written snapshot behind."""
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        payload = {
+            'version': SNAPSHOT_VERSION,
+            'database': self._database_name(),
+            'high_water_mark': high_water_mark,
+            'product_cache': product_cache,
+        }
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.snapshot_path)
+
+    @staticmethod
+    def _as_caches(product_cache):
+        """Returns the three cache entries backed by a CompactProductCache."""
+        return {
+            'products_by_id': product_cache.by_id,
+            'products_by_barcode': product_cache.by_barcode,
+            'products_by_norm_string': product_cache.by_norm_string,
+        }
+
+    @staticmethod
+    def _product_values(queryset):
+        return queryset.values(
+            'id', 'barcode', 'normalized_name_brand_size', 'brand__normalized_name'
+        ).iterator(chunk_size=5000)
+
+    @classmethod
+    def build_product_cache(cls):
+        """Builds a CompactProductCache from a full scan of the Product table."""
+        return CompactProductCache.from_values(cls._product_values(Product.objects.all()))
+
+    @classmethod
+    def build_caches(cls):
+        """Builds the three product caches from a full scan of the Product table."""
+        return cls._as_caches(cls.build_product_cache())
+
+    def _refresh(self, payload):
+        """Returns the stored cache brought up to date with the database."""
+        product_cache = payload['product_cache']
+        changed_since = payload['high_water_mark'] - HIGH_WATER_MARK_OVERLAP
+        changed_rows = [
+            (p['id'], p['normalized_name_brand_size'], p['brand__normalized_name'], p['barcode'])
+            for p in self._product_values(Product.objects.filter(updated_at__gte=changed_since))
+        ]
+
+        # Created products are all among the changed rows, so the table can only be
+        # smaller than the cache plus the new rows if products were deleted.
+        new_count = sum(1 for row in changed_rows if row[0] not in product_cache.by_id)
+        deleted_ids = set()
+        if Product.objects.count() != len(product_cache.by_id) + new_count:
+            live_ids = set(Product.objects.values_list('id', flat=True).iterator(chunk_size=20000))
+            deleted_ids = {product_id for product_id in product_cache.by_id if product_id not in live_ids}
+
+        if changed_rows or deleted_ids:
+            product_cache.replace_products(changed_rows, deleted_ids)
+            if product_cache.stale_share > REBUILD_STALE_SHARE:
+                product_cache = CompactProductCache.from_rows(product_cache.iter_rows())
+
+        self.command.stdout.write(
+            f"  - Refreshed product cache snapshot: re-read {len(changed_rows)} changed products, dropped {len(deleted_ids)} deleted products."
+        )
+        return product_cache
+
+    def load(self, save=True):
+        """
+        Returns the three product caches, refreshed from the snapshot when one is
+        available and built from a full scan otherwise, and (unless `save` is False)
+        saves the result as the new snapshot.
+        """
+        # Taken before reading so that rows written during the scan are picked up next time.
+        high_water_mark = timezone.now()
+
+        payload = self._read()
+        if payload is None:
+            self.command.stdout.write("  - No usable product cache snapshot found. Running a full product scan...")
+            product_cache = self.build_product_cache()
+        else:
+            product_cache = self._refresh(payload)
+
+        if save:
+            try:
+                self._write(product_cache, high_water_mark)
+            except OSError as e:
+                self.command.stderr.write(self.command.style.WARNING(f"  - Could not save product cache snapshot: {e}"))
+        return self._as_caches(product_cache)
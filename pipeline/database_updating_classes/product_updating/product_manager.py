@@ -1,6 +1,11 @@
+from contextlib import nullcontext
 from django.db import transaction
+from django.utils import timezone
 from products.models import Product, SKU
+from pipeline.database_updating_classes.product_updating.product_upsert_writer import ProductUpsertWriter
 from pipeline.database_updating_classes.product_updating.post_processing.product_enricher import ProductEnricher
+from pipeline.database_updating_classes.product_updating.run_report import RunReport
+from pipeline.utils.database_updating_utils.bulk_merge import bulk_merge
 
 class ProductManager:
     """
@@ -8,17 +13,26 @@ class ProductManager:
     two-tier caching system. It resolves products using lightweight IDs and fetches
     full objects only when necessary for updates.
     """
-    def __init__(self, command, caches, cache_updater, discovered_brand_pairs):
+    def __init__(self, command, caches, cache_updater, discovered_brand_pairs, writer_lock=None, translation_changes=None, run_report=None):
         self.command = command
         self.caches = caches
         self.cache_updater = cache_updater
         self.discovered_brand_pairs = discovered_brand_pairs
+        # Set when other worker processes write products concurrently (see UpdateOrchestrator).
+        self.writer_lock = writer_lock
+        # A TranslationTableChanges that records products whose variations change, if any.
+        self.translation_changes = translation_changes
+        self.run_report = run_report or RunReport()
 
-    def _resolve_products(self, raw_product_data, company_obj):
+    def _resolve_products(self, raw_product_data, company_obj, staged_barcodes=None):
         """
         Sorts raw product data into 'create' and 'update' lists using the lean cache.
         Returns lists of data for creation, tuples of (product_id, data) for updates,
         and tuples of (product_id or norm_string, sku_value) for SKU creation.
+
+        `staged_barcodes` maps barcodes of products created earlier in the same file
+        to their norm_string. It is shared across calls when a file is processed in chunks,
+        so later chunks resolve barcode collisions exactly as a single in-memory batch would.
         """
         self.command.stdout.write("    - Resolving products and SKUs (create vs. update)...")
         products_to_create_data = []
@@ -26,7 +40,8 @@ class ProductManager:
         skus_to_create_tuples = []    # Stores (product_id or norm_string, sku_value)
 
         company_sku_cache = self.caches['products_by_sku'].get(company_obj.name, {})
-        staged_barcodes = {}  
+        if staged_barcodes is None:
+            staged_barcodes = {}
 
         for data in raw_product_data:
             product_dict = data.get('product', {})
@@ -36,9 +51,9 @@ class ProductManager:
             sku = product_dict.get('sku')
             matched_product_id = None
             
-            # Tier 1: Barcode
+            # Tier 1: Barcode (barcodes staged earlier in this file are handled as collisions below)
             barcode = product_dict.get('barcode')
-            if barcode and barcode in self.caches['products_by_barcode']:
+            if barcode and barcode not in staged_barcodes and barcode in self.caches['products_by_barcode']:
                 matched_product_id = self.caches['products_by_barcode'][barcode]
 
             # Tier 2: SKU (if no barcode match)
@@ -165,26 +180,65 @@ class ProductManager:
                 product_objects_to_update.append(existing_product)
         return product_objects_to_update
 
+    def _cache_product(self, product_id, norm_string, brand_norm_name, barcode):
+        """Adds a product that is new to this process to every cache tier."""
+        # Tier 2 cache: ID -> slim data dictionary
+        self.caches['products_by_id'][product_id] = {
+            'id': product_id,
+            'normalized_name_brand_size': norm_string,
+            'brand_normalized_name': brand_norm_name
+        }
+        # Tier 1 caches: key -> ID
+        if barcode:
+            self.cache_updater('products_by_barcode', barcode, product_id)
+        if norm_string:
+            self.cache_updater('products_by_norm_string', norm_string, product_id)
+
+    def _adopt_conflicting_products(self, conflicts, products_to_create_data):
+        """
+        Handles new products that the upsert skipped because their barcode or norm string
+        already belongs to another product (created by another worker, or missed by the
+        caches). Each one is treated as a match to that product, exactly as if it had been
+        resolved against the caches, and returned as (product_id, data) for updating.
+        """
+        data_by_norm_string = {d['product'].get('normalized_name_brand_size'): d for d in products_to_create_data}
+        existing_ids = {existing_id for _, existing_id in conflicts}
+        existing_products = {
+            p['id']: p for p in Product.objects.filter(id__in=existing_ids).values(
+                'id', 'normalized_name_brand_size', 'barcode', 'brand__normalized_name'
+            )
+        }
+
+        adopted = []
+        for product, existing_id in conflicts:
+            existing = existing_products.get(existing_id)
+            data = data_by_norm_string.get(product.normalized_name_brand_size)
+            if not existing or not data:
+                continue
+
+            if existing_id not in self.caches['products_by_id']:
+                self._cache_product(existing_id, existing['normalized_name_brand_size'], existing['brand__normalized_name'], existing['barcode'])
+            norm_string = product.normalized_name_brand_size
+            if norm_string and norm_string != existing['normalized_name_brand_size']:
+                self.cache_updater('products_by_norm_string', norm_string, existing_id)
+
+            incoming_brand = data['product'].get('normalized_brand')
+            canonical_brand = existing['brand__normalized_name']
+            if incoming_brand and canonical_brand and incoming_brand != canonical_brand:
+                self.discovered_brand_pairs.add((incoming_brand, canonical_brand))
+            adopted.append((existing_id, data))
+
+        self.command.stdout.write(f"    - {len(adopted)} new products matched an existing product's barcode or norm string; updating those instead.")
+        return adopted
+
     def _update_caches(self, created_products, updated_products, new_skus, company_obj):
         """Updates the shared lean caches with new and updated product and SKU info."""
         self.command.stdout.write("    - Updating shared product and SKU caches...")
         
         # Process newly created products to populate all cache tiers
         for product in created_products:
-            product_id = product.id
             brand_norm_name = product.brand.normalized_name if product.brand else None
-            
-            # Tier 2 cache: ID -> slim data dictionary
-            self.caches['products_by_id'][product_id] = {
-                'id': product_id,
-                'normalized_name_brand_size': product.normalized_name_brand_size,
-                'brand_normalized_name': brand_norm_name
-            }
-            # Tier 1 caches: key -> ID
-            if product.barcode:
-                self.cache_updater('products_by_barcode', product.barcode, product_id)
-            if product.normalized_name_brand_size:
-                self.cache_updater('products_by_norm_string', product.normalized_name_brand_size, product_id)
+            self._cache_product(product.id, product.normalized_name_brand_size, brand_norm_name, product.barcode)
         
         # Process updated products to ensure their Tier 2 data is fresh
         for product in updated_products:
@@ -201,54 +255,78 @@ class ProductManager:
 
         self.command.stdout.write("      - Caches updated.")
 
-    def process(self, raw_product_data, company_obj):
+    def process(self, raw_product_data, company_obj, staged_barcodes=None):
         """
         Creates and updates products and SKUs based on the raw data.
+        Pass the same `staged_barcodes` dict for every chunk of a file when streaming.
         """
         self.command.stdout.write("  - ProductManager: Processing products...")
 
         # 1. Resolution (using lean caches)
-        to_create_data, to_update_data, skus_to_create_tuples = self._resolve_products(raw_product_data, company_obj)
+        with self.run_report.stage('products.resolve', rows_in=len(raw_product_data)) as stage:
+            to_create_data, to_update_data, skus_to_create_tuples = self._resolve_products(raw_product_data, company_obj, staged_barcodes)
+            stage['rows_out'] = len(to_create_data) + len(to_update_data)
+
+        # Everything from here on reads and writes shared product rows, so in a parallel
+        # run it happens while holding the writer lock.
+        with self.writer_lock or nullcontext():
+            with self.run_report.stage('products.persist', rows_in=len(to_create_data) + len(to_update_data)) as stage:
+                stage['rows_out'] = self._persist_products(to_create_data, to_update_data, skus_to_create_tuples, company_obj)
 
+    def _persist_products(self, to_create_data, to_update_data, skus_to_create_tuples, company_obj):
+        """
+        Prepares and writes product creations, updates and SKU links, then updates the caches.
+        Returns the number of products created or updated.
+        """
         # 2. Data Preparation for creations
         objects_to_create = self._prepare_creations(to_create_data)
 
-        # 3. Just-in-Time Fetch for updates
-        products_for_update_dict = {}
-        if to_update_data:
-            product_ids_to_update = list(set(pid for pid, data in to_update_data))
-            self.command.stdout.write(f"    - Fetching {len(product_ids_to_update)} full product objects for update...")
-            products_for_update = Product.objects.select_related('brand').filter(id__in=product_ids_to_update)
-            products_for_update_dict = {p.id: p for p in products_for_update}
-        
-        # 4. Data Preparation for updates
-        objects_to_update = self._prepare_updates(to_update_data, products_for_update_dict)
-
-        if not objects_to_create and not objects_to_update and not skus_to_create_tuples:
+        if not objects_to_create and not to_update_data and not skus_to_create_tuples:
             self.command.stdout.write("    - No new or updated products or SKUs to persist.")
-            return
+            return 0
 
-        # 5. Persistence of Products
         newly_created_products = []
+        objects_to_update = []
         try:
             with transaction.atomic():
+                # 3. Persistence of new products. The upsert returns their IDs directly, and rows whose
+                # barcode or norm string is already taken are skipped and updated below instead.
                 if objects_to_create:
                     self.command.stdout.write(f"    - Creating {len(objects_to_create)} new products...")
                     # Note: `brand` is not set here, it will be linked by BrandManager
-                    Product.objects.bulk_create(objects_to_create, batch_size=500)
-                
+                    newly_created_products, conflicts = ProductUpsertWriter(self.command).write(objects_to_create)
+                    if conflicts:
+                        to_update_data = to_update_data + self._adopt_conflicting_products(conflicts, to_create_data)
+
+                # 4. Just-in-Time Fetch for updates
+                products_for_update_dict = {}
+                if to_update_data:
+                    product_ids_to_update = list(set(pid for pid, data in to_update_data))
+                    self.command.stdout.write(f"    - Fetching {len(product_ids_to_update)} full product objects for update...")
+                    products_for_update = Product.objects.select_related('brand').filter(id__in=product_ids_to_update)
+                    products_for_update_dict = {p.id: p for p in products_for_update}
+                variations_before = {
+                    p.id: list(p.normalized_name_brand_size_variations or []) for p in products_for_update_dict.values()
+                }
+
+                # 5. Data Preparation and Persistence of updates
+                objects_to_update = self._prepare_updates(to_update_data, products_for_update_dict)
                 if objects_to_update:
                     self.command.stdout.write(f"    - Updating {len(objects_to_update)} existing products...")
                     update_fields = [
                         'barcode', 'url', 'aldi_image_url', 'has_no_coles_barcode',
-                        'sizes', 'normalized_name_brand_size_variations', 'brand_name_company_pairs'
+                        'sizes', 'normalized_name_brand_size_variations', 'brand_name_company_pairs',
+                        'updated_at'
                     ]
-                    Product.objects.bulk_update(objects_to_update, update_fields, batch_size=500)
-
-            # Re-fetch newly created products to get DB-assigned IDs and brand info for cache update
-            if objects_to_create:
-                norm_strings = [p.normalized_name_brand_size for p in objects_to_create]
-                newly_created_products = list(Product.objects.select_related('brand').filter(normalized_name_brand_size__in=norm_strings))
+                    now = timezone.now()
+                    for product in objects_to_update:
+                        product.updated_at = now
+                    bulk_merge(objects_to_update, update_fields, batch_size=500)
+                    if self.translation_changes is not None:
+                        self.translation_changes.mark_products(
+                            p.id for p in objects_to_update
+                            if (p.normalized_name_brand_size_variations or []) != variations_before.get(p.id)
+                        )
 
             # 6. Data Preparation and Persistence of SKUs
             new_skus = []
@@ -261,8 +339,8 @@ class ProductManager:
                     product_id = None
                     if isinstance(product_ref, int): # It's already a product_id
                         product_id = product_ref
-                    else: # It's a norm_string for a new product
-                        product_id = product_map.get(product_ref)
+                    else: # It's a norm_string for a new product (possibly created by an earlier chunk)
+                        product_id = product_map.get(product_ref) or self.caches['products_by_norm_string'].get(product_ref)
                     
                     if product_id:
                         skus_to_bulk_create.append(SKU(product_id=product_id, company=company_obj, sku=sku_val))
@@ -276,6 +354,7 @@ class ProductManager:
 
             # 7. Cache Update (only after successful transactions)
             self._update_caches(newly_created_products, objects_to_update, new_skus, company_obj)
+            return len(newly_created_products) + len(objects_to_update)
 
         except Exception as e:
             self.command.stderr.write(self.command.style.ERROR(f"    - Error processing products or SKUs: {e}"))
@@ -0,0 +1,118 @@
+from django.db import connection
+from django.db.models import Max, Q
+from products.models import Product
+
+BATCH_SIZE = 500
+
+
+class ProductUpsertWriter:
+    """
+    Inserts new Product rows keyed on their natural keys, normalized_name_brand_size
+    and barcode, without raising on a unique key conflict.
+
+    Rows that would collide with an existing product are skipped by the database
+    and reported back as conflicts, together with the id of the product they
+    collided with, so the caller can treat them as updates of that product. A
+    barcode collision therefore no longer aborts the whole batch.
+
+    SQLite and PostgreSQL use INSERT ... ON CONFLICT DO NOTHING RETURNING, so the
+    ids of new rows come back with the insert itself. MySQL has no RETURNING, so
+    it uses INSERT ... ON DUPLICATE KEY UPDATE followed by one keyed SELECT.
+
+    MySQL is not made faster by this writer: each batch still takes three round
+    trips (MAX(id), the insert and the keyed SELECT). LAST_INSERT_ID() and
+    ROW_COUNT() can't stand in for them. Django connects with CLIENT.FOUND_ROWS,
+    so a skipped duplicate still counts as an affected row. Ids are only handed
+    out one per row, in order, for these inserts under innodb_autoinc_lock_mode=0,
+    and the default since MySQL 8.0 is 2.
+    """
+    def __init__(self, command):
+        self.command = command
+        self.fields = [f for f in Product._meta.local_concrete_fields if not f.primary_key]
+
+    def _row_values(self, product):
+        return [f.get_db_prep_save(f.pre_save(product, add=True), connection) for f in self.fields]
+
+    def _insert_sql(self, row_count):
+        qn = connection.ops.quote_name
+        columns = ', '.join(qn(f.column) for f in self.fields)
+        row_placeholder = f"({', '.join(['%s'] * len(self.fields))})"
+        sql = f"INSERT INTO {qn(Product._meta.db_table)} ({columns}) VALUES {', '.join([row_placeholder] * row_count)}"
+        if connection.vendor == 'mysql':
+            pk_column = qn(Product._meta.pk.column)
+            return f"{sql} ON DUPLICATE KEY UPDATE {pk_column} = {pk_column}"
+        return f"{sql} ON CONFLICT DO NOTHING RETURNING {qn(Product._meta.pk.column)}, {qn('normalized_name_brand_size')}"
+
+    def _fetch_by_natural_keys(self, products):
+        """Returns {norm_string: (id, barcode)} and {barcode: (id, norm_string)} for rows matching any of the products' keys."""
+        norm_strings = [p.normalized_name_brand_size for p in products if p.normalized_name_brand_size]
+        barcodes = [p.barcode for p in products if p.barcode]
+        query = Q(normalized_name_brand_size__in=norm_strings) | Q(barcode__in=barcodes)
+        by_norm_string, by_barcode = {}, {}
+        for product_id, norm_string, barcode in Product.objects.filter(query).values_list('id', 'normalized_name_brand_size', 'barcode'):
+            if norm_string:
+                by_norm_string[norm_string] = (product_id, barcode)
+            if barcode:
+                by_barcode[barcode] = (product_id, norm_string)
+        return by_norm_string, by_barcode
+
+    def _write_batch(self, products):
+        """Inserts one batch and returns ({norm_string: new_id}, [(product, existing_id)])."""
+        params = []
+        for product in products:
+            params.extend(self._row_values(product))
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                # Ids are not guaranteed to be consecutive for ON DUPLICATE KEY inserts, so rows are
+                # read back by key; anything above the previous highest id was inserted by this statement.
+                max_id_before = Product.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+                cursor.execute(self._insert_sql(len(products)), params)
+                by_norm_string, _ = self._fetch_by_natural_keys(products)
+                inserted = {
+                    norm_string: product_id
+                    for norm_string, (product_id, _) in by_norm_string.items()
+                    if product_id > max_id_before
+                }
+            else:
+                cursor.execute(self._insert_sql(len(products)), params)
+                inserted = {norm_string: product_id for product_id, norm_string in cursor.fetchall()}
+
+        skipped = [p for p in products if p.normalized_name_brand_size not in inserted]
+        conflicts = []
+        if skipped:
+            by_norm_string, by_barcode = self._fetch_by_natural_keys(skipped)
+            for product in skipped:
+                # Barcode wins, as it does when products are resolved against the caches.
+                match = by_barcode.get(product.barcode) if product.barcode else None
+                if match is None:
+                    match = by_norm_string.get(product.normalized_name_brand_size)
+                if match is None:
+                    self.command.stderr.write(self.command.style.ERROR(
+                        f"    - Product '{product.normalized_name_brand_size}' was not inserted and no conflicting product was found."
+                    ))
+                    continue
+                conflicts.append((product, match[0]))
+        return inserted, conflicts
+
+    def write(self, products):
+        """
+        Inserts `products` (unsaved Product instances) in batches. Inserted instances
+        get their primary key set. Returns (inserted_products, conflicts), where
+        conflicts holds (product, existing_product_id) for every row that was skipped
+        because its norm string or barcode already belongs to another product.
+        """
+        inserted_products = []
+        conflicts = []
+        for i in range(0, len(products), BATCH_SIZE):
+            batch = products[i:i + BATCH_SIZE]
+            inserted, batch_conflicts = self._write_batch(batch)
+            for product in batch:
+                product_id = inserted.get(product.normalized_name_brand_size)
+                if product_id is not None:
+                    product.pk = product_id
+                    product._state.adding = False
+                    product._state.db = connection.alias
+                    inserted_products.append(product)
+            conflicts.extend(batch_conflicts)
+        return inserted_products, conflicts
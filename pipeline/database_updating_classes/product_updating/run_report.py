@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from django.db import connection
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _rss_mb():
+    """Returns the current resident set size of this process, or None where /proc is not available."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+
+def _process_peak_rss_mb():
+    """Returns the peak resident set size of this process so far, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+class RunReport:
+    """
+    Records how long each stage of an update run takes, how many rows go in and out
+    of it, how many database queries it makes and how much its RSS grew (current RSS
+    at the end minus at the start, from /proc/self/statm). The process-wide peak RSS
+    is stored too, as `process_peak_rss_mb`; it covers every stage run so far, not
+    just this one. One record is kept per stage call and, when `path` is set, appended
+    to a JSONL file as soon as the stage finishes. Worker processes of a parallel run
+    append to the same file, so the summary is read back from it.
+    """
+    def __init__(self, path=None):
+        self.path = os.fspath(path) if path else None
+        self.records = []
+        # Set by the orchestrator while it works on a file, and stored on each record.
+        self.current_file = None
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Times the body of the `with` block as stage `name`. The yielded dict is the
+        record itself; set 'rows_out' (or 'rows_in', if not known up front) on it.
+        """
+        record = {
+            'stage': name,
+            'file': self.current_file,
+            'pid': os.getpid(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'rows_in': rows_in,
+            'rows_out': None,
+        }
+        queries = 0
+        rss_before = _rss_mb()
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_queries):
+                yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 3)
+            record['queries'] = queries
+            rss_after = _rss_mb()
+            record['rss_delta_mb'] = round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None
+            record['process_peak_rss_mb'] = _process_peak_rss_mb()
+            self._add(record)
+
+    def _add(self, record):
+        self.records.append(record)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+    def read_records(self):
+        """Returns every record of the run, including those written by worker processes."""
+        if not self.path:
+            return list(self.records)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def summarise(self):
+        """
+        Returns {stage: totals} in the order the stages first ran. 'rss_delta_mb' is
+        the largest RSS growth of a single call of the stage.
+        """
+        totals = {}
+        for record in self.read_records():
+            stage = totals.setdefault(record['stage'], {
+                'calls': 0, 'seconds': 0.0, 'rows_in': 0, 'rows_out': 0, 'queries': 0, 'rss_delta_mb': None, 'process_peak_rss_mb': None,
+            })
+            stage['calls'] += 1
+            stage['seconds'] += record.get('seconds') or 0
+            stage['rows_in'] += record.get('rows_in') or 0
+            stage['rows_out'] += record.get('rows_out') or 0
+            stage['queries'] += record.get('queries') or 0
+            delta = record.get('rss_delta_mb')
+            if delta is not None:
+                stage['rss_delta_mb'] = delta if stage['rss_delta_mb'] is None else max(stage['rss_delta_mb'], delta)
+            if record.get('process_peak_rss_mb') is not None:
+                stage['process_peak_rss_mb'] = max(stage['process_peak_rss_mb'] or 0, record['process_peak_rss_mb'])
+        return totals
+
+    def write_summary(self, command):
+        """Writes a table of the totals for each stage to the command's stdout."""
+        totals = self.summarise()
+        if not totals:
+            return
+
+        command.stdout.write(command.style.SUCCESS("\n--- Run Report ---"))
+        command.stdout.write(f"  {'Stage':<28}{'Calls':>7}{'Seconds':>10}{'Rows in':>10}{'Rows out':>10}{'Queries':>9}{'RSS +MB':>9}{'Process peak MB':>17}")
+        for name, stage in totals.items():
+            delta = f"{stage['rss_delta_mb']:+.1f}" if stage['rss_delta_mb'] is not None else '-'
+            peak = f"{stage['process_peak_rss_mb']:.1f}" if stage['process_peak_rss_mb'] is not None else '-'
+            command.stdout.write(
+                f"  {name:<28}{stage['calls']:>7}{stage['seconds']:>10.2f}{stage['rows_in']:>10}"
+                f"{stage['rows_out']:>10}{stage['queries']:>9}{delta:>9}{peak:>17}"
+            )
+        if self.path:
+            command.stdout.write(f"  - Full report: {self.path}")
@@ -34,6 +34,23 @@ class BaseTranslationTableGenerator(abc.ABC):
         """
         pass
 
+    def update_translation_dict(self, translations: dict, changes) -> dict:
+        """
+        Patches an existing translation dictionary with the rows recorded in
+        `changes` (a TranslationTableChanges). Returns None when nothing relevant
+        to this table changed. Subclasses that cannot patch rebuild the table in full.
+        """
+        return self.generate_translation_dict()
+
+    def read_existing(self):
+        """Returns the translation dictionary currently on disk, or None if there is no usable file."""
+        try:
+            with open(self.output_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
     def write_to_file(self, data: dict):
         """
         Writes the generated dictionary to the specified JSON file.
@@ -43,10 +60,19 @@ class BaseTranslationTableGenerator(abc.ABC):
             json.dump(data, f, separators=(',', ':'))
         print("Done.")
 
-    def run(self):
+    def run(self, changes=None):
         """
         Orchestrates the generation and writing of the translation table file.
+        When `changes` is given, the existing file is patched with only the changed
+        rows; without it, or if there is no existing file, the table is rebuilt in full.
         """
         print(f"Running {self.__class__.__name__}...")
-        translation_dict = self.generate_translation_dict()
+        existing = self.read_existing() if changes is not None else None
+        if existing is None:
+            translation_dict = self.generate_translation_dict()
+        else:
+            translation_dict = self.update_translation_dict(existing, changes)
+            if translation_dict is None:
+                print("No changes to apply; keeping the existing translation table.")
+                return
         self.write_to_file(translation_dict)
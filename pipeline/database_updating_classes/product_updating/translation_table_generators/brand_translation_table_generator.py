@@ -1,4 +1,5 @@
 import os
+from collections import namedtuple
 from products.models import Product, ProductBrand
 from .base_translation_table_generator import BaseTranslationTableGenerator
 
@@ -12,6 +13,12 @@ TRANSLATION_TABLE_PATH = os.path.abspath(os.path.join(
     'brand_translation_table.json'
 ))
 
+# Rows fetched per query when streaming brands.
+STREAM_CHUNK_SIZE = 2000
+
+# The ProductBrand columns the table is built from.
+BrandRow = namedtuple('BrandRow', ['id', 'name', 'normalized_name', 'name_variations', 'normalized_name_variations'])
+
 class BrandTranslationTableGenerator(BaseTranslationTableGenerator):
     """
     Generates a translation table for product brand synonyms.
@@ -22,9 +29,13 @@ class BrandTranslationTableGenerator(BaseTranslationTableGenerator):
         """
         super().__init__(output_path=TRANSLATION_TABLE_PATH)
 
+    def _brand_rows(self, queryset):
+        """Reads only the columns the table is built from, without building model instances."""
+        return [BrandRow(*values) for values in queryset.values_list(*BrandRow._fields).iterator(chunk_size=STREAM_CHUNK_SIZE)]
+
     def generate_translation_dict(self) -> dict:
         """
-        Queries all ProductBrand objects and builds a translation dictionary
+        Reads every ProductBrand and builds a translation dictionary
         from their normalized name variations. It includes logic to detect and
         resolve circular dependencies, ensuring a clean, directed graph of brand synonyms.
 
@@ -33,15 +44,65 @@ class BrandTranslationTableGenerator(BaseTranslationTableGenerator):
         """
         print("--- Generating brand synonym translation dictionary ---")
         
-        all_brands = list(ProductBrand.objects.all())
+        all_brands = self._brand_rows(ProductBrand.objects.all())
         brand_map = {brand.normalized_name: brand for brand in all_brands}
         
         synonyms = {}
+        self._add_synonyms(synonyms, all_brands, brand_map)
+
+        print(f"--- Generated {len(synonyms)} brand synonyms. ---")
+        return synonyms
+
+    def update_translation_dict(self, translations: dict, changes) -> dict:
+        """
+        Patches an existing translation dictionary with the brands recorded in `changes`.
+
+        A brand's name can appear in the table as its own canonical name, as a key
+        (when another brand lists it as a variation) or as the loser of a circular
+        dependency. So every entry that points at a changed brand, or at a brand that
+        lists a changed brand as a variation, is dropped along with every entry keyed
+        by a changed brand, and all of those brands are added back from the database.
+        Conflicts between two unchanged brands are not re-evaluated.
+
+        Returns:
+            The patched dictionary, or None if no brands changed.
+        """
+        if not changes.has_brand_changes():
+            return None
+
+        print(f"--- Patching brand synonym translation dictionary ({len(changes.brand_ids)} changed, {len(changes.removed_brand_names)} removed) ---")
+        changed_names = set(changes.removed_brand_names)
+        changed_names.update(ProductBrand.objects.filter(id__in=changes.brand_ids).values_list('normalized_name', flat=True))
+
+        affected_names = changed_names | {canonical for variation, canonical in translations.items() if variation in changed_names}
+        synonyms = {
+            variation: canonical for variation, canonical in translations.items()
+            if canonical not in affected_names and variation not in changed_names
+        }
+
+        affected_brands = self._brand_rows(ProductBrand.objects.filter(normalized_name__in=affected_names))
+        referenced_names = {v for brand in affected_brands for v in (brand.normalized_name_variations or [])}
+        brand_map = {
+            brand.normalized_name: brand
+            for brand in self._brand_rows(ProductBrand.objects.filter(normalized_name__in=referenced_names - affected_names))
+        }
+        brand_map.update((brand.normalized_name, brand) for brand in affected_brands)
+
+        self._add_synonyms(synonyms, affected_brands, brand_map)
+
+        print(f"--- Patched table has {len(synonyms)} brand synonyms. ---")
+        return synonyms
+
+    def _add_synonyms(self, synonyms, brands, brand_map):
+        """
+        Adds the synonyms of `brands` to `synonyms`. `brand_map` must contain every
+        brand that one of `brands` lists as a variation, keyed by normalized name.
+        """
         conflicts = []
 
         # First pass: gather all potential mappings and identify circular dependencies
         print("--- Identifying synonyms and conflicts ---")
-        for brand in all_brands:
+        for brand in brands:
             canonical_name = brand.normalized_name
             if not brand.normalized_name_variations or not isinstance(brand.normalized_name_variations, list):
                 continue
@@ -83,17 +144,14 @@ class BrandTranslationTableGenerator(BaseTranslationTableGenerator):
                 if winner.normalized_name in synonyms:
                     del synonyms[winner.normalized_name]
 
-        print(f"--- Generated {len(synonyms)} brand synonyms. ---")
-        return synonyms
-
     def _resolve_conflict(self, brand1, brand2):
         """
         Resolves a conflict between two brands that have a circular dependency.
         Returns a tuple of (winner, loser).
         """
         # Tie-breaker 1: Product Count
-        b1_products = Product.objects.filter(brand=brand1).count()
-        b2_products = Product.objects.filter(brand=brand2).count()
+        b1_products = Product.objects.filter(brand_id=brand1.id).count()
+        b2_products = Product.objects.filter(brand_id=brand2.id).count()
         if b1_products > b2_products:
             return brand1, brand2
         if b2_products > b1_products:
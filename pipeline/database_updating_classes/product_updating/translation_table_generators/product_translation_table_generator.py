@@ -12,6 +12,9 @@ TRANSLATION_TABLE_PATH = os.path.abspath(os.path.join(
     'product_normalized_name_brand_size_translation_table.json'
 ))
 
+# Rows fetched per query when streaming products.
+STREAM_CHUNK_SIZE = 2000
+
 class ProductTranslationTableGenerator(BaseTranslationTableGenerator):
     """
     Generates a translation table for product name variations.
@@ -22,29 +25,62 @@ class ProductTranslationTableGenerator(BaseTranslationTableGenerator):
         """
         super().__init__(output_path=TRANSLATION_TABLE_PATH)
 
+    def _add_translations(self, translations, canonical_normalized_string, variations):
+        """Maps each of a product's variations to its canonical string."""
+        if not variations or not isinstance(variations, list) or not canonical_normalized_string:
+            return
+
+        for variation_normalized_string in variations:
+            if variation_normalized_string.lower() != canonical_normalized_string.lower():
+                translations[variation_normalized_string] = canonical_normalized_string
+
     def generate_translation_dict(self) -> dict:
         """
-        Queries all products and builds a translation dictionary from their
-        normalized name variations.
+        Streams every product's canonical string and variations and builds a
+        translation dictionary from them. Only the two columns are read, so no
+        model instances are built.
 
         Returns:
             A dictionary mapping variation strings to canonical strings.
         """
         print("--- Generating product name translation dictionary ---")
         translations = {}
-        all_products = Product.objects.all()
-
-        for product in all_products:
-            if not product.normalized_name_brand_size_variations or not isinstance(product.normalized_name_brand_size_variations, list):
-                continue
+        rows = Product.objects.values_list(
+            'normalized_name_brand_size', 'normalized_name_brand_size_variations'
+        ).iterator(chunk_size=STREAM_CHUNK_SIZE)
 
-            canonical_normalized_string = product.normalized_name_brand_size
-            if not canonical_normalized_string:
-                continue
-
-            for variation_normalized_string in product.normalized_name_brand_size_variations:
-                if variation_normalized_string.lower() != canonical_normalized_string.lower():
-                    translations[variation_normalized_string] = canonical_normalized_string
+        for canonical_normalized_string, variations in rows:
+            self._add_translations(translations, canonical_normalized_string, variations)
         
         print(f"Generated {len(translations)} product name translations.")
         return translations
+
+    def update_translation_dict(self, translations: dict, changes) -> dict:
+        """
+        Patches an existing translation dictionary with the products recorded in
+        `changes`. Every entry pointing at a changed or deleted product is dropped,
+        and the changed products' current variations are added back.
+
+        Returns:
+            The patched dictionary, or None if no products changed.
+        """
+        if not changes.has_product_changes():
+            return None
+
+        print(f"--- Patching product name translation dictionary ({len(changes.product_ids)} changed, {len(changes.removed_product_norm_strings)} removed) ---")
+        product_ids = list(changes.product_ids)
+        changed_rows = []
+        for i in range(0, len(product_ids), STREAM_CHUNK_SIZE):
+            changed_rows.extend(Product.objects.filter(id__in=product_ids[i:i + STREAM_CHUNK_SIZE]).values_list(
+                'normalized_name_brand_size', 'normalized_name_brand_size_variations'
+            ))
+
+        stale_canonicals = set(changes.removed_product_norm_strings)
+        stale_canonicals.update(canonical for canonical, _ in changed_rows)
+        translations = {v: c for v, c in translations.items() if c not in stale_canonicals}
+
+        for canonical_normalized_string, variations in changed_rows:
+            self._add_translations(translations, canonical_normalized_string, variations)
+
+        print(f"Patched table has {len(translations)} product name translations.")
+        return translations
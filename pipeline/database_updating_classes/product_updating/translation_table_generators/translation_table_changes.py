@@ -0,0 +1,44 @@
+class TranslationTableChanges:
+    """
+    Records which products and brands changed their variations during an update run,
+    so that the translation tables can be patched instead of rebuilt from a full table scan.
+
+    Ids are recorded for rows that still exist and are re-read when the tables are patched.
+    Deleted rows can no longer be read, so their canonical names are recorded instead.
+    """
+    def __init__(self):
+        self.product_ids = set()
+        self.brand_ids = set()
+        self.removed_product_norm_strings = set()
+        self.removed_brand_names = set()
+
+    def mark_products(self, product_ids):
+        self.product_ids.update(product_ids)
+
+    def mark_brands(self, brand_ids):
+        self.brand_ids.update(brand_ids)
+
+    def mark_removed_products(self, norm_strings):
+        self.removed_product_norm_strings.update(n for n in norm_strings if n)
+
+    def mark_removed_brands(self, normalized_names):
+        self.removed_brand_names.update(n for n in normalized_names if n)
+
+    def has_product_changes(self):
+        return bool(self.product_ids or self.removed_product_norm_strings)
+
+    def has_brand_changes(self):
+        return bool(self.brand_ids or self.removed_brand_names)
+
+    def update(self, other):
+        """Merges the changes recorded by another instance, e.g. one returned by a worker process."""
+        self.product_ids.update(other.product_ids)
+        self.brand_ids.update(other.brand_ids)
+        self.removed_product_norm_strings.update(other.removed_product_norm_strings)
+        self.removed_brand_names.update(other.removed_brand_names)
+
+    def clear(self):
+        self.product_ids.clear()
+        self.brand_ids.clear()
+        self.removed_product_norm_strings.clear()
+        self.removed_brand_names.clear()
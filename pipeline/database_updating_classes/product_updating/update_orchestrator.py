@@ -1,4 +1,6 @@
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from django.utils import timezone
 from django.db.models import Max
@@ -11,8 +13,12 @@ from .brand_manager import BrandManager
 from .product_manager import ProductManager
 from .price_manager import PriceManager
 from .path_manager import PathManager
+from .product_cache_snapshot import ProductCacheSnapshot
+from .run_report import RunReport
+from .parallel_worker import init_worker, process_company_files
 from .translation_table_generators.brand_translation_table_generator import BrandTranslationTableGenerator
 from .translation_table_generators.product_translation_table_generator import ProductTranslationTableGenerator
+from .translation_table_generators.translation_table_changes import TranslationTableChanges
 from .post_processing.brand_reconciler import BrandReconciler
 from .post_processing.product_reconciler import ProductReconciler
 from .post_processing.orphan_product_cleaner import OrphanProductCleaner
@@ -22,27 +28,53 @@ class UpdateOrchestrator:
     The main entry point for the V2 product update process.
     Initializes the global caches and orchestrates the pipeline for each file.
     """
-    def __init__(self, command, post_process_only=False, source_path=None, preserve_source_files=False):
+    def __init__(self, command, post_process_only=False, source_path=None, preserve_source_files=False, chunk_size=None, cache_snapshot_path=None, workers=None, writer_lock=None, translation_changes=None, rebuild_translation_tables=False, run_report_path=None):
         self.command = command
         self.post_process_only = post_process_only
         self.inbox_path = os.fspath(source_path or settings.PIPELINE_DATA_DIR / 'inboxes' / 'product_inbox')
         self.preserve_source_files = preserve_source_files
+        # When set, files are streamed through the managers in chunks of this many products
+        # instead of being loaded into memory whole.
+        self.chunk_size = chunk_size
+        # When set, the product caches are loaded from (and saved to) an on-disk snapshot
+        # that is refreshed incrementally instead of being rebuilt from a full table scan.
+        self.cache_snapshot_path = cache_snapshot_path
+        # When greater than 1, each company's files are processed in their own worker process.
+        self.workers = workers
+        # Shared by the workers of a parallel run so that only one of them writes
+        # products, brands or category paths at a time. None outside parallel runs.
+        self.writer_lock = writer_lock
+        # Products and brands whose variations changed. The translation tables are patched
+        # with just these rows unless a full rebuild is asked for. Pass the same instance to
+        # the next orchestrator when a run fails, so that its changes are not lost.
+        self.translation_changes = translation_changes if translation_changes is not None else TranslationTableChanges()
+        self.rebuild_translation_tables = rebuild_translation_tables
+        # Per-stage timings, row counts, query counts and peak RSS. Written to
+        # `run_report_path` as JSONL when it is set, and summarised at the end of the run.
+        self.run_report = RunReport(run_report_path)
         self.caches = {}
         self.brand_translation_cache = {}
         self.discovered_brand_pairs = set()
 
         # Initialize managers
-        self.brand_manager = BrandManager(self.command, self.caches, self.update_cache, self.brand_translation_cache)
-        self.product_manager = ProductManager(self.command, self.caches, self.update_cache, self.discovered_brand_pairs)
-        self.price_manager = PriceManager(self.command, self.caches, self.update_cache)
-        self.path_manager = PathManager(self.command, self.caches, self.update_cache)
+        self.brand_manager = BrandManager(self.command, self.caches, self.update_cache, self.brand_translation_cache, writer_lock=writer_lock, translation_changes=self.translation_changes, run_report=self.run_report)
+        self.product_manager = ProductManager(self.command, self.caches, self.update_cache, self.discovered_brand_pairs, writer_lock=writer_lock, translation_changes=self.translation_changes, run_report=self.run_report)
+        self.price_manager = PriceManager(self.command, self.caches, self.update_cache, run_report=self.run_report)
+        self.path_manager = PathManager(self.command, self.caches, self.update_cache, writer_lock=writer_lock, run_report=self.run_report)
 
-    def _build_global_caches(self):
+    def _build_global_caches(self, save_snapshot=True):
         """
         Builds the initial, memory-efficient, two-tier in-memory caches.
         - Tier 1 (Lean Global Cache): Maps barcodes, norm_strings, and SKUs to product IDs (int).
         - Tier 2 (ID-to-Data Cache): Maps a product ID to a slim dictionary of essential data needed for resolution.
+        The three product caches are views onto a single CompactProductCache.
         """
+        with self.run_report.stage('build_caches') as stage:
+            self._build_caches(save_snapshot)
+            stage['rows_out'] = len(self.caches['products_by_id'])
+
+    def _build_caches(self, save_snapshot):
+        """Does the work of _build_global_caches."""
         self.command.stdout.write("--- Building Global Caches (Lean) ---")
         
         # Brand Cache (remains as full objects, as it's not a memory bottleneck)
@@ -51,27 +83,11 @@ class UpdateOrchestrator:
         self.command.stdout.write(f"  - Cached {len(self.caches['normalized_brand_names'])} brands by normalized brand name.")
 
         # Product Caches (Lean Implementation)
-        self.caches['products_by_id'] = {}
-        self.caches['products_by_barcode'] = {}
-        self.caches['products_by_norm_string'] = {}
-
-        product_values = Product.objects.select_related('brand').values(
-            'id', 'barcode', 'normalized_name_brand_size', 'brand__normalized_name'
-        )
-
-        for p_dict in product_values:
-            product_id = p_dict['id']
-            # Tier 2 cache: ID -> slim data dictionary
-            self.caches['products_by_id'][product_id] = {
-                'id': product_id,
-                'normalized_name_brand_size': p_dict['normalized_name_brand_size'],
-                'brand_normalized_name': p_dict['brand__normalized_name']
-            }
-            # Tier 1 caches: key -> ID
-            if p_dict['barcode']:
-                self.caches['products_by_barcode'][p_dict['barcode']] = product_id
-            if p_dict['normalized_name_brand_size']:
-                self.caches['products_by_norm_string'][p_dict['normalized_name_brand_size']] = product_id
+        if self.cache_snapshot_path:
+            product_caches = ProductCacheSnapshot(self.command, self.cache_snapshot_path).load(save=save_snapshot)
+        else:
+            product_caches = ProductCacheSnapshot.build_caches()
+        self.caches.update(product_caches)
 
         self.command.stdout.write(f"  - Cached {len(self.caches['products_by_id'])} products by ID (lean).")
         self.command.stdout.write(f"  - Cached {len(self.caches['products_by_barcode'])} products by barcode.")
@@ -107,20 +123,35 @@ class UpdateOrchestrator:
     def _prepare_price_cache_for_company(self, company):
         """Builds a lightweight, two-level price cache for a specific company."""
         self.command.stdout.write(f"    - Preparing price cache for company: {company.name}")
-        price_data = Price.objects.filter(company=company).values('price_hash', 'pk', 'product_id')
+        with self.run_report.stage('price_cache') as stage:
+            stage['rows_out'] = self._build_price_cache(company)
+
+    def _build_price_cache(self, company):
+        """Does the work of _prepare_price_cache_for_company. Returns the number of prices cached."""
+        price_data = Price.objects.filter(company=company).values('price_hash', 'pk', 'product_id', 'was_price')
         
         hash_to_pk_cache = {p['price_hash']: p['pk'] for p in price_data if p['price_hash']}
         product_id_to_pk_cache = {p['product_id']: p['pk'] for p in price_data}
+        # Prices still marked as changed by an earlier run; PriceManager clears the ones that do not change again.
+        pks_with_was_price = {p['pk'] for p in price_data if p['was_price'] is not None}
 
         self.caches['prices_by_company'][company.id] = {
             'hash_to_pk': hash_to_pk_cache,
-            'product_id_to_pk': product_id_to_pk_cache
+            'product_id_to_pk': product_id_to_pk_cache,
+            'pks_with_was_price': pks_with_was_price,
         }
         self.command.stdout.write(f"      - Cached {len(hash_to_pk_cache)} price hashes for company.")
+        return len(product_id_to_pk_cache)
 
-    def _is_file_valid(self, metadata, raw_product_data):
-        """Performs all validation checks on a file before processing."""
-        if not metadata or not raw_product_data:
+    def _is_file_valid(self, metadata, raw_product_data, product_count=None):
+        """
+        Performs all validation checks on a file before processing.
+        In streaming mode `raw_product_data` is not available and `product_count` is passed instead.
+        """
+        if product_count is None:
+            product_count = len(raw_product_data) if raw_product_data else 0
+
+        if not metadata or not product_count:
             self.command.stdout.write("  - File is empty or metadata is missing, skipping.")
             return False, None
 
@@ -155,7 +186,7 @@ class UpdateOrchestrator:
 
         # 2. Product count must be at least 90% of the DB count (full sync check)
         db_price_count = Price.objects.filter(company=company).count()
-        file_product_count = len(raw_product_data)
+        file_product_count = product_count
         
         if db_price_count > 0 and (file_product_count / db_price_count) < 0.9:
             self.command.stderr.write(self.command.style.ERROR(
@@ -170,10 +201,15 @@ class UpdateOrchestrator:
         if cache_name in self.caches:
             self.caches[cache_name][key] = value
 
-    def _deduplicate_product_data_for_pricing(self, raw_product_data: list) -> list:
+    def _deduplicate_product_data_for_pricing(self, raw_product_data: list, seen_product_ids: set = None) -> list:
+        """
+        Drops products that resolve to a canonical product already priced.
+        Pass the same `seen_product_ids` set for every chunk of a file when streaming.
+        """
         self.command.stdout.write("  - De-duplicating product list for PriceManager...")
         final_list_for_pricing = []
-        seen_product_ids = set()
+        if seen_product_ids is None:
+            seen_product_ids = set()
 
         for data in raw_product_data:
             product_dict = data.get('product', {})
@@ -201,91 +237,237 @@ class UpdateOrchestrator:
         self.command.stdout.write(f"  - Original list size: {len(raw_product_data)}, De-duplicated list size: {len(final_list_for_pricing)}")
         return final_list_for_pricing
 
+    def _remove_source_file(self, file_path):
+        if not self.preserve_source_files:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass  # File is already gone, which is fine.
+
+    def _process_file(self, file_path, current_company_id_in_cache):
+        """
+        Validates and ingests a single file. Returns the id of the company whose
+        SKU cache is loaded after the file has been handled.
+        """
+        self.command.stdout.write(f"\n{self.command.style.WARNING('--- Processing file:')} {os.path.basename(file_path)} ---")
+        self.run_report.current_file = os.path.basename(file_path)
+        try:
+            return self._ingest_file(file_path, current_company_id_in_cache)
+        finally:
+            self.run_report.current_file = None
+
+    def _ingest_file(self, file_path, current_company_id_in_cache):
+        """Does the work of _process_file for the file the run report is attributing stages to."""
+
+        # Clear the discovered pairs cache for each new file
+        self.discovered_brand_pairs.clear()
+
+        file_reader = FileReader(file_path)
+        with self.run_report.stage('read_file') as stage:
+            if self.chunk_size:
+                metadata, product_count = file_reader.read_metadata_and_count()
+                raw_product_data = None
+            else:
+                metadata, raw_product_data = file_reader.read_and_consolidate()
+                product_count = len(raw_product_data) if raw_product_data else 0
+            stage['rows_out'] = product_count
+        is_valid, company_or_reason = self._is_file_valid(metadata, raw_product_data, product_count=product_count)
+
+        if not is_valid:
+            self._remove_source_file(file_path)
+            return current_company_id_in_cache
+
+        company = company_or_reason
+
+        # JIT Caching for SKUs
+        if company.id != current_company_id_in_cache:
+            self._prepare_sku_cache_for_company(company)
+            current_company_id_in_cache = company.id
+
+        if self.chunk_size:
+            self._process_product_data_in_chunks(file_reader, company)
+        else:
+            self._process_product_data(raw_product_data, company)
+
+        # 6. Cleanup
+        if self.preserve_source_files:
+            self.command.stdout.write(f"  - Successfully processed archive file: {os.path.basename(file_path)}")
+        else:
+            try:
+                os.remove(file_path)
+                self.command.stdout.write(f"  - Successfully processed and deleted file: {os.path.basename(file_path)}")
+            except FileNotFoundError:
+                self.command.stdout.write(f"  - File already removed, skipping deletion: {os.path.basename(file_path)}")
+
+        return current_company_id_in_cache
+
+    def _process_product_data(self, raw_product_data, company):
+        """Runs every manager over a file that has been loaded into memory whole."""
+        # 1. Process Products (runs first to discover brand pairs)
+        self.product_manager.process(raw_product_data, company)
+
+        # 1.5. De-duplicate the product list before pricing to prevent unique constraint errors
+        with self.run_report.stage('dedupe', rows_in=len(raw_product_data)) as stage:
+            final_list_for_pricing = self._deduplicate_product_data_for_pricing(raw_product_data)
+            stage['rows_out'] = len(final_list_for_pricing)
+
+        # 2. Process Brands
+        self.brand_manager.process(raw_product_data, self.discovered_brand_pairs)
+
+        # 3. Prepare Price Cache for the current company
+        self._prepare_price_cache_for_company(company)
+
+        # 4. Process Prices
+        self.price_manager.process(final_list_for_pricing, company)
+
+        # 5. Process Category Paths
+        self.path_manager.process(raw_product_data, company)
+
+    def _process_product_data_in_chunks(self, file_reader, company):
+        """
+        Streams a file through every manager in chunks of `self.chunk_size` products.
+        Each stage makes its own pass over the file so that it sees the state left by the
+        previous stage for the whole file, exactly as in the in-memory path:
+        brands need every discovered brand pair, and prices need every product resolved.
+        """
+        self.command.stdout.write(f"  - Streaming file in chunks of {self.chunk_size} products.")
+
+        # 1. Process Products (runs first to discover brand pairs)
+        staged_barcodes = {}
+        for chunk in file_reader.iter_chunks(self.chunk_size):
+            self.product_manager.process(chunk, company, staged_barcodes=staged_barcodes)
+
+        # 2. Process Brands
+        for chunk in file_reader.iter_chunks(self.chunk_size):
+            self.brand_manager.process(chunk, self.discovered_brand_pairs)
+
+        # 3. Prepare Price Cache for the current company
+        self._prepare_price_cache_for_company(company)
+
+        # 4. Process Prices, de-duplicating across the whole file
+        seen_product_ids = set()
+        pricing_chunks = (
+            self._deduplicate_product_data_for_pricing(chunk, seen_product_ids)
+            for chunk in file_reader.iter_chunks(self.chunk_size)
+        )
+        self.price_manager.process_chunks(pricing_chunks, company)
+
+        # 5. Process Category Paths
+        self.path_manager.process_chunks(file_reader.iter_chunks(self.chunk_size), company)
+
+    def _group_files_by_company(self, all_files):
+        """Returns {company name: [file paths]}, keeping each company's files in order."""
+        files_by_company = {}
+        for file_path in all_files:
+            metadata = FileReader(file_path).read_metadata() or {}
+            company_name = metadata.get('company') or metadata.get('company_name') or ''
+            files_by_company.setdefault(company_name.lower(), []).append(file_path)
+        return files_by_company
+
+    def _process_files_in_parallel(self, all_files):
+        """
+        Processes each company's files in a separate worker process. Price and SKU
+        caches are already scoped per company, so workers only contend on products,
+        brands and category paths. The shared lock serialises those writes: product
+        creations and updates (a creation that loses a race to another worker is
+        adopted as an update by the upsert writer), brand writes with the brand cache
+        refresh before them, and the read-merge-write of category paths.
+        """
+        files_by_company = self._group_files_by_company(all_files)
+        max_workers = min(self.workers, len(files_by_company))
+        self.command.stdout.write(f"  - Processing {len(all_files)} files for {len(files_by_company)} companies with {max_workers} workers.")
+
+        orchestrator_options = {
+            'source_path': self.inbox_path,
+            'preserve_source_files': self.preserve_source_files,
+            'chunk_size': self.chunk_size,
+            'cache_snapshot_path': self.cache_snapshot_path,
+            'run_report_path': self.run_report.path,
+        }
+        errors = []
+        with multiprocessing.Manager() as manager:
+            writer_lock = manager.Lock()
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+            ) as executor:
+                futures = {
+                    executor.submit(process_company_files, file_paths, orchestrator_options, writer_lock): company_name
+                    for company_name, file_paths in files_by_company.items()
+                }
+                for future in as_completed(futures):
+                    company_name = futures[future] or 'unknown company'
+                    try:
+                        file_count, translation_changes = future.result()
+                        self.translation_changes.update(translation_changes)
+                        self.command.stdout.write(f"  - Worker finished {file_count} files for {company_name}.")
+                    except Exception as e:
+                        self.command.stderr.write(self.command.style.ERROR(f"  - Worker for {company_name} failed: {e}"))
+                        errors.append(e)
+
+        # Other companies are independent, so they are allowed to finish before failing the run.
+        if errors:
+            raise errors[0]
+
     def run(self):
         """The main orchestration method."""
         self.command.stdout.write(self.command.style.SQL_FIELD("-- Starting Product Update (V2) --"))
         
         if not self.post_process_only:
-            self._build_global_caches()
+            all_files = sorted([os.path.join(root, file) for root, _, files in os.walk(self.inbox_path) for file in files if file.endswith(('.jsonl', '.jsonl.gz'))])
 
-            all_files = sorted([os.path.join(root, file) for root, _, files in os.walk(self.inbox_path) for file in files if file.endswith('.jsonl')])
-            
-            current_company_id_in_cache = None
+            if self.workers and self.workers > 1 and len(all_files) > 1:
+                # Workers build their own caches. Refreshing the snapshot once here
+                # means each of them only has to read it.
+                if self.cache_snapshot_path:
+                    self._build_global_caches()
+                self._process_files_in_parallel(all_files)
+            else:
+                self._build_global_caches()
+                current_company_id_in_cache = None
 
-            for file_path in all_files:
-                self.command.stdout.write(f"\n{self.command.style.WARNING('--- Processing file:')} {os.path.basename(file_path)} ---")
-                
-                # Clear the discovered pairs cache for each new file
-                self.discovered_brand_pairs.clear()
-
-                file_reader = FileReader(file_path)
-                metadata, raw_product_data = file_reader.read_and_consolidate()
-
-                is_valid, company_or_reason = self._is_file_valid(metadata, raw_product_data)
-                if not is_valid:
-                    if not self.preserve_source_files:
-                        try:
-                            os.remove(file_path)
-                        except FileNotFoundError:
-                            pass  # File is already gone, which is fine.
-                    continue
-                
-                company = company_or_reason
-
-                # JIT Caching for SKUs
-                if company.id != current_company_id_in_cache:
-                    self._prepare_sku_cache_for_company(company)
-                    current_company_id_in_cache = company.id
-
-                # 1. Process Products (runs first to discover brand pairs)
-                self.product_manager.process(raw_product_data, company)
-
-                # 1.5. De-duplicate the product list before pricing to prevent unique constraint errors
-                final_list_for_pricing = self._deduplicate_product_data_for_pricing(raw_product_data)
-                
-                # 2. Process Brands
-                self.brand_manager.process(raw_product_data, self.discovered_brand_pairs)
-
-                # 3. Prepare Price Cache for the current company
-                self._prepare_price_cache_for_company(company)
-
-                # 4. Process Prices
-                self.price_manager.process(final_list_for_pricing, company)
-
-                # 5. Process Category Paths
-                self.path_manager.process(raw_product_data, company)
-
-                # 6. Cleanup
-                if self.preserve_source_files:
-                    self.command.stdout.write(f"  - Successfully processed archive file: {os.path.basename(file_path)}")
-                else:
-                    try:
-                        os.remove(file_path)
-                        self.command.stdout.write(f"  - Successfully processed and deleted file: {os.path.basename(file_path)}")
-                    except FileNotFoundError:
-                        self.command.stdout.write(f"  - File already removed, skipping deletion: {os.path.basename(file_path)}")
+                for file_path in all_files:
+                    current_company_id_in_cache = self._process_file(file_path, current_company_id_in_cache)
 
 
         # --- Post-Processing Section ---
         self.command.stdout.write(self.command.style.SUCCESS("\n--- Post-Processing Run Started ---"))
         
-        # 1. First, generate translation tables based on the latest data
+        changes = self.translation_changes
+
+        # 1. First, generate translation tables based on the latest data. Only the changed
+        # rows are patched in, unless a full rebuild was asked for. Nothing is recorded in a
+        # post-processing-only run, so the tables are rebuilt in full there too.
         self.command.stdout.write(self.command.style.SUCCESS("\n--- Generating Translation Tables ---"))
-        BrandTranslationTableGenerator().run()
-        ProductTranslationTableGenerator().run()
+        full_rebuild = self.rebuild_translation_tables or self.post_process_only
+        with self.run_report.stage('translation_tables'):
+            BrandTranslationTableGenerator().run(None if full_rebuild else changes)
+            ProductTranslationTableGenerator().run(None if full_rebuild else changes)
+        changes.clear()
 
         # 2. Reconcile Brands and Products using the new tables
         self.command.stdout.write(self.command.style.SUCCESS("\n--- Reconciling Duplicates ---"))
-        BrandReconciler(self.command).run()
-        ProductReconciler(self.command).run()
+        with self.run_report.stage('brand_reconciler'):
+            BrandReconciler(self.command, translation_changes=changes).run()
+        with self.run_report.stage('product_reconciler'):
+            ProductReconciler(self.command, translation_changes=changes).run()
 
         # 3. Regenerate Translation Tables after reconciliation
         self.command.stdout.write(self.command.style.SUCCESS("\n--- Generating Translation Tables ---"))
-        BrandTranslationTableGenerator().run()
-        ProductTranslationTableGenerator().run()
+        with self.run_report.stage('translation_tables'):
+            BrandTranslationTableGenerator().run(changes)
+            ProductTranslationTableGenerator().run(changes)
+        changes.clear()
 
         # 4. Final Cleanup: Remove products with no prices
         self.command.stdout.write(self.command.style.SUCCESS("\n--- Cleaning Orphan Products ---"))
-        OrphanProductCleaner(self.command).run()
-
+        with self.run_report.stage('orphan_cleaner'):
+            OrphanProductCleaner(self.command, translation_changes=changes).run()
+            # Later runs only patch the table, so entries for the deleted products are dropped now.
+            if changes.has_product_changes():
+                ProductTranslationTableGenerator().run(changes)
+        changes.clear()
+
+        self.run_report.write_summary(self.command)
         self.command.stdout.write(self.command.style.SUCCESS("\n-- Orchestrator finished --"))
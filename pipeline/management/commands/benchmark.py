@@ -0,0 +1,174 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Runs synthetic benchmarks for parts of the update pipeline and the scrapers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product-cache', action='store_true', help='Compare the memory used by the dict product caches and CompactProductCache.')
+        parser.add_argument('--bulk-merge', action='store_true', help='Compare bulk_update with the staging-table bulk_merge on synthetic products (rolled back afterwards).')
+        parser.add_argument('--coles-pages', nargs='?', const='', default=None, metavar='DIR', help='Compare BeautifulSoup with the script scanner for extracting __NEXT_DATA__ and ld+json from the saved .html Coles pages in DIR (a synthetic page if no DIR is given).')
+        parser.add_argument('--scrapers', metavar='DIR', default=None, help='Replay the cassettes recorded with `scrape --record DIR` through their scrapers and report pages/sec, products/sec and CPU per product.')
+        parser.add_argument('--normalizer', nargs='?', const='', default=None, metavar='FILE', help='Compare ProductNormalizer with the NormalizationCache (cold, warm and from disk) on the products of a scraped store JSONL FILE (synthetic products if no FILE is given).')
+        parser.add_argument('--cleaners', nargs='?', const='', default=None, metavar='DIR', help='Compare _get_value with the compiled field accessors of the Woolworths and Coles cleaners on the products in the cassettes recorded in DIR (synthetic products if no DIR is given).')
+        parser.add_argument('--writer', nargs='?', const='', default=None, metavar='FILE', help='Compare writing products with json.dump and gzipping them for upload with the compressed JsonlWriter, on the products of a scraped store .jsonl or .jsonl.gz FILE (synthetic products if no FILE is given).')
+        parser.add_argument('--latency', type=float, default=0.0, help='--scrapers only: milliseconds to wait before each replayed response.')
+        parser.add_argument('--recorded-latency', action='store_true', help='--scrapers only: replay each response as slowly as it was recorded.')
+        parser.add_argument('--sizes', type=int, nargs='+', default=None, help='Numbers of synthetic rows to benchmark with (defaults depend on the benchmark).')
+
+    def handle(self, *args, **options):
+        run_product_cache = options['product_cache']
+        run_bulk_merge = options['bulk_merge']
+        coles_pages_dir = options['coles_pages']
+        cassette_dir = options['scrapers']
+        store_file = options['normalizer']
+        cleaners_dir = options['cleaners']
+        writer_file = options['writer']
+        sizes = options['sizes']
+
+        if (not run_product_cache and not run_bulk_merge and coles_pages_dir is None and not cassette_dir
+                and store_file is None and cleaners_dir is None and writer_file is None):
+            raise CommandError('Choose a benchmark to run, e.g. --product-cache, --bulk-merge, --coles-pages, --scrapers, --normalizer, --cleaners or --writer.')
+
+        if run_product_cache:
+            from pipeline.utils.database_updating_utils.product_cache_benchmark import run_product_cache_benchmark, DEFAULT_SIZES
+
+            self.stdout.write(self.style.SUCCESS('--- Benchmarking product caches ---'))
+            for result in run_product_cache_benchmark(sizes or DEFAULT_SIZES):
+                count = result['products']
+                dict_mb = result['dict_bytes'] / 1024 / 1024
+                compact_mb = result['compact_bytes'] / 1024 / 1024
+                self.stdout.write(f"  - {count} products:")
+                self.stdout.write(f"    - dict caches:    {dict_mb:8.1f} MB ({result['dict_bytes'] / count:6.1f} B/product, built in {result['dict_seconds']:.2f}s)")
+                self.stdout.write(f"    - compact cache:  {compact_mb:8.1f} MB ({result['compact_bytes'] / count:6.1f} B/product, built in {result['compact_seconds']:.2f}s)")
+                if result['compact_bytes']:
+                    self.stdout.write(f"    - {result['dict_bytes'] / result['compact_bytes']:.1f}x smaller")
+
+        if run_bulk_merge:
+            from pipeline.utils.database_updating_utils.bulk_merge_benchmark import run_bulk_merge_benchmark, DEFAULT_SIZES
+
+            self.stdout.write(self.style.SUCCESS('--- Benchmarking bulk_update vs. bulk_merge ---'))
+            for result in run_bulk_merge_benchmark(sizes or DEFAULT_SIZES, command=self):
+                self.stdout.write(f"  - {result['rows']} rows:")
+                self.stdout.write(f"    - bulk_update: {result['bulk_update_seconds']:8.2f}s")
+                self.stdout.write(f"    - bulk_merge:  {result['bulk_merge_seconds']:8.2f}s")
+                if result['bulk_merge_seconds']:
+                    self.stdout.write(f"    - {result['bulk_update_seconds'] / result['bulk_merge_seconds']:.1f}x faster")
+
+        if coles_pages_dir is not None:
+            from scraping.utils.product_scraping_utils.page_scripts_benchmark import run_page_scripts_benchmark, load_pages
+
+            pages = None
+            if coles_pages_dir:
+                if not os.path.isdir(coles_pages_dir):
+                    raise CommandError(f"{coles_pages_dir} is not a directory.")
+                pages = load_pages(coles_pages_dir)
+                if not pages:
+                    raise CommandError(f"No .html pages found in {coles_pages_dir}.")
+
+            self.stdout.write(self.style.SUCCESS('--- Benchmarking BeautifulSoup vs. the script scanner ---'))
+            for result in run_page_scripts_benchmark(pages):
+                self.stdout.write(f"  - {result['page']} ({result['bytes'] / 1024:.0f} KB):")
+                self.stdout.write(f"    - BeautifulSoup: {result['soup_ms']:8.2f} ms CPU/page")
+                self.stdout.write(f"    - scanner:       {result['scanner_ms']:8.2f} ms CPU/page")
+                if result['scanner_ms']:
+                    self.stdout.write(f"    - {result['soup_ms'] / result['scanner_ms']:.0f}x less CPU")
+                if not result['same_result']:
+                    self.stdout.write(self.style.WARNING("    - Results differ from BeautifulSoup's!"))
+
+        if cassette_dir:
+            from scraping.utils.product_scraping_utils.scraper_benchmark import run_scraper_benchmark, find_cassettes
+
+            cassette_paths = find_cassettes(cassette_dir) if os.path.isdir(cassette_dir) else []
+            if not cassette_paths:
+                raise CommandError(f"No .jsonl.gz cassettes found in {cassette_dir}. Record some with `scrape --record {cassette_dir}`.")
+
+            self.stdout.write(self.style.SUCCESS('--- Benchmarking scrapers on recorded responses ---'))
+            results = run_scraper_benchmark(
+                cassette_paths, command=self, latency=options['latency'] / 1000, recorded_latency=options['recorded_latency'],
+            )
+            for result in results:
+                cpu = f"{result['cpu_ms_per_product']:.2f} ms" if result['cpu_ms_per_product'] is not None else '-'
+                self.stdout.write(f"  - {result['scraper']} ({os.path.basename(result['cassette'])}), {result['seconds']:.2f}s:")
+                self.stdout.write(f"    - pages/sec:        {result['pages_per_second']:10.1f} ({result['pages']} pages)")
+                self.stdout.write(f"    - products/sec:     {result['products_per_second']:10.1f} ({result['products']} products)")
+                self.stdout.write(f"    - CPU per product:  {cpu:>10}")
+                if result['missed']:
+                    self.stdout.write(self.style.WARNING(f"    - {result['missed']} requests had no recorded response"))
+
+        if store_file is not None:
+            from scraping.utils.product_scraping_utils.BaseDataCleaner import BaseDataCleaner
+            from scraping.utils.product_scraping_utils.normalization_cache_benchmark import (
+                run_normalization_cache_benchmark, load_store_products, synthetic_store_products,
+            )
+
+            if store_file:
+                if not os.path.isfile(store_file):
+                    raise CommandError(f"{store_file} is not a file.")
+                products = load_store_products(store_file)
+                if not products:
+                    raise CommandError(f"No products found in {store_file}.")
+            else:
+                products = synthetic_store_products()
+            brand_translations, product_translations = BaseDataCleaner._load_translation_tables()
+
+            self.stdout.write(self.style.SUCCESS(f'--- Benchmarking product normalisation ({len(products)} products) ---'))
+            results = run_normalization_cache_benchmark(products, brand_translations, product_translations)
+            baseline = results[0]['us_per_product']
+            for result in results:
+                hit_rate = f", {result['hit_rate']:.0%} hits" if result['hit_rate'] is not None else ''
+                speedup = f", {baseline / result['us_per_product']:.1f}x" if result['us_per_product'] else ''
+                self.stdout.write(f"  - {result['run']:<22} {result['us_per_product']:8.1f} us CPU/product{hit_rate}{speedup}")
+                if not result['same_result']:
+                    self.stdout.write(self.style.WARNING("    - Results differ from ProductNormalizer's!"))
+
+        if cleaners_dir is not None:
+            from scraping.utils.product_scraping_utils.cleaner_benchmark import run_cleaner_benchmark, load_cassette_payloads, synthetic_payloads
+            from scraping.utils.product_scraping_utils.scraper_benchmark import find_cassettes
+
+            if cleaners_dir:
+                payloads = load_cassette_payloads(find_cassettes(cleaners_dir)) if os.path.isdir(cleaners_dir) else {}
+                if not payloads:
+                    raise CommandError(f"No recorded Woolworths or Coles products found in {cleaners_dir}. Record some with `scrape --record {cleaners_dir}`.")
+            else:
+                payloads = synthetic_payloads()
+
+            self.stdout.write(self.style.SUCCESS('--- Benchmarking cleaner field extraction ---'))
+            for result in run_cleaner_benchmark(payloads):
+                self.stdout.write(f"  - {result['company']} ({result['products']} products):")
+                self.stdout.write(f"    - _get_value per field: {result['get_value_us']:8.2f} us CPU/product")
+                self.stdout.write(f"    - compiled accessors:   {result['compiled_us']:8.2f} us CPU/product")
+                if result['compiled_us']:
+                    self.stdout.write(f"    - {result['get_value_us'] / result['compiled_us']:.1f}x less CPU")
+                self.stdout.write(f"    - whole clean_data():   {result['clean_data_us']:8.2f} us CPU/product")
+                if not result['same_result']:
+                    self.stdout.write(self.style.WARNING("    - Results differ from _get_value's!"))
+
+        if writer_file is not None:
+            from scraping.utils.product_scraping_utils.jsonl_writer_benchmark import run_jsonl_writer_benchmark, load_outbox_records, synthetic_outbox_records
+
+            if writer_file:
+                if not os.path.isfile(writer_file):
+                    raise CommandError(f"{writer_file} is not a file.")
+                records = load_outbox_records(writer_file)
+                if not records:
+                    raise CommandError(f"No products found in {writer_file}.")
+            else:
+                records = synthetic_outbox_records()
+
+            self.stdout.write(self.style.SUCCESS('--- Benchmarking JSONL output ---'))
+            results = run_jsonl_writer_benchmark(records)
+            baseline = results[0]
+            for result in results:
+                self.stdout.write(
+                    f"  - {result['run']:<24} {result['us_per_product']:8.2f} us CPU/product, "
+                    f"{result['bytes_per_product']:8.1f} B written/product ({result['products']} products)"
+                )
+                if not result['same_result']:
+                    self.stdout.write(self.style.WARNING("    - Lines differ from json.dump's!"))
+            if results[-1]['us_per_product'] and results[-1]['bytes_per_product']:
+                self.stdout.write(
+                    f"  - {baseline['us_per_product'] / results[-1]['us_per_product']:.1f}x less CPU, "
+                    f"{baseline['bytes_per_product'] / results[-1]['bytes_per_product']:.0f}x fewer bytes written"
+                )
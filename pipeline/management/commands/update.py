@@ -1,6 +1,7 @@
 import json
 import os
 import time
+from datetime import datetime
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.db import IntegrityError
@@ -16,6 +17,10 @@ class Command(BaseCommand):
         parser.add_argument('--cat-links', action='store_true', help='Update category links from the category_links_inbox directory.')
         parser.add_argument('--subs', action='store_true', help='Update substitutions from the substitutions_inbox directory.')
         parser.add_argument('--archive', action='store_true', help='Read from archive data for supported update types.')
+        parser.add_argument('--no-cache-snapshot', action='store_true', help='Rebuild the product caches from a full table scan instead of the on-disk snapshot.')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Stream product files through the pipeline in chunks of this many products instead of loading each file into memory.')
+        parser.add_argument('--rebuild-translation-tables', action='store_true', help='Rebuild the brand and product translation tables from a full table scan instead of patching in only the rows that changed.')
+        parser.add_argument('--workers', type=int, default=None, help="Process each company's product files in its own worker process, using up to this many workers.")
 
     def handle(self, *args, **options):
         run_products_processed = options['products']
@@ -24,6 +29,10 @@ class Command(BaseCommand):
         run_substitutions = options['subs']
         post_process_only = options['post_process_only']
         archive = options['archive']
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        rebuild_translation_tables = options['rebuild_translation_tables']
+        cache_snapshot_path = None if options['no_cache_snapshot'] else settings.PIPELINE_DATA_DIR / 'cache' / 'product_cache_snapshot.pickle'
 
         if run_companies:
             if not archive:
@@ -44,10 +53,11 @@ class Command(BaseCommand):
 
         if run_products_processed:
             from pipeline.database_updating_classes.product_updating.update_orchestrator import UpdateOrchestrator
+            from pipeline.database_updating_classes.product_updating.translation_table_generators.translation_table_changes import TranslationTableChanges
 
             if post_process_only:
                 self.stdout.write(self.style.SUCCESS('--- Running only product post-processing tasks ---'))
-                orchestrator = UpdateOrchestrator(self, post_process_only=True)
+                orchestrator = UpdateOrchestrator(self, post_process_only=True, run_report_path=self._run_report_path())
                 orchestrator.run()
             else:
                 source_path = (
@@ -60,12 +70,15 @@ class Command(BaseCommand):
                     if not os.path.exists(source_path):
                         return False
                     for _, _, files in os.walk(source_path):
-                        if any(f.endswith('.jsonl') for f in files):
+                        if any(f.endswith(('.jsonl', '.jsonl.gz')) for f in files):
                             return True
                     return False
 
                 error_counter = 0
                 MAX_RESTARTS = 10
+                # Shared by every orchestrator below, so that changes written by a run that
+                # fails are still patched into the translation tables by the next one.
+                translation_changes = TranslationTableChanges()
 
                 if archive:
                     if files_exist_in_inbox():
@@ -74,6 +87,12 @@ class Command(BaseCommand):
                             self,
                             source_path=source_path,
                             preserve_source_files=True,
+                            chunk_size=chunk_size,
+                            workers=workers,
+                            cache_snapshot_path=cache_snapshot_path,
+                            translation_changes=translation_changes,
+                            rebuild_translation_tables=rebuild_translation_tables,
+                            run_report_path=self._run_report_path(),
                         )
                         orchestrator.run()
                     else:
@@ -94,6 +113,12 @@ class Command(BaseCommand):
                             self,
                             source_path=source_path,
                             preserve_source_files=archive,
+                            chunk_size=chunk_size,
+                            workers=workers,
+                            cache_snapshot_path=cache_snapshot_path,
+                            translation_changes=translation_changes,
+                            rebuild_translation_tables=rebuild_translation_tables,
+                            run_report_path=self._run_report_path(),
                         )
                         orchestrator.run()
                         # A successful run resets the counter
@@ -118,6 +143,11 @@ class Command(BaseCommand):
 
             self.stdout.write(self.style.SUCCESS('--- Product update from inbox complete ---'))
 
+    def _run_report_path(self):
+        """Each orchestrator run writes its stage timings to its own JSONL report."""
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        return settings.PIPELINE_DATA_DIR / 'reports' / f'update_products_{timestamp}.jsonl'
+
     def _update_companies_from_archive(self):
         archive_file = settings.PIPELINE_DATA_DIR / 'archive' / 'company_archive' / 'companies.json'
         if not archive_file.exists():
@@ -10,6 +10,7 @@ class Command(BaseCommand):
         parser.add_argument('--products', action='store_true', help='Upload product data.')
         parser.add_argument('--cat-links', action='store_true', help='Upload generated category links.')
         parser.add_argument('--subs', action='store_true', help='Upload generated substitutions.')
+        parser.add_argument('--files-at-once', type=int, default=None, help='--products only: number of product files to upload at the same time.')
         parser.add_argument('--dev', action='store_true', help='Use development server URL.')
 
     def handle(self, *args, **options):
@@ -17,7 +18,7 @@ class Command(BaseCommand):
 
         if options['products']:
             self.stdout.write(self.style.SUCCESS("Uploading product data..."))
-            uploader = ProductUploader(self, dev=dev)
+            uploader = ProductUploader(self, dev=dev, files_at_once=options['files_at_once'])
             uploader.run()
 
         if options['cat_links']:
@@ -54,6 +54,19 @@ class TestUpdateCommandDispatch:
         _, kwargs = MockOrch.call_args
         assert kwargs.get('preserve_source_files') is False
 
+    @patch(f'{BASE}.time.sleep')
+    @patch(PRODUCT_ORCH)
+    @patch(f'{BASE}.os.walk')
+    @patch(f'{BASE}.os.path.exists', return_value=True)
+    def test_products_workers_flag_passed_to_orchestrator(self, mock_exists, mock_walk, MockOrch, mock_sleep):
+        mock_walk.side_effect = [
+            [('root', [], ['data.jsonl'])],
+            [('root', [], [])],
+        ]
+        call_command('update', products=True, workers=4)
+        _, kwargs = MockOrch.call_args
+        assert kwargs.get('workers') == 4
+
     @patch(f'{BASE}.time.sleep')
     @patch(PRODUCT_ORCH)
     @patch(f'{BASE}.os.walk')
@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from products.models import Product
+from products.tests.factories import ProductFactory, ProductBrandFactory
+from pipeline.utils.database_updating_utils.bulk_merge import bulk_merge
+from pipeline.utils.database_updating_utils.bulk_merge_benchmark import run_bulk_merge_benchmark
+
+
+@pytest.mark.django_db
+class TestBulkMerge:
+    def test_merges_through_staging_table(self):
+        brand = ProductBrandFactory()
+        products = [ProductFactory(url=None, sizes=[]) for _ in range(3)]
+        for i, product in enumerate(products):
+            product.url = f'https://example.com/{i}'
+            product.sizes = [f'{i}00g']
+            product.brand = brand
+
+        with CaptureQueriesContext(connection) as ctx:
+            updated = bulk_merge(products, ['url', 'sizes', 'brand'], merge_threshold=0)
+
+        assert updated == 3
+        assert any('merge_staging_' in q['sql'] and q['sql'].startswith('UPDATE') for q in ctx.captured_queries)
+        for i, product in enumerate(products):
+            product.refresh_from_db()
+            assert product.url == f'https://example.com/{i}'
+            assert product.sizes == [f'{i}00g']
+            assert product.brand_id == brand.id
+
+    def test_only_listed_fields_are_written(self):
+        product = ProductFactory(name='original', url=None)
+        product.name = 'changed'
+        product.url = 'https://example.com'
+
+        bulk_merge([product], ['url'], merge_threshold=0)
+
+        product.refresh_from_db()
+        assert product.name == 'original'
+        assert product.url == 'https://example.com'
+
+    def test_first_duplicate_wins_like_bulk_update(self):
+        product = ProductFactory(url=None)
+        first = Product.objects.get(pk=product.pk)
+        second = Product.objects.get(pk=product.pk)
+        first.url = 'https://example.com/first'
+        second.url = 'https://example.com/second'
+
+        bulk_merge([first, second], ['url'], merge_threshold=0)
+
+        product.refresh_from_db()
+        assert product.url == 'https://example.com/first'
+
+    def test_small_updates_fall_back_to_bulk_update(self):
+        product = ProductFactory()
+
+        with patch.object(Product.objects, 'bulk_update', return_value=1) as mock_bulk_update:
+            bulk_merge([product], ['url'], batch_size=250)
+
+        mock_bulk_update.assert_called_once_with([product], ['url'], batch_size=250)
+
+    def test_rejects_primary_key_and_unsaved_objects(self):
+        with pytest.raises(ValueError):
+            bulk_merge([ProductFactory()], ['id'], merge_threshold=0)
+        with pytest.raises(ValueError):
+            bulk_merge([Product(name='unsaved')], ['name'], merge_threshold=0)
+
+    def test_empty_list_is_a_no_op(self):
+        assert bulk_merge([], ['url']) == 0
+
+
+@pytest.mark.django_db
+def test_benchmark_leaves_database_unchanged():
+    results = run_bulk_merge_benchmark(sizes=(50,))
+
+    assert [r['rows'] for r in results] == [50]
+    assert not Product.objects.exists()
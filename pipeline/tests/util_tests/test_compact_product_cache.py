@@ -0,0 +1,112 @@
+import pickle
+
+from pipeline.database_updating_classes.product_updating.compact_product_cache import CompactProductCache
+from pipeline.utils.database_updating_utils.product_cache_benchmark import _build_dict_caches, _synthetic_rows, run_product_cache_benchmark
+
+
+def _rows():
+    return [
+        (3, 'milk-1l', 'dairyco', '09300000000001'),
+        (1, 'bread-700g', 'bakeco', 'ABC-123'),
+        (2, 'eggs-12pk', None, None),
+    ]
+
+
+class TestCompactProductCache:
+    def test_lookups_match_dict_caches(self):
+        rows = list(_synthetic_rows(500))
+        cache = CompactProductCache.from_rows(rows)
+        expected = _build_dict_caches(rows)
+
+        assert cache.by_id == expected['products_by_id']
+        assert cache.by_barcode == expected['products_by_barcode']
+        assert cache.by_norm_string == expected['products_by_norm_string']
+        assert len(cache.by_id) == 500
+
+    def test_barcodes_keep_leading_zeros_and_non_digits(self):
+        cache = CompactProductCache.from_rows(_rows())
+
+        assert cache.by_barcode['09300000000001'] == 3
+        assert cache.by_barcode.get('9300000000001') is None
+        assert cache.by_barcode['ABC-123'] == 1
+        assert 'missing' not in cache.by_barcode
+
+    def test_record_behaves_like_slim_dict(self):
+        cache = CompactProductCache.from_rows(_rows())
+
+        record = cache.by_id[2]
+        assert record['id'] == 2
+        assert record.get('brand_normalized_name') is None
+        assert record == {'id': 2, 'normalized_name_brand_size': 'eggs-12pk', 'brand_normalized_name': None}
+        assert cache.by_id.get(99) is None
+
+    def test_norm_string_hash_collisions_are_verified(self, monkeypatch):
+        from pipeline.database_updating_classes.product_updating import compact_product_cache
+        monkeypatch.setattr(compact_product_cache, '_hash_norm_string', lambda s: 7)
+
+        cache = CompactProductCache.from_rows(_rows())
+
+        assert cache.by_norm_string['milk-1l'] == 3
+        assert cache.by_norm_string['eggs-12pk'] == 2
+        assert cache.by_norm_string.get('cheese') is None
+
+    def test_runtime_writes_go_through_views(self):
+        cache = CompactProductCache.from_rows(_rows())
+
+        cache.add_product(10, 'butter-250g', 'dairyco', '555')
+        cache.by_norm_string['butter 250g'] = 10
+        cache.by_id[3]['normalized_name_brand_size'] = 'milk-1l-full-cream'
+
+        assert cache.by_id[10]['brand_normalized_name'] == 'dairyco'
+        assert cache.by_barcode['555'] == 10
+        assert cache.by_norm_string['butter 250g'] == 10
+        assert cache.by_id[3]['normalized_name_brand_size'] == 'milk-1l-full-cream'
+        # The old string still resolves, as it did when the cache was a dict.
+        assert cache.by_norm_string['milk-1l'] == 3
+        assert len(cache.by_id) == 4
+
+    def test_without_ids_drops_every_tier(self):
+        cache = CompactProductCache.from_rows(_rows())
+        cache.add_product(10, 'butter-250g', 'dairyco', '555')
+
+        trimmed = cache.without_ids({3, 10})
+
+        assert sorted(trimmed.by_id) == [1, 2]
+        assert '09300000000001' not in trimmed.by_barcode
+        assert '555' not in trimmed.by_barcode
+        assert 'butter-250g' not in trimmed.by_norm_string
+        assert trimmed.by_barcode['ABC-123'] == 1
+
+    def test_replace_products_matches_a_rebuilt_cache(self):
+        cache = CompactProductCache.from_rows(_rows())
+        cache.add_product(10, 'butter-250g', 'dairyco', '555')
+
+        cache.replace_products([(3, 'milk-2l', 'dairyco', '777'), (11, 'jam-300g', None, 'XYZ')], removed_ids={1, 10})
+
+        expected = CompactProductCache.from_rows([
+            (2, 'eggs-12pk', None, None),
+            (3, 'milk-2l', 'dairyco', '777'),
+            (11, 'jam-300g', None, 'XYZ'),
+        ])
+        assert cache.by_id == expected.by_id
+        assert cache.by_barcode == expected.by_barcode
+        assert cache.by_norm_string == expected.by_norm_string
+        assert len(cache.by_id) == 3 and len(cache.by_barcode) == 2
+        assert sorted(cache.iter_rows()) == sorted(expected.iter_rows())
+        assert cache.stale_share == 4 / 3
+
+    def test_pickle_round_trip(self):
+        cache = CompactProductCache.from_rows(_rows())
+        cache.add_product(10, 'butter-250g', 'dairyco', '555')
+
+        restored = pickle.loads(pickle.dumps(cache))
+
+        assert sorted(restored.iter_rows()) == sorted(cache.iter_rows())
+        assert restored.by_norm_string['butter-250g'] == 10
+
+
+def test_benchmark_reports_each_size():
+    results = run_product_cache_benchmark(sizes=(200,))
+
+    assert [r['products'] for r in results] == [200]
+    assert results[0]['compact_bytes'] < results[0]['dict_bytes']
@@ -1,3 +1,4 @@
+import gzip
 import json
 import pytest
 import tempfile
@@ -112,3 +113,54 @@ class TestFileReader:
             assert data == []
         finally:
             os.unlink(path)
+
+
+class TestFileReaderStreaming:
+    def _lines(self):
+        return [
+            {'metadata': {'company': 'Coles'}, 'product': {'normalized_name_brand_size': 'milk 1l'}},
+            {'metadata': {}, 'product': {'normalized_name_brand_size': 'bread 700g'}},
+            {'metadata': {}, 'product': {'normalized_name_brand_size': 'milk 1l'}},
+            {'metadata': {}, 'product': {'normalized_name_brand_size': 'eggs 12pk'}},
+        ]
+
+    def test_iter_chunks_matches_read_and_consolidate(self, tmp_path):
+        path = str(tmp_path / 'file.jsonl')
+        _write_jsonl(path, self._lines())
+        reader = FileReader(path)
+
+        _, data = reader.read_and_consolidate()
+        chunks = list(reader.iter_chunks(2))
+
+        assert [len(c) for c in chunks] == [2, 1]
+        assert [item for chunk in chunks for item in chunk] == data
+
+    def test_read_metadata_and_count(self, tmp_path):
+        path = str(tmp_path / 'file.jsonl')
+        _write_jsonl(path, self._lines())
+
+        meta, count = FileReader(path).read_metadata_and_count()
+
+        assert meta == {'company': 'Coles'}
+        assert count == 3
+
+    def test_missing_file_streams_nothing(self):
+        reader = FileReader('/nonexistent/path/file.jsonl')
+        assert list(reader.iter_chunks(10)) == []
+        assert reader.read_metadata_and_count() == (None, 0)
+
+    def test_invalid_chunk_size_raises(self, tmp_path):
+        path = str(tmp_path / 'file.jsonl')
+        _write_jsonl(path, self._lines())
+        with pytest.raises(ValueError):
+            list(FileReader(path).iter_chunks(0))
+
+    def test_reads_gzipped_files(self, tmp_path):
+        path = tmp_path / 'coles-store-2025-06-01.jsonl.gz'
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'metadata': {'company': 'Coles'}, 'product': {'normalized_name_brand_size': 'milk 1l'}}) + '\n')
+
+        meta, data = FileReader(str(path)).read_and_consolidate()
+
+        assert meta == {'company': 'Coles'}
+        assert len(data) == 1
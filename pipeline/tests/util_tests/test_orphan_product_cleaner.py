@@ -1,5 +1,6 @@
 import pytest
 from pipeline.database_updating_classes.product_updating.post_processing.orphan_product_cleaner import OrphanProductCleaner
+from pipeline.database_updating_classes.product_updating.translation_table_generators.translation_table_changes import TranslationTableChanges
 from products.models import Product
 from products.tests.factories import ProductFactory, PriceFactory
 
@@ -12,6 +13,13 @@ class TestOrphanProductCleaner:
         cleaner.run()
         assert not Product.objects.filter(pk=orphan.pk).exists()
 
+    def test_records_deleted_products_as_translation_table_changes(self, mock_command):
+        ProductFactory(normalized_name_brand_size='orphan')
+        PriceFactory()
+        changes = TranslationTableChanges()
+        OrphanProductCleaner(mock_command, translation_changes=changes).run()
+        assert changes.removed_product_norm_strings == {'orphan'}
+
     def test_preserves_products_with_prices(self, mock_command):
         price = PriceFactory()
         product = price.product
@@ -0,0 +1,123 @@
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+from companies.tests.factories import CompanyFactory
+from pipeline.utils.database_updating_utils import prefill_barcodes
+from pipeline.utils.database_updating_utils.prefill_barcodes import prefill_barcodes_from_api
+from pipeline.utils.database_updating_utils.sku_barcode_cache import SkuBarcodeCache
+from products.models import SKU
+from products.tests.factories import ProductFactory
+
+
+class _DjangoSession:
+    """Sends the prefill's requests to the Django test client, one at a time, recording them."""
+    def __init__(self, client, fail_gets=False):
+        self.client = client
+        self.lock = threading.Lock()
+        self.fail_gets = fail_gets
+        self.lookups = []
+        self.syncs = []
+
+    def _response(self, response):
+        def raise_for_status():
+            if response.status_code >= 400:
+                raise requests.exceptions.HTTPError(f"HTTP {response.status_code}")
+        return SimpleNamespace(status_code=response.status_code, json=response.json, raise_for_status=raise_for_status)
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        if self.fail_gets:
+            raise requests.exceptions.ConnectionError('connection refused')
+        self.syncs.append(dict(params))
+        return self._response(self.client.get(urlsplit(url).path, params, HTTP_X_INTERNAL_API_KEY=headers['X-Internal-API-Key']))
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        with self.lock:
+            self.lookups.append(json.loads(data)['skus'])
+            return self._response(self.client.post(
+                urlsplit(url).path, data, content_type='application/json', HTTP_X_INTERNAL_API_KEY=headers['X-Internal-API-Key'],
+            ))
+
+
+@pytest.fixture
+def server(settings, monkeypatch):
+    monkeypatch.setenv('INTERNAL_API_KEY', 'test-key')
+    settings.INTERNAL_API_KEY = 'test-key'
+    settings.API_SERVER_URL = 'http://testserver'
+    coles = CompanyFactory(name='Coles')
+    SKU.objects.create(company=coles, product=ProductFactory(barcode='9300000000001'), sku='123')
+    SKU.objects.create(company=coles, product=ProductFactory(barcode=None, has_no_coles_barcode=True), sku='789')
+    return coles
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SkuBarcodeCache(tmp_path / 'sku_barcode_cache.sqlite3')
+    yield cache
+    cache.close()
+
+
+def _products(*skus):
+    return [{'sku': sku, 'barcode': None} for sku in skus]
+
+
+# Lookups run on worker threads, which only see committed rows.
+@pytest.mark.django_db(transaction=True)
+class TestPrefillBarcodesFromApi:
+    def test_prefills_from_the_synced_cache_without_looking_up_known_skus(self, client, server, cache):
+        session = _DjangoSession(client)
+
+        products = prefill_barcodes_from_api(_products('123', '789', '555'), MagicMock(), cache=cache, session=session)
+
+        assert products[0]['barcode'] == '9300000000001'
+        assert products[1]['has_no_coles_barcode'] is True
+        assert products[2]['barcode'] is None
+        assert session.lookups == [[555]]
+
+    def test_later_runs_only_sync_changes(self, client, server, cache):
+        prefill_barcodes_from_api(_products('123'), MagicMock(), cache=cache, session=_DjangoSession(client))
+        SKU.objects.create(company=server, product=ProductFactory(barcode='9300000000005'), sku='555')
+        session = _DjangoSession(client)
+
+        products = prefill_barcodes_from_api(_products('555'), MagicMock(), cache=cache, session=session)
+
+        assert products[0]['barcode'] == '9300000000005'
+        assert 'since' in session.syncs[0]
+        assert session.lookups == []
+
+    def test_unknown_skus_are_looked_up_in_chunks_and_cached(self, client, server, cache, monkeypatch):
+        monkeypatch.setattr(prefill_barcodes, 'LOOKUP_CHUNK_SIZE', 2)
+        session = _DjangoSession(client, fail_gets=True)
+
+        products = prefill_barcodes_from_api(_products('123', '789', '555', '556', '557'), MagicMock(), cache=cache, session=session)
+
+        assert products[0]['barcode'] == '9300000000001'
+        assert sorted(session.lookups) == [[123, 555], [556, 557], [789]]
+        assert cache.get_many(['123', '789', '555']) == {
+            '123': {'barcode': '9300000000001', 'has_no_coles_barcode': False},
+            '789': {'barcode': None, 'has_no_coles_barcode': True},
+        }
+
+
+class TestSkuBarcodeCache:
+    def test_sync_state_is_reset_for_another_server(self, cache):
+        cache.update([('123', '9300000000001', False)])
+        session = MagicMock()
+        session.get.return_value.json.return_value = {'rows': [], 'next_after': None, 'high_water_mark': '2025-06-01T00:00:00+00:00'}
+
+        cache.sync(session, 'http://other-server/api/products/barcodes/', {})
+
+        assert cache.get_many(['123']) == {}
+        assert 'since' not in session.get.call_args.kwargs['params']
+
+    def test_sku_without_barcode_information_is_forgotten(self, cache):
+        cache.update([('123', '9300000000001', False)])
+
+        cache.update([('123', None, False)])
+
+        assert len(cache) == 0
@@ -1,6 +1,8 @@
 import datetime
 import pytest
 from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from products.models import Price
 from products.tests.factories import ProductFactory, PriceFactory
 from companies.tests.factories import CompanyFactory
@@ -152,3 +154,41 @@ class TestPriceManagerProcess:
         manager.process(data, company)
 
         assert not Price.objects.filter(product=product, company=company).exists()
+
+    def test_unchanged_prices_are_not_written(self, mock_command):
+        product = ProductFactory()
+        company = CompanyFactory()
+        existing = PriceFactory(
+            product=product, company=company,
+            price=Decimal('2.50'), price_hash='hash-abc',
+            scraped_date=datetime.date(2024, 12, 1),
+        )
+        caches = _make_caches(product.id, company.id, existing_price=existing)
+        caches['prices_by_company'][company.id]['pks_with_was_price'] = set()
+        manager = PriceManager(mock_command, caches, lambda *a: None)
+
+        with CaptureQueriesContext(connection) as ctx:
+            manager.process(_raw_data(price_hash='hash-abc'), company)
+
+        assert not [q for q in ctx.captured_queries if q['sql'].startswith(('UPDATE', 'DELETE'))]
+
+    @pytest.mark.parametrize('cached', [True, False])
+    def test_clears_stale_was_price_on_unchanged_price(self, mock_command, cached):
+        product = ProductFactory()
+        company = CompanyFactory()
+        existing = PriceFactory(
+            product=product, company=company,
+            price=Decimal('2.50'), price_hash='hash-abc',
+            was_price=Decimal('3.00'), save_amount=Decimal('0.50'),
+            scraped_date=datetime.date(2024, 12, 1),
+        )
+        caches = _make_caches(product.id, company.id, existing_price=existing)
+        if cached:
+            caches['prices_by_company'][company.id]['pks_with_was_price'] = {existing.pk}
+        manager = PriceManager(mock_command, caches, lambda *a: None)
+
+        manager.process(_raw_data(price_hash='hash-abc'), company)
+
+        existing.refresh_from_db()
+        assert existing.was_price is None
+        assert existing.save_amount is None
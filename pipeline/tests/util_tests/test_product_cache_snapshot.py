@@ -0,0 +1,135 @@
+import pickle
+from unittest.mock import patch
+
+import pytest
+from products.models import Product
+from products.tests.factories import ProductFactory, ProductBrandFactory
+from pipeline.database_updating_classes.product_updating import product_cache_snapshot
+from pipeline.database_updating_classes.product_updating.product_cache_snapshot import ProductCacheSnapshot
+from pipeline.database_updating_classes.product_updating.compact_product_cache import CompactProductCache
+
+
+@pytest.fixture
+def snapshot(mock_command, tmp_path):
+    return ProductCacheSnapshot(mock_command, tmp_path / 'cache' / 'products.pickle')
+
+
+@pytest.mark.django_db
+class TestProductCacheSnapshot:
+    def test_build_caches_matches_database(self):
+        brand = ProductBrandFactory(normalized_name='brand-a')
+        product = ProductFactory(normalized_name_brand_size='milk', barcode='123', brand=brand)
+
+        caches = ProductCacheSnapshot.build_caches()
+
+        assert caches['products_by_barcode'] == {'123': product.id}
+        assert caches['products_by_norm_string'] == {'milk': product.id}
+        assert caches['products_by_id'][product.id] == {
+            'id': product.id,
+            'normalized_name_brand_size': 'milk',
+            'brand_normalized_name': 'brand-a',
+        }
+
+    def test_load_writes_versioned_snapshot(self, snapshot):
+        product = ProductFactory(normalized_name_brand_size='milk')
+
+        snapshot.load()
+
+        with open(snapshot.snapshot_path, 'rb') as f:
+            payload = pickle.load(f)
+        assert payload['version'] == product_cache_snapshot.SNAPSHOT_VERSION
+        assert isinstance(payload['product_cache'], CompactProductCache)
+        assert payload['product_cache'].by_norm_string == {'milk': product.id}
+
+    def test_refresh_picks_up_created_changed_and_deleted_products(self, snapshot):
+        kept = ProductFactory(normalized_name_brand_size='kept', barcode='111')
+        changed = ProductFactory(normalized_name_brand_size='changed', barcode=None)
+        deleted = ProductFactory(normalized_name_brand_size='deleted', barcode='333')
+        snapshot.load()
+
+        changed.barcode = '222'
+        changed.save()
+        deleted.delete()
+        created = ProductFactory(normalized_name_brand_size='created')
+
+        caches = snapshot.load()
+
+        assert caches == ProductCacheSnapshot.build_caches()
+        assert caches['products_by_barcode'] == {'111': kept.id, '222': changed.id}
+        assert 'deleted' not in caches['products_by_norm_string']
+        assert caches['products_by_norm_string']['created'] == created.id
+
+    def test_refresh_only_rereads_rows_past_high_water_mark(self, snapshot, mock_command):
+        ProductFactory(normalized_name_brand_size='old')
+        snapshot.load()
+        with open(snapshot.snapshot_path, 'rb') as f:
+            payload = pickle.load(f)
+
+        # Pretend the snapshot was taken after every existing row was written.
+        payload['high_water_mark'] = Product.objects.latest('updated_at').updated_at + product_cache_snapshot.HIGH_WATER_MARK_OVERLAP * 2
+        payload['product_cache'].add_product(-1, 'ghost', None)
+        with open(snapshot.snapshot_path, 'wb') as f:
+            pickle.dump(payload, f)
+        mock_command.stdout.write.reset_mock()
+
+        with patch.object(CompactProductCache, 'from_values') as mock_full_scan:
+            caches = snapshot.load()
+
+        mock_full_scan.assert_not_called()
+        mock_command.stdout.write.assert_any_call(
+            "  - Refreshed product cache snapshot: re-read 0 changed products, dropped 1 deleted products."
+        )
+        assert 'ghost' not in caches['products_by_norm_string']
+        assert 'old' in caches['products_by_norm_string']
+
+    def test_small_refresh_is_patched_in_without_a_rebuild(self, snapshot, monkeypatch):
+        ProductFactory(normalized_name_brand_size='kept', barcode='111')
+        changed = ProductFactory(normalized_name_brand_size='changed', barcode='222')
+        deleted = ProductFactory(normalized_name_brand_size='deleted', barcode='333')
+        snapshot.load()
+        monkeypatch.setattr(product_cache_snapshot, 'REBUILD_STALE_SHARE', float('inf'))
+
+        changed.barcode = '444'
+        changed.save()
+        deleted.delete()
+        ProductFactory(normalized_name_brand_size='created')
+        with patch.object(CompactProductCache, 'from_rows') as mock_rebuild:
+            caches = snapshot.load()
+
+        mock_rebuild.assert_not_called()
+        assert caches == ProductCacheSnapshot.build_caches()
+
+    def test_refresh_skips_the_id_scan_when_nothing_was_deleted(self, snapshot, django_assert_num_queries):
+        ProductFactory(normalized_name_brand_size='kept')
+        snapshot.load()
+        ProductFactory(normalized_name_brand_size='created')
+
+        # One query for the changed rows and one COUNT(*).
+        with django_assert_num_queries(2):
+            caches = snapshot.load()
+
+        assert caches == ProductCacheSnapshot.build_caches()
+
+    def test_incompatible_version_triggers_rebuild(self, snapshot):
+        product = ProductFactory(normalized_name_brand_size='milk')
+        snapshot.load()
+        with open(snapshot.snapshot_path, 'rb') as f:
+            payload = pickle.load(f)
+        payload['version'] = -1
+        payload['product_cache'] = CompactProductCache.from_rows([(999, 'stale', None, None)])
+        with open(snapshot.snapshot_path, 'wb') as f:
+            pickle.dump(payload, f)
+
+        caches = snapshot.load()
+
+        assert caches['products_by_norm_string'] == {'milk': product.id}
+
+    def test_corrupt_file_triggers_rebuild(self, snapshot):
+        product = ProductFactory(normalized_name_brand_size='milk')
+        snapshot.load()
+        with open(snapshot.snapshot_path, 'wb') as f:
+            f.write(b'not a pickle')
+
+        caches = snapshot.load()
+
+        assert caches['products_by_norm_string'] == {'milk': product.id}
@@ -1,10 +1,13 @@
 import datetime
 import pytest
 from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from products.models import Product, Price
 from products.tests.factories import ProductFactory, PriceFactory
 from companies.tests.factories import CompanyFactory
 from pipeline.database_updating_classes.product_updating.post_processing.product_reconciler import ProductReconciler
+from pipeline.database_updating_classes.product_updating.translation_table_generators.translation_table_changes import TranslationTableChanges
 
 
 def _write_translation_table(path, mapping: dict):
@@ -67,6 +70,18 @@ class TestProductReconcilerRun:
         assert not Product.objects.filter(pk=dupe.pk).exists()
         assert Product.objects.filter(pk=canonical.pk).exists()
 
+    def test_records_translation_table_changes(self, reconciler):
+        r, table_path = reconciler
+        r.translation_changes = TranslationTableChanges()
+        canonical = ProductFactory(normalized_name_brand_size='canonical-product')
+        ProductFactory(normalized_name_brand_size='dupe-product')
+        _write_translation_table(table_path, {'dupe-product': 'canonical-product'})
+
+        r.run()
+
+        assert r.translation_changes.product_ids == {canonical.id}
+        assert r.translation_changes.removed_product_norm_strings == {'dupe-product'}
+
     def test_reassigns_dupe_price_to_canonical(self, reconciler):
         r, table_path = reconciler
         company = CompanyFactory()
@@ -99,6 +114,43 @@ class TestProductReconcilerRun:
         assert Price.objects.filter(pk=canonical_price.pk).exists()
         assert not Price.objects.filter(pk=dupe_price.pk).exists()
 
+    def _merge_pairs(self, reconciler, pair_count):
+        r, table_path = reconciler
+        companies = [CompanyFactory(), CompanyFactory()]
+        translations = {}
+        for i in range(pair_count):
+            canonical = ProductFactory(normalized_name_brand_size=f'canonical-{pair_count}-{i}')
+            dupe = ProductFactory(normalized_name_brand_size=f'dupe-{pair_count}-{i}')
+            PriceFactory(product=canonical, company=companies[0])
+            PriceFactory(product=dupe, company=companies[0])
+            PriceFactory(product=dupe, company=companies[1])
+            translations[dupe.normalized_name_brand_size] = canonical.normalized_name_brand_size
+        _write_translation_table(table_path, translations)
+
+        with CaptureQueriesContext(connection) as ctx:
+            r.run()
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_merges(self, reconciler):
+        assert self._merge_pairs(reconciler, 2) == self._merge_pairs(reconciler, 6)
+        # Every canonical keeps one price per company.
+        assert Price.objects.count() == 2 * (2 + 6)
+        assert not Product.objects.filter(normalized_name_brand_size__startswith='dupe-').exists()
+
+    def test_follows_chains_of_duplicates_within_a_chunk(self, reconciler):
+        r, table_path = reconciler
+        company = CompanyFactory()
+        final = ProductFactory(normalized_name_brand_size='final')
+        middle = ProductFactory(normalized_name_brand_size='middle')
+        first = ProductFactory(normalized_name_brand_size='first')
+        first_price = PriceFactory(product=first, company=company)
+        _write_translation_table(table_path, {'first': 'middle', 'middle': 'final'})
+
+        r.run()
+
+        assert list(Product.objects.values_list('pk', flat=True)) == [final.pk]
+        assert Price.objects.get(pk=first_price.pk).product_id == final.pk
+
     def test_does_not_crash_when_canonical_missing_from_db(self, reconciler):
         r, table_path = reconciler
         ProductFactory(normalized_name_brand_size='dupe-product')
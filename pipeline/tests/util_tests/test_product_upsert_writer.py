@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from products.models import Product
+from products.tests.factories import ProductFactory
+from pipeline.database_updating_classes.product_updating import product_upsert_writer
+from pipeline.database_updating_classes.product_updating.product_upsert_writer import ProductUpsertWriter
+
+
+def _new_product(norm_string, barcode=None, **kwargs):
+    return Product(name=norm_string, normalized_name_brand_size=norm_string, barcode=barcode, **kwargs)
+
+
+@pytest.mark.django_db
+class TestProductUpsertWriter:
+    def test_inserts_products_and_returns_ids_in_one_query(self, mock_command):
+        products = [
+            _new_product('milk', barcode='111', sizes=['1l'], brand_name_company_pairs=[['Dairy Co', 'Coles']]),
+            _new_product('bread'),
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            inserted, conflicts = ProductUpsertWriter(mock_command).write(products)
+
+        assert len(ctx.captured_queries) == 1
+        assert conflicts == []
+        assert [p.pk for p in inserted] == [
+            Product.objects.get(normalized_name_brand_size='milk').id,
+            Product.objects.get(normalized_name_brand_size='bread').id,
+        ]
+        milk = Product.objects.get(normalized_name_brand_size='milk')
+        assert milk.sizes == ['1l']
+        assert milk.brand_name_company_pairs == [['Dairy Co', 'Coles']]
+        assert milk.updated_at is not None
+
+    def test_barcode_conflict_is_reported_instead_of_raised(self, mock_command):
+        existing = ProductFactory(normalized_name_brand_size='milk-coles', barcode='111')
+
+        inserted, conflicts = ProductUpsertWriter(mock_command).write([
+            _new_product('milk-aldi', barcode='111'),
+            _new_product('bread', barcode='222'),
+        ])
+
+        assert [p.normalized_name_brand_size for p in inserted] == ['bread']
+        assert [(p.normalized_name_brand_size, existing_id) for p, existing_id in conflicts] == [('milk-aldi', existing.id)]
+        assert not Product.objects.filter(normalized_name_brand_size='milk-aldi').exists()
+
+    def test_norm_string_conflict_is_reported(self, mock_command):
+        existing = ProductFactory(normalized_name_brand_size='milk', barcode=None)
+
+        inserted, conflicts = ProductUpsertWriter(mock_command).write([_new_product('milk')])
+
+        assert inserted == []
+        assert [existing_id for _, existing_id in conflicts] == [existing.id]
+
+    def test_writes_in_batches(self, mock_command, monkeypatch):
+        monkeypatch.setattr(product_upsert_writer, 'BATCH_SIZE', 2)
+
+        inserted, _ = ProductUpsertWriter(mock_command).write([_new_product(f'p{i}') for i in range(5)])
+
+        assert len(inserted) == 5
+        assert Product.objects.count() == 5
@@ -0,0 +1,106 @@
+import json
+import pytest
+from products.models import Product
+from products.tests.factories import ProductFactory
+from pipeline.database_updating_classes.product_updating import run_report
+from pipeline.database_updating_classes.product_updating.run_report import RunReport
+
+
+@pytest.mark.django_db
+class TestRunReportStage:
+    def test_records_rows_queries_and_timing(self):
+        ProductFactory()
+        report = RunReport()
+        report.current_file = 'coles.jsonl'
+
+        with report.stage('products.resolve', rows_in=3) as stage:
+            list(Product.objects.all())
+            Product.objects.count()
+            stage['rows_out'] = 1
+
+        [record] = report.records
+        assert record['stage'] == 'products.resolve'
+        assert record['file'] == 'coles.jsonl'
+        assert (record['rows_in'], record['rows_out']) == (3, 1)
+        assert record['queries'] == 2
+        assert record['seconds'] >= 0
+
+    def test_records_stage_that_raises(self):
+        report = RunReport()
+
+        with pytest.raises(ValueError):
+            with report.stage('prices'):
+                raise ValueError('boom')
+
+        assert [r['stage'] for r in report.records] == ['prices']
+
+    def test_process_peak_rss_is_none_without_resource_module(self, monkeypatch):
+        monkeypatch.setattr(run_report, 'resource', None)
+        report = RunReport()
+
+        with report.stage('paths'):
+            pass
+
+        assert report.records[0]['process_peak_rss_mb'] is None
+
+    def test_rss_delta_is_measured_over_the_stage_only(self, monkeypatch):
+        readings = iter([500.0, 512.5])
+        monkeypatch.setattr(run_report, '_rss_mb', lambda: next(readings))
+        report = RunReport()
+
+        with report.stage('prices'):
+            pass
+
+        assert report.records[0]['rss_delta_mb'] == 12.5
+
+    def test_rss_delta_is_none_without_proc(self, monkeypatch):
+        monkeypatch.setattr(run_report, '_rss_mb', lambda: None)
+        report = RunReport()
+
+        with report.stage('paths'):
+            pass
+
+        assert report.records[0]['rss_delta_mb'] is None
+
+
+class TestRunReportFile:
+    def test_appends_jsonl_and_summarises_every_writer(self, tmp_path):
+        path = tmp_path / 'reports' / 'run.jsonl'
+        parent, worker = RunReport(path), RunReport(path)
+
+        with parent.stage('build_caches') as stage:
+            stage['rows_out'] = 10
+        with worker.stage('prices', rows_in=4) as stage:
+            stage['rows_out'] = 2
+        with worker.stage('prices', rows_in=6) as stage:
+            stage['rows_out'] = 1
+
+        lines = path.read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line)['stage'] for line in lines] == ['build_caches', 'prices', 'prices']
+
+        totals = parent.summarise()
+        assert list(totals) == ['build_caches', 'prices']
+        assert totals['prices']['calls'] == 2
+        assert (totals['prices']['rows_in'], totals['prices']['rows_out']) == (10, 3)
+
+    def test_summary_keeps_the_largest_rss_growth_of_a_call(self, tmp_path, monkeypatch):
+        readings = iter([100.0, 130.0, 130.0, 125.0])
+        monkeypatch.setattr(run_report, '_rss_mb', lambda: next(readings))
+        report = RunReport(tmp_path / 'run.jsonl')
+
+        for _ in range(2):
+            with report.stage('prices'):
+                pass
+
+        assert report.summarise()['prices']['rss_delta_mb'] == 30.0
+
+    def test_write_summary_prints_a_row_per_stage(self, mock_command, tmp_path):
+        report = RunReport(tmp_path / 'run.jsonl')
+        with report.stage('dedupe', rows_in=5) as stage:
+            stage['rows_out'] = 4
+
+        report.write_summary(mock_command)
+
+        output = ''.join(str(c.args[0]) for c in mock_command.stdout.write.call_args_list)
+        assert 'Run Report' in output
+        assert 'dedupe' in output
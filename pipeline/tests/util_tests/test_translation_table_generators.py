@@ -5,6 +5,7 @@ from products.tests.factories import ProductFactory, ProductBrandFactory
 from pipeline.database_updating_classes.product_updating.translation_table_generators.base_translation_table_generator import BaseTranslationTableGenerator
 from pipeline.database_updating_classes.product_updating.translation_table_generators.product_translation_table_generator import ProductTranslationTableGenerator
 from pipeline.database_updating_classes.product_updating.translation_table_generators.brand_translation_table_generator import BrandTranslationTableGenerator
+from pipeline.database_updating_classes.product_updating.translation_table_generators.translation_table_changes import TranslationTableChanges
 
 
 # ── Concrete stub for the abstract base ──────────────────────────────────────
@@ -35,6 +36,13 @@ class TestBaseTranslationTableGeneratorWriteToFile:
         with open(path) as f:
             assert json.load(f) == {'variation': 'canonical'}
 
+    def test_run_with_changes_rebuilds_when_no_file_exists(self, tmp_path):
+        path = str(tmp_path / 'output.json')
+        gen = StubGenerator(path)
+        gen.run(TranslationTableChanges())
+        with open(path) as f:
+            assert json.load(f) == {'variation': 'canonical'}
+
 
 # ── ProductTranslationTableGenerator ─────────────────────────────────────────
 
@@ -85,6 +93,59 @@ class TestProductTranslationTableGenerator:
         assert result['var-b'] == 'canonical'
 
 
+@pytest.mark.django_db
+class TestProductTranslationTableGeneratorIncremental:
+    def _generator(self, tmp_path, table):
+        gen = ProductTranslationTableGenerator()
+        gen.output_path = str(tmp_path / 'out.json')
+        gen.write_to_file(table)
+        return gen
+
+    def test_no_changes_leaves_file_untouched(self, tmp_path):
+        gen = self._generator(tmp_path, {'stale': 'entry'})
+        gen.run(TranslationTableChanges())
+        assert gen.read_existing() == {'stale': 'entry'}
+
+    def test_patches_only_changed_products(self, tmp_path):
+        ProductFactory(normalized_name_brand_size='untouched', normalized_name_brand_size_variations=['untouched-var'])
+        changed = ProductFactory(normalized_name_brand_size='changed', normalized_name_brand_size_variations=['new-var'])
+        # 'untouched-var' is deliberately left out: only changed products are re-read.
+        gen = self._generator(tmp_path, {'old-var': 'changed', 'other-var': 'other'})
+
+        changes = TranslationTableChanges()
+        changes.mark_products([changed.id])
+        gen.run(changes)
+
+        assert gen.read_existing() == {'new-var': 'changed', 'other-var': 'other'}
+
+    def test_drops_entries_of_removed_products(self, tmp_path):
+        gen = self._generator(tmp_path, {'var-a': 'deleted', 'var-b': 'kept'})
+
+        changes = TranslationTableChanges()
+        changes.mark_removed_products(['deleted'])
+        gen.run(changes)
+
+        assert gen.read_existing() == {'var-b': 'kept'}
+
+    def test_patch_matches_full_rebuild(self, tmp_path):
+        products = [
+            ProductFactory(normalized_name_brand_size=f'p{i}', normalized_name_brand_size_variations=[f'p{i}-var'])
+            for i in range(4)
+        ]
+        gen = self._generator(tmp_path, {})
+        gen.run()
+
+        products[1].normalized_name_brand_size_variations = ['p1-var', 'p1-var-2']
+        products[1].save()
+        products[2].delete()
+        changes = TranslationTableChanges()
+        changes.mark_products([products[1].id])
+        changes.mark_removed_products(['p2'])
+        gen.run(changes)
+
+        assert gen.read_existing() == gen.generate_translation_dict()
+
+
 # ── BrandTranslationTableGenerator ───────────────────────────────────────────
 
 @pytest.mark.django_db
@@ -145,3 +206,49 @@ class TestBrandTranslationTableGeneratorResolveConflict:
         gen.output_path = str(tmp_path / 'out.json')
         winner, loser = gen._resolve_conflict(brand_a, brand_z)
         assert winner == brand_a
+
+
+@pytest.mark.django_db
+class TestBrandTranslationTableGeneratorIncremental:
+    def _run_full_then_patch(self, tmp_path, change):
+        gen = BrandTranslationTableGenerator()
+        gen.output_path = str(tmp_path / 'out.json')
+        gen.run()
+        changes = TranslationTableChanges()
+        change(changes)
+        gen.run(changes)
+        return gen
+
+    def test_changed_brand_variations_are_patched(self, tmp_path):
+        ProductBrandFactory(normalized_name='other', normalized_name_variations=['other-alias'])
+        brand = ProductBrandFactory(normalized_name='canon', normalized_name_variations=['alias-a'])
+
+        def change(changes):
+            brand.normalized_name_variations = ['alias-b']
+            brand.save()
+            changes.mark_brands([brand.id])
+
+        gen = self._run_full_then_patch(tmp_path, change)
+        assert gen.read_existing() == {'alias-b': 'canon', 'other-alias': 'other'}
+
+    def test_new_brand_creating_a_circular_dependency_is_resolved(self, tmp_path):
+        ProductBrandFactory(normalized_name='zebra', name='Zebra', normalized_name_variations=['aardvark'])
+
+        def change(changes):
+            new_brand = ProductBrandFactory(normalized_name='aardvark', name='Aardvark', normalized_name_variations=['zebra'])
+            changes.mark_brands([new_brand.id])
+
+        gen = self._run_full_then_patch(tmp_path, change)
+        assert gen.read_existing() == {'zebra': 'aardvark'}
+        assert gen.read_existing() == gen.generate_translation_dict()
+
+    def test_removed_brand_entries_are_dropped(self, tmp_path):
+        ProductBrandFactory(normalized_name='kept', normalized_name_variations=['kept-alias'])
+        removed = ProductBrandFactory(normalized_name='removed', normalized_name_variations=['removed-alias'])
+
+        def change(changes):
+            removed.delete()
+            changes.mark_removed_brands(['removed'])
+
+        gen = self._run_full_then_patch(tmp_path, change)
+        assert gen.read_existing() == {'kept-alias': 'kept'}
@@ -1,10 +1,15 @@
 import datetime
+import json
+import threading
 import pytest
+from concurrent.futures import Future
 from decimal import Decimal
-from unittest.mock import MagicMock
-from products.tests.factories import ProductFactory, PriceFactory
+from unittest.mock import MagicMock, patch
+from products.models import Product, ProductBrand, Price, SKU
+from products.tests.factories import ProductFactory, PriceFactory, ProductBrandFactory
 from companies.tests.factories import CompanyFactory
 from pipeline.database_updating_classes.product_updating.update_orchestrator import UpdateOrchestrator
+from pipeline.database_updating_classes.product_updating.product_manager import ProductManager
 
 
 @pytest.fixture
@@ -146,3 +151,157 @@ class TestIsFileValid:
             raw
         )
         assert valid is True
+
+
+# ── streaming ingest ──────────────────────────────────────────────────────────
+
+def _product_line(company_name, nnbs, brand, price, sku, barcode=None, path=None):
+    return {
+        'metadata': {'company': company_name, 'scraped_date': '2025-06-01T00:00:00'},
+        'product': {
+            'name': nnbs,
+            'normalized_name_brand_size': nnbs,
+            'brand': brand,
+            'normalized_brand': brand,
+            'sku': sku,
+            'barcode': barcode,
+            'price_current': price,
+            'price_hash': f'hash-{nnbs}-{price}',
+            'category_path': path or ['Dairy', 'Milk'],
+        },
+    }
+
+
+@pytest.mark.django_db
+class TestStreamingIngest:
+    @pytest.mark.parametrize('chunk_size', [None, 1, 2])
+    def test_streaming_matches_in_memory_results(self, mock_command, tmp_path, chunk_size):
+        company = CompanyFactory(name='Coles')
+        existing = ProductFactory(
+            normalized_name_brand_size='milk-existing', barcode='111',
+            brand=ProductBrandFactory(normalized_name='dairyco'),
+        )
+        PriceFactory(product=existing, company=company, price=Decimal('4.00'), scraped_date=datetime.date(2025, 1, 1))
+
+        lines = [
+            _product_line('Coles', 'milk-existing', 'dairyco', 3.50, 'sku-1', barcode='111'),
+            _product_line('Coles', 'bread-new', 'bakeco', 2.00, 'sku-2', barcode='222', path=['Bakery']),
+            _product_line('Coles', 'bread-new', 'bakeco', 9.99, 'sku-2', barcode='222'),
+            _product_line('Coles', 'bread-collision', 'bakeco', 2.10, 'sku-3', barcode='222'),
+            _product_line('Coles', 'eggs-new', 'eggco', 5.00, 'sku-4'),
+        ]
+        file_path = tmp_path / 'coles.jsonl'
+        file_path.write_text(''.join(json.dumps(line) + '\n' for line in lines), encoding='utf-8')
+
+        orchestrator = UpdateOrchestrator(mock_command, source_path=tmp_path, chunk_size=chunk_size)
+        orchestrator._build_global_caches()
+        orchestrator._process_file(str(file_path), None)
+
+        assert not file_path.exists()
+        assert sorted(Product.objects.values_list('normalized_name_brand_size', 'barcode', 'brand__normalized_name')) == [
+            ('bread-new', '222', 'bakeco'),
+            ('eggs-new', None, 'eggco'),
+            ('milk-existing', '111', 'dairyco'),
+        ]
+        assert sorted(Price.objects.values_list('product__normalized_name_brand_size', 'price', 'was_price')) == [
+            ('bread-new', Decimal('2.00'), None),
+            ('eggs-new', Decimal('5.00'), None),
+            ('milk-existing', Decimal('3.50'), Decimal('4.00')),
+        ]
+        assert sorted(SKU.objects.values_list('sku', 'product__normalized_name_brand_size')) == [
+            ('sku-1', 'milk-existing'),
+            ('sku-2', 'bread-new'),
+            ('sku-3', 'bread-new'),
+            ('sku-4', 'eggs-new'),
+        ]
+        bread = Product.objects.get(normalized_name_brand_size='bread-new')
+        assert [entry['path'] for entry in bread.category_paths] == [['Bakery']]
+
+        # Every stage of the file is recorded in the run report, whether streamed or not.
+        stages = {r['stage'] for r in orchestrator.run_report.records if r['file'] == 'coles.jsonl'}
+        assert {'read_file', 'products.resolve', 'products.persist', 'brands', 'price_cache', 'prices', 'paths'} <= stages
+
+
+# ── parallel ingest ───────────────────────────────────────────────────────────
+
+def _write_file(path, lines):
+    path.write_text(''.join(json.dumps(line) + '\n' for line in lines), encoding='utf-8')
+
+
+class _InlineExecutor:
+    """Stands in for ProcessPoolExecutor so that workers run in the test process, against the test database."""
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@pytest.mark.django_db
+class TestParallelIngest:
+    def test_groups_files_by_company_in_order(self, mock_command, tmp_path):
+        for name, company in [('a.jsonl', 'Coles'), ('b.jsonl', 'Aldi'), ('c.jsonl', 'coles')]:
+            _write_file(tmp_path / name, [_product_line(company, 'milk', 'dairyco', 1.0, 'sku')])
+        orchestrator = UpdateOrchestrator(mock_command, source_path=tmp_path)
+
+        groups = orchestrator._group_files_by_company(sorted(str(p) for p in tmp_path.iterdir()))
+
+        assert list(groups) == ['coles', 'aldi']
+        assert [p.rsplit('/', 1)[-1] for p in groups['coles']] == ['a.jsonl', 'c.jsonl']
+
+    @patch('pipeline.database_updating_classes.product_updating.update_orchestrator.ProcessPoolExecutor', _InlineExecutor)
+    def test_each_company_is_ingested_by_a_worker(self, mock_command, tmp_path):
+        CompanyFactory(name='Coles')
+        CompanyFactory(name='Aldi')
+        _write_file(tmp_path / 'aldi.jsonl', [
+            _product_line('Aldi', 'milk-shared', 'dairyco', 3.00, 'aldi-1', barcode='999'),
+        ])
+        _write_file(tmp_path / 'coles.jsonl', [
+            _product_line('Coles', 'milk-shared-coles', 'dairyco', 3.20, 'coles-1', barcode='999'),
+            _product_line('Coles', 'bread', 'bakeco', 2.00, 'coles-2'),
+        ])
+        orchestrator = UpdateOrchestrator(mock_command, source_path=tmp_path, workers=2)
+
+        with patch('django.db.connections.close_all'):
+            orchestrator._process_files_in_parallel(sorted(str(p) for p in tmp_path.iterdir()))
+
+        assert sorted(Product.objects.values_list('normalized_name_brand_size', flat=True)) == ['bread', 'milk-shared']
+        assert sorted(Price.objects.values_list('company__name', 'product__normalized_name_brand_size')) == [
+            ('Aldi', 'milk-shared'),
+            ('Coles', 'bread'),
+            ('Coles', 'milk-shared'),
+        ]
+        assert not list(tmp_path.iterdir())
+        # Brands created by the workers are passed back for the translation tables.
+        assert orchestrator.translation_changes.brand_ids == set(ProductBrand.objects.values_list('id', flat=True))
+
+    def test_product_manager_claims_products_created_by_another_worker(self, mock_command):
+        company = CompanyFactory(name='Coles')
+        # Created by another worker after this process built its (now stale, empty) caches.
+        other = ProductFactory(normalized_name_brand_size='milk-other', barcode='999')
+        caches = {
+            'products_by_id': {}, 'products_by_barcode': {}, 'products_by_norm_string': {},
+            'products_by_sku': {}, 'normalized_brand_names': {},
+        }
+
+        def update_cache(cache_name, key, value):
+            caches[cache_name][key] = value
+
+        manager = ProductManager(mock_command, caches, update_cache, set(), writer_lock=threading.Lock())
+        manager.process([_product_line('Coles', 'milk-coles', 'dairyco', 3.00, 'sku-1', barcode='999')], company)
+
+        assert Product.objects.count() == 1
+        assert caches['products_by_norm_string']['milk-coles'] == other.id
+        assert caches['products_by_barcode']['999'] == other.id
+        assert SKU.objects.get(sku='sku-1').product_id == other.id
@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+import time
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from pipeline.views import base_file_upload_view
+from pipeline.views.base_file_upload_view import wait_for_decompressions
+
+CONTENT = b''.join(json.dumps({'product': {'name': f'Product {i}'}, 'metadata': {}}).encode() + b'\n' for i in range(1000))
+FILE_NAME = 'woolworths-store-1-2025-06-01.jsonl.gz'
+AUTH = {'HTTP_X_INTERNAL_API_KEY': 'test-key'}
+
+
+@pytest.fixture
+def data_dir(settings, tmp_path, monkeypatch):
+    monkeypatch.setenv('INTERNAL_API_KEY', 'test-key')
+    settings.PIPELINE_DATA_DIR = tmp_path
+    return tmp_path
+
+
+def _upload(client, data, file_name=FILE_NAME):
+    return client.post(reverse('product-file-upload'), data={'file': SimpleUploadedFile(file_name, data)}, **AUTH)
+
+
+class TestBaseFileUploadView:
+    def test_upload_is_decompressed_into_the_inbox(self, client, data_dir):
+        response = _upload(client, gzip.compress(CONTENT))
+
+        assert response.status_code == 201
+        inbox = data_dir / 'inboxes' / 'product_inbox'
+        assert (inbox / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == CONTENT
+        assert [path.name for path in inbox.iterdir()] == ['woolworths-store-1-2025-06-01.jsonl']
+
+    def test_corrupt_upload_leaves_nothing_in_the_inbox(self, client, data_dir):
+        response = _upload(client, gzip.compress(CONTENT)[:-100])
+
+        assert response.status_code == 500
+        assert list((data_dir / 'inboxes' / 'product_inbox').iterdir()) == []
+
+    def test_large_upload_is_decompressed_in_the_background(self, client, data_dir, monkeypatch):
+        monkeypatch.setattr(base_file_upload_view, 'BACKGROUND_DECOMPRESS_BYTES', 0)
+
+        response = _upload(client, gzip.compress(CONTENT))
+        wait_for_decompressions()
+
+        assert response.status_code == 202
+        assert (data_dir / 'inboxes' / 'product_inbox' / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == CONTENT
+        assert list((data_dir / 'uploads' / 'product_inbox').iterdir()) == []
+
+    def test_large_upload_that_fails_is_kept_for_inspection(self, client, data_dir, monkeypatch):
+        monkeypatch.setattr(base_file_upload_view, 'BACKGROUND_DECOMPRESS_BYTES', 0)
+
+        response = _upload(client, b'not gzip')
+        wait_for_decompressions()
+
+        assert response.status_code == 202
+        assert list((data_dir / 'inboxes' / 'product_inbox').iterdir()) == []
+        assert [path.name.endswith(f'--{FILE_NAME}.failed') for path in (data_dir / 'uploads' / 'product_inbox').iterdir()] == [True]
+
+    def test_decompresses_in_bounded_blocks(self, data_dir, tmp_path, monkeypatch):
+        from pipeline.views.product_file_upload_view import ProductFileUploadView
+        compressed_path = tmp_path / 'upload.gz'
+        compressed_path.write_bytes(gzip.compress(CONTENT * 50))
+        reads = []
+
+        class RecordingGzipFile(gzip.GzipFile):
+            def read(self, size=-1):
+                reads.append(size)
+                return super().read(size)
+
+        monkeypatch.setattr(base_file_upload_view.gzip, 'open', lambda filename, mode='rb': RecordingGzipFile(filename, mode))
+        ProductFileUploadView().save_decompressed(str(compressed_path), FILE_NAME)
+
+        assert reads and all(0 < size <= base_file_upload_view.DECOMPRESS_BLOCK_SIZE for size in reads)
+        assert (data_dir / 'inboxes' / 'product_inbox' / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == CONTENT * 50
+
+    def test_failure_is_logged(self, client, data_dir, monkeypatch, caplog):
+        monkeypatch.setattr(base_file_upload_view, 'BACKGROUND_DECOMPRESS_BYTES', 0)
+
+        _upload(client, b'not gzip')
+        wait_for_decompressions()
+
+        assert f"Failed to decompress {FILE_NAME}" in caplog.text
+
+
+class TestOrphanedPendingUploads:
+    DEAD_PID = 2 ** 30 - 1
+
+    def _staged(self, data_dir, name):
+        from pipeline.views.product_file_upload_view import ProductFileUploadView
+        view = ProductFileUploadView()
+        staging = data_dir / 'uploads' / 'product_inbox'
+        staging.mkdir(parents=True)
+        path = staging / name
+        path.write_bytes(gzip.compress(CONTENT))
+        old = time.time() - base_file_upload_view.ORPHANED_PENDING_SECONDS - 60
+        os.utime(path, (old, old))
+        return view, staging
+
+    def test_file_claimed_by_a_dead_worker_is_decompressed_once(self, data_dir):
+        view, staging = self._staged(data_dir, f'abc--{FILE_NAME}.pending.{self.DEAD_PID}.claimed')
+
+        view._resume_orphaned_pending()
+        view._resume_orphaned_pending()
+        wait_for_decompressions()
+
+        assert (data_dir / 'inboxes' / 'product_inbox' / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == CONTENT
+        assert list(staging.iterdir()) == []
+
+    def test_file_claimed_by_this_process_is_left_alone(self, data_dir):
+        name = f'abc--{FILE_NAME}.pending.{os.getpid()}.claimed'
+        view, staging = self._staged(data_dir, name)
+
+        view._resume_orphaned_pending()
+        wait_for_decompressions()
+
+        assert [path.name for path in staging.iterdir()] == [name]
+
+    def test_file_claimed_by_another_worker_first_is_skipped(self, data_dir, monkeypatch):
+        view, staging = self._staged(data_dir, f'abc--{FILE_NAME}.pending')
+        submitted = []
+        monkeypatch.setattr(base_file_upload_view, '_submit', lambda func, *args: submitted.append(args))
+        real_rename = os.rename
+
+        def rename_after_another_worker(src, dst):
+            # Another worker's claim lands between this one's check and its rename.
+            real_rename(src, f"{src}.1.claimed")
+            real_rename(src, dst)
+        monkeypatch.setattr(base_file_upload_view.os, 'rename', rename_after_another_worker)
+
+        view._resume_orphaned_pending()
+
+        assert submitted == []
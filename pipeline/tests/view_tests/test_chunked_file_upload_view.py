@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+
+import pytest
+from django.urls import reverse
+
+CONTENT = b''.join(json.dumps({'product': {'name': hashlib.sha256(bytes([i])).hexdigest()}, 'metadata': {}}).encode() + b'\n' for i in range(100))
+COMPRESSED = gzip.compress(CONTENT)
+SHA256 = hashlib.sha256(COMPRESSED).hexdigest()
+CHUNK_SIZE = 1000
+AUTH = {'HTTP_X_INTERNAL_API_KEY': 'test-key'}
+
+
+@pytest.fixture
+def data_dir(settings, tmp_path, monkeypatch):
+    monkeypatch.setenv('INTERNAL_API_KEY', 'test-key')
+    settings.PIPELINE_DATA_DIR = tmp_path
+    return tmp_path
+
+
+def _start(client, sha256=SHA256, file_name='woolworths-store-1-2025-06-01.jsonl.gz'):
+    return client.post(
+        reverse('product-chunked-upload'),
+        data=json.dumps({'file_name': file_name, 'sha256': sha256, 'size': len(COMPRESSED), 'chunk_size': CHUNK_SIZE}),
+        content_type='application/json', **AUTH,
+    )
+
+
+def _put_chunk(client, index, chunk=None):
+    chunk = COMPRESSED[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE] if chunk is None else chunk
+    return client.put(
+        reverse('product-chunked-upload-chunk', args=[SHA256, index]), data=chunk,
+        content_type='application/octet-stream', HTTP_X_CHUNK_SHA256=hashlib.sha256(chunk).hexdigest(), **AUTH,
+    )
+
+
+def _complete(client):
+    return client.post(reverse('product-chunked-upload-complete', args=[SHA256]), **AUTH)
+
+
+class TestChunkedFileUploadView:
+    def test_requires_internal_api_key(self, client, data_dir):
+        response = client.post(reverse('product-chunked-upload'), data='{}', content_type='application/json')
+
+        assert response.status_code in (401, 403)
+
+    def test_chunks_are_joined_and_decompressed_into_the_inbox(self, client, data_dir):
+        started = _start(client).json()
+        assert started['status'] == 'incomplete'
+        assert started['received'] == []
+
+        for index in reversed(range(started['chunks'])):
+            assert _put_chunk(client, index).status_code == 201
+        response = _complete(client)
+
+        assert response.status_code == 201
+        assert (data_dir / 'inboxes' / 'product_inbox' / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == CONTENT
+        assert not (data_dir / 'uploads' / 'product_inbox' / SHA256).exists()
+
+    def test_a_file_already_received_is_not_asked_for_again(self, client, data_dir):
+        started = _start(client).json()
+        for index in range(started['chunks']):
+            _put_chunk(client, index)
+        _complete(client)
+
+        assert _start(client).json()['status'] == 'complete'
+
+    def test_restarted_upload_reports_the_chunks_already_stored(self, client, data_dir):
+        _start(client)
+        _put_chunk(client, 0)
+        _put_chunk(client, 2)
+
+        assert _start(client).json()['received'] == [0, 2]
+
+    def test_chunk_that_does_not_match_its_hash_is_refused(self, client, data_dir):
+        _start(client)
+        response = client.put(
+            reverse('product-chunked-upload-chunk', args=[SHA256, 0]), data=b'corrupted',
+            content_type='application/octet-stream', HTTP_X_CHUNK_SHA256='0' * 64, **AUTH,
+        )
+
+        assert response.status_code == 400
+        assert _start(client).json()['received'] == []
+
+    def test_completing_with_missing_chunks_lists_them(self, client, data_dir):
+        started = _start(client).json()
+        _put_chunk(client, 0)
+
+        response = _complete(client)
+
+        assert response.status_code == 409
+        assert response.json()['missing'] == list(range(1, started['chunks']))
+
+    def test_file_names_with_paths_are_refused(self, client, data_dir):
+        assert _start(client, file_name='../escape.jsonl.gz').status_code == 400
+
+    def test_large_upload_is_decompressed_in_the_background(self, client, data_dir, monkeypatch):
+        from pipeline.views import chunked_file_upload_view
+        from pipeline.views.base_file_upload_view import wait_for_decompressions
+        monkeypatch.setattr(chunked_file_upload_view, 'BACKGROUND_DECOMPRESS_BYTES', 0)
+        started = _start(client).json()
+        for index in range(started['chunks']):
+            _put_chunk(client, index)
+
+        response = _complete(client)
+        wait_for_decompressions()
+
+        assert response.status_code == 202
+        assert response.json()['status'] == 'processing'
+        assert (data_dir / 'inboxes' / 'product_inbox' / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == CONTENT
+        assert _start(client).json()['status'] == 'complete'
+        assert list((data_dir / 'uploads' / 'product_inbox').glob('*.pending')) == []
+
+    def test_chunk_that_cannot_be_read_while_joining_returns_a_server_error(self, client, data_dir, monkeypatch):
+        from pipeline.views import chunked_file_upload_view
+        started = _start(client).json()
+        for index in range(started['chunks']):
+            _put_chunk(client, index)
+
+        def failing_open(path, mode='r', *args, **kwargs):
+            if os.fspath(path).endswith('.chunk'):
+                raise OSError("disk went away")
+            return open(path, mode, *args, **kwargs)
+        monkeypatch.setattr(chunked_file_upload_view, 'open', failing_open, raising=False)
+        response = _complete(client)
+
+        assert response.status_code == 500
+        assert 'disk went away' in response.json()['error']
+        assert list((data_dir / 'uploads' / 'product_inbox').glob('*.joining')) == []
+        assert _start(client).json()['received'] == list(range(started['chunks']))
+
+    def test_completion_that_finishes_second_leaves_the_chunks_alone(self, client, data_dir, monkeypatch):
+        from pipeline.views.chunked_file_upload_view import BaseChunkedFileUploadView
+        started = _start(client).json()
+        for index in range(started['chunks']):
+            _put_chunk(client, index)
+        real_pending_exists = BaseChunkedFileUploadView._pending_exists
+
+        def finished_elsewhere(view, upload_id):
+            # The other completion writes its marker while this one is joining.
+            view._write_received_marker(upload_id, 'woolworths-store-1-2025-06-01.jsonl.gz')
+            return real_pending_exists(view, upload_id)
+        monkeypatch.setattr(BaseChunkedFileUploadView, '_pending_exists', finished_elsewhere)
+        response = _complete(client)
+
+        assert response.status_code == 200
+        assert response.json()['status'] == 'complete'
+        assert list((data_dir / 'uploads' / 'product_inbox').glob('*.joining')) == []
+        assert not (data_dir / 'inboxes' / 'product_inbox').exists()
+
+    def test_old_received_markers_are_forgotten(self, client, data_dir):
+        from pipeline.views import chunked_file_upload_view
+        started = _start(client).json()
+        for index in range(started['chunks']):
+            _put_chunk(client, index)
+        _complete(client)
+        marker = data_dir / 'uploads' / 'product_inbox' / 'received' / SHA256
+        old = time.time() - chunked_file_upload_view.RECEIVED_MARKER_SECONDS - 60
+        os.utime(marker, (old, old))
+
+        _start(client, sha256='a' * 64)
+
+        assert not marker.exists()
+        assert _start(client).json()['status'] == 'incomplete'
@@ -1,5 +1,6 @@
 from django.urls import path
 from .views.product_file_upload_view import ProductFileUploadView
+from .views.product_chunked_file_upload_view import ProductChunkedFileUploadView
 from .views.category_links_file_upload_view import CategoryLinksFileUploadView
 from .views.pillar_page_view import PillarPageView
 from .views.product_translation_file_view import ProductTranslationFileView
@@ -8,6 +9,9 @@ from .views.import_semantic_data_view import ImportSemanticDataView
 
 urlpatterns = [
     path('upload/products/', ProductFileUploadView.as_view(), name='product-file-upload'),
+    path('upload/products/chunked/', ProductChunkedFileUploadView.as_view(), name='product-chunked-upload'),
+    path('upload/products/chunked/<str:upload_id>/', ProductChunkedFileUploadView.as_view(), name='product-chunked-upload-complete'),
+    path('upload/products/chunked/<str:upload_id>/<int:index>/', ProductChunkedFileUploadView.as_view(), name='product-chunked-upload-chunk'),
     path('upload/category-links/', CategoryLinksFileUploadView.as_view(), name='category-links-file-upload'),
     path('pillar-pages/<slug:slug>/', PillarPageView.as_view(), name='pillar-page-detail'),
     path('files/product_translations/', ProductTranslationFileView.as_view(), name='product-translation-file'),
@@ -0,0 +1,91 @@
+from django.db import connection, transaction
+
+# Below this many objects Django's bulk_update is fast enough and a staging table is not worth creating.
+MERGE_THRESHOLD = 2000
+STAGING_BATCH_SIZE = 2000
+
+
+def _staging_table_name(model):
+    return f"merge_staging_{model._meta.db_table}"
+
+
+def _create_staging_table(cursor, model, pk_field, fields):
+    qn = connection.ops.quote_name
+    columns = [f"{qn(pk_field.column)} {pk_field.rel_db_type(connection)} PRIMARY KEY"]
+    columns.extend(f"{qn(f.column)} {f.db_type(connection)}" for f in fields)
+    temporary = 'TEMPORARY TABLE' if connection.vendor == 'mysql' else 'TEMP TABLE'
+    cursor.execute(f"CREATE {temporary} {qn(_staging_table_name(model))} ({', '.join(columns)})")
+
+
+def _drop_staging_table(cursor, model):
+    temporary = 'TEMPORARY TABLE' if connection.vendor == 'mysql' else 'TABLE'
+    cursor.execute(f"DROP {temporary} IF EXISTS {connection.ops.quote_name(_staging_table_name(model))}")
+
+
+def _fill_staging_table(cursor, model, pk_field, fields, objs, batch_size):
+    qn = connection.ops.quote_name
+    columns = [pk_field] + fields
+    sql = (
+        f"INSERT INTO {qn(_staging_table_name(model))} ({', '.join(qn(f.column) for f in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    for i in range(0, len(objs), batch_size):
+        rows = [
+            [f.get_db_prep_save(getattr(obj, f.attname), connection) for f in columns]
+            for obj in objs[i:i + batch_size]
+        ]
+        cursor.executemany(sql, rows)
+
+
+def _merge_sql(model, pk_field, fields):
+    qn = connection.ops.quote_name
+    target = qn(model._meta.db_table)
+    staging = qn(_staging_table_name(model))
+    pk = qn(pk_field.column)
+    if connection.vendor == 'mysql':
+        assignments = ', '.join(f"t.{qn(f.column)} = s.{qn(f.column)}" for f in fields)
+        return f"UPDATE {target} AS t JOIN {staging} AS s ON t.{pk} = s.{pk} SET {assignments}"
+    # SQLite (3.33+) and PostgreSQL
+    assignments = ', '.join(f"{qn(f.column)} = s.{qn(f.column)}" for f in fields)
+    return f"UPDATE {target} SET {assignments} FROM {staging} AS s WHERE {target}.{pk} = s.{pk}"
+
+
+def bulk_merge(objs, fields, batch_size=500, merge_threshold=MERGE_THRESHOLD):
+    """
+    A drop-in replacement for `Model.objects.bulk_update(objs, fields, batch_size)`
+    for large updates.
+
+    Instead of one `CASE WHEN pk=... THEN ...` statement per batch, the new values
+    are streamed into a temporary staging table and applied with a single
+    `UPDATE ... JOIN` (MySQL) or `UPDATE ... FROM` (SQLite, PostgreSQL) for all the
+    given fields. Below `merge_threshold` objects it simply calls bulk_update with
+    `batch_size`. As with bulk_update, only the first of several objects sharing a
+    primary key is applied. Returns the number of rows updated.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+
+    model = type(objs[0])
+    if len(objs) < merge_threshold:
+        return model._default_manager.bulk_update(objs, fields, batch_size=batch_size)
+
+    opts = model._meta
+    pk_field = opts.pk
+    fields = [opts.get_field(name) for name in fields]
+    if any(not f.concrete or f.many_to_many or f.primary_key for f in fields):
+        raise ValueError("bulk_merge() can only be used with concrete, non-primary-key fields.")
+
+    unique_objs = list({obj.pk: obj for obj in reversed(objs)}.values())
+    if any(obj.pk is None for obj in unique_objs):
+        raise ValueError("All bulk_merge() objects must have a primary key set.")
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # A staging table left behind by a failed merge on this connection is dropped first.
+        _drop_staging_table(cursor, model)
+        _create_staging_table(cursor, model, pk_field, fields)
+        _fill_staging_table(cursor, model, pk_field, fields, unique_objs, STAGING_BATCH_SIZE)
+        cursor.execute(_merge_sql(model, pk_field, fields))
+        rows_updated = cursor.rowcount
+        _drop_staging_table(cursor, model)
+    return rows_updated
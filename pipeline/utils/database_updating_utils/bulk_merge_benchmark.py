@@ -0,0 +1,56 @@
+import time
+from django.db import transaction
+from products.models import Product
+from pipeline.utils.database_updating_utils.bulk_merge import bulk_merge
+
+DEFAULT_SIZES = (10_000, 100_000, 500_000)
+BENCHMARK_FIELDS = ['url', 'sizes', 'has_no_coles_barcode']
+NORM_STRING_PREFIX = 'bulk-merge-benchmark-'
+
+
+def _change_products(products, run):
+    for i, product in enumerate(products):
+        product.url = f"https://example.com/{run}/{i}"
+        product.sizes = [f"{i % 1000}g"]
+        product.has_no_coles_barcode = bool((i + len(run)) % 2)
+
+
+def _timed(update, products):
+    start = time.perf_counter()
+    update(products)
+    return time.perf_counter() - start
+
+
+def run_bulk_merge_benchmark(sizes=DEFAULT_SIZES, command=None):
+    """
+    Times Product.objects.bulk_update(batch_size=500) against bulk_merge for each number
+    of rows in `sizes`. Synthetic products are created inside a transaction that is
+    rolled back at the end, so the database is left unchanged. Returns one result dict per size.
+    """
+    results = []
+    for count in sizes:
+        if command:
+            command.stdout.write(f"  - Creating {count} synthetic products...")
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                [Product(name=f"benchmark {i}", normalized_name_brand_size=f"{NORM_STRING_PREFIX}{i}") for i in range(count)],
+                batch_size=2000,
+            )
+            products = list(
+                Product.objects.filter(normalized_name_brand_size__startswith=NORM_STRING_PREFIX).only('id', *BENCHMARK_FIELDS)
+            )
+
+            _change_products(products, 'bulk-update')
+            bulk_update_seconds = _timed(lambda objs: Product.objects.bulk_update(objs, BENCHMARK_FIELDS, batch_size=500), products)
+
+            _change_products(products, 'bulk-merge')
+            bulk_merge_seconds = _timed(lambda objs: bulk_merge(objs, BENCHMARK_FIELDS, batch_size=500), products)
+
+            transaction.set_rollback(True)
+
+        results.append({
+            'rows': count,
+            'bulk_update_seconds': bulk_update_seconds,
+            'bulk_merge_seconds': bulk_merge_seconds,
+        })
+    return results
@@ -1,10 +1,27 @@
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.conf import settings
+from .sku_barcode_cache import SkuBarcodeCache
 
-def prefill_barcodes_from_api(product_list: list, command=None, dev: bool = False) -> list:
+# SKUs sent per lookup request, and lookup requests in flight at once.
+LOOKUP_CHUNK_SIZE = 2000
+LOOKUP_WORKERS = 4
+
+def _lookup_chunk(session, url: str, headers: dict, skus: list) -> dict:
+    response = session.post(url, headers=headers, data=json.dumps({"skus": skus}), timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+def prefill_barcodes_from_api(product_list: list, command=None, dev: bool = False, cache: SkuBarcodeCache = None, session=None) -> list:
     """
     Enriches a list of product dictionaries with barcode info by calling a dedicated API endpoint using SKUs.
+
+    The local SkuBarcodeCache is synced from the server's barcode export first, so the
+    lookup only has to send the SKUs it doesn't know. Those go in LOOKUP_CHUNK_SIZE
+    chunks, LOOKUP_WORKERS at a time, and what comes back is added to the cache. If the
+    sync fails, every uncached SKU is looked up; if a chunk fails, its products are
+    left as they were.
     """
     if command:
         command.stdout.write(f"  - Prefilling barcodes via API for {len(product_list)} products...")
@@ -17,7 +34,7 @@ def prefill_barcodes_from_api(product_list: list, command=None, dev: bool = Fals
             sku = product_data.get('sku')
             if not sku:
                 continue
-            
+
             try:
                 sku_int = int(sku)
                 skus_to_lookup.add(sku_int)
@@ -32,7 +49,7 @@ def prefill_barcodes_from_api(product_list: list, command=None, dev: bool = Fals
             command.stdout.write("  - No products required barcode prefilling.")
         return product_list
 
-    # Step 2: Call the API to get barcode info for the collected SKUs.
+    # Step 2: Sync the local cache and look up the SKUs it doesn't hold.
     server_url = "http://127.0.0.1:8000" if dev else settings.API_SERVER_URL
     api_key = settings.INTERNAL_API_KEY
     if not server_url or not api_key:
@@ -45,22 +62,43 @@ def prefill_barcodes_from_api(product_list: list, command=None, dev: bool = Fals
         'Content-Type': 'application/json',
         'X-Internal-API-Key': api_key,
     }
-    payload = {"skus": list(skus_to_lookup)}
-
-    if command:
-        command.stdout.write(f"  - Querying API with {len(skus_to_lookup)} unique product SKUs...")
+    session = session or requests.Session()
+    owns_cache = cache is None
+    if owns_cache:
+        cache = SkuBarcodeCache()
 
     try:
-        # Use a long timeout (5 minutes) to allow for the heavy computation on the server.
-        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=300)
-        response.raise_for_status()
-        api_response_map = response.json()
-        if command:
-            command.stdout.write(f"  - API returned data for {len(api_response_map)} products.")
-    except requests.exceptions.RequestException as e:
+        try:
+            synced = cache.sync(session, url, headers)
+            if command:
+                command.stdout.write(f"  - Synced {synced} changed SKUs into the local barcode cache ({len(cache)} cached).")
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            if command:
+                command.stdout.write(command.style.WARNING(f"  - Barcode cache sync failed ({e}); looking up every uncached SKU."))
+
+        api_response_map = cache.get_many(skus_to_lookup)
+        unknown_skus = sorted(sku for sku in skus_to_lookup if str(sku) not in api_response_map)
         if command:
-            command.stdout.write(command.style.ERROR(f"  - API call for barcodes failed: {e}"))
-        return product_list # Return original list on failure
+            command.stdout.write(f"  - {len(api_response_map)} SKUs found in the local cache; querying API with {len(unknown_skus)} unknown SKUs...")
+
+        chunks = [unknown_skus[i:i + LOOKUP_CHUNK_SIZE] for i in range(0, len(unknown_skus), LOOKUP_CHUNK_SIZE)]
+        with ThreadPoolExecutor(max_workers=LOOKUP_WORKERS) as executor:
+            futures = [executor.submit(_lookup_chunk, session, url, headers, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                try:
+                    chunk_map = future.result()
+                except requests.exceptions.RequestException as e:
+                    if command:
+                        command.stdout.write(command.style.ERROR(f"  - API call for barcodes failed: {e}"))
+                    continue
+                api_response_map.update(chunk_map)
+                cache.update((sku, data.get('barcode'), data.get('has_no_coles_barcode')) for sku, data in chunk_map.items())
+    finally:
+        if owns_cache:
+            cache.close()
+
+    if command:
+        command.stdout.write(f"  - Barcode data available for {len(api_response_map)} products.")
 
     # Step 3: Update the product list with the data received from the API.
     prefilled_count = 0
@@ -0,0 +1,73 @@
+import gc
+import time
+import tracemalloc
+from pipeline.database_updating_classes.product_updating.compact_product_cache import CompactProductCache
+
+DEFAULT_SIZES = (100_000, 1_000_000)
+SYNTHETIC_BRAND_COUNT = 5_000
+
+
+def _synthetic_rows(count):
+    """
+    Yields (id, norm_string, brand_normalized_name, barcode) rows shaped like real
+    products: a few thousand brands, and a barcode on roughly two thirds of rows.
+    """
+    for i in range(count):
+        brand = f"brand{i % SYNTHETIC_BRAND_COUNT}"
+        barcode = f"93{i:011d}" if i % 3 else None
+        yield i + 1, f"product{i}{brand}{(i % 40) * 25}g", brand, barcode
+
+
+def _build_dict_caches(rows):
+    """Builds the three product caches the way the pipeline did before CompactProductCache."""
+    caches = {
+        'products_by_id': {},
+        'products_by_barcode': {},
+        'products_by_norm_string': {},
+    }
+    for product_id, norm_string, brand_name, barcode in rows:
+        caches['products_by_id'][product_id] = {
+            'id': product_id,
+            'normalized_name_brand_size': norm_string,
+            'brand_normalized_name': brand_name,
+        }
+        if barcode:
+            caches['products_by_barcode'][barcode] = product_id
+        if norm_string:
+            caches['products_by_norm_string'][norm_string] = product_id
+    return caches
+
+
+def _measure(build, count):
+    """Returns (retained_bytes, peak_bytes, seconds) for building a cache of `count` synthetic products."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    cache = build(_synthetic_rows(count))
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cache
+    return retained, peak, elapsed
+
+
+def run_product_cache_benchmark(sizes=DEFAULT_SIZES):
+    """
+    Compares the memory held by the dict-of-dicts product caches against
+    CompactProductCache for each number of synthetic products in `sizes`.
+    Returns one result dict per size.
+    """
+    results = []
+    for count in sizes:
+        dict_retained, dict_peak, dict_seconds = _measure(_build_dict_caches, count)
+        compact_retained, compact_peak, compact_seconds = _measure(CompactProductCache.from_rows, count)
+        results.append({
+            'products': count,
+            'dict_bytes': dict_retained,
+            'dict_peak_bytes': dict_peak,
+            'dict_seconds': dict_seconds,
+            'compact_bytes': compact_retained,
+            'compact_peak_bytes': compact_peak,
+            'compact_seconds': compact_seconds,
+        })
+    return results
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from django.conf import settings
+
+# Products written shortly before the last sync's high-water mark are fetched again,
+# so that clock skew between the server's writers cannot hide a change from the sync.
+HIGH_WATER_MARK_OVERLAP = timedelta(minutes=5)
+
+
+def default_cache_path() -> str:
+    return os.path.join(settings.BASE_DIR, 'scraping', 'data', 'sku_barcode_cache.sqlite3')
+
+
+class SkuBarcodeCache:
+    """
+    A SQLite file on the scraper machine remembering, per Coles SKU, the barcode the
+    server knows for it and whether the product is flagged has_no_coles_barcode. Only
+    SKUs the server has something for are kept, so a SKU missing here is one to ask
+    the server about.
+
+    sync() brings it up to date from ProductBarcodeView's bulk export: the first sync
+    pulls every SKU with a barcode, later ones only the SKUs whose product changed since
+    the previous sync's high-water mark. The cache is tied to one server; pointing it at
+    another one empties it. Safe to share between threads.
+    """
+    def __init__(self, path: str = None):
+        self.path = os.fspath(path) if path else default_cache_path()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sku_barcodes ('
+            ' sku TEXT PRIMARY KEY, barcode TEXT, has_no_coles_barcode INTEGER) WITHOUT ROWID'
+        )
+        self._db.execute('CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID')
+        self._db.commit()
+
+    def _state(self, key: str):
+        row = self._db.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value):
+        if value is None:
+            self._db.execute('DELETE FROM sync_state WHERE key = ?', (key,))
+        else:
+            self._db.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?)', (key, value))
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM sku_barcodes').fetchone()[0]
+
+    def get_many(self, skus) -> dict:
+        """Returns {sku: {'barcode', 'has_no_coles_barcode'}} for the SKUs held in the cache."""
+        skus = [str(sku) for sku in skus]
+        found = {}
+        with self._lock:
+            for start in range(0, len(skus), 500):
+                batch = skus[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT sku, barcode, has_no_coles_barcode FROM sku_barcodes WHERE sku IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for sku, barcode, has_no_coles_barcode in rows:
+                    found[sku] = {'barcode': barcode, 'has_no_coles_barcode': bool(has_no_coles_barcode)}
+        return found
+
+    def update(self, rows):
+        """
+        Stores (sku, barcode, has_no_coles_barcode) rows. A SKU the server has nothing
+        for (no barcode and not flagged) is dropped from the cache.
+        """
+        known, unknown = [], []
+        for sku, barcode, has_no_coles_barcode in rows:
+            if barcode or has_no_coles_barcode:
+                known.append((str(sku), barcode or None, int(bool(has_no_coles_barcode))))
+            else:
+                unknown.append((str(sku),))
+        with self._lock:
+            self._db.executemany('INSERT OR REPLACE INTO sku_barcodes VALUES (?, ?, ?)', known)
+            self._db.executemany('DELETE FROM sku_barcodes WHERE sku = ?', unknown)
+            self._db.commit()
+
+    def sync(self, session, export_url: str, headers: dict, timeout: int = 60) -> int:
+        """
+        Pulls the SKUs that changed since the last sync from the export at `export_url`,
+        a page at a time. Returns the number of rows received. The high-water mark is only
+        moved on once every page is in, so an interrupted sync is repeated next time.
+        """
+        with self._lock:
+            if self._state('server') != export_url:
+                self._db.execute('DELETE FROM sku_barcodes')
+                self._set_state('high_water_mark', None)
+                self._set_state('server', export_url)
+                self._db.commit()
+            high_water_mark = self._state('high_water_mark')
+
+        params = {}
+        if high_water_mark:
+            params['since'] = (datetime.fromisoformat(high_water_mark) - HIGH_WATER_MARK_OVERLAP).isoformat()
+
+        received = 0
+        new_high_water_mark = None
+        after = None
+        while True:
+            page_params = {**params, 'after': after} if after is not None else params
+            response = session.get(export_url, headers=headers, params=page_params, timeout=timeout)
+            response.raise_for_status()
+            page = response.json()
+            new_high_water_mark = new_high_water_mark or page['high_water_mark']
+            self.update(page['rows'])
+            received += len(page['rows'])
+            after = page.get('next_after')
+            if after is None:
+                break
+
+        with self._lock:
+            self._set_state('high_water_mark', new_high_water_mark)
+            self._db.commit()
+        return received
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,18 +1,80 @@
 import gzip
+import logging
 import os
 import hmac
+import shutil
+import threading
+import time
+import uuid
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.throttling import ScopedRateThrottle
 
+# Bytes decompressed and written at a time, so a worker's memory doesn't grow with the upload.
+DECOMPRESS_BLOCK_SIZE = 1024 * 1024
+
+# Compressed uploads larger than this are decompressed in the background after the response.
+BACKGROUND_DECOMPRESS_BYTES = 8 * 1024 * 1024
+
+# Pending uploads untouched for this long are assumed to belong to a worker that died.
+ORPHANED_PENDING_SECONDS = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_futures = set()
+_executor_lock = threading.Lock()
+
+
+def _submit(func, *args):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-decompress')
+        future = _executor.submit(func, *args)
+        _futures.add(future)
+    future.add_done_callback(_futures.discard)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Background decompression failed.", exc_info=future.exception())
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except (OverflowError, ValueError):
+        return False
+    return True
+
+
+def wait_for_decompressions(timeout: float = None):
+    """Blocks until uploads handed off to the background have been decompressed."""
+    wait(list(_futures), timeout=timeout)
+
+
 class BaseFileUploadView(APIView, ABC):
     """
     An abstract base view for handling the upload of compressed .jsonl files.
     It handles authentication, decompression, and file saving, while delegating
     the final destination path to subclasses.
+
+    Uploads are decompressed DECOMPRESS_BLOCK_SIZE bytes at a time into a temp file in
+    the inbox, which is renamed to its final name only once it is complete, so readers
+    of the inbox never see half a file. Uploads of more than BACKGROUND_DECOMPRESS_BYTES
+    are kept under get_staging_path() and decompressed by a background thread, and the
+    request is answered with 202 Accepted straight away.
     """
     throttle_classes = [ScopedRateThrottle]
     throttle_scope = 'internal'
@@ -30,21 +92,142 @@ class BaseFileUploadView(APIView, ABC):
 
         # 3. Decompress and save the file
         try:
-            inbox_path = self.get_inbox_path()
-            os.makedirs(inbox_path, exist_ok=True)
-            
-            decompressed_file_name = file_name.replace(".gz", "")
-            decompressed_file_path = os.path.join(inbox_path, decompressed_file_name)
-
-            with gzip.open(uploaded_file, 'rb') as f_in:
-                with open(decompressed_file_path, 'wb') as f_out:
-                    f_out.write(f_in.read())
-
+            decompressed_file_name, handed_off = self.store_upload(uploaded_file, file_name)
         except Exception as e:
             return Response({"error": f"Failed to process file: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        if handed_off:
+            return Response({"message": f"Received '{file_name}'; it is being decompressed to '{decompressed_file_name}'"}, status=status.HTTP_202_ACCEPTED)
         return Response({"message": f"Successfully uploaded and decompressed '{decompressed_file_name}'"}, status=status.HTTP_201_CREATED)
 
+    def get_staging_path(self) -> str:
+        """Where compressed uploads wait to be decompressed."""
+        return os.fspath(settings.PIPELINE_DATA_DIR / 'uploads' / os.path.basename(self.get_inbox_path()))
+
+    def store_upload(self, uploaded_file, file_name: str) -> tuple:
+        """
+        Decompresses an uploaded file into the inbox, or hands it off to the background
+        if it is large. Returns the decompressed file's name and whether it was handed off.
+        """
+        if uploaded_file.size <= BACKGROUND_DECOMPRESS_BYTES:
+            return self.save_decompressed(uploaded_file, file_name), False
+
+        pending_path = self._pending_path(uuid.uuid4().hex, file_name)
+        with open(pending_path, 'wb') as f:
+            for chunk in uploaded_file.chunks(DECOMPRESS_BLOCK_SIZE):
+                f.write(chunk)
+        self.hand_off(pending_path)
+        return self.decompressed_file_name(file_name), True
+
+    @staticmethod
+    def decompressed_file_name(file_name: str) -> str:
+        return file_name.replace(".gz", "")
+
+    def save_decompressed(self, compressed_file, file_name: str) -> str:
+        """
+        Decompresses a gzipped upload (a file object or a path) into the inbox under
+        `file_name` without its .gz, through a temp file that is renamed into place.
+        Returns the decompressed file's name.
+        """
+        inbox_path = self.get_inbox_path()
+        os.makedirs(inbox_path, exist_ok=True)
+
+        decompressed_file_name = self.decompressed_file_name(file_name)
+        decompressed_file_path = os.path.join(inbox_path, decompressed_file_name)
+        # Hidden and without the .jsonl extension, so the update never picks it up.
+        temp_path = os.path.join(inbox_path, f".{decompressed_file_name}.{uuid.uuid4().hex}.part")
+
+        try:
+            with gzip.open(compressed_file, 'rb') as f_in:
+                with open(temp_path, 'wb') as f_out:
+                    shutil.copyfileobj(f_in, f_out, DECOMPRESS_BLOCK_SIZE)
+            os.replace(temp_path, decompressed_file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return decompressed_file_name
+
+    def _pending_path(self, token: str, file_name: str) -> str:
+        staging_path = self.get_staging_path()
+        os.makedirs(staging_path, exist_ok=True)
+        return os.path.join(staging_path, f"{token}--{file_name}.pending")
+
+    def _pending_exists(self, token: str) -> bool:
+        staging_path = self.get_staging_path()
+        return os.path.isdir(staging_path) and any(
+            name.startswith(f"{token}--") and name.endswith(('.pending', '.claimed')) for name in os.listdir(staging_path)
+        )
+
+    @staticmethod
+    def _claim(path: str):
+        """
+        Renames a pending file to `<name>.pending.<pid>.claimed`, so it belongs to this
+        process. Returns the claimed path, or None if another worker claimed it first.
+        """
+        pending_path = path.rsplit('.pending', 1)[0] + '.pending'
+        claimed_path = f"{pending_path}.{os.getpid()}.claimed"
+        try:
+            os.rename(path, claimed_path)
+        except OSError:
+            return None
+        return claimed_path
+
+    def hand_off(self, pending_path: str):
+        """
+        Claims a compressed file waiting at `pending_path` and decompresses it in a
+        background thread, then calls pending_decompressed() and deletes it. A file that
+        fails is renamed to .failed and left for inspection. Pending files left behind by
+        a worker that died are claimed and picked up again here.
+        """
+        self._resume_orphaned_pending()
+        claimed_path = self._claim(pending_path)
+        if claimed_path is not None:
+            _submit(self._decompress_pending, claimed_path)
+
+    def pending_decompressed(self, token: str, file_name: str):
+        """Called once a handed off upload is in the inbox. Subclasses can record it here."""
+        pass
+
+    def _decompress_pending(self, claimed_path: str):
+        base_path = claimed_path.rsplit('.pending', 1)[0]
+        token, file_name = os.path.basename(base_path).split('--', 1)
+        try:
+            self.save_decompressed(claimed_path, file_name)
+            self.pending_decompressed(token, file_name)
+            os.remove(claimed_path)
+        except Exception:
+            logger.exception("Failed to decompress %s", file_name)
+            try:
+                os.replace(claimed_path, base_path + '.failed')
+            except OSError:
+                logger.exception("Could not mark %s as failed", claimed_path)
+
+    def _is_orphaned(self, name: str, path: str, cutoff: float) -> bool:
+        if name.endswith('.claimed'):
+            try:
+                pid = int(name.rsplit('.', 2)[1])
+            except ValueError:
+                return False
+            if pid == os.getpid() or _pid_alive(pid):
+                return False
+        elif not name.endswith('.pending'):
+            return False
+        try:
+            return os.path.getmtime(path) < cutoff
+        except OSError:
+            return False
+
+    def _resume_orphaned_pending(self):
+        staging_path = self.get_staging_path()
+        cutoff = time.time() - ORPHANED_PENDING_SECONDS
+        for name in os.listdir(staging_path):
+            path = os.path.join(staging_path, name)
+            if not self._is_orphaned(name, path, cutoff):
+                continue
+            claimed_path = self._claim(path)
+            if claimed_path is not None:
+                _submit(self._decompress_pending, claimed_path)
+
     @abstractmethod
     def get_inbox_path(self) -> str:
         """
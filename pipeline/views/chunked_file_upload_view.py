@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from rest_framework.response import Response
+from rest_framework import status
+from .base_file_upload_view import BACKGROUND_DECOMPRESS_BYTES, BaseFileUploadView
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Largest chunk accepted; the uploader sends 4 MiB.
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Bytes read from a request or chunk file at a time.
+COPY_BLOCK_SIZE = 1024 * 1024
+
+# Unfinished uploads older than this are deleted when another upload starts.
+STALE_UPLOAD_SECONDS = 7 * 24 * 60 * 60
+
+# How long a received file is remembered, so the same file sent again is skipped.
+RECEIVED_MARKER_SECONDS = 30 * 24 * 60 * 60
+
+
+class BaseChunkedFileUploadView(BaseFileUploadView):
+    """
+    Receives a compressed file in chunks, so a slow link or a dropped connection only
+    costs the chunk in flight, and an interrupted upload picks up where it stopped.
+    Uploads are keyed by the sha256 of the compressed file:
+
+    POST <url>                      {"file_name", "sha256", "size", "chunk_size"} starts
+                                    or resumes an upload. Returns {"status": "complete"}
+                                    if a file with this hash was received before, else
+                                    {"status": "incomplete", "upload_id", "received"}
+                                    with the indexes of the chunks already stored.
+    PUT  <url><upload_id>/<index>/  one chunk as the raw request body, with its sha256
+                                    in an X-Chunk-SHA256 header. Chunks can arrive in
+                                    any order, and sending one again replaces it.
+    POST <url><upload_id>/          joins the chunks, checks the file's hash and
+                                    decompresses it into the inbox like an ordinary upload.
+
+    Chunks are kept under get_staging_path() until the upload completes. A joined file
+    of more than BACKGROUND_DECOMPRESS_BYTES is decompressed in the background; until
+    that is done, completing the upload returns 202 and starting it again returns
+    {"status": "processing"}.
+    """
+    def _upload_dir(self, upload_id: str) -> str:
+        return os.path.join(self.get_staging_path(), upload_id)
+
+    def _received_marker(self, upload_id: str) -> str:
+        return os.path.join(self.get_staging_path(), 'received', upload_id)
+
+    def _chunk_path(self, upload_id: str, index: int) -> str:
+        return os.path.join(self._upload_dir(upload_id), f"{index:06d}.chunk")
+
+    def _write_received_marker(self, upload_id: str, file_name: str):
+        with open(self._received_marker(upload_id), 'w', encoding='utf-8') as f:
+            json.dump({'file_name': file_name, 'received_at': time.time()}, f)
+
+    def pending_decompressed(self, token: str, file_name: str):
+        self._write_received_marker(token, file_name)
+
+    def _load_meta(self, upload_id: str):
+        try:
+            with open(os.path.join(self._upload_dir(upload_id), 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return None
+
+    def _received_chunks(self, upload_id: str, meta: dict) -> list:
+        return [index for index in range(meta['chunks']) if os.path.exists(self._chunk_path(upload_id, index))]
+
+    def _prune_stale_uploads(self):
+        """Deletes unfinished uploads and joined files left behind, and ages out received markers."""
+        staging_path = self.get_staging_path()
+        cutoff = time.time() - STALE_UPLOAD_SECONDS
+        for name in os.listdir(staging_path):
+            path = os.path.join(staging_path, name)
+            try:
+                if UPLOAD_ID_PATTERN.match(name) and os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                elif name.endswith('.joining') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+        received_path = os.path.join(staging_path, 'received')
+        marker_cutoff = time.time() - RECEIVED_MARKER_SECONDS
+        for name in os.listdir(received_path):
+            path = os.path.join(received_path, name)
+            try:
+                if os.path.getmtime(path) < marker_cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def post(self, request, upload_id=None, *args, **kwargs):
+        if upload_id is None:
+            return self.start_upload(request)
+        return self.complete_upload(request, upload_id)
+
+    def start_upload(self, request):
+        data = request.data
+        file_name = data.get('file_name') or ''
+        upload_id = data.get('sha256') or ''
+        try:
+            size = int(data.get('size'))
+            chunk_size = int(data.get('chunk_size'))
+        except (TypeError, ValueError):
+            return Response({"error": "size and chunk_size must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if os.path.basename(file_name) != file_name or not file_name.endswith(('.jsonl.gz', '.json.gz')):
+            return Response({"error": "Invalid file format. Expected .jsonl.gz"}, status=status.HTTP_400_BAD_REQUEST)
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            return Response({"error": "sha256 must be a lowercase hex sha256 digest."}, status=status.HTTP_400_BAD_REQUEST)
+        if size <= 0 or not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            return Response({"error": f"size must be positive and chunk_size at most {MAX_CHUNK_SIZE}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if os.path.exists(self._received_marker(upload_id)):
+            return Response({"status": "complete", "message": f"'{file_name}' was already received."}, status=status.HTTP_200_OK)
+        if self._pending_exists(upload_id):
+            return Response({"status": "processing", "message": f"'{file_name}' was received and is being decompressed."}, status=status.HTTP_200_OK)
+
+        os.makedirs(os.path.join(self.get_staging_path(), 'received'), exist_ok=True)
+        self._prune_stale_uploads()
+
+        meta = {'file_name': file_name, 'size': size, 'chunk_size': chunk_size, 'chunks': -(-size // chunk_size)}
+        existing = self._load_meta(upload_id)
+        if existing is not None and existing != meta:
+            # Same bytes cut into different chunks; start over.
+            shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+            existing = None
+        if existing is None:
+            os.makedirs(self._upload_dir(upload_id), exist_ok=True)
+            with open(os.path.join(self._upload_dir(upload_id), 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+
+        return Response({
+            "status": "incomplete",
+            "upload_id": upload_id,
+            "chunks": meta['chunks'],
+            "received": self._received_chunks(upload_id, meta),
+        }, status=status.HTTP_200_OK)
+
+    def put(self, request, upload_id=None, index=None, *args, **kwargs):
+        meta = self._load_meta(upload_id) if upload_id and UPLOAD_ID_PATTERN.match(upload_id) else None
+        if meta is None:
+            return Response({"error": "Unknown upload."}, status=status.HTTP_404_NOT_FOUND)
+        if index is None or not 0 <= index < meta['chunks']:
+            return Response({"error": f"Chunk index must be between 0 and {meta['chunks'] - 1}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        chunk_path = self._chunk_path(upload_id, index)
+        temp_path = f"{chunk_path}.{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        received = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                while True:
+                    block = request.stream.read(COPY_BLOCK_SIZE) if request.stream else b''
+                    if not block:
+                        break
+                    received += len(block)
+                    if received > meta['chunk_size']:
+                        os.remove(temp_path)
+                        return Response({"error": "Chunk is larger than the upload's chunk_size."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+                    digest.update(block)
+                    f.write(block)
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return Response({"error": f"Failed to store chunk: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if digest.hexdigest() != request.headers.get('X-Chunk-SHA256'):
+            os.remove(temp_path)
+            return Response({"error": "Chunk does not match its X-Chunk-SHA256."}, status=status.HTTP_400_BAD_REQUEST)
+        os.replace(temp_path, chunk_path)
+        return Response({"index": index, "bytes": received}, status=status.HTTP_201_CREATED)
+
+    def complete_upload(self, request, upload_id):
+        meta = self._load_meta(upload_id) if UPLOAD_ID_PATTERN.match(upload_id) else None
+        if meta is None:
+            if UPLOAD_ID_PATTERN.match(upload_id) and os.path.exists(self._received_marker(upload_id)):
+                return Response({"status": "complete", "message": "Upload was already received."}, status=status.HTTP_200_OK)
+            return Response({"error": "Unknown upload."}, status=status.HTTP_404_NOT_FOUND)
+
+        received = self._received_chunks(upload_id, meta)
+        missing = sorted(set(range(meta['chunks'])) - set(received))
+        if missing:
+            return Response({"error": "Upload is missing chunks.", "missing": missing}, status=status.HTTP_409_CONFLICT)
+
+        upload_dir = self._upload_dir(upload_id)
+        # Each completion joins into its own file outside the upload dir, so a retried
+        # completion running alongside this one can't truncate it or pull it away.
+        joined_path = os.path.join(self.get_staging_path(), f"{upload_id}.{uuid.uuid4().hex}.joining")
+        digest = hashlib.sha256()
+        try:
+            with open(joined_path, 'wb') as f_out:
+                for index in range(meta['chunks']):
+                    with open(self._chunk_path(upload_id, index), 'rb') as f_in:
+                        for block in iter(lambda: f_in.read(COPY_BLOCK_SIZE), b''):
+                            digest.update(block)
+                            f_out.write(block)
+        except Exception as e:
+            if os.path.exists(joined_path):
+                os.remove(joined_path)
+            return Response({"error": f"Failed to process file: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if digest.hexdigest() != upload_id or os.path.getsize(joined_path) != meta['size']:
+            os.remove(joined_path)
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            return Response({"error": "Joined chunks do not match the upload's sha256; start again."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Another completion of the same upload may have finished while this one joined.
+        if self._pending_exists(upload_id) or os.path.exists(self._received_marker(upload_id)):
+            os.remove(joined_path)
+            return Response({"status": "complete", "message": "Upload was already received."}, status=status.HTTP_200_OK)
+
+        if meta['size'] > BACKGROUND_DECOMPRESS_BYTES:
+            pending_path = self._pending_path(upload_id, meta['file_name'])
+            os.replace(joined_path, pending_path)
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            self.hand_off(pending_path)
+            return Response({"status": "processing", "message": f"Received '{meta['file_name']}'; it is being decompressed."}, status=status.HTTP_202_ACCEPTED)
+
+        try:
+            decompressed_file_name = self.save_decompressed(joined_path, meta['file_name'])
+        except Exception as e:
+            return Response({"error": f"Failed to process file: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            if os.path.exists(joined_path):
+                os.remove(joined_path)
+
+        self._write_received_marker(upload_id, meta['file_name'])
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return Response({"status": "complete", "message": f"Successfully uploaded and decompressed '{decompressed_file_name}'"}, status=status.HTTP_201_CREATED)
@@ -0,0 +1,16 @@
+import os
+from django.conf import settings
+from .chunked_file_upload_view import BaseChunkedFileUploadView
+from config.permissions import IsInternalAPIRequest
+
+class ProductChunkedFileUploadView(BaseChunkedFileUploadView):
+    """
+    A view to receive compressed product .jsonl files from the scraper in chunks.
+    """
+    permission_classes = [IsInternalAPIRequest]
+
+    def get_inbox_path(self) -> str:
+        """
+        Returns the destination directory for the decompressed product files.
+        """
+        return os.fspath(settings.PIPELINE_DATA_DIR / 'inboxes' / 'product_inbox')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Last time the product row was written. Used as the high-water mark for cache snapshots.'),
+        ),
+    ]
@@ -91,6 +91,11 @@ class Product(models.Model):
         blank=True,
         help_text="List of [raw_brand_name, company_name] tuples for this product."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Last time the product row was written. Used as the high-water mark for cache snapshots."
+    )
     substitutes = models.ManyToManyField(
         'self',
         through='ProductSubstitution',
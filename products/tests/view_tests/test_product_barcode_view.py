@@ -6,6 +6,7 @@ from django.urls import reverse
 from companies.tests.factories import CompanyFactory
 from products.models import SKU
 from products.tests.factories import ProductFactory
+from products.views.product_barcode_view import ProductBarcodeView
 
 
 @pytest.mark.django_db
@@ -64,3 +65,56 @@ class TestProductBarcodeView:
                 'has_no_coles_barcode': True,
             }
         }
+
+    def test_export_lists_coles_skus_with_barcode_information(self, client, monkeypatch):
+        monkeypatch.setenv('INTERNAL_API_KEY', 'test-key')
+        coles = CompanyFactory(name='Coles')
+        woolworths = CompanyFactory(name='Woolworths')
+        SKU.objects.create(company=coles, product=ProductFactory(barcode='9300000000001'), sku='123')
+        SKU.objects.create(company=coles, product=ProductFactory(barcode=None, has_no_coles_barcode=True), sku='789')
+        SKU.objects.create(company=coles, product=ProductFactory(barcode=None), sku='555')
+        SKU.objects.create(company=woolworths, product=ProductFactory(barcode='9300000000002'), sku='456')
+
+        response = client.get(reverse('product-barcodes'), HTTP_X_INTERNAL_API_KEY='test-key')
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body['fields'] == ['sku', 'barcode', 'has_no_coles_barcode']
+        assert body['rows'] == [['123', '9300000000001', False], ['789', None, True]]
+        assert body['next_after'] is None
+        assert body['high_water_mark']
+
+    def test_export_since_returns_every_sku_whose_product_changed(self, client, monkeypatch):
+        monkeypatch.setenv('INTERNAL_API_KEY', 'test-key')
+        coles = CompanyFactory(name='Coles')
+        SKU.objects.create(company=coles, product=ProductFactory(barcode='9300000000001'), sku='123')
+        since = client.get(reverse('product-barcodes'), HTTP_X_INTERNAL_API_KEY='test-key').json()['high_water_mark']
+        SKU.objects.create(company=coles, product=ProductFactory(barcode=None), sku='555')
+
+        response = client.get(reverse('product-barcodes'), {'since': since}, HTTP_X_INTERNAL_API_KEY='test-key')
+
+        assert response.json()['rows'] == [['555', None, False]]
+
+    def test_export_is_paged_by_sku_id(self, client, monkeypatch):
+        monkeypatch.setenv('INTERNAL_API_KEY', 'test-key')
+        monkeypatch.setattr(ProductBarcodeView, 'export_page_size', 2)
+        coles = CompanyFactory(name='Coles')
+        for i in range(5):
+            SKU.objects.create(company=coles, product=ProductFactory(barcode=f'930000000000{i}'), sku=str(100 + i))
+
+        skus, params = [], {}
+        while True:
+            body = client.get(reverse('product-barcodes'), params, HTTP_X_INTERNAL_API_KEY='test-key').json()
+            skus.extend(row[0] for row in body['rows'])
+            if body['next_after'] is None:
+                break
+            params = {'after': body['next_after']}
+
+        assert skus == ['100', '101', '102', '103', '104']
+
+    def test_export_rejects_invalid_since(self, client, monkeypatch):
+        monkeypatch.setenv('INTERNAL_API_KEY', 'test-key')
+
+        response = client.get(reverse('product-barcodes'), {'since': 'yesterday'}, HTTP_X_INTERNAL_API_KEY='test-key')
+
+        assert response.status_code == 400
@@ -1,17 +1,39 @@
 import json
+from datetime import datetime
 from pipeline.views.base_api_view import BaseAPIView
+from django.db.models import Q
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
 from products.models import SKU
 
+# SKUs resolved per query, so a large lookup doesn't become one huge IN clause.
+LOOKUP_BATCH_SIZE = 2000
+
+EXPORT_FIELDS = ['sku', 'barcode', 'has_no_coles_barcode']
+
+# The export changes with every sync, so it must not be served from the site-wide cache.
+@method_decorator(never_cache, name='dispatch')
 class ProductBarcodeView(BaseAPIView):
     """
     An API view to look up barcode information for a given list of Coles SKUs.
+
+    GET is the bulk export a scraper machine keeps its local SKU cache in sync with:
+    Coles SKUs as compact [sku, barcode, has_no_coles_barcode] rows, ordered by SKU id
+    and `export_page_size` at a time. `after` is the id to continue from, given as
+    `next_after` in the previous page (null on the last one). Without `since`, only
+    SKUs with a barcode or has_no_coles_barcode are exported; with `since` (an ISO
+    datetime, usually the `high_water_mark` of the last sync), every SKU whose product
+    was written since then is, so the client can also forget barcodes that were removed.
     """
+    export_page_size = 20000
+
     def post(self, request, *args, **kwargs):
         try:
             data = json.loads(request.body)
             skus_to_lookup_raw = data.get('skus', [])
-            
+
             # Ensure all SKUs are integers for the lookup set
             skus_to_lookup = set()
             for sku in skus_to_lookup_raw:
@@ -27,18 +49,50 @@ class ProductBarcodeView(BaseAPIView):
             return JsonResponse({})
 
         sku_strings = [str(sku) for sku in skus_to_lookup]
-        sku_rows = (
-            SKU.objects
-            .filter(company__name__iexact='Coles', sku__in=sku_strings)
-            .select_related('product')
-        )
+        sku_to_barcode_map = {}
+        for start in range(0, len(sku_strings), LOOKUP_BATCH_SIZE):
+            sku_rows = (
+                SKU.objects
+                .filter(company__name__iexact='Coles', sku__in=sku_strings[start:start + LOOKUP_BATCH_SIZE])
+                .values_list('sku', 'product__barcode', 'product__has_no_coles_barcode')
+            )
+            for sku, barcode, has_no_coles_barcode in sku_rows:
+                sku_to_barcode_map[sku] = {
+                    'barcode': barcode,
+                    'has_no_coles_barcode': has_no_coles_barcode,
+                }
 
-        sku_to_barcode_map = {
-            sku_obj.sku: {
-                'barcode': sku_obj.product.barcode,
-                'has_no_coles_barcode': sku_obj.product.has_no_coles_barcode,
-            }
-            for sku_obj in sku_rows
-        }
-        
         return JsonResponse(sku_to_barcode_map)
+
+    def get(self, request, *args, **kwargs):
+        # Taken before reading so that products written during the export are picked up next time.
+        high_water_mark = timezone.now()
+        try:
+            after = int(request.query_params.get('after', 0))
+        except (ValueError, TypeError):
+            return JsonResponse({"error": "after must be an integer."}, status=400)
+
+        queryset = SKU.objects.filter(company__name__iexact='Coles', id__gt=after)
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = datetime.fromisoformat(since)
+            except ValueError:
+                return JsonResponse({"error": "since must be an ISO datetime."}, status=400)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            queryset = queryset.filter(product__updated_at__gte=since)
+        else:
+            has_barcode = Q(product__barcode__isnull=False) & ~Q(product__barcode='')
+            queryset = queryset.filter(has_barcode | Q(product__has_no_coles_barcode=True))
+
+        page = list(
+            queryset.order_by('id')
+            .values_list('id', 'sku', 'product__barcode', 'product__has_no_coles_barcode')[:self.export_page_size]
+        )
+        return JsonResponse({
+            'fields': EXPORT_FIELDS,
+            'rows': [[sku, barcode or None, has_no_coles_barcode] for _, sku, barcode, has_no_coles_barcode in page],
+            'next_after': page[-1][0] if len(page) == self.export_page_size else None,
+            'high_water_mark': high_water_mark.isoformat(),
+        })
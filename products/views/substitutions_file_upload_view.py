@@ -1,5 +1,4 @@
 import os
-import gzip
 from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
@@ -30,18 +29,12 @@ class SubstitutionsFileUploadView(BaseFileUploadView):
 
         try:
             # Decompress and save the file, assuming it's already de-duplicated
-            inbox_path = self.get_inbox_path()
-            os.makedirs(inbox_path, exist_ok=True)
-            
-            decompressed_file_name = uploaded_file.name.replace(".gz", "")
-            decompressed_file_path = os.path.join(inbox_path, decompressed_file_name)
-
-            with gzip.open(uploaded_file, 'rb') as f_in:
-                with open(decompressed_file_path, 'wb') as f_out:
-                    f_out.write(f_in.read())
-
-            message = f"Successfully uploaded and saved '{decompressed_file_name}'."
-            return Response({"message": message}, status=status.HTTP_201_CREATED)
-
+            decompressed_file_name, handed_off = self.store_upload(uploaded_file, uploaded_file.name)
         except Exception as e:
             return Response({"error": f"Failed to process file: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if handed_off:
+            message = f"Received '{uploaded_file.name}'; it is being saved as '{decompressed_file_name}'."
+            return Response({"message": message}, status=status.HTTP_202_ACCEPTED)
+        message = f"Successfully uploaded and saved '{decompressed_file_name}'."
+        return Response({"message": message}, status=status.HTTP_201_CREATED)
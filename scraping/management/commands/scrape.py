@@ -1,7 +1,9 @@
 import os
 import time
+from datetime import datetime, timedelta
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import slugify
 from scraping.scrapers.product_scraper_coles_v2 import ColesScraperV2
 from scraping.scrapers.product_scraper_woolworths import ProductScraperWoolworths
 from scraping.scrapers.product_scraper_aldi import ProductScraperAldi
@@ -9,6 +11,9 @@ from scraping.utils.coles_session_manager import ColesSessionManager
 from scraping.utils.product_scraping_utils.get_woolworths_categories import get_woolworths_categories
 from scraping.utils.product_scraping_utils.get_coles_categories import get_coles_categories
 from scraping.utils.python_file_downloader import fetch_python_file
+from scraping.utils.product_scraping_utils.http_cassette import Cassette, RecordingTransport
+from scraping.utils.product_scraping_utils.normalization_cache import default_cache_path
+from scraping.utils.store_scrape_scheduler import StoreScrapeScheduler, load_store_list
 
 COLES_STORE_ID = 'COL:401'
 WOOLWORTHS_STORE_ID = '1147'
@@ -19,31 +24,51 @@ class Command(BaseCommand):
     help = (
         'Scrapes product data. '
         '--coles: session-persistent Coles scraper using a hardcoded API store ID. '
-        '--woolworths/--aldi: single-company scraper using hardcoded API fulfilment IDs.'
+        '--woolworths/--aldi: single-company scraper using hardcoded API fulfilment IDs. '
+        '--stores FILE: scrapes every store in FILE, several at a time.'
     )
+    record_dir = None
+    max_staleness = None
 
     def add_arguments(self, parser):
         parser.add_argument('--woolworths', action='store_true', help='Scrape Woolworths products.')
         parser.add_argument('--coles', action='store_true', help='Run the session-persistent Coles v2 scraper.')
         parser.add_argument('--aldi', action='store_true', help='Scrape Aldi products.')
+        parser.add_argument('--stores', metavar='FILE', default=None, help='Scrape every store listed in FILE, a JSON list or JSONL of {"company", "store_id", "store_name", "state"} objects, writing a JSONL file per store.')
+        parser.add_argument('--stores-at-once', type=int, default=None, help='With --stores: how many Woolworths and how many Aldi stores to scrape at once. Coles stores are always scraped one at a time.')
         parser.add_argument('--dev', action='store_true', help='Use the local dev server instead of the production server.')
+        parser.add_argument('--concurrency', type=int, default=None, help='Woolworths only: number of category page requests to have in flight at once (1 fetches one page at a time).')
+        parser.add_argument('--requests-per-second', type=float, default=None, help='Woolworths only: highest rate the adaptive rate controller may start requests at.')
+        parser.add_argument('--record', metavar='DIR', default=None, help='Also record every response to a cassette in DIR, for replaying offline with `benchmark --scrapers DIR`.')
+        parser.add_argument('--incremental', action='store_true', help="Only page through categories whose first page changed since the last scrape of the store; carry the rest forward from then.")
+        parser.add_argument('--max-staleness', type=float, default=72, metavar='HOURS', help='With --incremental: fetch a category in full anyway once its carried-forward products are this old (default 72).')
+        parser.add_argument('--stream-pages', action='store_true', help='Fetch one category at a time and clean and write each page as it arrives, to bound memory and keep pages written before a crash.')
 
     def handle(self, *args, **options):
         base_url = "http://127.0.0.1:8000" if options['dev'] else settings.API_SERVER_URL
+        self.record_dir = options['record']
+        if options['incremental']:
+            if options['stream_pages']:
+                raise CommandError('--incremental cannot be combined with --stream-pages.')
+            self.max_staleness = timedelta(hours=options['max_staleness'])
 
         # All product scraping paths need up-to-date translation tables
         self._fetch_translation_tables(base_url)
 
+        if options['stores']:
+            self._scrape_stores(options['stores'], options['stores_at_once'], options['concurrency'], options['requests_per_second'], options['stream_pages'])
+            return
+
         if options['coles']:
-            self._scrape_coles()
+            self._scrape_coles(options['stream_pages'])
             return
 
         if options['woolworths']:
-            self._scrape_woolworths()
+            self._scrape_woolworths(options['concurrency'], options['requests_per_second'], options['stream_pages'])
             return
 
         if options['aldi']:
-            self._scrape_aldi()
+            self._scrape_aldi(options['stream_pages'])
             return
 
         self.stdout.write(self.style.WARNING("No company flag supplied. Use --coles, --woolworths, or --aldi."))
@@ -56,7 +81,7 @@ class Command(BaseCommand):
         fetch_python_file('brand_translations', brand_table_path, self, base_url)
         self.stdout.write(self.style.SUCCESS('Translation tables are up to date.'))
 
-    def _scrape_coles(self):
+    def _scrape_coles(self, stream_pages=False):
         """
         Phase 1 of the Coles scraping workflow. Visits category/list pages and
         writes JSONL files to the barcode_scraper_inbox. Run scrape_barcodes
@@ -80,28 +105,115 @@ class Command(BaseCommand):
                 state="",
                 categories_to_fetch=categories,
                 session=session,
-                session_manager=session_manager
+                session_manager=session_manager,
+                stream_pages=stream_pages,
+                max_staleness=self.max_staleness
             )
             t_start = time.time()
-            scraper.run()
+            self._run_scraper(scraper, 'coles', categories)
             self.stdout.write(self.style.SUCCESS(f"Coles scraped in {time.time() - t_start:.0f}s"))
         finally:
             session_manager.close()
 
-    def _scrape_woolworths(self):
+    def _scrape_woolworths(self, concurrency=None, requests_per_second=None, stream_pages=False):
         categories = get_woolworths_categories(self)
         if not categories:
             self.stdout.write(self.style.ERROR('Could not fetch Woolworths categories. Aborting scrape.'))
             return
-        scraper = ProductScraperWoolworths(
-            command=self, company="Woolworths", store_id=WOOLWORTHS_STORE_ID,
-            store_name="Woolworths", state="", categories_to_fetch=categories
+        scraper = self._woolworths_scraper(WOOLWORTHS_STORE_ID, "Woolworths", "", categories, concurrency, requests_per_second, stream_pages)
+        self._run_scraper(scraper, 'woolworths', categories)
+
+    def _woolworths_scraper(self, store_id, store_name, state, categories, concurrency=None, requests_per_second=None, stream_pages=False):
+        rate_options = {}
+        if concurrency is not None:
+            rate_options['concurrency'] = concurrency
+        if requests_per_second is not None:
+            rate_options['requests_per_second'] = requests_per_second
+        return ProductScraperWoolworths(
+            command=self, company="Woolworths", store_id=store_id,
+            store_name=store_name, state=state, categories_to_fetch=categories,
+            stream_pages=stream_pages, max_staleness=self.max_staleness, **rate_options
         )
-        scraper.run()
 
-    def _scrape_aldi(self):
+    def _scrape_aldi(self, stream_pages=False):
         scraper = ProductScraperAldi(
             command=self, company="Aldi", store_id=ALDI_STORE_ID,
-            store_name="Aldi", state=""
+            store_name="Aldi", state="", stream_pages=stream_pages, max_staleness=self.max_staleness
         )
-        scraper.run()
+        self._run_scraper(scraper, 'aldi')
+
+    def _scrape_stores(self, stores_path, stores_at_once=None, concurrency=None, requests_per_second=None, stream_pages=False):
+        """
+        Scrapes every store in the store list, several at a time, writing a JSONL file
+        per store. Categories are fetched once per company. Coles stores take turns on
+        one browser session, switching store with a cookie rather than a new CAPTCHA.
+        """
+        stores = load_store_list(stores_path)
+        companies = {store['company'] for store in stores}
+        self.stdout.write(self.style.SUCCESS(f"--- Scraping {len(stores)} stores from {stores_path} ---"))
+
+        categories = {}
+        if 'woolworths' in companies:
+            categories['woolworths'] = get_woolworths_categories(self)
+        if 'coles' in companies:
+            categories['coles'] = get_coles_categories()
+        for company, company_categories in categories.items():
+            if not company_categories:
+                self.stdout.write(self.style.ERROR(f'Could not fetch {company.title()} categories. Skipping {company.title()} stores.'))
+                stores = [store for store in stores if store['company'] != company]
+
+        session_manager = ColesSessionManager(self) if 'coles' in companies else None
+
+        def scrape_store(store):
+            store_id, store_name, state = store['store_id'], store['store_name'], store['state']
+            if store['company'] == 'woolworths':
+                scraper = self._woolworths_scraper(store_id, store_name, state, categories['woolworths'], concurrency, requests_per_second, stream_pages)
+            elif store['company'] == 'aldi':
+                scraper = ProductScraperAldi(command=self, company="Aldi", store_id=store_id, store_name=store_name, state=state, stream_pages=stream_pages, max_staleness=self.max_staleness)
+            else:
+                scraper = ColesScraperV2(
+                    command=self, company="Coles", store_id=store_id, store_name=store_name, state=state,
+                    categories_to_fetch=categories['coles'], session=session_manager.get_session(store_id),
+                    session_manager=session_manager, stream_pages=stream_pages, max_staleness=self.max_staleness
+                )
+            try:
+                self._run_scraper(scraper, store['company'], categories.get(store['company']))
+            except InterruptedError:
+                if store['company'] == 'coles':
+                    # Blocked: start a fresh browser session for the next Coles store.
+                    session_manager.close()
+                raise
+            return scraper
+
+        company_concurrency = {'woolworths': stores_at_once, 'aldi': stores_at_once} if stores_at_once else None
+        scheduler = StoreScrapeScheduler(self, scrape_store, company_concurrency)
+        try:
+            scheduler.run(stores)
+        finally:
+            if session_manager is not None:
+                session_manager.close()
+        scheduler.write_report()
+
+    def _run_scraper(self, scraper, name, categories=None):
+        """
+        Runs the scraper, recording its responses to a cassette in the --record directory
+        if one was given. The cassette also keeps what is needed to rebuild the scraper
+        for replay. Normalisations are kept on disk for the next run.
+        """
+        scraper.normalization_cache_path = default_cache_path()
+        if not self.record_dir:
+            scraper.run()
+            return
+
+        cassette = Cassette(os.path.join(self.record_dir, f"{name}-{slugify(scraper.store_id)}.jsonl.gz"), metadata={
+            'scraper': name,
+            'store_id': scraper.store_id,
+            'categories': categories,
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        })
+        scraper.transport = RecordingTransport(cassette)
+        try:
+            scraper.run()
+        finally:
+            cassette.save()
+            self.stdout.write(f"Recorded {len(cassette)} responses to {cassette.path}")
@@ -9,6 +9,7 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--dev', action='store_true', help='Use dev server for API calls.')
+        parser.add_argument('--concurrency', type=int, default=None, help='Number of product pages to fetch at once (1 fetches one at a time).')
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('--- Starting Barcode Scraper Worker ---'))
@@ -53,7 +54,8 @@ class Command(BaseCommand):
                         command=self, 
                         source_file_path=source_file_path, 
                         session_manager=session_manager, 
-                        dev=options['dev']
+                        dev=options['dev'],
+                        concurrency=options['concurrency']
                     )
                     scraper.run()
                     self.stdout.write(self.style.SUCCESS(f"Successfully processed {file_name}."))
@@ -1,9 +1,11 @@
 import os
 import json
-from bs4 import BeautifulSoup
+import threading
 from scraping.scrapers.base_product_scraper import BaseProductScraper
 from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter
+from scraping.utils.product_scraping_utils.page_scripts import extract_ld_json, extract_next_data
 from scraping.utils.product_scraping_utils.product_normalizer import ProductNormalizer
+from scraping.utils.product_scraping_utils.progress_journal import ProgressJournal
 from pipeline.utils.database_updating_utils.prefill_barcodes import prefill_barcodes_from_api
 from scraping.utils.coles_session_manager import ColesSessionManager
 
@@ -12,14 +14,28 @@ DEFAULT_COLES_STORE_ID = "COL:401"
 class ColesBarcodeScraperV2(BaseProductScraper):
     """
     Refactored version of the barcode scraper that uses an external session manager.
+
+    Product pages are fetched CONCURRENCY at a time on the shared session. The first
+    CAPTCHA page, or MAX_CONSECUTIVE_ERRORS failed pages in a row, trips a circuit
+    breaker: no further requests are sent and the scrape stops with an InterruptedError
+    so the caller can renew the session. Finished products are journalled to a
+    .progress file in batches, and a later run resumes from it.
     """
+    CONCURRENCY = 4
+    MAX_CONSECUTIVE_ERRORS = 10
+    PROGRESS_BATCH_SIZE = 50
 
-    def __init__(self, command, source_file_path: str, session_manager: ColesSessionManager, dev: bool = False):
+    def __init__(self, command, source_file_path: str, session_manager: ColesSessionManager, dev: bool = False,
+                 concurrency: int = None):
         self.source_file_path = source_file_path
         self.progress_file_path = source_file_path + ".progress"
+        self.progress_journal = ProgressJournal(self.progress_file_path, batch_size=self.PROGRESS_BATCH_SIZE)
         self.session_manager = session_manager
         self.session = None
         self.dev = dev
+        self._breaker_tripped = threading.Event()
+        self._breaker_lock = threading.Lock()
+        self._consecutive_errors = 0
 
         try:
             with open(source_file_path, 'r') as f:
@@ -35,6 +51,8 @@ class ColesBarcodeScraperV2(BaseProductScraper):
             raise ValueError(f"Could not read source file or metadata: {e}") from e
 
         super().__init__(command, company, DEFAULT_COLES_STORE_ID, company, "", load_translation_tables=False)
+        if concurrency is not None:
+            self.concurrency = concurrency
 
     def _output_metadata(self, metadata: dict) -> dict:
         return {
@@ -45,21 +63,15 @@ class ColesBarcodeScraperV2(BaseProductScraper):
     def setup(self):
         self.session = self.session_manager.get_session(self.store_id)
         output_file_name = f"{self.company}-barcodes"
-        self.jsonl_writer = JsonlWriter(self.company, output_file_name, self.state)
+        self.jsonl_writer = JsonlWriter(self.company, output_file_name, self.state, compress=True)
         return True
 
     def get_work_items(self) -> list:
         found_products = {}
-        if os.path.exists(self.progress_file_path):
-            with open(self.progress_file_path, 'r') as f:
-                for line in f:
-                    try:
-                        data = json.loads(line)
-                        sku = data.get('product', {}).get('sku')
-                        if sku:
-                            found_products[sku] = data
-                    except json.JSONDecodeError:
-                        continue
+        for data in self.progress_journal.read():
+            sku = data.get('product', {}).get('sku')
+            if sku:
+                found_products[sku] = data
 
         try:
             with open(self.source_file_path, 'r') as f:
@@ -85,8 +97,7 @@ class ColesBarcodeScraperV2(BaseProductScraper):
 
             if product_info.get('barcode') or not product_info.get('url') or product_info.get('has_no_coles_barcode'):
                 self.jsonl_writer.write_product(product_info, self._output_metadata(line_data.get('metadata', {})))
-                with open(self.progress_file_path, 'a') as progress_f:
-                    progress_f.write(json.dumps(line_data) + '\n')
+                self.progress_journal.record(line_data)
                 continue
 
             lines_to_scrape.append(line_data)
@@ -95,31 +106,47 @@ class ColesBarcodeScraperV2(BaseProductScraper):
         return lines_to_scrape
 
     def fetch_data_for_item(self, item) -> list:
+        """
+        Fetches one product page. Runs on a worker thread, so it only fetches; the
+        result is cleaned, written and journalled in order on the main thread.
+        """
         product_data = item['product']
         url = product_data.get('url')
         if not url:
             return []
 
+        if self._breaker_tripped.is_set():
+            raise InterruptedError("Barcode scrape stopped after a block was detected.")
+
         response = self.session.get(url, timeout=30)
 
         if self.session_manager.is_blocked(response.text):
-            self.command.stderr.write(self.command.style.ERROR("High-level block detected. Ending session."))
+            self._trip_breaker("High-level block detected. Ending session.")
             raise InterruptedError("Session appears to be blocked by CAPTCHA.")
 
         try:
             response.raise_for_status()
         except Exception as e:
-            self.command.stdout.write(self.command.style.WARNING(f"  - HTTP error for {url}: {e}. Skipping barcode."))
-            product_data['barcode'] = None
-            product_data['has_no_coles_barcode'] = True
-            item['product'] = product_data
-            self.jsonl_writer.write_product(product_data, self._output_metadata(item.get('metadata', {})))
-            with open(self.progress_file_path, 'a') as progress_f:
-                progress_f.write(json.dumps(item) + '\n')
-            return []
+            self._record_error()
+            return [{'html': None, 'error': e, 'original_item': item}]
 
+        with self._breaker_lock:
+            self._consecutive_errors = 0
         return [{'html': response.text, 'original_item': item}]
 
+    def _record_error(self):
+        with self._breaker_lock:
+            self._consecutive_errors += 1
+            too_many = self._consecutive_errors >= self.MAX_CONSECUTIVE_ERRORS
+        if too_many:
+            self._trip_breaker(f"{self.MAX_CONSECUTIVE_ERRORS} product pages failed in a row. Ending session.")
+            raise InterruptedError("Session appears to be blocked.")
+
+    def _trip_breaker(self, message):
+        if not self._breaker_tripped.is_set():
+            self._breaker_tripped.set()
+            self.command.stderr.write(self.command.style.ERROR(message))
+
     def clean_raw_data(self, raw_data_list: list) -> dict:
         if not raw_data_list:
             return {}
@@ -128,27 +155,33 @@ class ColesBarcodeScraperV2(BaseProductScraper):
         html = raw_data['html']
         original_item = raw_data['original_item']
         product_data = original_item['product']
-        soup = BeautifulSoup(html, 'html.parser')
+
+        if html is None:
+            self.command.stdout.write(self.command.style.WARNING(
+                f"  - HTTP error for {product_data.get('url')}: {raw_data['error']}. Skipping barcode."
+            ))
+            product_data['barcode'] = None
+            product_data['has_no_coles_barcode'] = True
+            self.progress_journal.record(original_item)
+            return {'products': [product_data], 'metadata': self._output_metadata(original_item.get('metadata', {}))}
 
         gtin = None
-        json_ld_scripts = soup.find_all('script', {'type': 'application/ld+json'})
-        for script in json_ld_scripts:
-            if script.string:
-                try:
-                    data = json.loads(script.string)
-                    items = [data] if isinstance(data, dict) else data if isinstance(data, list) else []
-                    for item_ld in items:
-                        if isinstance(item_ld, dict) and item_ld.get('@type') == 'Product':
-                            gtin = item_ld.get('gtin') or item_ld.get('gtin13') or item_ld.get('gtin14') or item_ld.get('mpn')
-                            if gtin: break
-                    if gtin: break
-                except json.JSONDecodeError:
-                    continue
+        for script_text in extract_ld_json(html):
+            try:
+                data = json.loads(script_text)
+                items = [data] if isinstance(data, dict) else data if isinstance(data, list) else []
+                for item_ld in items:
+                    if isinstance(item_ld, dict) and item_ld.get('@type') == 'Product':
+                        gtin = item_ld.get('gtin') or item_ld.get('gtin13') or item_ld.get('gtin14') or item_ld.get('mpn')
+                        if gtin: break
+                if gtin: break
+            except json.JSONDecodeError:
+                continue
 
         if not gtin:
-            json_element = soup.find('script', {'id': '__NEXT_DATA__'}) 
-            if json_element and json_element.string:
-                page_data = json.loads(json_element.string)
+            next_data = extract_next_data(html)
+            if next_data:
+                page_data = json.loads(next_data)
                 product_json = page_data.get('pageProps', {}).get('product') or \
                                page_data.get('pageProps', {}).get('pdpLayout', {}).get('product')
                 if product_json:
@@ -165,21 +198,22 @@ class ColesBarcodeScraperV2(BaseProductScraper):
 
         original_item['product'] = product_data
         
-        # Write to progress file immediately after successful processing
-        with open(self.progress_file_path, 'a') as progress_f:
-            progress_f.write(json.dumps(original_item) + '\n')
-            
+        self.progress_journal.record(original_item)
+
         return {'products': [original_item['product']], 'metadata': self._output_metadata(original_item.get('metadata', {}))}
 
     def run(self):
         """
         Overrides the base run method to handle the progress file cleanup.
         """
-        super().run()
+        try:
+            super().run()
+        finally:
+            # Whatever happened, keep what was finished so a retry can resume from it.
+            self.progress_journal.close()
         # The base run method handles the main logic. We just need to clean up
         # the progress file if the scrape was successful.
-        if os.path.exists(self.progress_file_path):
-            os.remove(self.progress_file_path)
+        self.progress_journal.remove()
         # On full success, remove the original source file as it has been replaced
         if os.path.exists(self.source_file_path):
             os.remove(self.source_file_path)
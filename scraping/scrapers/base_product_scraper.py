@@ -1,6 +1,15 @@
+import json
+import requests
 from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
 from scraping.utils.product_scraping_utils.output_utils import ScraperOutput
 from scraping.utils.product_scraping_utils.BaseDataCleaner import BaseDataCleaner
+from scraping.utils.product_scraping_utils.adaptive_rate_controller import AdaptiveRateController
+from scraping.utils.product_scraping_utils.async_fetch_engine import AsyncFetchEngine
+from scraping.utils.product_scraping_utils.category_fingerprints import CategoryFingerprints, fingerprint_listing
+from scraping.utils.product_scraping_utils.field_accessors import compile_field_map, extract_fields
+from scraping.utils.product_scraping_utils.wrap_cleaned_products import wrap_cleaned_products
+from scraping.utils.product_scraping_utils.normalization_cache import NormalizationCache, translation_tables_version
 
 class BaseProductScraper(ABC):
     """
@@ -8,14 +17,56 @@ class BaseProductScraper(ABC):
 
     This class defines the overall scraping workflow and provides common
     functionality, while leaving company-specific implementation details to subclasses.
+
+    Requests made through `self.session` go through an AdaptiveRateController, which
+    starts below CONCURRENCY and REQUESTS_PER_SECOND, works up to them while the
+    server copes and backs off on 429s and 5xxs. Subclasses set these to suit their API;
+    a REQUESTS_PER_SECOND of None leaves the rate unlimited until the first back-off.
+
+    With `stream_pages`, work items are fetched one at a time and each page is cleaned
+    and written as it arrives (see fetch_pages_for_item), so only one page of raw data
+    is held at once and an interrupted scrape keeps the pages it already wrote.
+
+    Setting `transport` to a requests adapter, such as a RecordingTransport or a
+    ReplayTransport from http_cassette, sends every request through it instead of
+    straight to the network. Scrapers create their sessions with new_session() so that
+    requests made during setup go through it too.
+
+    With a `max_staleness`, the scrape is incremental: each category's first page is
+    fingerprinted (see category_fingerprint) and, if it matches last run's and last
+    run's products for it are younger than `max_staleness`, those products are written
+    again instead of fetching the rest of the category. Not used with `stream_pages`.
+
+    Products are normalised through a NormalizationCache shared by every scraper in the
+    process that has the same translation tables. Setting `normalization_cache_path`
+    before run() also keeps the cache on disk there, for later runs.
     """
-    def __init__(self, command, company: str, store_id: str, store_name: str, state: str, load_translation_tables: bool = True):
+    CONCURRENCY = 1
+    REQUESTS_PER_SECOND = None
+    # The raw product field that identifies a product, used to fingerprint listings.
+    PRODUCT_ID_FIELD = 'id'
+    # The raw (field map) paths of a product's prices, fingerprinted along with its id.
+    PRICE_FIELDS = ()
+
+    def __init__(self, command, company: str, store_id: str, store_name: str, state: str, load_translation_tables: bool = True,
+                 stream_pages: bool = False, max_staleness: timedelta = None):
         self.command = command
         self.company = company
         self.store_id = store_id
         self.store_name = store_name
         self.state = state
         self.jsonl_writer = None
+        self.concurrency = self.CONCURRENCY
+        self.requests_per_second = self.REQUESTS_PER_SECOND
+        self.rate_controller = None
+        self.transport = None
+        self.normalization_cache = None
+        self.normalization_cache_path = None
+        self.stream_pages = stream_pages
+        self.max_staleness = max_staleness
+        self.category_fingerprints = None
+        self._category_totals = {}
+        self._incomplete_categories = set()
         self.output = ScraperOutput(self.command, self.company)
         if load_translation_tables:
             self.brand_translations, self.product_translations = BaseDataCleaner._load_translation_tables()
@@ -30,40 +81,246 @@ class BaseProductScraper(ABC):
             self.command.stdout.write(self.command.style.ERROR("Setup failed, aborting scrape."))
             return
 
+        self.start_rate_control()
+        self.open_normalization_cache()
+        self.load_category_fingerprints()
         try:
             self.jsonl_writer.open()
             work_items = self.get_work_items()
             self.output.update_progress(total_categories=len(work_items))
-
-            for i, item in enumerate(work_items):
-                self.output.update_progress(categories_scraped=i + 1)
-                raw_data_list = self.fetch_data_for_item(item)
-                
-                if not raw_data_list:
-                    continue
-
-                try:
-                    cleaned_data_packet = self.clean_raw_data(raw_data_list)
-                    if cleaned_data_packet and cleaned_data_packet.get('products'):
-                        self.write_data(cleaned_data_packet)
-                except Exception as e:
-                    self.command.stderr.write(self.command.style.ERROR(f"\nAn unexpected error occurred during data cleaning: {e}"))
-                    import traceback
-                    self.command.stderr.write(traceback.format_exc())
-                    # Stop the scrape for this store if cleaning fails catastrophically
-                    break
+            self._items_handled = 0
+            if self.stream_pages:
+                self.stream_items(work_items)
+            elif self.category_fingerprints is not None:
+                self.fetch_categories_incrementally(work_items)
+            else:
+                self.fetch_items(work_items, self.handle_item_data)
             
             if self.output.new_products > 0 or self.output.duplicate_products > 0:
                 scrape_successful = True
+        except BaseException:
+            if self.stream_pages and self.output.new_products > 0:
+                partial_path = self.jsonl_writer.keep_partial()
+                self.command.stderr.write(self.command.style.ERROR(
+                    f"\nScrape interrupted; the {self.output.new_products} products written so far are kept in {partial_path}"
+                ))
+            raise
         finally:
             if self.jsonl_writer:
                 self.jsonl_writer.close()
                 if scrape_successful:
                     self.post_scrape_enrichment()
                     self.jsonl_writer.commit()
+                    if self.category_fingerprints is not None:
+                        self.category_fingerprints.save()
+                        self.output.report_carried_forward(self.category_fingerprints.carried_forward, self.category_fingerprints.fetched)
                 else:
                     self.jsonl_writer.cleanup()
             self.output.finalize()
+            self.report_request_rate()
+            self.report_normalization_cache()
+
+    def start_rate_control(self):
+        """Puts the scraper's session, if it has one, under a fresh AdaptiveRateController."""
+        self.rate_controller = AdaptiveRateController(
+            max_requests_per_second=self.requests_per_second,
+            max_concurrency=self.concurrency,
+        )
+        session = getattr(self, 'session', None)
+        if session is not None:
+            self.rate_controller.attach(session, transport=self.transport)
+
+    def open_normalization_cache(self):
+        """Picks up the shared NormalizationCache for this scraper's translation tables."""
+        self.normalization_cache = NormalizationCache.shared(
+            translation_tables_version(self.brand_translations, self.product_translations),
+            path=self.normalization_cache_path,
+        )
+
+    def report_normalization_cache(self):
+        """Writes what the normalisation cache saved to disk, and reports its hit rate."""
+        if self.normalization_cache is None:
+            return
+        self.normalization_cache.flush()
+        stats = self.normalization_cache.stats()
+        if stats['lookups']:
+            self.output.report_normalization_cache(stats)
+
+    def load_category_fingerprints(self):
+        """Loads last run's category fingerprints for this store if the scrape is incremental."""
+        if self.max_staleness is None or self.stream_pages:
+            return
+        self.category_fingerprints = CategoryFingerprints.load(
+            CategoryFingerprints.path_for(self.company, self.store_id), self.max_staleness
+        )
+
+    def new_session(self) -> requests.Session:
+        """Returns a new requests.Session that sends requests through `transport`, if one is set."""
+        session = requests.Session()
+        if self.transport is not None:
+            session.mount('https://', self.transport)
+            session.mount('http://', self.transport)
+        return session
+
+    def report_request_rate(self):
+        if self.rate_controller and self.rate_controller.requests:
+            self.output.report_request_rate(self.rate_controller.stats())
+
+    def handle_item_data(self, raw_data_list) -> bool:
+        """
+        Cleans and writes the raw data fetched for one work item.
+        Returns False if the scrape should stop.
+        """
+        self._items_handled += 1
+        self.output.update_progress(categories_scraped=self._items_handled)
+        return self.clean_and_write(raw_data_list)
+
+    def clean_and_write(self, raw_data_list) -> bool:
+        """
+        Cleans a list of raw products and writes them out.
+        Returns False if cleaning failed and the scrape should stop.
+        """
+        if not raw_data_list:
+            return True
+
+        return self._clean_and_write(raw_data_list) is not None
+
+    def _clean_and_write(self, raw_data_list):
+        """Does the work of clean_and_write. Returns the cleaned products, or None if cleaning failed."""
+        try:
+            cleaned_data_packet = self.clean_raw_data(raw_data_list)
+            if cleaned_data_packet and cleaned_data_packet.get('products'):
+                self.write_data(cleaned_data_packet)
+                return cleaned_data_packet['products']
+        except Exception as e:
+            self.command.stderr.write(self.command.style.ERROR(f"\nAn unexpected error occurred during data cleaning: {e}"))
+            import traceback
+            self.command.stderr.write(traceback.format_exc())
+            # Stop the scrape for this store if cleaning fails catastrophically
+            return None
+        return []
+
+    def fetch_items(self, work_items: list, handle_item_data):
+        """
+        Fetches each work item and passes its raw data to `handle_item_data`, stopping
+        if that returns False. With a concurrency above 1, up to that many items are
+        fetched at once, but the raw data is still handed over in work item order.
+        Subclasses may override this as long as they keep to that order.
+        """
+        if self.concurrency <= 1:
+            for item in work_items:
+                if not handle_item_data(self.fetch_data_for_item(item)):
+                    break
+            return
+
+        engine = AsyncFetchEngine(concurrency=self.concurrency)
+        engine.run_ordered(work_items, lambda item: engine.call(self.fetch_data_for_item, item), handle_item_data)
+
+    def stream_items(self, work_items: list):
+        """
+        Fetches work items one at a time, cleaning and writing each page as soon as it
+        arrives and flushing it to disk before the next page is requested.
+        """
+        for item in work_items:
+            for raw_page in self.fetch_pages_for_item(item):
+                if not self.clean_and_write(raw_page):
+                    return
+                self.jsonl_writer.flush()
+            self._items_handled += 1
+            self.output.update_progress(categories_scraped=self._items_handled)
+
+    def fetch_categories_incrementally(self, work_items: list):
+        """
+        Like fetch_items, but each work item goes through fetch_category and
+        handle_category, so unchanged categories are carried forward.
+        """
+        if self.concurrency <= 1:
+            for item in work_items:
+                if not self.handle_category(self.fetch_category(item)):
+                    break
+            return
+
+        engine = AsyncFetchEngine(concurrency=self.concurrency)
+        engine.run_ordered(work_items, lambda item: engine.call(self.fetch_category, item), self.handle_category)
+
+    def fetch_category(self, item) -> dict:
+        """
+        Fetches the first page of a work item and, unless its fingerprint says the
+        category is unchanged, the rest of it. Returns a dict with the category 'key'
+        and 'fingerprint', and either the 'carried_forward' products or the 'raw_data'.
+        """
+        key = self.category_key(item)
+        pages = self.fetch_pages_for_item(item)
+        first_page = next(pages, None) or []
+        fingerprint = self.category_fingerprint(item, first_page)
+        carried_forward = self.category_fingerprints.carry_forward(key, fingerprint)
+        if carried_forward is not None:
+            pages.close()
+            return {'key': key, 'fingerprint': fingerprint, 'carried_forward': carried_forward}
+
+        raw_data = list(first_page)
+        for page in pages:
+            raw_data.extend(page)
+        return {'key': key, 'fingerprint': fingerprint, 'raw_data': raw_data}
+
+    def handle_category(self, category: dict) -> bool:
+        """
+        Writes a category fetched by fetch_category, and remembers the products of
+        one fetched in full for next run. Returns False if the scrape should stop.
+        """
+        self._items_handled += 1
+        self.output.update_progress(categories_scraped=self._items_handled)
+
+        if 'carried_forward' in category:
+            self.write_data(wrap_cleaned_products(
+                products=category['carried_forward'], company=self.company, store_name=self.store_name,
+                store_id=self.store_id, state=self.state, timestamp=datetime.now(),
+            ))
+            return True
+
+        products = self._clean_and_write(category['raw_data']) if category['raw_data'] else []
+        if products is None:
+            return False
+        if category['key'] not in self._incomplete_categories:
+            self.category_fingerprints.record(category['key'], category['fingerprint'], products)
+        return True
+
+    def category_key(self, item) -> str:
+        """A stable name for a work item, to keep its fingerprint under."""
+        if isinstance(item, str):
+            return item
+        return json.dumps(item, sort_keys=True, default=str)
+
+    def category_fingerprint(self, item, first_page: list):
+        """
+        Fingerprints a category from the product ids on its first page, their prices
+        (the payload's price_hash if it has one, else the PRICE_FIELDS) and the total
+        result count noted for it by note_category_total, if the scraper does that.
+        """
+        compiled_price_fields = compile_field_map({field: field for field in self.PRICE_FIELDS})
+        product_ids = []
+        prices = {}
+        for product in first_page:
+            if not isinstance(product, dict):
+                continue
+            product_id = product.get(self.PRODUCT_ID_FIELD)
+            product_ids.append(product_id)
+            if 'price_hash' in product:
+                prices[str(product_id)] = product['price_hash']
+            elif compiled_price_fields:
+                prices[str(product_id)] = extract_fields(product, compiled_price_fields)
+        return fingerprint_listing(product_ids, self._category_totals.get(self.category_key(item)), prices)
+
+    def note_category_total(self, item, total_results):
+        """Called by scrapers with the total result count a category's first page reports."""
+        self._category_totals[self.category_key(item)] = total_results
+
+    def mark_incomplete(self, item):
+        """
+        Called by scrapers that stop paging a category early on an error, so the partial
+        category is not remembered as the whole of it.
+        """
+        self._incomplete_categories.add(self.category_key(item))
 
     # --- Methods to be implemented by subclasses ---
 
@@ -92,6 +349,14 @@ class BaseProductScraper(ABC):
 
     # --- Optional hooks that can be overridden ---
 
+    def fetch_pages_for_item(self, item):
+        """
+        Yields the raw data for a single work item one page at a time, for streaming.
+        Scrapers that page through their API override this; by default the whole
+        item is one page.
+        """
+        yield self.fetch_data_for_item(item)
+
     def post_scrape_enrichment(self):
         """Optional hook for post-scrape processing. Default is to do nothing."""
         pass
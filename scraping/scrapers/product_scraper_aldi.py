@@ -1,34 +1,39 @@
 import requests
-import time
-import random
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.utils.text import slugify
 from scraping.scrapers.base_product_scraper import BaseProductScraper
 from scraping.utils.product_scraping_utils.DataCleanerAldi import DataCleanerAldi
+from scraping.utils.product_scraping_utils.field_maps import ALDI_FIELD_MAP
 from scraping.utils.product_scraping_utils.get_aldi_categories import get_aldi_categories
 from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter
 
 class ProductScraperAldi(BaseProductScraper):
     """
     A scraper for ALDI stores.
+    Categories are fetched concurrently; the rate controller paces the requests.
     """
+    CONCURRENCY = 4
+    REQUESTS_PER_SECOND = 8
+    PRODUCT_ID_FIELD = 'sku'
+    PRICE_FIELDS = tuple(ALDI_FIELD_MAP[field] for field in ('price_current', 'price_was', 'per_unit_price_value'))
 
-    def __init__(self, command, company: str, store_id: str, store_name: str, state: str):
-        super().__init__(command, company, store_id, store_name, state)
+    def __init__(self, command, company: str, store_id: str, store_name: str, state: str, stream_pages: bool = False,
+                 max_staleness: timedelta = None):
+        super().__init__(command, company, store_id, store_name, state, stream_pages=stream_pages, max_staleness=max_staleness)
         self.session = None
 
     def setup(self):
         """
         Initializes the requests.Session and the JsonlWriter.
         """
-        self.session = requests.Session()
+        self.session = self.new_session()
         self.session.headers.update({
             "user-agent": "SplitCartScraper/1.0 (Contact: admin@splitcart.com)",
         })
         
         effective_store_name = self.store_name if self.store_name else f"ALDI Store {self.store_id}"
         store_name_slug = f"{slugify(effective_store_name)}-{self.store_id}"
-        self.jsonl_writer = JsonlWriter(self.company, store_name_slug, self.state)
+        self.jsonl_writer = JsonlWriter(self.company, store_name_slug, self.state, compress=True)
         return True
 
     def get_work_items(self) -> list:
@@ -41,8 +46,13 @@ class ProductScraperAldi(BaseProductScraper):
         """
         Fetches the raw product data for a single ALDI category.
         """
+        return [product for page in self.fetch_pages_for_item(item) for product in page]
+
+    def fetch_pages_for_item(self, item):
+        """
+        Yields the raw product data for a single ALDI category, one page at a time.
+        """
         category_slug, category_key = item
-        all_raw_products = []
         
         limit = 30
         offset = 0
@@ -58,26 +68,25 @@ class ProductScraperAldi(BaseProductScraper):
             try:
                 response = self.session.get(api_url, params=params, timeout=60)
                 if response.status_code == 400:
-                    break
+                    return
                 response.raise_for_status()
                 data = response.json()
-                
-                raw_products_on_page = data.get("data", [])
+                if offset == 0:
+                    self.note_category_total(item, data.get("meta", {}).get("pagination", {}).get("totalCount"))
 
-                if not raw_products_on_page:
-                    break
-
-                all_raw_products.extend(raw_products_on_page)
+                raw_products_on_page = data.get("data", [])
 
             except (requests.exceptions.RequestException, requests.exceptions.JSONDecodeError) as e:
                 self.command.stderr.write(self.command.style.ERROR(f"Error fetching data for category {category_slug}: {e}"))
-                break
+                self.mark_incomplete(item)
+                return
 
-            time.sleep(random.uniform(0.5, 1.5))
+            if not raw_products_on_page:
+                return
+
+            yield raw_products_on_page
             
             offset += limit
-        
-        return all_raw_products
 
     def clean_raw_data(self, raw_data: list) -> dict:
         """
@@ -93,6 +102,7 @@ class ProductScraperAldi(BaseProductScraper):
             timestamp=datetime.now(),
             brand_translations=self.brand_translations,
             product_translations=self.product_translations,
+            normalization_cache=self.normalization_cache,
         )
         return cleaner.clean_data()
 
@@ -2,11 +2,13 @@ import os
 import json
 import math
 import requests
-from bs4 import BeautifulSoup
+from datetime import timedelta
 from django.conf import settings
 from django.utils.text import slugify
 from scraping.scrapers.base_product_scraper import BaseProductScraper
 from scraping.utils.product_scraping_utils.DataCleanerColes import DataCleanerColes
+from scraping.utils.product_scraping_utils.field_maps import COLES_FIELD_MAP
+from scraping.utils.product_scraping_utils.page_scripts import extract_next_data
 from scraping.utils.coles_session_manager import ColesSessionManager
 from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter
 
@@ -16,9 +18,12 @@ class ColesScraperV2(BaseProductScraper):
     This class is responsible only for fetching and processing data for a single store,
     assuming a valid session is provided.
     """
+    PRODUCT_ID_FIELD = 'id'
+    PRICE_FIELDS = tuple(COLES_FIELD_MAP[field] for field in ('price_current', 'price_was', 'per_unit_price_value'))
 
-    def __init__(self, command, company: str, store_id: str, store_name: str, state: str, categories_to_fetch: list, session: requests.Session, session_manager: ColesSessionManager):
-        super().__init__(command, company, store_id, store_name, state)
+    def __init__(self, command, company: str, store_id: str, store_name: str, state: str, categories_to_fetch: list, session: requests.Session, session_manager: ColesSessionManager,
+                 stream_pages: bool = False, max_staleness: timedelta = None):
+        super().__init__(command, company, store_id, store_name, state, stream_pages=stream_pages, max_staleness=max_staleness)
         self.categories_to_fetch = categories_to_fetch
         self.session = session
         self.session_manager = session_manager
@@ -51,14 +56,20 @@ class ColesScraperV2(BaseProductScraper):
         Fetches the raw product data for a single Coles category.
         Checks for session blocks during operation.
         """
+        return [product for page in self.fetch_pages_for_item(item) for product in page]
+
+    def fetch_pages_for_item(self, item):
+        """
+        Yields the raw product data for a single Coles category, one page at a time.
+        Checks for session blocks during operation.
+        """
         category_slug = item
-        all_raw_products = []
         page_num = 1
         total_pages = 1
 
         while True:
             if page_num > total_pages and total_pages > 1:
-                break
+                return
 
             browse_url = f"https://www.coles.com.au/browse/{category_slug}?page={page_num}"
             
@@ -71,13 +82,12 @@ class ColesScraperV2(BaseProductScraper):
 
                 response.raise_for_status()
 
-                soup = BeautifulSoup(response.text, 'html.parser')
-                json_element = soup.find('script', {'id': '__NEXT_DATA__'}) 
+                next_data = extract_next_data(response.text)
                 
-                if not json_element:
-                    break # Category likely has no products or page is empty
+                if not next_data:
+                    return # Category likely has no products or page is empty
 
-                full_data = json.loads(json_element.string)
+                full_data = json.loads(next_data)
 
                 # At the start of scraping a new category, verify the store ID hasn't drifted
                 if page_num == 1:
@@ -90,30 +100,29 @@ class ColesScraperV2(BaseProductScraper):
                         ))
                         # In this new model, we don't halt, but we warn, as the controlling
                         # loop might need to decide what to do. For now, we stop this category.
-                        break
+                        return
                 
                 search_results = full_data.get("props", {}).get("pageProps", {}).get("searchResults", {})
                 raw_product_list = search_results.get("results", [])
 
                 if not raw_product_list:
-                    break
+                    return
 
                 if page_num == 1:
                     total_results = search_results.get("noOfResults", 0)
+                    self.note_category_total(item, total_results)
                     page_size = search_results.get("pageSize", 48)
                     if total_results > 0 and page_size > 0:
                         total_pages = math.ceil(total_results / page_size)
 
-                all_raw_products.extend(raw_product_list)
-
             except requests.exceptions.RequestException as e:
                 self.command.stderr.write(self.command.style.ERROR(f"Request failed for {category_slug}: {e}"))
-                # We break on network errors for this category and move to the next.
-                break
-            
+                self.mark_incomplete(item)
+                # We stop on network errors for this category and move to the next.
+                return
+
+            yield raw_product_list
             page_num += 1
-        
-        return all_raw_products
 
     def clean_raw_data(self, raw_data: list) -> dict:
         """Cleans the raw Coles product data."""
@@ -127,5 +136,6 @@ class ColesScraperV2(BaseProductScraper):
             timestamp=datetime.now(),
             brand_translations=self.brand_translations,
             product_translations=self.product_translations,
+            normalization_cache=self.normalization_cache,
         )
         return cleaner.clean_data()
@@ -2,13 +2,13 @@ import os
 import json
 import math
 import requests
-from bs4 import BeautifulSoup
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from django.conf import settings
 from django.utils.text import slugify
 from scraping.scrapers.base_product_scraper import BaseProductScraper
 from scraping.utils.product_scraping_utils.DataCleanerColes import DataCleanerColes
+from scraping.utils.product_scraping_utils.page_scripts import extract_next_data
 from scraping.utils.coles_session_manager import ColesSessionManager
 from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter
 
@@ -21,6 +21,7 @@ class ColesScraperV3(BaseProductScraper):
     """
 
     MAX_WORKERS = 5
+    CONCURRENCY = MAX_WORKERS
 
     def __init__(self, command, company: str, store_id: str, store_name: str, state: str,
                  categories_to_fetch: list, session: requests.Session, session_manager: ColesSessionManager):
@@ -67,13 +68,12 @@ class ColesScraperV3(BaseProductScraper):
 
                 response.raise_for_status()
 
-                soup = BeautifulSoup(response.text, 'html.parser')
-                json_element = soup.find('script', {'id': '__NEXT_DATA__'})
+                next_data = extract_next_data(response.text)
 
-                if not json_element:
+                if not next_data:
                     break
 
-                full_data = json.loads(json_element.string)
+                full_data = json.loads(next_data)
 
                 if page_num == 1:
                     numeric_store_id = self.store_id.split(':')[-1]
@@ -116,6 +116,8 @@ class ColesScraperV3(BaseProductScraper):
             self.command.stdout.write(self.command.style.ERROR("Setup failed, aborting scrape."))
             return
 
+        self.start_rate_control()
+        self.open_normalization_cache()
         try:
             self.jsonl_writer.open()
             work_items = self.get_work_items()
@@ -164,6 +166,8 @@ class ColesScraperV3(BaseProductScraper):
                 else:
                     self.jsonl_writer.cleanup()
             self.output.finalize()
+            self.report_request_rate()
+            self.report_normalization_cache()
 
     def clean_raw_data(self, raw_data: list) -> dict:
         cleaner = DataCleanerColes(
@@ -175,5 +179,6 @@ class ColesScraperV3(BaseProductScraper):
             timestamp=datetime.now(),
             brand_translations=self.brand_translations,
             product_translations=self.product_translations,
+            normalization_cache=self.normalization_cache,
         )
         return cleaner.clean_data()
@@ -1,18 +1,36 @@
+import asyncio
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.utils.text import slugify
 from scraping.scrapers.base_product_scraper import BaseProductScraper
 from scraping.utils.product_scraping_utils.DataCleanerWoolworths import DataCleanerWoolworths
+from scraping.utils.product_scraping_utils.field_maps import WOOLWORTHS_FIELD_MAP
 from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter
+from scraping.utils.product_scraping_utils.async_fetch_engine import AsyncFetchEngine
+
+# The most requests in flight at once, and the highest rate they may start at; the
+# rate controller works up to these while the API keeps up.
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_SECOND = 8
 
 class ProductScraperWoolworths(BaseProductScraper):
     """
     A scraper for Woolworths stores.
+    With a concurrency above 1, categories and their pages are fetched concurrently
+    by an AsyncFetchEngine; the output is written in the same order either way.
+    A requests_per_second of None leaves the rate unlimited until the API pushes back.
     """
+    API_URL = "https://www.woolworths.com.au/apis/ui/browse/category"
+    PRODUCT_ID_FIELD = 'Stockcode'
+    PRICE_FIELDS = tuple(WOOLWORTHS_FIELD_MAP[field] for field in ('price_current', 'price_was', 'per_unit_price_value'))
 
-    def __init__(self, command, company: str, store_id: str, store_name: str, state: str, categories_to_fetch: list):
-        super().__init__(command, company, store_id, store_name, state)
+    def __init__(self, command, company: str, store_id: str, store_name: str, state: str, categories_to_fetch: list,
+                 concurrency: int = DEFAULT_CONCURRENCY, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 stream_pages: bool = False, max_staleness: timedelta = None):
+        super().__init__(command, company, store_id, store_name, state, stream_pages=stream_pages, max_staleness=max_staleness)
         self.session = None
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
         self.EXCLUDED_CATEGORY_SLUGS = ["everyday-market", "cigarettes-tobacco"]
         self.categories_to_fetch = [
             cat for cat in categories_to_fetch
@@ -38,7 +56,7 @@ class ProductScraperWoolworths(BaseProductScraper):
         """
         Initializes the requests.Session and the JsonlWriter.
         """
-        self.session = requests.Session()
+        self.session = self.new_session()
         self.session.headers.update({
             'accept': 'application/json, text/plain, */*',
             'accept-language': 'en-US,en;q=0.9',
@@ -60,7 +78,7 @@ class ProductScraperWoolworths(BaseProductScraper):
             return False
 
         store_name_slug = f"{slugify(self.store_name)}-{self.store_id}"
-        self.jsonl_writer = JsonlWriter(self.company, store_name_slug, self.state)
+        self.jsonl_writer = JsonlWriter(self.company, store_name_slug, self.state, compress=True)
         return True
 
     def get_work_items(self) -> list:
@@ -69,52 +87,98 @@ class ProductScraperWoolworths(BaseProductScraper):
         """
         return self.categories_to_fetch
 
+    def fetch_items(self, work_items: list, handle_item_data):
+        """
+        Fetches categories one after another, or concurrently when `concurrency` is above 1.
+        """
+        if self.concurrency <= 1:
+            return super().fetch_items(work_items, handle_item_data)
+
+        engine = AsyncFetchEngine(concurrency=self.concurrency)
+        engine.run_ordered(work_items, lambda item: self._fetch_data_for_item_async(engine, item), handle_item_data)
+
+    def _build_payload(self, category_slug, category_id, page_num) -> dict:
+        return {
+            "categoryId": category_id, "pageNumber": page_num, "pageSize": 36,
+            "sortType": "PriceAsc",
+            "url": f"/shop/browse/{category_slug}?pageNumber={page_num}&sortBy=PriceAsc",
+            "location": f"/shop/browse/{category_slug}?pageNumber={page_num}&sortBy=PriceAsc&filter=SoldBy(Woolworths)",
+            "formatObject": f'{{"name":"{category_slug}"}}', "isSpecial": False, "isBundle": False,
+            "isMobile": False, "filters": [{"Key": "SoldBy", "Items": [{"Term": "Woolworths"}]}],
+            "token": "", "gpBoost": 0, "isHideUnavailableProducts": False,
+            "isHideEverydayMarketProducts": True,
+            "isRegisteredRewardCardPromotion": False, "categoryVersion": "v2",
+            "enableAdReRanking": False, "groupEdmVariants": False, "activePersonalizedViewType": "",
+            "storeId": self.store_id
+        }
+
+    def _fetch_page(self, item, page_num) -> list:
+        """
+        Fetches one page of a category. Returns its raw products, stamped with the
+        category path, or an empty list once past the last page.
+        """
+        payload = self._build_payload(self._category_slug(item), self._category_node_id(item), page_num)
+        response = self.session.post(self.API_URL, json=payload, timeout=20)
+        response.raise_for_status()
+        data = response.json()
+        if page_num == 1:
+            self.note_category_total(item, data.get("TotalRecordCount"))
+
+        raw_products_on_page = [
+            p
+            for bundle in data.get("Bundles", [])
+            if bundle and bundle.get("Products")
+            for p in bundle["Products"]
+        ]
+
+        category_path = self._category_path(item)
+        for product in raw_products_on_page:
+            product['category_path'] = category_path
+        return raw_products_on_page
+
     def fetch_data_for_item(self, item) -> list:
         """
         Fetches the raw product data for a single Woolworths category.
         """
-        category_slug = self._category_slug(item)
-        category_id = self._category_node_id(item)
-        category_path = self._category_path(item)
-        all_raw_products = []
+        return [product for page in self.fetch_pages_for_item(item) for product in page]
+
+    def fetch_pages_for_item(self, item):
+        """
+        Yields the raw product data for a single Woolworths category, one page at a time.
+        """
         page_num = 1
 
         while True:
-            api_url = "https://www.woolworths.com.au/apis/ui/browse/category"
-            payload = {
-                "categoryId": category_id, "pageNumber": page_num, "pageSize": 36,
-                "sortType": "PriceAsc",
-                "url": f"/shop/browse/{category_slug}?pageNumber={page_num}&sortBy=PriceAsc",
-                "location": f"/shop/browse/{category_slug}?pageNumber={page_num}&sortBy=PriceAsc&filter=SoldBy(Woolworths)",
-                "formatObject": f'{{"name":"{category_slug}"}}', "isSpecial": False, "isBundle": False,
-                "isMobile": False, "filters": [{"Key": "SoldBy", "Items": [{"Term": "Woolworths"}]}],
-                "token": "", "gpBoost": 0, "isHideUnavailableProducts": False,
-                "isHideEverydayMarketProducts": True,
-                "isRegisteredRewardCardPromotion": False, "categoryVersion": "v2",
-                "enableAdReRanking": False, "groupEdmVariants": False, "activePersonalizedViewType": "",
-                "storeId": self.store_id
-            }
-
-            response = self.session.post(api_url, json=payload, timeout=20)
-            response.raise_for_status()
-            data = response.json()
-            
-            raw_products_on_page = [
-                p
-                for bundle in data.get("Bundles", [])
-                if bundle and bundle.get("Products")
-                for p in bundle["Products"]
-            ]
-            
+            raw_products_on_page = self._fetch_page(item, page_num)
             if not raw_products_on_page:
-                break
-
-            for product in raw_products_on_page:
-                product['category_path'] = category_path
+                return
 
-            all_raw_products.extend(raw_products_on_page)
+            yield raw_products_on_page
             page_num += 1
-        return all_raw_products
+
+    async def _fetch_data_for_item_async(self, engine, item) -> list:
+        """
+        Fetches the raw product data for a single Woolworths category, `concurrency`
+        pages at a time. The page count is not known up front, so each batch may
+        request a few pages past the end; everything from the first empty page on is
+        dropped (errors included), which gives the same result as fetching the pages
+        one by one.
+        """
+        all_raw_products = []
+        page_num = 1
+
+        while True:
+            pages = await asyncio.gather(*[
+                engine.request(self.API_URL, self._fetch_page, item, page_num + offset)
+                for offset in range(self.concurrency)
+            ], return_exceptions=True)
+            for raw_products_on_page in pages:
+                if isinstance(raw_products_on_page, BaseException):
+                    raise raw_products_on_page
+                if not raw_products_on_page:
+                    return all_raw_products
+                all_raw_products.extend(raw_products_on_page)
+            page_num += self.concurrency
 
     def clean_raw_data(self, raw_data: list) -> dict:
         """
@@ -129,6 +193,7 @@ class ProductScraperWoolworths(BaseProductScraper):
             timestamp=datetime.now(),
             brand_translations=self.brand_translations,
             product_translations=self.product_translations,
+            normalization_cache=self.normalization_cache,
         )
         cleaned_data = cleaner.clean_data()
         return cleaned_data
@@ -0,0 +1,192 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from scraping.scrapers.product_scraper_aldi import ProductScraperAldi
+from scraping.utils.product_scraping_utils.adaptive_rate_controller import AdaptiveRateController
+
+
+def _respond(controller, status_code, latency=0.01, retry_after=None):
+    controller.acquire()
+    controller.release(status_code, latency, retry_after)
+
+
+class TestAdaptiveRateController:
+    def test_starts_at_half_the_limits(self):
+        controller = AdaptiveRateController(max_requests_per_second=8, max_concurrency=4)
+
+        assert controller.requests_per_second == 4
+        assert controller.concurrency == 2
+
+    def test_healthy_responses_raise_rate_and_concurrency_up_to_the_limits(self):
+        controller = AdaptiveRateController(max_requests_per_second=1000, max_concurrency=3, increase_after=2)
+
+        for _ in range(4):
+            _respond(controller, 200)
+        assert controller.concurrency == 3
+        assert controller.requests_per_second == pytest.approx(700)
+
+        for _ in range(20):
+            _respond(controller, 200)
+        assert controller.concurrency == 3
+        assert controller.requests_per_second == 1000
+
+    def test_slow_responses_hold_the_rate(self):
+        controller = AdaptiveRateController(max_requests_per_second=1000, increase_after=1, target_latency=0.5)
+
+        _respond(controller, 200, latency=1.0)
+
+        assert controller.requests_per_second == 500
+
+    @pytest.mark.parametrize('status_code', [429, 503, None])
+    def test_throttled_responses_halve_rate_and_concurrency(self, status_code):
+        controller = AdaptiveRateController(max_requests_per_second=1000, max_concurrency=8)
+
+        _respond(controller, status_code)
+
+        assert controller.requests_per_second == 250
+        assert controller.concurrency == 2
+        assert controller.throttled == 1
+
+    def test_rate_never_drops_below_the_minimum(self):
+        controller = AdaptiveRateController(max_requests_per_second=2, min_requests_per_second=1)
+        _respond(controller, 429)
+        _respond(controller, 429)
+
+        assert controller.requests_per_second == 1
+
+    def test_unlimited_rate_is_set_from_achieved_rate_on_first_back_off(self):
+        controller = AdaptiveRateController()
+        for _ in range(3):
+            _respond(controller, 200)
+        assert controller.requests_per_second is None
+
+        _respond(controller, 429)
+
+        assert controller.requests_per_second > 0
+
+    def test_retry_after_pauses_requests(self):
+        controller = AdaptiveRateController()
+        _respond(controller, 429, retry_after=0.2)
+
+        start = time.monotonic()
+        controller.acquire()
+
+        assert time.monotonic() - start >= 0.15
+
+    def test_rate_limit_spaces_out_requests(self):
+        controller = AdaptiveRateController(max_requests_per_second=40, increase_after=100)
+
+        start = time.monotonic()
+        for _ in range(5):
+            _respond(controller, 200)
+
+        # 20 req/s to start with: the first token is in the bucket, the other four wait 50ms each.
+        assert time.monotonic() - start >= 0.18
+        assert controller.stats()['requests'] == 5
+        assert controller.achieved_requests_per_second() > 0
+
+    def test_concurrency_is_limited_across_threads(self):
+        controller = AdaptiveRateController(max_concurrency=4, increase_after=1000)
+        state = {'in_flight': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def request():
+            controller.acquire()
+            with lock:
+                state['in_flight'] += 1
+                state['max'] = max(state['max'], state['in_flight'])
+            time.sleep(0.02)
+            with lock:
+                state['in_flight'] -= 1
+            controller.release(200, 0.02)
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert state['max'] == 2
+
+
+# ── the session adapter against a local stub server ──────────────────────────
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    # Statuses to answer with, in order; 200 once they run out.
+    statuses = []
+
+    def do_GET(self):
+        cls = type(self)
+        status = cls.statuses.pop(0) if cls.statuses else 200
+        body = b'{"data": []}'
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ThrottlingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_retries_throttled_responses(stub_server):
+    _ThrottlingHandler.statuses = [429, 503]
+    controller = AdaptiveRateController(max_requests_per_second=1000)
+    session = controller.attach(requests.Session())
+
+    response = session.get(stub_server, timeout=5)
+
+    assert response.status_code == 200
+    assert controller.requests == 3
+    assert controller.throttled == 2
+
+
+def test_session_gives_up_after_throttle_retries(stub_server):
+    _ThrottlingHandler.statuses = [429] * 5
+    controller = AdaptiveRateController(max_requests_per_second=1000)
+    session = controller.attach(requests.Session())
+
+    response = session.get(stub_server, timeout=5)
+
+    assert response.status_code == 429
+    assert controller.requests == 4
+
+
+def test_scrapers_with_concurrency_fetch_items_at_once_in_order():
+    scraper = ProductScraperAldi(MagicMock(), 'Aldi', '1234', 'Aldi', '')
+    state = {'in_flight': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def fetch_data_for_item(item):
+        with lock:
+            state['in_flight'] += 1
+            state['max'] = max(state['max'], state['in_flight'])
+        # Later items finish first.
+        time.sleep(0.01 * (6 - item))
+        with lock:
+            state['in_flight'] -= 1
+        return [item]
+
+    scraper.fetch_data_for_item = fetch_data_for_item
+    handed_over = []
+    scraper.fetch_items(range(6), lambda raw: handed_over.append(raw) or True)
+
+    assert handed_over == [[i] for i in range(6)]
+    assert 1 < state['max'] <= ProductScraperAldi.CONCURRENCY
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from scraping.utils.product_scraping_utils.async_fetch_engine import AsyncFetchEngine, HostRateLimiter
+
+
+def test_results_are_consumed_in_item_order():
+    engine = AsyncFetchEngine(concurrency=3)
+    consumed = []
+
+    async def fetch(item):
+        # Later items finish first.
+        await asyncio.sleep(0.01 * (5 - item))
+        return item * 10
+
+    engine.run_ordered(range(5), fetch, consumed.append)
+
+    assert consumed == [0, 10, 20, 30, 40]
+
+
+def test_concurrency_limit_is_respected():
+    engine = AsyncFetchEngine(concurrency=2)
+    state = {'in_flight': 0, 'max': 0}
+
+    def blocking_call():
+        state['in_flight'] += 1
+        state['max'] = max(state['max'], state['in_flight'])
+        time.sleep(0.02)
+        state['in_flight'] -= 1
+
+    async def fetch(item):
+        await asyncio.gather(*[engine.request('https://example.com/', blocking_call) for _ in range(3)])
+
+    engine.run_ordered(range(3), fetch, lambda result: None)
+
+    assert state['max'] == 2
+
+
+def test_errors_propagate():
+    engine = AsyncFetchEngine(concurrency=2)
+
+    def fail():
+        raise ValueError('boom')
+
+    async def fetch(item):
+        return await engine.request('https://example.com/', fail)
+
+    try:
+        engine.run_ordered([1, 2], fetch, lambda result: None)
+    except ValueError as e:
+        assert str(e) == 'boom'
+    else:
+        raise AssertionError('expected the fetch error to propagate')
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = HostRateLimiter(requests_per_second=50)
+    starts = {}
+
+    async def hit(url, key):
+        await limiter.wait(url)
+        starts[key] = asyncio.get_running_loop().time()
+
+    async def main():
+        await asyncio.gather(
+            *[hit('https://a.example/x', f'a{i}') for i in range(3)],
+            hit('https://b.example/x', 'b0'),
+        )
+
+    asyncio.run(main())
+
+    assert starts['a2'] - starts['a0'] >= 0.035
+    # Another host is not held back by the first one's limit.
+    assert starts['b0'] - starts['a0'] < 0.015
@@ -1,6 +1,12 @@
+import gzip
 import json
+import os
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from scraping.scrapers.barcode_scraper_coles_v2 import ColesBarcodeScraperV2
 
 
@@ -24,3 +30,121 @@ def test_barcode_scraper_does_not_load_translation_tables(tmp_path):
     load_tables.assert_not_called()
     assert scraper.brand_translations == {}
     assert scraper.product_translations == {}
+
+
+# ── concurrent, resumable scraping ───────────────────────────────────────────
+
+BLOCKED_PAGE = '<html>Please verify you are a human</html>'
+
+
+def _product_page(barcode):
+    return f'<script type="application/ld+json">{{"@type": "Product", "gtin13": "{barcode}"}}</script>'
+
+
+def _source_file(tmp_path, count):
+    source_file = tmp_path / "coles-store.jsonl"
+    with open(source_file, "w", encoding="utf-8") as f:
+        for i in range(1, count + 1):
+            f.write(json.dumps({
+                "product": {"sku": i, "normalized_name_brand_size": f"product {i}", "url": f"https://coles.test/product/{i}"},
+                "metadata": {"company": "coles", "scraped_date": "2026-06-29"},
+            }) + "\n")
+    return source_file
+
+
+class _StubSession:
+    """Serves product pages from the url's sku, and records the skus it was asked for."""
+    def __init__(self, blocked_skus=()):
+        self.blocked_skus = set(blocked_skus)
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def get(self, url, timeout=None):
+        sku = int(url.rsplit('/', 1)[1])
+        with self.lock:
+            self.requested.append(sku)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Later products answer first.
+        time.sleep(0.002 * (20 - sku % 20))
+        with self.lock:
+            self.in_flight -= 1
+        response = MagicMock()
+        response.text = BLOCKED_PAGE if sku in self.blocked_skus else _product_page(f"{9300000000000 + sku}")
+        response.raise_for_status.return_value = None
+        return response
+
+
+def _scraper(tmp_path, session, source_file):
+    session_manager = MagicMock()
+    session_manager.get_session.return_value = session
+    session_manager.is_blocked.side_effect = lambda text: text == BLOCKED_PAGE
+    return ColesBarcodeScraperV2(
+        command=MagicMock(), source_file_path=str(source_file), session_manager=session_manager,
+    )
+
+
+@pytest.fixture
+def scraper_env(tmp_path):
+    with patch("scraping.scrapers.base_product_scraper.BaseDataCleaner._load_translation_tables"), \
+         patch("scraping.scrapers.barcode_scraper_coles_v2.prefill_barcodes_from_api", side_effect=lambda products, *args: products), \
+         patch("scraping.utils.product_scraping_utils.jsonl_writer.settings") as mock_settings:
+        mock_settings.BASE_DIR = str(tmp_path)
+        mock_settings.PIPELINE_DATA_DIR = tmp_path
+        yield tmp_path
+
+
+def _outbox_barcodes(tmp_path):
+    [path] = (tmp_path / "outboxes" / "product_outbox").glob("*.jsonl.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line)["product"]["barcode"] for line in f]
+
+
+def test_fetches_pages_concurrently_and_writes_them_in_order(scraper_env):
+    source_file = _source_file(scraper_env, 12)
+    session = _StubSession()
+
+    _scraper(scraper_env, session, source_file).run()
+
+    assert session.max_in_flight > 1
+    assert _outbox_barcodes(scraper_env) == [f"{9300000000000 + i}" for i in range(1, 13)]
+    assert not os.path.exists(str(source_file) + ".progress")
+    assert not source_file.exists()
+
+
+def test_block_trips_breaker_and_next_run_resumes_from_progress(scraper_env):
+    source_file = _source_file(scraper_env, 12)
+    blocked_session = _StubSession(blocked_skus={6})
+
+    with pytest.raises(InterruptedError):
+        _scraper(scraper_env, blocked_session, source_file).run()
+
+    progress = [json.loads(line)["product"]["sku"] for line in open(str(source_file) + ".progress", encoding="utf-8")]
+    assert progress == [1, 2, 3, 4, 5]
+    # Once tripped, no more pages are requested beyond those already in flight.
+    assert len(blocked_session.requested) < 12
+
+    session = _StubSession()
+    _scraper(scraper_env, session, source_file).run()
+
+    assert sorted(session.requested) == list(range(6, 13))
+    assert sorted(_outbox_barcodes(scraper_env)) == [f"{9300000000000 + i}" for i in range(1, 13)]
+
+
+def test_consecutive_http_errors_trip_breaker(scraper_env):
+    source_file = _source_file(scraper_env, 30)
+    scraper = _scraper(scraper_env, MagicMock(), source_file)
+    scraper.concurrency = 1
+    failing = MagicMock(text=_product_page("9300000000000"))
+    failing.raise_for_status.side_effect = Exception("503 Server Error")
+    scraper.session_manager.get_session.return_value.get.return_value = failing
+
+    with pytest.raises(InterruptedError):
+        scraper.run()
+
+    assert scraper.session.get.call_count == ColesBarcodeScraperV2.MAX_CONSECUTIVE_ERRORS
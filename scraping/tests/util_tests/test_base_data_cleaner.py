@@ -70,6 +70,30 @@ class TestGetValue:
         assert cleaner._get_value(raw, 'nested_list_field') is None
 
 
+class TestExtractFields:
+    RAW_PRODUCTS = [
+        {'id': '123', 'name': 'Milk', 'pricing': {'now': 2.50}, 'items': [{'value': 'first'}]},
+        {'id': '', 'name': '  ', 'pricing': {'now': '   '}, 'items': []},
+        {'pricing': 'not a dict', 'items': {'0': {'value': 'dict, not list'}}},
+        {},
+    ]
+
+    def test_matches_get_value_field_by_field(self, cleaner):
+        for raw in self.RAW_PRODUCTS:
+            assert cleaner._extract_fields(raw) == {field: cleaner._get_value(raw, field) for field in cleaner.field_map}
+
+    def test_keeps_field_map_order(self, cleaner):
+        assert list(cleaner._extract_fields({})) == list(cleaner.field_map)
+
+    def test_field_map_is_compiled_once_per_class(self, cleaner):
+        cleaner._extract_fields({})
+        compiled = BaseDataCleaner._compiled_field_maps[ConcreteDataCleaner]
+
+        cleaner._extract_fields({'id': '1'})
+
+        assert BaseDataCleaner._compiled_field_maps[ConcreteDataCleaner] is compiled
+
+
 class TestCalculatePriceInfo:
     def test_on_special(self, cleaner):
         result = cleaner._calculate_price_info(current_price=2.00, was_price=3.00)
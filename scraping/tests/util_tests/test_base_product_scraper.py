@@ -0,0 +1,187 @@
+import json
+import os
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from scraping.scrapers.base_product_scraper import BaseProductScraper
+from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter
+
+# Raw pages per category; a page of None makes the fake API fail mid-category.
+PAGES = {
+    'milk': [['milk 1l', 'milk 2l'], ['milk 3l']],
+    'bread': [['bread white']],
+}
+
+
+class _PagedScraper(BaseProductScraper):
+    def __init__(self, command, tmp_path, pages, stream_pages=True):
+        super().__init__(command, 'test', 'store-1', 'Test Store', 'nsw',
+                         load_translation_tables=False, stream_pages=stream_pages)
+        self.tmp_path = tmp_path
+        self.pages = pages
+        self.lines_on_disk_per_fetch = []
+
+    def setup(self):
+        outbox = self.tmp_path / 'outbox'
+        outbox.mkdir(parents=True, exist_ok=True)
+        with patch('scraping.utils.product_scraping_utils.jsonl_writer.settings') as mock_settings:
+            mock_settings.BASE_DIR = str(self.tmp_path)
+            self.jsonl_writer = JsonlWriter(self.company, 'test-store', self.state, final_outbox_path=str(outbox))
+        return True
+
+    def get_work_items(self) -> list:
+        return list(self.pages)
+
+    def fetch_data_for_item(self, item) -> list:
+        return [product for page in self.fetch_pages_for_item(item) for product in page]
+
+    def fetch_pages_for_item(self, item):
+        for page in self.pages[item]:
+            self.lines_on_disk_per_fetch.append(self._lines_on_disk())
+            if page is None:
+                raise ConnectionError('API went away')
+            yield page
+
+    def clean_raw_data(self, raw_data: list) -> dict:
+        return {'products': [{'normalized_name_brand_size': name} for name in raw_data], 'metadata': {}}
+
+    def _lines_on_disk(self):
+        if not os.path.exists(self.jsonl_writer.temp_file_path):
+            return 0
+        with open(self.jsonl_writer.temp_file_path, encoding='utf-8') as f:
+            return len(f.readlines())
+
+
+@pytest.fixture
+def command():
+    return MagicMock()
+
+
+def _outbox_lines(tmp_path):
+    [path] = (tmp_path / 'outbox').iterdir()
+    return path.read_text(encoding='utf-8').splitlines()
+
+
+def test_streaming_writes_each_page_before_fetching_the_next(command, tmp_path):
+    scraper = _PagedScraper(command, tmp_path, PAGES)
+
+    scraper.run()
+
+    assert scraper.lines_on_disk_per_fetch == [0, 2, 3]
+    assert len(_outbox_lines(tmp_path)) == 4
+    assert scraper.output.categories_scraped == 2
+
+
+def test_streaming_output_matches_whole_category_scrape(command, tmp_path):
+    _PagedScraper(command, tmp_path / 'streamed', PAGES).run()
+    _PagedScraper(command, tmp_path / 'whole', PAGES, stream_pages=False).run()
+
+    assert _outbox_lines(tmp_path / 'streamed') == _outbox_lines(tmp_path / 'whole')
+
+
+def test_crash_mid_category_keeps_pages_already_written(command, tmp_path):
+    scraper = _PagedScraper(command, tmp_path, {'milk': [['milk 1l', 'milk 2l'], None]})
+
+    with pytest.raises(ConnectionError):
+        scraper.run()
+
+    partial_path = scraper.jsonl_writer.temp_file_path + '.partial'
+    with open(partial_path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 2
+    assert not list((tmp_path / 'outbox').iterdir())
+
+
+# ── incremental scraping ─────────────────────────────────────────────────────
+
+class _ListingScraper(_PagedScraper):
+    """Pages of products with ids, as a category listing API returns them."""
+    def __init__(self, command, tmp_path, pages, max_staleness=timedelta(days=3)):
+        super().__init__(command, tmp_path, pages, stream_pages=False)
+        self.max_staleness = max_staleness
+        self.pages_fetched = 0
+
+    def fetch_pages_for_item(self, item):
+        self.note_category_total(item, sum(len(page) for page in self.pages[item]))
+        for page in self.pages[item]:
+            self.pages_fetched += 1
+            yield [{'id': name} for name in page]
+
+    def clean_raw_data(self, raw_data: list) -> dict:
+        return {'products': [{'normalized_name_brand_size': p['id']} for p in raw_data], 'metadata': {}}
+
+
+def _scrape_incrementally(command, tmp_path, pages, **kwargs):
+    with patch('scraping.utils.product_scraping_utils.category_fingerprints.settings') as mock_settings:
+        mock_settings.BASE_DIR = str(tmp_path)
+        scraper = _ListingScraper(command, tmp_path / f'run-{len(list(tmp_path.glob("run-*")))}', pages, **kwargs)
+        scraper.run()
+    return scraper
+
+
+def test_unchanged_categories_are_carried_forward(command, tmp_path):
+    first = _scrape_incrementally(command, tmp_path, PAGES)
+    changed = {**PAGES, 'bread': [['bread white', 'bread rye']]}
+    second = _scrape_incrementally(command, tmp_path, changed)
+
+    assert first.pages_fetched == 3
+    # milk only had its first page fetched; bread changed and was fetched in full.
+    assert second.pages_fetched == 2
+    assert second.category_fingerprints.carried_forward == 1
+    assert sorted(json.loads(line)['product']['normalized_name_brand_size'] for line in _outbox_lines(tmp_path / 'run-1')) == [
+        'bread rye', 'bread white', 'milk 1l', 'milk 2l', 'milk 3l',
+    ]
+
+
+def test_stale_categories_are_fetched_in_full(command, tmp_path):
+    _scrape_incrementally(command, tmp_path, PAGES)
+    second = _scrape_incrementally(command, tmp_path, PAGES, max_staleness=timedelta(0))
+
+    assert second.pages_fetched == 3
+    assert second.category_fingerprints.carried_forward == 0
+
+
+def test_incomplete_categories_are_not_remembered(command, tmp_path):
+    class _FailingListingScraper(_ListingScraper):
+        def fetch_pages_for_item(self, item):
+            yield from super().fetch_pages_for_item(item)
+            if item == 'milk':
+                self.mark_incomplete(item)
+
+    with patch('scraping.utils.product_scraping_utils.category_fingerprints.settings') as mock_settings:
+        mock_settings.BASE_DIR = str(tmp_path)
+        _FailingListingScraper(command, tmp_path / 'run-0', PAGES).run()
+    second = _scrape_incrementally(command, tmp_path, PAGES)
+
+    assert second.category_fingerprints.carried_forward == 1
+    assert second.pages_fetched == 3
+
+
+class _PricedListingScraper(_ListingScraper):
+    """Listing pages whose products carry a raw price, as the Coles API nests it."""
+    PRICE_FIELDS = ('pricing.now',)
+
+    def __init__(self, command, tmp_path, pages, prices, **kwargs):
+        super().__init__(command, tmp_path, pages, **kwargs)
+        self.prices = prices
+
+    def fetch_pages_for_item(self, item):
+        for page in super().fetch_pages_for_item(item):
+            yield [{**product, 'pricing': {'now': self.prices.get(product['id'], 1.0)}} for product in page]
+
+
+def test_price_change_on_first_page_forces_a_full_fetch(command, tmp_path):
+    def scrape(prices):
+        with patch('scraping.utils.product_scraping_utils.category_fingerprints.settings') as mock_settings:
+            mock_settings.BASE_DIR = str(tmp_path)
+            scraper = _PricedListingScraper(command, tmp_path / f'run-{len(list(tmp_path.glob("run-*")))}', PAGES, prices)
+            scraper.run()
+        return scraper
+
+    scrape({'milk 1l': 2.0})
+    second = scrape({'milk 1l': 1.5})
+
+    # Same products listed, but milk 1l went on special: milk is fetched in full, bread carried forward.
+    assert second.pages_fetched == 3
+    assert second.category_fingerprints.carried_forward == 1
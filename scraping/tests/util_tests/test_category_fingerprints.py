@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from scraping.utils.product_scraping_utils.category_fingerprints import CategoryFingerprints, fingerprint_listing
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+def test_fingerprint_changes_with_ids_order_and_total():
+    base = fingerprint_listing([1, 2, 3], 40)
+
+    assert fingerprint_listing(['1', '2', '3'], 40) == base
+    assert fingerprint_listing([1, 3, 2], 40) != base
+    assert fingerprint_listing([1, 2, 3], 41) != base
+    assert fingerprint_listing([], 40) is None
+
+
+def test_fingerprint_changes_with_prices():
+    base = fingerprint_listing([1, 2], 40, {'1': 'hash-a', '2': {'price_current': 3.5}})
+
+    assert fingerprint_listing([1, 2], 40, {'2': {'price_current': 3.5}, '1': 'hash-a'}) == base
+    assert fingerprint_listing([1, 2], 40, {'1': 'hash-b', '2': {'price_current': 3.5}}) != base
+    assert fingerprint_listing([1, 2], 40, {'1': 'hash-a', '2': {'price_current': 3.0}}) != base
+
+
+def test_recorded_products_are_carried_forward_until_stale(tmp_path):
+    path = tmp_path / 'fingerprints.json.gz'
+    fingerprints = CategoryFingerprints(path, timedelta(days=3))
+    fingerprints.record('milk', 'abc', [{'sku': '1'}], now=NOW)
+    fingerprints.save()
+
+    loaded = CategoryFingerprints.load(path, timedelta(days=3))
+
+    assert loaded.carry_forward('milk', 'abc', now=NOW + timedelta(days=2)) == [{'sku': '1'}]
+    assert loaded.carry_forward('milk', 'abc', now=NOW + timedelta(days=4)) is None
+    assert loaded.carry_forward('milk', 'changed', now=NOW) is None
+    assert loaded.carry_forward('bread', 'abc', now=NOW) is None
+
+
+def test_carrying_forward_keeps_the_original_fetch_date(tmp_path):
+    path = tmp_path / 'fingerprints.json.gz'
+    fingerprints = CategoryFingerprints(path, timedelta(days=3))
+    fingerprints.record('milk', 'abc', [], now=NOW)
+    fingerprints.save()
+
+    second = CategoryFingerprints.load(path, timedelta(days=3))
+    second.carry_forward('milk', 'abc', now=NOW + timedelta(days=2))
+    second.save()
+    third = CategoryFingerprints.load(path, timedelta(days=3))
+
+    assert third.carry_forward('milk', 'abc', now=NOW + timedelta(days=4)) is None
+
+
+def test_damaged_file_starts_afresh(tmp_path):
+    path = tmp_path / 'fingerprints.json.gz'
+    path.write_bytes(b'not gzip')
+
+    fingerprints = CategoryFingerprints.load(path, timedelta(days=3))
+
+    assert fingerprints.carry_forward('milk', 'abc') is None
@@ -0,0 +1,99 @@
+import gzip
+import hashlib
+import json
+from json import dumps
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+from scraping.utils.command_utils.chunked_uploader import ChunkedUploader, ChunkedUploadError
+
+UPLOAD_URL = 'http://testserver/api/upload/products/chunked/'
+
+
+class _DjangoSession:
+    """
+    Sends ChunkedUploader's requests to the Django test client. The first `fail_puts`
+    chunk PUTs fail, as do all of them after `puts_before_disconnect` have gone through.
+    """
+    def __init__(self, client, fail_puts=0, puts_before_disconnect=None):
+        self.client = client
+        self.fail_puts = fail_puts
+        self.puts_before_disconnect = puts_before_disconnect
+        self.requests = []
+
+    def request(self, method, url, headers=None, timeout=None, json=None, data=None):
+        self.requests.append((method, urlsplit(url).path))
+        if method == 'PUT':
+            if self.fail_puts or self.puts_before_disconnect == 0:
+                self.fail_puts = max(self.fail_puts - 1, 0)
+                raise requests.exceptions.ConnectionError('connection reset')
+            if self.puts_before_disconnect is not None:
+                self.puts_before_disconnect -= 1
+        extra = {f"HTTP_{key.upper().replace('-', '_')}": value for key, value in headers.items() if key != 'Content-Type'}
+        if json is not None:
+            body, content_type = dumps(json), 'application/json'
+        else:
+            body, content_type = data or b'', headers.get('Content-Type', 'application/octet-stream')
+        response = self.client.generic(method, urlsplit(url).path, body, content_type=content_type, **extra)
+        return SimpleNamespace(status_code=response.status_code, json=response.json, text=response.content.decode())
+
+
+@pytest.fixture
+def server(settings, tmp_path, monkeypatch):
+    monkeypatch.setenv('INTERNAL_API_KEY', 'test-key')
+    settings.PIPELINE_DATA_DIR = tmp_path / 'server'
+    return tmp_path / 'server'
+
+
+@pytest.fixture
+def product_file(tmp_path):
+    content = b''.join(json.dumps({'product': {'name': hashlib.sha256(bytes([i])).hexdigest()}}).encode() + b'\n' for i in range(100))
+    path = tmp_path / 'woolworths-store-1-2025-06-01.jsonl.gz'
+    path.write_bytes(gzip.compress(content))
+    return path, content, hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _uploader(session, chunk_size=1000):
+    uploader = ChunkedUploader(UPLOAD_URL, {'X-Internal-API-Key': 'test-key'}, chunk_size=chunk_size, session=session)
+    uploader.retry_backoff = 0
+    return uploader
+
+
+class TestChunkedUploader:
+    def test_file_arrives_decompressed_in_the_server_inbox(self, client, server, product_file):
+        path, content, sha256 = product_file
+
+        assert _uploader(_DjangoSession(client)).upload(str(path), sha256) is True
+        assert (server / 'inboxes' / 'product_inbox' / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == content
+
+    def test_file_the_server_already_has_is_not_sent_again(self, client, server, product_file):
+        path, _, sha256 = product_file
+        _uploader(_DjangoSession(client)).upload(str(path), sha256)
+        session = _DjangoSession(client)
+
+        assert _uploader(session).upload(str(path), sha256) is False
+        assert session.requests == [('POST', '/api/upload/products/chunked/')]
+
+    def test_failed_chunks_are_retried(self, client, server, product_file):
+        path, content, sha256 = product_file
+
+        assert _uploader(_DjangoSession(client, fail_puts=2)).upload(str(path), sha256) is True
+        assert (server / 'inboxes' / 'product_inbox' / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == content
+
+    def test_interrupted_upload_resumes_with_the_missing_chunks(self, client, server, product_file):
+        path, content, sha256 = product_file
+        interrupted = _uploader(_DjangoSession(client, puts_before_disconnect=2))
+        interrupted.max_attempts = 1
+        with pytest.raises(ChunkedUploadError):
+            interrupted.upload(str(path), sha256)
+
+        session = _DjangoSession(client)
+        assert _uploader(session).upload(str(path), sha256) is True
+
+        sent = [request_path for method, request_path in session.requests if method == 'PUT']
+        chunks = -(-path.stat().st_size // 1000)
+        assert sent == [f'/api/upload/products/chunked/{sha256}/{index}/' for index in range(2, chunks)]
+        assert (server / 'inboxes' / 'product_inbox' / 'woolworths-store-1-2025-06-01.jsonl').read_bytes() == content
@@ -2,6 +2,7 @@ import pytest
 import json
 from datetime import datetime
 from scraping.utils.product_scraping_utils.DataCleanerWoolworths import DataCleanerWoolworths
+from scraping.utils.product_scraping_utils.cleaner_benchmark import run_cleaner_benchmark, synthetic_payloads
 
 
 @pytest.fixture
@@ -130,3 +131,11 @@ class TestTransformProductAvailability:
         raw = {**RAW_PRODUCT, 'IsAvailable': False}
         result = cleaner._transform_product(raw)
         assert result['is_available'] is False
+
+
+class TestCleanerBenchmark:
+    def test_compiled_fields_match_get_value(self):
+        results = run_cleaner_benchmark(synthetic_payloads(50), repeat=1)
+
+        assert [r['company'] for r in results] == ['woolworths', 'coles']
+        assert all(r['same_result'] for r in results)
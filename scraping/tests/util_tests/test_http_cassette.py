@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from scraping.scrapers.product_scraper_woolworths import ProductScraperWoolworths
+from scraping.utils.product_scraping_utils.http_cassette import Cassette, RecordingTransport, ReplayTransport, request_key
+from scraping.utils.product_scraping_utils.scraper_benchmark import run_scraper_benchmark
+
+
+class _CountingHandler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        body = json.dumps({'path': self.path, 'hit': type(self).hits}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('X-Served-By', 'stub')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _CountingHandler.hits = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _CountingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def _session(transport):
+    session = requests.Session()
+    session.mount('http://', transport)
+    session.mount('https://', transport)
+    return session
+
+
+def test_request_key_ignores_query_order_but_not_body():
+    assert request_key('get', 'https://a.test/p?b=2&a=1') == request_key('GET', 'https://a.test/p?a=1&b=2')
+    assert request_key('POST', 'https://a.test/p', b'{"page": 1}') != request_key('POST', 'https://a.test/p', b'{"page": 2}')
+
+
+def test_recorded_responses_replay_offline(stub_server, tmp_path):
+    cassette = Cassette(tmp_path / 'cassettes' / 'test.jsonl.gz', metadata={'scraper': 'test'})
+    recording = _session(RecordingTransport(cassette))
+    recorded = [recording.get(f'{stub_server}/page', params={'n': 1, 'q': 'milk'}, timeout=5) for _ in range(2)]
+    cassette.save()
+
+    replayed_cassette = Cassette.load(cassette.path)
+    transport = ReplayTransport(replayed_cassette)
+    replaying = _session(transport)
+    replayed = [replaying.get(f'{stub_server}/page?q=milk&n=1', timeout=5) for _ in range(3)]
+
+    assert _CountingHandler.hits == 2
+    assert replayed_cassette.metadata == {'scraper': 'test'}
+    # Repeated requests get their responses back in order, then the last one again.
+    assert [r.json()['hit'] for r in replayed] == [1, 2, 2]
+    assert replayed[0].text == recorded[0].text
+    assert replayed[0].headers['X-Served-By'] == 'stub'
+    assert transport.replayed == 3
+
+
+def test_unrecorded_request_raises_connection_error(tmp_path):
+    transport = ReplayTransport(Cassette(tmp_path / 'empty.jsonl.gz'))
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        _session(transport).get('https://www.example.com/missing', timeout=5)
+    assert transport.missed == 1
+
+
+def test_replay_waits_for_latency(stub_server, tmp_path):
+    cassette = Cassette(tmp_path / 'test.jsonl.gz')
+    _session(RecordingTransport(cassette)).get(f'{stub_server}/page', timeout=5)
+
+    start = time.monotonic()
+    _session(ReplayTransport(cassette, latency=0.1)).get(f'{stub_server}/page', timeout=5)
+
+    assert time.monotonic() - start >= 0.1
+
+
+# ── the scraper benchmark ────────────────────────────────────────────────────
+
+CATEGORY = {'slug': 'milk', 'node_id': '1_A', 'category_path': ['Dairy', 'Milk']}
+
+
+def _woolworths_product(i):
+    return {
+        'Stockcode': 1000 + i, 'Name': f'Full Cream Milk {i}', 'Brand': 'Dairy Farmers', 'Barcode': None,
+        'PackageSize': f'{i}L', 'UrlFriendlyName': f'milk-{i}', 'Price': 3.2, 'WasPrice': None,
+        'CupString': '$1.60 per 1L', 'CupMeasure': '1L', 'AdditionalAttributes': {}, 'IsAvailable': True,
+    }
+
+
+def _record(cassette, method, url, payload, body):
+    request = requests.Request(method, url, json=payload).prepare()
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    response._content = json.dumps(body).encode()
+    cassette.record(request, response, 0.01)
+
+
+def _woolworths_cassette(path):
+    cassette = Cassette(path, metadata={'scraper': 'woolworths', 'store_id': '1147', 'categories': [CATEGORY]})
+    scraper = ProductScraperWoolworths(MagicMock(), 'Woolworths', '1147', 'Woolworths', '', categories_to_fetch=[])
+    _record(cassette, 'GET', 'https://www.woolworths.com.au/', None, {})
+    # Recorded from a concurrent scrape, so the batch of pages past the end is there too.
+    pages = [[_woolworths_product(1), _woolworths_product(2)], [_woolworths_product(3)], [], []]
+    for page_num, products in enumerate(pages, start=1):
+        payload = scraper._build_payload(CATEGORY['slug'], CATEGORY['node_id'], page_num)
+        _record(cassette, 'POST', ProductScraperWoolworths.API_URL, payload, {'Bundles': [{'Products': products}]})
+    cassette.save()
+    return cassette.path
+
+
+def test_benchmark_replays_a_recorded_scrape(tmp_path):
+    path = _woolworths_cassette(tmp_path / 'cassettes' / 'woolworths.jsonl.gz')
+
+    with patch('scraping.scrapers.base_product_scraper.BaseDataCleaner._load_translation_tables', return_value=({}, {})), \
+         patch('scraping.utils.product_scraping_utils.jsonl_writer.settings') as mock_settings:
+        mock_settings.BASE_DIR = str(tmp_path)
+        [result] = run_scraper_benchmark([path], command=MagicMock())
+
+    assert result['scraper'] == 'woolworths'
+    assert result['missed'] == 0
+    assert result['products'] == 3
+    assert result['products_per_second'] > 0
+    assert result['cpu_ms_per_product'] > 0
+    assert result['pages'] == 5
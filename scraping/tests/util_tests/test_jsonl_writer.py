@@ -1,8 +1,11 @@
 import pytest
+import gzip
 import json
 import os
+import zlib
 from unittest.mock import patch
-from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter
+from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter, file_sha256, read_manifest
+from scraping.utils.product_scraping_utils.jsonl_writer_benchmark import run_jsonl_writer_benchmark, synthetic_outbox_records
 
 
 @pytest.fixture
@@ -100,3 +103,76 @@ class TestJsonlWriterCleanup:
             writer.open()
         writer.cleanup()
         assert not os.path.exists(writer.temp_file_path)
+
+
+class TestJsonlWriterKeepPartial:
+    def test_flushed_lines_are_on_disk_before_close(self, writer):
+        writer.open()
+        writer.write_product({'normalized_name_brand_size': 'milk'}, {})
+        writer.flush()
+        with open(writer.temp_file_path, encoding='utf-8') as f:
+            assert len(f.readlines()) == 1
+        writer.close()
+
+    def test_keep_partial_sets_file_aside_and_cleanup_leaves_it(self, writer, tmp_path):
+        writer.open()
+        writer.write_product({'normalized_name_brand_size': 'milk'}, {})
+        partial_path = writer.keep_partial()
+        writer.cleanup()
+
+        assert partial_path.endswith('.partial')
+        assert os.path.exists(partial_path)
+        assert not os.path.exists(writer.temp_file_path)
+        assert not list((tmp_path / 'outbox').iterdir())
+
+
+class TestJsonlWriterCompressed:
+    @pytest.fixture
+    def compressed_writer(self, tmp_path):
+        with patch('scraping.utils.product_scraping_utils.jsonl_writer.settings') as mock_settings:
+            mock_settings.BASE_DIR = str(tmp_path)
+            return JsonlWriter('woolworths', 'store-001', 'nsw', final_outbox_path=str(tmp_path / 'outbox'), compress=True)
+
+    def test_commit_leaves_gzip_file_and_manifest_in_outbox(self, compressed_writer, tmp_path):
+        compressed_writer.open()
+        compressed_writer.write_product({'normalized_name_brand_size': 'milk', 'name': 'Milk ü'}, {'company': 'Woolworths'})
+        compressed_writer.write_product({'normalized_name_brand_size': 'bread'}, {'company': 'Woolworths'})
+        compressed_writer.commit()
+
+        committed = tmp_path / 'outbox' / os.path.basename(compressed_writer.temp_file_path)
+        assert committed.name.endswith('.jsonl.gz')
+        with gzip.open(committed, 'rt', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert [line['product']['normalized_name_brand_size'] for line in lines] == ['milk', 'bread']
+        assert lines[0]['product']['name'] == 'Milk ü'
+
+        manifest = read_manifest(str(committed))
+        assert manifest['products'] == 2
+        assert manifest['metadata'] == {'company': 'Woolworths'}
+        assert manifest['sha256'] == file_sha256(str(committed))
+
+    def test_flushed_products_can_be_read_back_from_a_partial_file(self, compressed_writer):
+        compressed_writer.open()
+        compressed_writer.write_product({'normalized_name_brand_size': 'milk'}, {})
+        compressed_writer.flush()
+
+        with open(compressed_writer.temp_file_path, 'rb') as f:
+            text = zlib.decompressobj(wbits=31).decompress(f.read())
+        assert json.loads(text)['product']['normalized_name_brand_size'] == 'milk'
+        compressed_writer.cleanup()
+
+    def test_products_orjson_cannot_encode_are_still_written(self, compressed_writer):
+        compressed_writer.open()
+        assert compressed_writer.write_product({'normalized_name_brand_size': 'milk', 'sizes': {1: '2L'}}, {})
+        compressed_writer.close()
+
+        with gzip.open(compressed_writer.temp_file_path, 'rt', encoding='utf-8') as f:
+            assert json.loads(f.readline())['product']['sizes'] == {'1': '2L'}
+
+
+def test_writer_benchmark_writes_the_same_lines():
+    results = run_jsonl_writer_benchmark(synthetic_outbox_records(200))
+
+    assert [r['run'] for r in results] == ['json.dump + upload gzip', 'compressed writer']
+    assert all(r['same_result'] for r in results)
+    assert results[1]['bytes_per_product'] < results[0]['bytes_per_product']
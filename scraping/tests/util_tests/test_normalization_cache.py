@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from scraping.utils.product_scraping_utils.DataCleanerWoolworths import DataCleanerWoolworths
+from scraping.utils.product_scraping_utils.normalization_cache import NormalizationCache, translation_tables_version
+from scraping.utils.product_scraping_utils.normalization_cache_benchmark import run_normalization_cache_benchmark, synthetic_store_products
+from scraping.utils.product_scraping_utils.product_normalizer import ProductNormalizer
+
+BRANDS = {'farmers dairy': 'dairy farmers'}
+PRODUCTS = {}
+MILK = {'name': 'Dairy Farmers Full Cream Milk 2L', 'brand': 'Farmers Dairy', 'size': '2L'}
+
+
+def _expected(product):
+    normalizer = ProductNormalizer(product, brand_translations=BRANDS, product_translations=PRODUCTS)
+    return normalizer.get_normalized_brand_name(), normalizer.standardized_sizes, normalizer.get_normalized_name_brand_size_string()
+
+
+def test_cached_result_matches_product_normalizer():
+    cache = NormalizationCache('v1')
+
+    first = cache.normalize(MILK, BRANDS, PRODUCTS)
+    second = cache.normalize(dict(MILK), BRANDS, PRODUCTS)
+
+    assert first == second == _expected(MILK)
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = NormalizationCache('v1', max_entries=2)
+    for size in ('1L', '2L', '3L'):
+        cache.normalize({**MILK, 'size': size}, BRANDS, PRODUCTS)
+
+    cache.normalize({**MILK, 'size': '1L'}, BRANDS, PRODUCTS)
+
+    assert cache.stats()['misses'] == 4
+
+
+def test_disk_tier_is_shared_by_later_runs(tmp_path):
+    path = tmp_path / 'cache.sqlite3'
+    first_run = NormalizationCache('v1', path=path)
+    first_run.normalize(MILK, BRANDS, PRODUCTS)
+    first_run.close()
+
+    next_run = NormalizationCache('v1', path=path)
+    result = next_run.normalize(MILK, BRANDS, PRODUCTS)
+
+    assert result == _expected(MILK)
+    assert next_run.stats()['misses'] == 0
+    assert next_run.stats()['loaded'] == 1
+
+
+def test_new_tables_version_starts_afresh(tmp_path):
+    path = tmp_path / 'cache.sqlite3'
+    old = NormalizationCache('v1', path=path)
+    old.normalize(MILK, BRANDS, PRODUCTS)
+    old.close()
+
+    new = NormalizationCache('v2', path=path)
+    new.normalize(MILK, {}, PRODUCTS)
+
+    assert new.stats()['misses'] == 1
+    assert translation_tables_version(BRANDS, PRODUCTS) != translation_tables_version({}, PRODUCTS)
+
+
+def test_cleaner_output_is_the_same_with_a_cache():
+    raw = [{
+        'Stockcode': 1, 'Name': 'Full Cream Milk', 'Brand': 'Farmers Dairy', 'PackageSize': '2L', 'Price': 3.1,
+        'Barcode': '9300601000011', 'AdditionalAttributes': {}, 'IsAvailable': True,
+    }] * 2
+    timestamp = datetime(2025, 6, 1)
+
+    def clean(cache):
+        return DataCleanerWoolworths(raw, 'Woolworths', 'Store', '1', 'nsw', timestamp, BRANDS, PRODUCTS, normalization_cache=cache).clean_data()
+
+    cache = NormalizationCache('v1')
+    assert clean(cache) == clean(None)
+    assert cache.stats()['hits'] == 1
+
+
+def test_benchmark_results_match_product_normalizer():
+    results = run_normalization_cache_benchmark(synthetic_store_products(200), BRANDS, PRODUCTS)
+
+    assert [r['run'] for r in results] == ['ProductNormalizer', 'cold cache', 'warm cache', 'next run (from disk)']
+    assert all(r['same_result'] for r in results)
+    assert results[2]['hit_rate'] == results[3]['hit_rate'] == 1.0
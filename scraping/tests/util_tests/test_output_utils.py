@@ -61,3 +61,22 @@ class TestScraperOutputFinalize:
     def test_finalize_writes_newline(self, output, command):
         output.finalize()
         command.stdout.write.assert_called()
+
+
+class TestScraperOutputReportRequestRate:
+    def test_reports_achieved_rate_and_throttling(self, output, command):
+        output.report_request_rate({
+            'requests': 120, 'throttled': 3, 'achieved_requests_per_second': 4.5,
+            'requests_per_second': 6.0, 'concurrency': 2,
+        })
+        call_args = command.stdout.write.call_args[0][0]
+        assert '120' in call_args
+        assert '4.50 req/s achieved' in call_args
+        assert '3 throttled' in call_args
+
+    def test_unlimited_rate(self, output, command):
+        output.report_request_rate({
+            'requests': 1, 'throttled': 0, 'achieved_requests_per_second': 0.0,
+            'requests_per_second': None, 'concurrency': 1,
+        })
+        assert 'unlimited' in command.stdout.write.call_args[0][0]
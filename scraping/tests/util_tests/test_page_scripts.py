@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from bs4 import BeautifulSoup
+
+from scraping.utils.product_scraping_utils import page_scripts
+from scraping.utils.product_scraping_utils.page_scripts import extract_ld_json, extract_next_data
+from scraping.utils.product_scraping_utils.page_scripts_benchmark import run_page_scripts_benchmark, synthetic_coles_page
+
+NEXT_DATA = json.dumps({'props': {'pageProps': {'initStoreId': '401', 'text': 'a < b && c > d'}}})
+LD_JSON = json.dumps({'@type': 'Product', 'gtin13': '9300000000001'})
+
+
+def _soup_next_data(html):
+    element = BeautifulSoup(html, 'html.parser').find('script', {'id': '__NEXT_DATA__'})
+    return element.string if element else None
+
+
+def _soup_ld_json(html):
+    scripts = BeautifulSoup(html, 'html.parser').find_all('script', {'type': 'application/ld+json'})
+    return [s.string for s in scripts if s.string]
+
+
+PAGES = [
+    f'<html><body><script id="__NEXT_DATA__" type="application/json">{NEXT_DATA}</script></body></html>',
+    f'<html><body><script type="application/json" id="__NEXT_DATA__" crossorigin>{NEXT_DATA}</script></body></html>',
+    f"<html><body><SCRIPT ID='__NEXT_DATA__'>{NEXT_DATA}</SCRIPT ></body></html>",
+    f'<html><body><script id=__NEXT_DATA__>{NEXT_DATA}</script></body></html>',
+    f'<html><body><script src="/a.js"></script><script id="__NEXT_DATA__"></script></body></html>',
+    '<html><body><script>window.__NEXT_DATA__ = {}</script></body></html>',
+    f'<html><body><script id="__NEXT_DATA__x">{NEXT_DATA}</script></body></html>',
+    '<html><body><p>No scripts here</p></body></html>',
+    f'<html><head><script type="application/ld+json">{LD_JSON}</script>'
+    f'<script type=\'application/ld+json\' nonce="x">[{LD_JSON}]</script>'
+    f'<script type="application/ld+json"></script></head></html>',
+    f'<html><head><script type="Application/LD+JSON">{LD_JSON}</script></head></html>',
+]
+
+
+@pytest.mark.parametrize('html', PAGES)
+def test_matches_beautifulsoup(html):
+    assert extract_next_data(html) == _soup_next_data(html)
+    assert extract_ld_json(html) == _soup_ld_json(html)
+
+
+def test_finds_scripts_without_building_a_soup(monkeypatch):
+    monkeypatch.setattr(page_scripts, 'BeautifulSoup', None)
+    html = synthetic_coles_page(products=2)
+
+    assert json.loads(extract_next_data(html))['props']['pageProps']['initStoreId'] == '401'
+    assert json.loads(extract_ld_json(html)[0])['@type'] == 'BreadcrumbList'
+
+
+def test_unclosed_script_falls_back_to_beautifulsoup():
+    html = f'<html><body><script id="__NEXT_DATA__">{NEXT_DATA}'
+
+    assert extract_next_data(html) == _soup_next_data(html)
+
+
+def test_benchmark_finds_the_same_scripts_as_beautifulsoup():
+    [result] = run_page_scripts_benchmark(repeat=1)
+
+    assert result['same_result']
+    assert result['soup_ms'] > 0
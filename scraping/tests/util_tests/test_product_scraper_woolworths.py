@@ -1,5 +1,12 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock
 
+import pytest
+import requests
+
 from scraping.scrapers.product_scraper_woolworths import ProductScraperWoolworths
 
 
@@ -40,3 +47,109 @@ def test_fetch_data_for_item_stamps_canonical_category_path():
             'category_path': ['Dairy, Eggs & Fridge', 'Yoghurt', 'Kefir'],
         },
     ]
+
+
+# ── concurrent fetching against a local stub server ──────────────────────────
+
+# Recorded browse API responses, keyed by (categoryId, pageNumber). Pages past the
+# end of a category return no bundles, as the real API does.
+RECORDED_RESPONSES = {
+    ('1_A', 1): {'Bundles': [{'Products': [{'Name': 'Milk 1L'}, {'Name': 'Milk 2L'}]}]},
+    ('1_A', 2): {'Bundles': [{'Products': [{'Name': 'Milk 3L'}]}, None]},
+    ('1_A', 3): {'Bundles': [{'Products': [{'Name': 'Milk 4L'}]}]},
+    ('1_B', 1): {'Bundles': [{'Products': [{'Name': 'Bread'}]}]},
+    ('1_D', 1): {'Bundles': [{'Products': [{'Name': 'Eggs'}]}]},
+    ('1_D', 2): {'Bundles': [{'Products': [{'Name': 'Eggs 12'}]}]},
+}
+
+CATEGORIES = [
+    {'slug': 'milk', 'node_id': '1_A', 'category_path': ['Dairy', 'Milk']},
+    {'slug': 'bread', 'node_id': '1_B', 'category_path': ['Bakery']},
+    {'slug': 'empty', 'node_id': '1_C', 'category_path': ['Empty']},
+    {'slug': 'eggs', 'node_id': '1_D', 'category_path': ['Dairy', 'Eggs']},
+]
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        # Slow enough that concurrent requests overlap.
+        time.sleep(0.02)
+        body = json.dumps(RECORDED_RESPONSES.get((payload['categoryId'], payload['pageNumber']), {'Bundles': []})).encode()
+        with cls.lock:
+            cls.in_flight -= 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _ReplayHandler.in_flight = _ReplayHandler.max_in_flight = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ReplayHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/apis/ui/browse/category'
+    server.shutdown()
+    server.server_close()
+
+
+def _stub_scraper(api_url, concurrency):
+    scraper = ProductScraperWoolworths(
+        command=MagicMock(), company='Woolworths', store_id='1147', store_name='Bass Hill',
+        state='nsw', categories_to_fetch=[], concurrency=concurrency, requests_per_second=None,
+    )
+    scraper.API_URL = api_url
+    scraper.session = requests.Session()
+    return scraper
+
+
+def _fetch_all(scraper):
+    handed_over = []
+
+    def handle(raw_data_list):
+        handed_over.append(raw_data_list)
+        return True
+
+    scraper.fetch_items(CATEGORIES, handle)
+    return handed_over
+
+
+def test_concurrent_fetch_matches_sequential_fetch(stub_server):
+    sequential = _fetch_all(_stub_scraper(stub_server, concurrency=1))
+    assert _ReplayHandler.max_in_flight == 1
+
+    _ReplayHandler.max_in_flight = 0
+    concurrent = _fetch_all(_stub_scraper(stub_server, concurrency=4))
+
+    assert _ReplayHandler.max_in_flight > 1
+    assert concurrent == sequential
+    assert [[p['Name'] for p in products] for products in concurrent] == [
+        ['Milk 1L', 'Milk 2L', 'Milk 3L', 'Milk 4L'],
+        ['Bread'],
+        [],
+        ['Eggs', 'Eggs 12'],
+    ]
+    assert concurrent[0][0]['category_path'] == ['Dairy', 'Milk']
+
+
+def test_concurrent_fetch_stops_when_handler_asks(stub_server):
+    scraper = _stub_scraper(stub_server, concurrency=4)
+    handed_over = []
+
+    scraper.fetch_items(CATEGORIES, lambda raw: handed_over.append(raw) or False)
+
+    assert len(handed_over) == 1
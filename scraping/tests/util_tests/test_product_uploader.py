@@ -1,8 +1,11 @@
 import pytest
 import json
-from requests.exceptions import RequestException
+import os
+import threading
 from unittest.mock import MagicMock, patch
+from scraping.utils.command_utils.chunked_uploader import ChunkedUploader, ChunkedUploadError
 from scraping.utils.command_utils.product_uploader import ProductUploader
+from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter, read_manifest, write_manifest
 
 
 @pytest.fixture
@@ -49,11 +52,9 @@ class TestProductUploaderLatestFileScan:
 
         uploaded_files = []
 
-        def mock_post(url, headers, files, timeout):
-            uploaded_files.append(files['file'][0])
-            resp = MagicMock()
-            resp.raise_for_status.return_value = None
-            return resp
+        def mock_upload(chunked_uploader, file_path, sha256, file_name=None):
+            uploaded_files.append(os.path.basename(file_path))
+            return True
 
         uploader = ProductUploader(command)
         with patch('scraping.utils.command_utils.product_uploader.settings') as ms:
@@ -61,7 +62,7 @@ class TestProductUploaderLatestFileScan:
             ms.PIPELINE_DATA_DIR = tmp_path / 'pipeline' / 'data'
             with patch.object(uploader, 'get_server_url', return_value='http://test.com'):
                 with patch.object(uploader, 'get_api_key', return_value='key'):
-                    with patch('scraping.utils.command_utils.product_uploader.requests.post', side_effect=mock_post):
+                    with patch.object(ChunkedUploader, 'upload', autospec=True, side_effect=mock_upload):
                         with patch('scraping.utils.command_utils.product_uploader.run_sanity_checks', return_value=[]):
                             uploader.run()
 
@@ -85,9 +86,79 @@ class TestProductUploaderLatestFileScan:
             ms.PIPELINE_DATA_DIR = tmp_path / 'pipeline' / 'data'
             with patch.object(uploader, 'get_server_url', return_value='http://test.com'):
                 with patch.object(uploader, 'get_api_key', return_value='key'):
-                    with patch('scraping.utils.command_utils.product_uploader.requests.post', side_effect=RequestException):
+                    with patch.object(ChunkedUploader, 'upload', side_effect=ChunkedUploadError('connection reset')):
                         with patch('scraping.utils.command_utils.product_uploader.run_sanity_checks', return_value=[]):
                             uploader.run()
 
         assert product_file.exists()
         assert not (archive / product_file.name).exists()
+
+
+class TestProductUploaderCompressedFiles:
+    def _run(self, command, tmp_path, upload):
+        uploader = ProductUploader(command)
+        with patch('scraping.utils.command_utils.product_uploader.settings') as ms:
+            ms.BASE_DIR = str(tmp_path)
+            ms.PIPELINE_DATA_DIR = tmp_path / 'pipeline' / 'data'
+            with patch.object(uploader, 'get_server_url', return_value='http://test.com'):
+                with patch.object(uploader, 'get_api_key', return_value='key'):
+                    with patch.object(ChunkedUploader, 'upload', autospec=True, side_effect=upload):
+                        uploader.run()
+
+    def _write_store_file(self, tmp_path):
+        outbox = tmp_path / 'pipeline' / 'data' / 'outboxes' / 'product_outbox'
+        with patch('scraping.utils.product_scraping_utils.jsonl_writer.settings') as mock_settings:
+            mock_settings.BASE_DIR = str(tmp_path)
+            writer = JsonlWriter('woolworths', 'store-001', 'nsw', final_outbox_path=str(outbox), compress=True)
+        writer.open()
+        writer.write_product(
+            {'name': 'Milk', 'price_current': 3.1, 'normalized_name_brand_size': 'milk'},
+            {'company_name': 'Woolworths', 'scraped_date': '2024-06-01'},
+        )
+        writer.commit()
+        return outbox / os.path.basename(writer.temp_file_path)
+
+    def test_compressed_file_is_sent_as_it_is_and_archived_with_its_manifest(self, command, tmp_path):
+        product_file = self._write_store_file(tmp_path)
+        written_bytes = product_file.read_bytes()
+        sent = []
+
+        def mock_upload(chunked_uploader, file_path, sha256, file_name=None):
+            with open(file_path, 'rb') as f:
+                sent.append((os.path.basename(file_path), f.read()))
+            return True
+
+        self._run(command, tmp_path, mock_upload)
+
+        assert sent == [(product_file.name, written_bytes)]
+        archive = tmp_path / 'pipeline' / 'data' / 'archive' / 'product_archive'
+        assert (archive / product_file.name).exists()
+        assert (archive / (product_file.name + '.manifest.json')).exists()
+        assert not list(product_file.parent.iterdir())
+
+    def test_file_that_does_not_match_its_manifest_is_not_sent(self, command, tmp_path):
+        product_file = self._write_store_file(tmp_path)
+        manifest = read_manifest(str(product_file))
+        write_manifest(str(product_file), {**manifest, 'sha256': '0' * 64})
+        upload = MagicMock()
+
+        self._run(command, tmp_path, upload)
+
+        upload.assert_not_called()
+        assert product_file.exists()
+
+    def test_files_of_several_companies_are_uploaded_at_the_same_time(self, command, tmp_path):
+        outbox = tmp_path / 'pipeline' / 'data' / 'outboxes' / 'product_outbox'
+        outbox.mkdir(parents=True)
+        for company in ('Coles', 'Woolworths', 'Aldi'):
+            (outbox / f'{company.lower()}-2024-06-01.jsonl').write_text(_make_jsonl_line(company, '2024-06-01'))
+        all_started = threading.Barrier(3, timeout=5)
+
+        def upload(chunked_uploader, file_path, sha256, file_name=None):
+            all_started.wait()  # Only returns once all three uploads are in flight
+            return True
+
+        with patch('scraping.utils.command_utils.product_uploader.run_sanity_checks', return_value=[]):
+            self._run(command, tmp_path, upload)
+
+        assert not list(outbox.iterdir())
@@ -0,0 +1,38 @@
+import json
+from scraping.utils.product_scraping_utils.progress_journal import ProgressJournal
+
+
+def test_entries_are_written_a_batch_at_a_time(tmp_path):
+    path = tmp_path / 'file.jsonl.progress'
+    journal = ProgressJournal(str(path), batch_size=3)
+
+    journal.record({'sku': 1})
+    journal.record({'sku': 2})
+    assert not path.exists()
+
+    journal.record({'sku': 3})
+    journal.record({'sku': 4})
+    assert [e['sku'] for e in journal.read()] == [1, 2, 3]
+
+    journal.close()
+    assert [e['sku'] for e in journal.read()] == [1, 2, 3, 4]
+
+
+def test_read_skips_a_line_cut_short_by_a_crash(tmp_path):
+    path = tmp_path / 'file.jsonl.progress'
+    path.write_text(json.dumps({'sku': 1}) + '\n{"sku": 2', encoding='utf-8')
+
+    assert ProgressJournal(str(path)).read() == [{'sku': 1}]
+
+
+def test_remove_drops_buffer_and_file(tmp_path):
+    path = tmp_path / 'file.jsonl.progress'
+    journal = ProgressJournal(str(path), batch_size=1)
+    journal.record({'sku': 1})
+    journal.batch_size = 10
+    journal.record({'sku': 2})
+
+    journal.remove()
+    journal.close()
+
+    assert not path.exists()
@@ -1,7 +1,10 @@
 import pytest
+import gzip
 import json
 import os
-from scraping.utils.command_utils.sanity_checker import _validate_product_fields, run_sanity_checks
+from unittest.mock import patch
+from scraping.utils.command_utils.sanity_checker import _validate_product_fields, check_jsonl_file, run_sanity_checks
+from scraping.utils.product_scraping_utils.jsonl_writer import file_sha256, read_manifest, write_manifest
 
 
 def _make_valid_product(name='Full Cream Milk', price=2.50, nnbs='cream full milk 2000ml'):
@@ -132,6 +135,18 @@ class TestRunSanityChecks:
         assert len(lines) == 1
         assert any('Duplicate' in e for e in errors)
 
+    def test_distinct_nnbs_are_kept_even_if_their_builtin_hashes_collide(self, tmp_path):
+        file_path = tmp_path / 'products.jsonl'
+        p1 = _make_valid_product(name='Milk A', nnbs='milk a')
+        p2 = _make_valid_product(name='Milk B', nnbs='milk b')
+        file_path.write_text(_make_jsonl_line(p1) + _make_jsonl_line(p2), encoding='utf-8')
+
+        with patch('builtins.hash', lambda value: 0):
+            errors = run_sanity_checks(str(file_path))
+
+        assert errors == []
+        assert len(file_path.read_text(encoding='utf-8').splitlines()) == 2
+
     def test_metadata_mismatch_line_removed(self, tmp_path):
         file_path = tmp_path / 'products.jsonl'
         meta1 = {'company_name': 'Woolworths'}
@@ -156,3 +171,60 @@ class TestRunSanityChecks:
         errors = run_sanity_checks(str(tmp_path / 'nonexistent.jsonl'))
         assert len(errors) > 0
         assert any('File Error' in e for e in errors)
+
+    def test_compressed_file_is_sanitized_and_its_manifest_updated(self, tmp_path):
+        f = tmp_path / 'test.jsonl.gz'
+        with gzip.open(f, 'wt', encoding='utf-8') as out:
+            out.write(_make_jsonl_line(_make_valid_product(name='Donation Box', nnbs='donation')))
+            out.write(_make_jsonl_line(_make_valid_product()))
+        write_manifest(str(f), {'products': 2, 'metadata': {'company_name': 'Woolworths'}, 'sha256': 'stale', 'bytes': 0})
+
+        run_sanity_checks(str(f))
+
+        with gzip.open(f, 'rt', encoding='utf-8') as written:
+            assert len(written.readlines()) == 1
+        manifest = read_manifest(str(f))
+        assert manifest['products'] == 1
+        assert manifest['sha256'] == file_sha256(str(f))
+
+
+class TestCheckJsonlFile:
+    def test_valid_file_is_not_rewritten(self, tmp_path):
+        file_path = tmp_path / 'products.jsonl'
+        file_path.write_text(_make_jsonl_line(_make_valid_product()), encoding='utf-8')
+        inode = os.stat(file_path).st_ino
+
+        report = check_jsonl_file(str(file_path))
+
+        assert (report['lines'], report['kept'], report['removed']) == (1, 1, 0)
+        assert os.stat(file_path).st_ino == inode
+        assert os.listdir(tmp_path) == ['products.jsonl']
+
+    def test_kept_lines_before_and_after_a_removed_line_stay_in_order(self, tmp_path):
+        file_path = tmp_path / 'products.jsonl'
+        lines = [
+            _make_jsonl_line(_make_valid_product(name='A', nnbs='a')),
+            _make_jsonl_line(_make_valid_product(name='B', nnbs='b')),
+            'NOT JSON\n',
+            _make_jsonl_line(_make_valid_product(name='C', nnbs='a')),
+            _make_jsonl_line(_make_valid_product(name='D', nnbs='d')),
+        ]
+        file_path.write_text(''.join(lines), encoding='utf-8')
+
+        report = check_jsonl_file(str(file_path))
+
+        assert file_path.read_text(encoding='utf-8') == lines[0] + lines[1] + lines[4]
+        assert report['removed'] == 2
+        assert report['rule_counts'] == {'invalid_json': 1, 'duplicate_nnbs': 1}
+        assert os.listdir(tmp_path) == ['products.jsonl']
+
+    def test_errors_past_the_limit_are_only_counted(self, tmp_path):
+        file_path = tmp_path / 'products.jsonl'
+        file_path.write_text('NOT JSON\n' * 5, encoding='utf-8')
+
+        with patch('scraping.utils.command_utils.sanity_checker.MAX_ERROR_MESSAGES', 2):
+            errors = run_sanity_checks(str(file_path))
+
+        assert errors[0] == 'File sanitized. Removed 5 invalid lines (invalid_json: 5).'
+        assert errors[-1] == '... and 3 more errors.'
+        assert len(errors) == 4
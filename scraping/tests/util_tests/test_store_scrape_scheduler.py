@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from scraping.utils.store_scrape_scheduler import StoreScrapeScheduler, load_store_list
+
+
+@pytest.fixture
+def command():
+    return MagicMock()
+
+
+def _store(company, store_id):
+    return {'company': company, 'store_id': store_id, 'store_name': f'{company} {store_id}', 'state': 'NSW'}
+
+
+def test_load_store_list_reads_json_and_jsonl(tmp_path):
+    json_path = tmp_path / 'stores.json'
+    json_path.write_text(json.dumps([{'company': 'Woolworths', 'store_id': 1147}]))
+    jsonl_path = tmp_path / 'stores.jsonl'
+    jsonl_path.write_text('{"company": "aldi", "store_id": "G102", "store_name": "Aldi Ultimo"}\n\n')
+
+    [woolworths] = load_store_list(json_path)
+    [aldi] = load_store_list(jsonl_path)
+
+    assert woolworths == {'company': 'woolworths', 'store_id': '1147', 'store_name': 'Woolworths 1147', 'state': ''}
+    assert aldi['store_name'] == 'Aldi Ultimo'
+
+
+def test_load_store_list_rejects_unknown_company(tmp_path):
+    path = tmp_path / 'stores.json'
+    path.write_text(json.dumps([{'company': 'iga', 'store_id': '1'}]))
+
+    with pytest.raises(ValueError):
+        load_store_list(path)
+
+
+def test_stores_run_concurrently_within_company_caps(command):
+    lock = threading.Lock()
+    running = {'woolworths': 0, 'coles': 0}
+    peak = {'woolworths': 0, 'coles': 0, 'total': 0}
+
+    def scrape_store(store):
+        company = store['company']
+        with lock:
+            running[company] += 1
+            peak[company] = max(peak[company], running[company])
+            peak['total'] = max(peak['total'], sum(running.values()))
+        time.sleep(0.05)
+        with lock:
+            running[company] -= 1
+        return SimpleNamespace(output=SimpleNamespace(new_products=10, duplicate_products=1))
+
+    stores = [_store('woolworths', str(i)) for i in range(6)] + [_store('coles', f'COL:{i}') for i in range(3)]
+    scheduler = StoreScrapeScheduler(command, scrape_store, {'woolworths': 3})
+    results = scheduler.run(stores)
+
+    assert len(results) == 9
+    assert sum(r['products'] for r in results) == 99
+    assert peak['woolworths'] == 3
+    assert peak['coles'] == 1
+    assert peak['total'] == 4
+
+
+def test_coles_is_never_scraped_concurrently(command):
+    scheduler = StoreScrapeScheduler(command, MagicMock(), {'coles': 4})
+
+    assert scheduler.company_concurrency['coles'] == 1
+
+
+def test_failed_store_is_reported_and_the_rest_carry_on(command):
+    def scrape_store(store):
+        if store['store_id'] == 'bad':
+            raise InterruptedError('Session appears to be blocked by CAPTCHA.')
+        return SimpleNamespace(output=SimpleNamespace(new_products=5, duplicate_products=0))
+
+    scheduler = StoreScrapeScheduler(command, scrape_store)
+    results = scheduler.run([_store('coles', 'bad'), _store('coles', 'good')])
+    scheduler.write_report()
+
+    by_id = {r['store']['store_id']: r for r in results}
+    assert by_id['bad']['error'].startswith('InterruptedError')
+    assert by_id['good']['products'] == 5
+    output = ' '.join(str(call.args[0]) for call in command.stdout.write.call_args_list)
+    assert 'products/sec' in output
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import time
+import requests
+
+# Bytes sent per request. Small enough that a retry is cheap on a slow link.
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """An upload that could not be finished, even after retrying."""
+
+
+class ChunkedUploader:
+    """
+    Sends a compressed file to a BaseChunkedFileUploadView in CHUNK_SIZE pieces. The
+    server is asked first which chunks it already holds for the file's sha256, so a
+    file it has already received is skipped and an interrupted upload is resumed
+    rather than restarted. Each request is retried up to `max_attempts` times, waiting
+    `retry_backoff` seconds and doubling it after each failure.
+    """
+    max_attempts = 5
+    retry_backoff = 1.0
+    timeout = 60
+
+    def __init__(self, upload_url: str, headers: dict, chunk_size: int = CHUNK_SIZE, session: requests.Session = None):
+        self.upload_url = upload_url.rstrip('/') + '/'
+        self.headers = headers
+        self.chunk_size = chunk_size
+        self.session = session or requests.Session()
+
+    def _request(self, method: str, url: str, retry_statuses=(), **kwargs) -> requests.Response:
+        """Sends a request, retrying on connection errors, 5xx/429 responses and `retry_statuses`."""
+        headers = {**self.headers, **kwargs.pop('extra_headers', {})}
+        delay = self.retry_backoff
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+                if response.status_code < 500 and response.status_code != 429 and response.status_code not in retry_statuses:
+                    return response
+                failure = f"HTTP {response.status_code}"
+            except requests.exceptions.RequestException as e:
+                failure = str(e)
+            if attempt < self.max_attempts:
+                time.sleep(delay)
+                delay *= 2
+        raise ChunkedUploadError(f"{method} {url} failed after {self.max_attempts} attempts: {failure}")
+
+    def _send_chunk(self, upload_id: str, file_path: str, index: int):
+        with open(file_path, 'rb') as f:
+            f.seek(index * self.chunk_size)
+            chunk = f.read(self.chunk_size)
+        response = self._request(
+            'PUT', f"{self.upload_url}{upload_id}/{index}/", retry_statuses=(400,), data=chunk,
+            extra_headers={'Content-Type': 'application/octet-stream', 'X-Chunk-SHA256': hashlib.sha256(chunk).hexdigest()},
+        )
+        if response.status_code != 201:
+            raise ChunkedUploadError(f"Chunk {index} of {os.path.basename(file_path)} was refused: HTTP {response.status_code}")
+
+    def upload(self, file_path: str, sha256: str, file_name: str = None) -> bool:
+        """
+        Uploads the file under `file_name` (its own name by default). Returns False if the
+        server already had it, True once it has been sent. Raises ChunkedUploadError.
+        """
+        file_name = file_name or os.path.basename(file_path)
+        size = os.path.getsize(file_path)
+        start = {'file_name': file_name, 'sha256': sha256, 'size': size, 'chunk_size': self.chunk_size}
+
+        for _ in range(self.max_attempts):
+            response = self._request('POST', self.upload_url, json=start)
+            if response.status_code != 200:
+                raise ChunkedUploadError(f"Upload of {file_name} was refused: HTTP {response.status_code} {response.text[:200]}")
+            progress = response.json()
+            if progress.get('status') in ('complete', 'processing'):
+                return False
+
+            received = set(progress.get('received') or [])
+            for index in range(progress['chunks']):
+                if index not in received:
+                    self._send_chunk(sha256, file_path, index)
+
+            response = self._request('POST', f"{self.upload_url}{sha256}/")
+            if response.status_code in (200, 201, 202):
+                return True
+            if response.status_code not in (400, 404, 409):
+                raise ChunkedUploadError(f"Upload of {file_name} could not be completed: HTTP {response.status_code} {response.text[:200]}")
+            # Chunks went missing or the joined file didn't match; ask again what is there.
+        raise ChunkedUploadError(f"Upload of {file_name} could not be completed after {self.max_attempts} attempts.")
@@ -1,17 +1,23 @@
 import os
 import gzip
 import json
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from django.conf import settings
 from .base_uploader import BaseUploader
+from .chunked_uploader import ChunkedUploader, ChunkedUploadError
 from scraping.utils.command_utils.sanity_checker import run_sanity_checks
+from scraping.utils.product_scraping_utils.jsonl_writer import file_sha256, manifest_path, read_manifest
 
 class ProductUploader(BaseUploader):
-    def __init__(self, command, dev=False):
+    # Files sent at the same time, each in its own chunked upload.
+    DEFAULT_FILES_AT_ONCE = 3
+
+    def __init__(self, command, dev=False, files_at_once=None):
         super().__init__(command, dev)
         self.outbox_path_name = 'product_outbox'
-        self.upload_url_path = '/api/upload/products/'
+        self.upload_url_path = '/api/upload/products/chunked/'
+        self.files_at_once = files_at_once or self.DEFAULT_FILES_AT_ONCE
 
     def run(self):
         outbox_path = os.fspath(settings.PIPELINE_DATA_DIR / 'outboxes' / self.outbox_path_name)
@@ -27,7 +33,7 @@ class ProductUploader(BaseUploader):
         upload_url = f"{server_url.rstrip('/')}/{self.upload_url_path.lstrip('/')}"
         headers = {'X-Internal-API-Key': api_key}
 
-        all_files = [f for f in os.listdir(outbox_path) if f.endswith('.jsonl')]
+        all_files = [f for f in os.listdir(outbox_path) if f.endswith(('.jsonl', '.jsonl.gz'))]
         total_files = len(all_files)
 
         if not total_files:
@@ -43,14 +49,11 @@ class ProductUploader(BaseUploader):
         for file_name in all_files:
             file_path = os.path.join(outbox_path, file_name)
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    first_line = f.readline()
-                    if not first_line:
-                        files_skipped_during_scan.add(file_name)
-                        continue
-                    data = json.loads(first_line)
-                
-                metadata = data.get('metadata', {})
+                metadata = self._read_file_metadata(file_path)
+                if metadata is None:
+                    files_skipped_during_scan.add(file_name)
+                    continue
+
                 company_name = metadata.get('company') or metadata.get('company_name')
                 scraped_date_str = metadata.get('scraped_date')
 
@@ -65,7 +68,7 @@ class ProductUploader(BaseUploader):
                         'file_name': file_name,
                         'scraped_date': scraped_date
                     }
-            except (json.JSONDecodeError, IOError):
+            except (json.JSONDecodeError, IOError, EOFError):
                 files_with_scan_error.add(file_name)
                 continue
 
@@ -73,7 +76,7 @@ class ProductUploader(BaseUploader):
         files_to_upload_count = len(files_to_upload)
         self.command.stdout.write(f"Scan complete. Found {files_to_upload_count} files to upload.")
 
-        # --- Stage 2: Process files ---
+        # --- Stage 2: Archive outdated files, upload the latest ones ---
         uploaded_count = 0
         archived_count = 0
         error_count = len(files_with_scan_error)
@@ -85,51 +88,84 @@ class ProductUploader(BaseUploader):
         print_progress()
 
         for file_name in all_files:
-            file_path = os.path.join(outbox_path, file_name)
-            archive_file_path = os.path.join(archive_path, file_name)
-
-            if file_name in files_with_scan_error or file_name in files_skipped_during_scan:
-                os.replace(file_path, archive_file_path)
+            if file_name not in files_to_upload:
+                self._archive(os.path.join(outbox_path, file_name), os.path.join(archive_path, file_name))
                 archived_count += 1
                 print_progress()
-                continue
 
-            if file_name in files_to_upload:
-                run_sanity_checks(file_path)
-                
-                compressed_file_path = file_path + '.gz'
-                has_error = False
-                uploaded_successfully = False
-
-                try:
-                    with open(file_path, 'rb') as f_in, gzip.open(compressed_file_path, 'wb') as f_out:
-                        f_out.writelines(f_in)
-                except Exception:
-                    error_count += 1
-                    has_error = True
-
-                if not has_error:
-                    try:
-                        with open(compressed_file_path, 'rb') as f:
-                            files = {'file': (os.path.basename(compressed_file_path), f)}
-                            response = requests.post(upload_url, headers=headers, files=files, timeout=120)
-                            response.raise_for_status()
-                        uploaded_count += 1
-                        uploaded_successfully = True
-                    except requests.exceptions.RequestException:
-                        error_count += 1
-                
-                if os.path.exists(compressed_file_path):
-                    os.remove(compressed_file_path)
-                if uploaded_successfully:
-                    os.replace(file_path, archive_file_path)
+        with ThreadPoolExecutor(max_workers=self.files_at_once) as executor:
+            futures = {
+                executor.submit(self._upload_file, os.path.join(outbox_path, file_name), upload_url, headers): file_name
+                for file_name in sorted(files_to_upload)
+            }
+            for future in as_completed(futures):
+                file_name = futures[future]
+                if future.result():
+                    uploaded_count += 1
+                    self._archive(os.path.join(outbox_path, file_name), os.path.join(archive_path, file_name))
                     archived_count += 1
-
-            else: # Archive outdated files
-                os.replace(file_path, archive_file_path)
-                archived_count += 1
-            
-            print_progress()
+                else:
+                    error_count += 1
+                print_progress()
 
         self.command.stdout.write("") # Final newline
         self.command.stdout.write("Processing complete.")
+
+    def _upload_file(self, file_path, upload_url, headers) -> bool:
+        """
+        Sanity checks one file and sends it through a ChunkedUploader, gzipping a plain
+        .jsonl first. Returns True once the server has the file (including when it
+        already had it), False if it could not be sent.
+        """
+        run_sanity_checks(file_path)
+
+        if file_path.endswith('.gz'):
+            # Written compressed by JsonlWriter; sent as it is once it matches its manifest.
+            compressed_file_path = file_path
+        else:
+            compressed_file_path = file_path + '.gz'
+            try:
+                # No time in the header, so the same file always has the same hash.
+                with open(file_path, 'rb') as f_in, open(compressed_file_path, 'wb') as raw_out, \
+                        gzip.GzipFile(filename='', mode='wb', fileobj=raw_out, mtime=0) as f_out:
+                    f_out.writelines(f_in)
+            except Exception:
+                return False
+
+        try:
+            sha256 = file_sha256(compressed_file_path)
+            manifest = read_manifest(file_path) if compressed_file_path == file_path else None
+            if manifest and manifest.get('sha256') and manifest['sha256'] != sha256:
+                return False
+            uploader = ChunkedUploader(upload_url, headers)
+            uploader.upload(compressed_file_path, sha256)
+            return True
+        except (ChunkedUploadError, IOError):
+            return False
+        finally:
+            if compressed_file_path != file_path and os.path.exists(compressed_file_path):
+                os.remove(compressed_file_path)
+
+    def _read_file_metadata(self, file_path):
+        """
+        Returns the metadata of a file's first product, or None if it is empty. A
+        compressed file's manifest holds it, so the file itself is only opened if the
+        manifest is missing.
+        """
+        if file_path.endswith('.gz'):
+            manifest = read_manifest(file_path)
+            if manifest is not None:
+                return (manifest.get('metadata') or {}) if manifest.get('products') else None
+            opener = gzip.open
+        else:
+            opener = open
+        with opener(file_path, 'rt', encoding='utf-8') as f:
+            first_line = f.readline()
+        if not first_line:
+            return None
+        return json.loads(first_line).get('metadata', {})
+
+    def _archive(self, file_path, archive_file_path):
+        os.replace(file_path, archive_file_path)
+        if os.path.exists(manifest_path(file_path)):
+            os.replace(manifest_path(file_path), manifest_path(archive_file_path))
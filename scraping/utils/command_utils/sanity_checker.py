@@ -1,13 +1,43 @@
+import gzip
+import hashlib
 import json
 import os
 import re
+from collections import Counter
 from decimal import Decimal, InvalidOperation
+from scraping.utils.product_scraping_utils.jsonl_writer import COMPRESS_LEVEL, file_sha256, read_manifest, write_manifest
+
+# Error messages kept in full; past this, errors are only counted per rule.
+MAX_ERROR_MESSAGES = 200
+
+BARCODE_PATTERN = re.compile(r'^\d{8,18}$')
 
 def _metadata_company(metadata: dict):
     return metadata.get('company') or metadata.get('company_name')
 
-def _validate_product_fields(product: dict, line_number: int) -> list:
-    """Helper function to validate fields within a single product dictionary."""
+def _open_jsonl(file_path: str, mode: str, compressed: bool = None):
+    """Opens a .jsonl file, or a .jsonl.gz written by JsonlWriter, as text."""
+    if compressed is None:
+        compressed = file_path.endswith('.gz')
+    if compressed:
+        return gzip.open(file_path, mode + 't', encoding='utf-8', compresslevel=COMPRESS_LEVEL)
+    return open(file_path, mode, encoding='utf-8')
+
+def _refresh_manifest(file_path: str, product_count: int, first_metadata):
+    """Brings a sanitized file's manifest, if it has one, back in line with the file."""
+    manifest = read_manifest(file_path)
+    if manifest is None:
+        return
+    manifest.update({
+        'products': product_count,
+        'metadata': first_metadata,
+        'sha256': file_sha256(file_path),
+        'bytes': os.path.getsize(file_path),
+    })
+    write_manifest(file_path, manifest)
+
+def _product_field_errors(product: dict, line_number: int) -> list:
+    """Validates the fields of a single product dictionary, returning (rule, message) pairs."""
     errors = []
     nnbs = product.get('normalized_name_brand_size', 'N/A')
 
@@ -15,7 +45,7 @@ def _validate_product_fields(product: dict, line_number: int) -> list:
     required_fields = ['name', 'price_current', 'normalized_name_brand_size']
     for field in required_fields:
         if product.get(field) in [None, ""]:
-            errors.append(f"L{line_number} (Product: {nnbs}): Required field '{field}' is missing or empty.")
+            errors.append(('required_field', f"L{line_number} (Product: {nnbs}): Required field '{field}' is missing or empty."))
 
     # 2. String Length Checks
     length_checks = {
@@ -27,7 +57,7 @@ def _validate_product_fields(product: dict, line_number: int) -> list:
     for field, max_len in length_checks.items():
         value = product.get(field)
         if value and isinstance(value, str) and len(value) > max_len:
-            errors.append(f"L{line_number} (Product: {nnbs}): Field '{field}' exceeds max length of {max_len}. Value: '{value[:30]}...'")
+            errors.append(('field_too_long', f"L{line_number} (Product: {nnbs}): Field '{field}' exceeds max length of {max_len}. Value: '{value[:30]}...'"))
 
     # 3. Price Sanity and Precision Checks
     price_fields = ['price_current', 'price_was', 'unit_price']
@@ -40,114 +70,150 @@ def _validate_product_fields(product: dict, line_number: int) -> list:
             # Custom range check based on field
             if field == 'unit_price':
                 if price_val < 0: # Only check for non-negative
-                    errors.append(f"L{line_number} (Product: {nnbs}): Field '{field}' is negative: {price_val}")
+                    errors.append(('negative_price', f"L{line_number} (Product: {nnbs}): Field '{field}' is negative: {price_val}"))
             if price_val.as_tuple().exponent < -2:
                 # If it has more than 2 decimal places
                 if price_val.as_tuple().exponent < -10: # More than 10 decimal places, treat as error
-                    errors.append(f"L{line_number} (Product: {nnbs}): Field '{field}' has excessive decimal places (>10): {price_val}")
+                    errors.append(('excessive_decimals', f"L{line_number} (Product: {nnbs}): Field '{field}' has excessive decimal places (>10): {price_val}"))
                 else:
                     # Round to 2 decimal places
                     rounded_price = price_val.quantize(Decimal('0.01'))
                     if rounded_price != price_val: # Only update if rounding actually changed the value
                         product[field] = str(rounded_price) # Update the product dictionary
-                        # Optionally, log a warning that it was rounded, but don't add to 'errors'
-                        # self.command.stdout.write(f"L{line_number} (Product: {nnbs}): Field '{field}' rounded from {price_val} to {rounded_price}")
         except InvalidOperation:
-            errors.append(f"L{line_number} (Product: {nnbs}): Field '{field}' is not a valid number: '{price_str}'")
+            errors.append(('invalid_number', f"L{line_number} (Product: {nnbs}): Field '{field}' is not a valid number: '{price_str}'"))
 
     # 4. Barcode Format Check
     barcode = product.get('barcode')
-    if barcode and not re.match(r'^\d{8,18}$', str(barcode)):
-        errors.append(f"L{line_number} (Product: {nnbs}): 'barcode' has invalid format (must be 8-18 digits): '{barcode}'")
-        
+    if barcode and not BARCODE_PATTERN.match(str(barcode)):
+        errors.append(('invalid_barcode', f"L{line_number} (Product: {nnbs}): 'barcode' has invalid format (must be 8-18 digits): '{barcode}'"))
+
     return errors
 
-def run_sanity_checks(file_path: str) -> list:
-    """
-    Reads a .jsonl file, performs sanity checks, and overwrites the file with only the valid lines.
-    Returns a list of error strings found.
-    """
-    all_errors = []
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_lines = f.readlines()
-    except IOError as e:
-        return [f"File Error: Could not read file. Reason: {e}"]
+def _validate_product_fields(product: dict, line_number: int) -> list:
+    """Helper function to validate fields within a single product dictionary."""
+    return [message for _, message in _product_field_errors(product, line_number)]
 
-    if not original_lines:
-        return []
+def _line_errors(line: str, line_number: int):
+    """Returns the parsed line (or None if it is not JSON) and the (rule, message) errors of its own content."""
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None, [('invalid_json', f"L{line_number}: Invalid JSON format.")]
 
-    valid_lines_data = []
-    
-    # Pass 1: Perform all per-line validation
-    for i, line in enumerate(original_lines):
-        line_number = i + 1
-        line_errors = []
-        
-        try:
-            data = json.loads(line)
-            if 'metadata' not in data:
-                line_errors.append(f"L{line_number}: Line is missing 'metadata' key.")
-            
-            product = data.get('product')
-            if not product:
-                line_errors.append(f"L{line_number}: Line is missing 'product' key.")
-            else:
-                if 'donation' in product.get('name', '').lower():
-                    line_errors.append(f"L{line_number}: Product name contains 'donation', removing line.")
-                else:
-                    line_errors.extend(_validate_product_fields(product, line_number))
-        except json.JSONDecodeError:
-            line_errors.append(f"L{line_number}: Invalid JSON format.")
-        
-        if line_errors:
-            all_errors.extend(line_errors)
-            valid_lines_data.append({'line_number': line_number, 'is_valid': False, 'data': None, 'original_line': None})
-        else:
-            valid_lines_data.append({'line_number': line_number, 'is_valid': True, 'data': data, 'original_line': line})
-
-    # Pass 2: Perform file-wide consistency and uniqueness checks
-    final_valid_lines = []
+    errors = []
+    if 'metadata' not in data:
+        errors.append(('missing_metadata', f"L{line_number}: Line is missing 'metadata' key."))
+
+    product = data.get('product')
+    if not product:
+        errors.append(('missing_product', f"L{line_number}: Line is missing 'product' key."))
+    elif 'donation' in product.get('name', '').lower():
+        errors.append(('donation', f"L{line_number}: Product name contains 'donation', removing line."))
+    else:
+        errors.extend(_product_field_errors(product, line_number))
+    return data, errors
+
+def check_jsonl_file(file_path: str) -> dict:
+    """
+    Checks a .jsonl (or .jsonl.gz) product file in one pass, a line at a time. Lines are
+    checked on their own (JSON, metadata, required fields, lengths, prices, barcode),
+    then against the lines kept before them (same company as the first, first
+    occurrence of each normalized_name_brand_size). Lines that fail are dropped.
+
+    Nothing is written while every line passes. From the first failing line on, the
+    lines kept are written to a temp file next to the original (the valid lines before
+    it are copied over first), which replaces the original once the pass is done, and
+    the file's manifest, if it has one, is updated.
+
+    Memory does not grow with the file, apart from one 16-byte blake2b digest per
+    product for spotting duplicates. Returns the numbers of lines read, kept and removed, the count of
+    errors per rule, and the first MAX_ERROR_MESSAGES error messages.
+    """
+    report = {'lines': 0, 'kept': 0, 'removed': 0, 'rule_counts': Counter(), 'errors': []}
+    temp_path = file_path + '.sanitizing'
     seen_nnbs = set()
     first_metadata = None
+    first_kept_metadata = None
+    out = None
 
-    for line_info in valid_lines_data:
-        if not line_info['is_valid']:
-            continue
+    def record(rule, message):
+        report['rule_counts'][rule] += 1
+        if len(report['errors']) < MAX_ERROR_MESSAGES:
+            report['errors'].append(message)
 
-        is_line_still_valid = True
-        data = line_info['data']
-        product = data['product']
-        metadata = data.get('metadata')
-        line_number = line_info['line_number']
-        nnbs = product.get('normalized_name_brand_size')
-
-        # Metadata consistency
-        if first_metadata is None and metadata:
-            first_metadata = metadata
-        elif metadata and _metadata_company(metadata) != _metadata_company(first_metadata):
-            all_errors.append(f"L{line_number}: Metadata mismatch. Inconsistent 'company'.")
-            is_line_still_valid = False
-
-        # Uniqueness check for normalized_name_brand_size ONLY
-        if nnbs:
-            if nnbs in seen_nnbs:
-                all_errors.append(f"L{line_number}: Duplicate 'normalized_name_brand_size' (keeping first occurrence): {nnbs}")
-                is_line_still_valid = False
-            else:
-                seen_nnbs.add(nnbs)
-
-        if is_line_still_valid:
-            final_valid_lines.append(line_info['original_line'])
-
-    # Pass 3: Overwrite the original file if any lines were removed
-    if len(final_valid_lines) < len(original_lines):
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.writelines(final_valid_lines)
-            all_errors.insert(0, f"File sanitized. Removed {len(original_lines) - len(final_valid_lines)} invalid lines.")
-        except IOError as e:
-            all_errors.insert(0, f"CRITICAL: Could not write sanitized file. Reason: {e}")
+    try:
+        with _open_jsonl(file_path, 'r') as f:
+            for line_number, line in enumerate(f, start=1):
+                report['lines'] = line_number
+                data, errors = _line_errors(line, line_number)
+
+                if not errors:
+                    metadata = data.get('metadata')
+                    nnbs = data['product'].get('normalized_name_brand_size')
+
+                    # Metadata consistency
+                    if first_metadata is None and metadata:
+                        first_metadata = metadata
+                    elif metadata and _metadata_company(metadata) != _metadata_company(first_metadata):
+                        errors.append(('company_mismatch', f"L{line_number}: Metadata mismatch. Inconsistent 'company'."))
+
+                    # Uniqueness check for normalized_name_brand_size ONLY
+                    if nnbs:
+                        # A 16-byte digest: small, stable across runs, and no realistic collisions.
+                        nnbs_digest = hashlib.blake2b(nnbs.encode('utf-8'), digest_size=16).digest()
+                        if nnbs_digest in seen_nnbs:
+                            errors.append(('duplicate_nnbs', f"L{line_number}: Duplicate 'normalized_name_brand_size' (keeping first occurrence): {nnbs}"))
+                        else:
+                            seen_nnbs.add(nnbs_digest)
+
+                if errors:
+                    for rule, message in errors:
+                        record(rule, message)
+                    report['removed'] += 1
+                    if out is None:
+                        out = _open_jsonl(temp_path, 'w', compressed=file_path.endswith('.gz'))
+                        _copy_first_lines(file_path, out, report['kept'])
+                    continue
+
+                report['kept'] += 1
+                if first_kept_metadata is None:
+                    first_kept_metadata = metadata
+                if out is not None:
+                    out.write(line)
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(temp_path)
+        raise
+
+    if out is not None:
+        out.close()
+        os.replace(temp_path, file_path)
+        _refresh_manifest(file_path, report['kept'], first_kept_metadata)
+    return report
+
+def _copy_first_lines(file_path: str, out, count: int):
+    with _open_jsonl(file_path, 'r') as f:
+        for line_number, line in enumerate(f, start=1):
+            if line_number > count:
+                break
+            out.write(line)
+
+def run_sanity_checks(file_path: str) -> list:
+    """
+    Sanity checks a .jsonl (or .jsonl.gz) file with check_jsonl_file(), removing the
+    invalid lines. Returns a list of error strings found.
+    """
+    try:
+        report = check_jsonl_file(file_path)
+    except (IOError, EOFError) as e:
+        return [f"File Error: Could not read file. Reason: {e}"]
 
+    all_errors = list(report['errors'])
+    if sum(report['rule_counts'].values()) > len(all_errors):
+        all_errors.append(f"... and {sum(report['rule_counts'].values()) - len(all_errors)} more errors.")
+    if report['removed']:
+        by_rule = ', '.join(f"{rule}: {count}" for rule, count in report['rule_counts'].most_common())
+        all_errors.insert(0, f"File sanitized. Removed {report['removed']} invalid lines ({by_rule}).")
     return all_errors
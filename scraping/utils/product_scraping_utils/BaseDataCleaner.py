@@ -7,14 +7,21 @@ from scraping.utils.product_scraping_utils.product_normalizer import ProductNorm
 from scraping.utils.product_scraping_utils.price_normalizer import PriceNormalizer
 from scraping.utils.product_scraping_utils.price_hasher import generate_price_hash
 from .wrap_cleaned_products import wrap_cleaned_products
+from .field_accessors import compile_field_map, extract_fields
 
 class BaseDataCleaner(ABC):
     """
     Abstract base class for cleaning raw product data from a specific store.
     It orchestrates the cleaning process, separating store-specific transformation
     from generic, common normalization.
+
+    With a `normalization_cache` (a NormalizationCache made for the same translation
+    tables), products already normalised in this or an earlier run are not normalised again.
     """
-    def __init__(self, raw_product_list: list, company: str, store_name: str, store_id: str, state: str, timestamp: datetime, brand_translations: dict = None, product_translations: dict = None):
+    # Each subclass's field map, compiled once by _extract_fields.
+    _compiled_field_maps = {}
+    def __init__(self, raw_product_list: list, company: str, store_name: str, store_id: str, state: str, timestamp: datetime, brand_translations: dict = None, product_translations: dict = None,
+                 normalization_cache=None):
         self.raw_product_list = raw_product_list or []
         self.company = company
         self.store_name = store_name
@@ -26,6 +33,7 @@ class BaseDataCleaner(ABC):
             self.product_translations = product_translations
         else:
             self.brand_translations, self.product_translations = BaseDataCleaner._load_translation_tables()
+        self.normalization_cache = normalization_cache
 
     @staticmethod
     def _load_translation_table(path: str) -> dict:
@@ -91,6 +99,16 @@ class BaseDataCleaner(ABC):
             return None
         return value
 
+    def _extract_fields(self, raw_product: dict) -> dict:
+        """
+        Gets every field in the field_map from the raw product, as _get_value would
+        field by field, using the field map compiled the first time the class used it.
+        """
+        compiled = self._compiled_field_maps.get(type(self))
+        if compiled is None:
+            compiled = self._compiled_field_maps[type(self)] = compile_field_map(self.field_map)
+        return extract_fields(raw_product, compiled)
+
     def clean_data(self) -> dict:
         """
         Main orchestration method.
@@ -123,17 +141,25 @@ class BaseDataCleaner(ABC):
         """
         Performs generic normalization on a cleaned product.
         """
-        normalizer = ProductNormalizer(
-            product,
-            brand_translations=self.brand_translations,
-            product_translations=self.product_translations
-        )
+        if self.normalization_cache is not None:
+            normalized_brand, sizes, normalized_name_brand_size = self.normalization_cache.normalize(
+                product, self.brand_translations, self.product_translations
+            )
+        else:
+            normalizer = ProductNormalizer(
+                product,
+                brand_translations=self.brand_translations,
+                product_translations=self.product_translations
+            )
+            normalized_brand = normalizer.get_normalized_brand_name()
+            sizes = normalizer.standardized_sizes
+            normalized_name_brand_size = normalizer.get_normalized_name_brand_size_string()
         # Add the new normalized brand key
-        product['normalized_brand'] = normalizer.get_normalized_brand_name()
-        product['sizes'] = normalizer.standardized_sizes
-        product['normalized_name_brand_size'] = normalizer.get_normalized_name_brand_size_string()
+        product['normalized_brand'] = normalized_brand
+        product['sizes'] = sizes
+        product['normalized_name_brand_size'] = normalized_name_brand_size
         if product.get('barcode') is not None:
-             product['barcode'] = normalizer.get_cleaned_barcode()
+             product['barcode'] = ProductNormalizer.clean_barcode(product['barcode'])
 
 
         # Convert all empty string fields to None to ensure consistency
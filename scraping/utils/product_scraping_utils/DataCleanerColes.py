@@ -19,8 +19,10 @@ class DataCleanerColes(BaseDataCleaner):
     """
     Concrete cleaner class for Coles product data.
     """
-    def __init__(self, raw_product_list: list, company: str, store_name: str, store_id: str, state: str, timestamp: datetime, brand_translations: dict = None, product_translations: dict = None):
-        super().__init__(raw_product_list, company, store_name, store_id, state, timestamp, brand_translations, product_translations)
+    def __init__(self, raw_product_list: list, company: str, store_name: str, store_id: str, state: str, timestamp: datetime, brand_translations: dict = None, product_translations: dict = None,
+                 normalization_cache=None):
+        super().__init__(raw_product_list, company, store_name, store_id, state, timestamp, brand_translations, product_translations,
+                         normalization_cache=normalization_cache)
 
     @property
     def field_map(self):
@@ -46,10 +48,7 @@ class DataCleanerColes(BaseDataCleaner):
         using the field map.
         """
         # Use the base class helper to get most fields
-        cleaned_product = {
-            standard_field: self._get_value(raw_product, standard_field)
-            for standard_field in self.field_map.keys()
-        }
+        cleaned_product = self._extract_fields(raw_product)
 
         # --- Handle special cases and transformations for Coles ---
 
@@ -0,0 +1,198 @@
+import threading
+import time
+from requests.adapters import HTTPAdapter
+
+# Statuses that mean the server wants us to slow down.
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Longest Retry-After we are prepared to honour, in seconds.
+MAX_RETRY_AFTER = 60
+
+
+def is_throttled(status_code) -> bool:
+    """A status of None means the request failed without a response (timeout, reset, ...)."""
+    return status_code is None or status_code in THROTTLE_STATUSES
+
+
+def _retry_after_seconds(response):
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    try:
+        return min(float(value), MAX_RETRY_AFTER) if value else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to the normal back-off.
+
+
+class AdaptiveRateController:
+    """
+    A token bucket whose rate and concurrency adjust to how the server is coping.
+
+    Every request takes a token before it starts and a concurrency slot while it is in
+    flight. After `increase_after` healthy responses in a row (below 429/5xx and faster
+    than `target_latency`), the rate rises by `increase_step` and one more request may be
+    in flight, up to `max_requests_per_second` and `max_concurrency`. A 429, a 5xx or a
+    failed request halves both and empties the bucket, and a Retry-After header pauses
+    all requests for that long.
+
+    With no `max_requests_per_second`, requests are not rate limited until the first
+    throttled response, after which the rate starts from what had been achieved so far.
+    Safe to share between threads.
+    """
+    def __init__(self, max_requests_per_second=None, max_concurrency=1, requests_per_second=None,
+                 min_requests_per_second=0.5, target_latency=2.0, increase_after=5, increase_step=None,
+                 backoff_factor=0.5, burst=1):
+        self.max_requests_per_second = max_requests_per_second
+        self.min_requests_per_second = min_requests_per_second
+        self.max_concurrency = max(1, max_concurrency)
+        self.target_latency = target_latency
+        self.increase_after = increase_after
+        self.backoff_factor = backoff_factor
+        self.burst = burst
+        if requests_per_second is None and max_requests_per_second:
+            requests_per_second = max(min_requests_per_second, max_requests_per_second / 2)
+        self.requests_per_second = requests_per_second
+        if increase_step is None:
+            increase_step = max(0.5, (max_requests_per_second or 0) / 10)
+        self.increase_step = increase_step
+        self.concurrency = max(1, self.max_concurrency // 2)
+
+        self._condition = threading.Condition()
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._healthy_streak = 0
+
+        self.requests = 0
+        self.throttled = 0
+        self._first_started_at = None
+        self._last_finished_at = None
+
+    def attach(self, session, pool_maxsize=10, transport=None):
+        """
+        Routes every request made through `session` via this controller, and on to
+        `transport` (e.g. a cassette) if given, rather than the network.
+        """
+        adapter = RateControlledAdapter(self, transport=transport, pool_maxsize=max(pool_maxsize, self.max_concurrency))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def acquire(self):
+        """Blocks until a request may start."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._in_flight >= self.concurrency:
+                    self._condition.wait()
+                    continue
+                wait = self._paused_until - now
+                if self.requests_per_second and self._tokens < 1:
+                    wait = max(wait, (1 - self._tokens) / self.requests_per_second)
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+
+                if self.requests_per_second:
+                    self._tokens -= 1
+                self._in_flight += 1
+                if self._first_started_at is None:
+                    self._first_started_at = now
+                return
+
+    def release(self, status_code, latency, retry_after=None):
+        """Records how a request started by acquire() went and adjusts the rate to suit."""
+        with self._condition:
+            now = time.monotonic()
+            self._in_flight -= 1
+            self.requests += 1
+            self._last_finished_at = now
+
+            if is_throttled(status_code):
+                self._back_off(now, retry_after)
+            elif latency > self.target_latency:
+                self._healthy_streak = 0
+            else:
+                self._healthy_streak += 1
+                if self._healthy_streak >= self.increase_after:
+                    self._healthy_streak = 0
+                    self._speed_up()
+            self._condition.notify_all()
+
+    def _refill(self, now):
+        if self.requests_per_second:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.requests_per_second)
+        self._refilled_at = now
+
+    def _back_off(self, now, retry_after):
+        self.throttled += 1
+        self._healthy_streak = 0
+        rate = self.requests_per_second or self.achieved_requests_per_second() or self.min_requests_per_second
+        self.requests_per_second = max(self.min_requests_per_second, rate * self.backoff_factor)
+        self.concurrency = max(1, self.concurrency // 2)
+        self._tokens = 0
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+    def _speed_up(self):
+        if self.requests_per_second:
+            rate = self.requests_per_second + self.increase_step
+            if self.max_requests_per_second:
+                rate = min(rate, self.max_requests_per_second)
+            self.requests_per_second = rate
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def achieved_requests_per_second(self) -> float:
+        """Completed requests per second between the first start and the last finish."""
+        if not self.requests or self._first_started_at is None:
+            return 0.0
+        elapsed = self._last_finished_at - self._first_started_at
+        return self.requests / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'achieved_requests_per_second': self.achieved_requests_per_second(),
+                'requests_per_second': self.requests_per_second,
+                'concurrency': self.concurrency,
+            }
+
+
+class RateControlledAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter that sends each request through an AdaptiveRateController, and
+    retries throttled responses up to `throttle_retries` times once the controller
+    has backed off. Requests go out through `transport` if one is given.
+    """
+    def __init__(self, controller, throttle_retries=3, transport=None, **kwargs):
+        self.controller = controller
+        self.throttle_retries = throttle_retries
+        self.transport = transport
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        for attempt in range(self.throttle_retries + 1):
+            self.controller.acquire()
+            started = time.monotonic()
+            response = None
+            try:
+                if self.transport is not None:
+                    response = self.transport.send(request, **kwargs)
+                else:
+                    response = super().send(request, **kwargs)
+            finally:
+                status_code = response.status_code if response is not None else None
+                self.controller.release(status_code, time.monotonic() - started, _retry_after_seconds(response))
+
+            if not is_throttled(response.status_code) or attempt == self.throttle_retries:
+                return response
+            response.close()
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+        super().close()
@@ -0,0 +1,86 @@
+import asyncio
+from collections import deque
+from urllib.parse import urlsplit
+
+
+class HostRateLimiter:
+    """
+    Spaces out the start of requests to each host so that no host sees more than
+    `requests_per_second`. With no limit set, requests start as soon as they are made.
+    """
+    def __init__(self, requests_per_second=None):
+        self.interval = 1 / requests_per_second if requests_per_second else 0
+        self._next_start = {}
+
+    async def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        now = asyncio.get_running_loop().time()
+        # Reserve the next free slot before sleeping, so concurrent callers queue up behind it.
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class AsyncFetchEngine:
+    """
+    Runs blocking HTTP calls (e.g. on a shared requests.Session) concurrently from an
+    asyncio event loop. At most `concurrency` calls are in flight at once, and calls to
+    each host are rate limited by a HostRateLimiter.
+    """
+    def __init__(self, concurrency=4, requests_per_second=None):
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        self._semaphore = None
+
+    async def request(self, url, func, *args, **kwargs):
+        """
+        Calls `func(*args, **kwargs)` in a worker thread once a concurrency slot is free
+        and the rate limit for `url`'s host allows it. Returns what `func` returns.
+        """
+        async with self._semaphore:
+            await self.rate_limiter.wait(url)
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Calls `func(*args, **kwargs)` in a worker thread once a concurrency slot is free.
+        For calls that make their own requests, e.g. through a rate controlled session.
+        """
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def run_ordered(self, items, fetch, consume, window=None):
+        """
+        Fetches `items` concurrently with the coroutine function `fetch(item)` and passes
+        each result to `consume(result)` in the order of `items`, however the fetches
+        complete. At most `window` items (default: `concurrency`) are fetched ahead of the
+        one being consumed, which bounds memory. Stops early if `consume` returns False.
+        """
+        asyncio.run(self._run_ordered(items, fetch, consume, window or self.concurrency))
+
+    async def _run_ordered(self, items, fetch, consume, window):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        items = iter(items)
+        pending = deque()
+
+        def schedule_next():
+            for item in items:
+                pending.append(asyncio.create_task(fetch(item)))
+                return
+
+        for _ in range(window):
+            schedule_next()
+
+        try:
+            while pending:
+                result = await pending.popleft()
+                schedule_next()
+                if consume(result) is False:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
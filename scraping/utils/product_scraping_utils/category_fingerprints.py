@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from django.conf import settings
+
+
+def fingerprint_listing(product_ids: list, total_results=None, prices: dict = None):
+    """
+    A short hash of what the first page of a category listing shows: the ids of its
+    products, in order, the total result count the site reports for the category and,
+    if given, each product's prices keyed by its id, so a price change on the first
+    page forces a full fetch even when the products listed stay the same.
+    Returns None for an empty page, which never matches.
+    """
+    if not product_ids:
+        return None
+    listing = json.dumps(
+        [total_results, [str(product_id) for product_id in product_ids], prices or {}],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha1(listing.encode('utf-8')).hexdigest()
+
+
+class CategoryFingerprints:
+    """
+    Remembers, per category of one store, the fingerprint of its first listing page
+    and the cleaned products the last full fetch of it produced, so an unchanged
+    category can be carried forward instead of paged through again.
+
+    A category is only carried forward while its products are younger than
+    `max_staleness`; after that it is fetched in full again, whatever its fingerprint.
+    Carrying forward keeps the date of the fetch the products came from, so a run of
+    matches can never stretch past that age. Kept as one gzipped JSON file per store,
+    which is only rewritten (by save()) once a scrape has succeeded.
+    """
+    def __init__(self, path: str, max_staleness: timedelta):
+        self.path = os.fspath(path)
+        self.max_staleness = max_staleness
+        self._previous = {}
+        self._current = {}
+        self.carried_forward = 0
+        self.fetched = 0
+
+    @staticmethod
+    def path_for(company: str, store_id: str) -> str:
+        store_key = ''.join(c if c.isalnum() else '-' for c in str(store_id))
+        return os.path.join(settings.BASE_DIR, 'scraping', 'data', 'category_fingerprints', f"{company.lower()}-{store_key}.json.gz")
+
+    @classmethod
+    def load(cls, path: str, max_staleness: timedelta) -> 'CategoryFingerprints':
+        fingerprints = cls(path, max_staleness)
+        try:
+            with gzip.open(fingerprints.path, 'rt', encoding='utf-8') as f:
+                fingerprints._previous = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, EOFError, json.JSONDecodeError):
+            # A damaged file only costs one full scrape.
+            fingerprints._previous = {}
+        return fingerprints
+
+    def carry_forward(self, key: str, fingerprint, now: datetime = None):
+        """
+        Returns last run's cleaned products for the category if its fingerprint still
+        matches and they are fresh enough, keeping the entry for the next run.
+        Returns None if the category has to be fetched.
+        """
+        entry = self._previous.get(key)
+        if fingerprint is None or not entry or entry.get('fingerprint') != fingerprint:
+            return None
+        scraped_at = datetime.fromisoformat(entry['scraped_at'])
+        if (now or datetime.now()) - scraped_at > self.max_staleness:
+            return None
+        self._current[key] = entry
+        self.carried_forward += 1
+        return entry['products']
+
+    def record(self, key: str, fingerprint, products: list, now: datetime = None):
+        """Remembers the products a full fetch of the category produced."""
+        self.fetched += 1
+        if fingerprint is None:
+            return
+        self._current[key] = {
+            'fingerprint': fingerprint,
+            'scraped_at': (now or datetime.now()).isoformat(timespec='seconds'),
+            'products': products,
+        }
+
+    def save(self):
+        """
+        Writes out the categories seen this run; categories that were not fetched in
+        full or carried forward are dropped, so they are fetched in full next time.
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump(self._current, f)
+        os.replace(temp_path, self.path)
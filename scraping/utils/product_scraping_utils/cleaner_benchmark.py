@@ -0,0 +1,108 @@
+import json
+import time
+from datetime import datetime
+from scraping.utils.product_scraping_utils.DataCleanerColes import DataCleanerColes
+from scraping.utils.product_scraping_utils.DataCleanerWoolworths import DataCleanerWoolworths
+from scraping.utils.product_scraping_utils.http_cassette import Cassette
+from scraping.utils.product_scraping_utils.page_scripts import extract_next_data
+
+DEFAULT_REPEAT = 5
+
+CLEANERS = {
+    'woolworths': DataCleanerWoolworths,
+    'coles': DataCleanerColes,
+}
+
+
+def synthetic_payloads(count: int = 2000) -> dict:
+    """Raw products shaped like the Woolworths and Coles APIs return them."""
+    woolworths = [
+        {
+            'Stockcode': 100000 + i, 'Name': f'Full Cream Milk {i}', 'Brand': 'Dairy Farmers', 'Barcode': '9300601000011',
+            'Description': 'Fresh milk.', 'PackageSize': '2L', 'UrlFriendlyName': f'full-cream-milk-{i}',
+            'Price': 3.1, 'WasPrice': 3.5, 'CupString': '$1.55 / 1L', 'InstoreCupPrice': 1.55, 'CupMeasure': '1L',
+            'Rating': {'Average': 4.5, 'ReviewCount': 12}, 'IsAvailable': True, 'category_path': ['Dairy', 'Milk'],
+            'AdditionalAttributes': {'ingredients': 'Milk', 'allergystatement': 'Contains milk', 'countryoforigin': 'Australia', 'healthstarrating': '4'},
+        }
+        for i in range(count)
+    ]
+    coles = [
+        {
+            '_type': 'PRODUCT', 'id': 200000 + i, 'name': f'Tasty Cheese Block {i}', 'brand': 'Bega', 'size': '500g',
+            'description': 'Cheddar cheese.', 'availability': True,
+            'pricing': {'now': 7.5, 'was': 9.0, 'comparable': '$1.50 per 100g', 'unit': {'price': 15.0, 'ofMeasureUnits': 'kg'}},
+            'onlineHeirs': [{'subCategory': 'Dairy, Eggs & Fridge', 'category': 'Cheese', 'aisle': 'Block Cheese'}],
+        }
+        for i in range(count)
+    ]
+    return {'woolworths': woolworths, 'coles': coles}
+
+
+def load_cassette_payloads(paths: list) -> dict:
+    """Collects the raw products in recorded Woolworths and Coles responses, by company."""
+    payloads = {}
+    for path in paths:
+        cassette = Cassette.load(path)
+        company = cassette.metadata.get('scraper')
+        if company not in CLEANERS:
+            continue
+        products = payloads.setdefault(company, [])
+        for entry in cassette.responses():
+            text = entry.get('text')
+            if not text or entry.get('status') != 200:
+                continue
+            if company == 'woolworths' and text.lstrip().startswith('{'):
+                data = json.loads(text)
+                products.extend(p for bundle in data.get('Bundles') or [] if bundle for p in bundle.get('Products') or [])
+            elif company == 'coles':
+                next_data = extract_next_data(text)
+                if next_data:
+                    search_results = json.loads(next_data).get('props', {}).get('pageProps', {}).get('searchResults', {})
+                    products.extend(search_results.get('results', []))
+    return {company: products for company, products in payloads.items() if products}
+
+
+def _cleaner(cleaner_class, raw_products):
+    return cleaner_class(
+        raw_product_list=raw_products, company=cleaner_class.__name__, store_name='Benchmark', store_id='0', state='',
+        timestamp=datetime.now(), brand_translations={}, product_translations={},
+    )
+
+
+def _cpu_us_per_product(func, products, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        results = [func(product) for product in products]
+    return (time.process_time() - start) * 1_000_000 / (repeat * len(products)), results
+
+
+def run_cleaner_benchmark(payloads: dict, repeat: int = DEFAULT_REPEAT) -> list:
+    """
+    For each company's raw products, times reading the field map fields with
+    _get_value field by field against the compiled _extract_fields, and the whole
+    clean_data() per product. Returns one result dict per company.
+    """
+    results = []
+    for company, raw_products in payloads.items():
+        cleaner = _cleaner(CLEANERS[company], raw_products)
+        fields = list(cleaner.field_map)
+
+        get_value_us, by_field = _cpu_us_per_product(
+            lambda raw: {field: cleaner._get_value(raw, field) for field in fields}, raw_products, repeat
+        )
+        compiled_us, compiled = _cpu_us_per_product(cleaner._extract_fields, raw_products, repeat)
+
+        start = time.process_time()
+        for _ in range(repeat):
+            _cleaner(CLEANERS[company], raw_products).clean_data()
+        clean_data_us = (time.process_time() - start) * 1_000_000 / (repeat * len(raw_products))
+
+        results.append({
+            'company': company,
+            'products': len(raw_products),
+            'get_value_us': get_value_us,
+            'compiled_us': compiled_us,
+            'clean_data_us': clean_data_us,
+            'same_result': by_field == compiled,
+        })
+    return results
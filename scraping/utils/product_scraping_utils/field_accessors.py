@@ -0,0 +1,66 @@
+def _compile_path(raw_field_key: str) -> tuple:
+    """
+    Splits a dotted field map path once, turning each part into (key, index): the key
+    to look up in a dict and the index to take from a list, or None if the part is not
+    a number and so cannot index a list.
+    """
+    parts = []
+    for part in raw_field_key.split('.'):
+        try:
+            index = int(part)
+        except ValueError:
+            index = None
+        parts.append((part, index))
+    return tuple(parts)
+
+
+def compile_field_map(field_map: dict) -> tuple:
+    """
+    Compiles a DataCleaner field map into (standard_field, raw_field_key, path) entries,
+    in field map order. `path` is None for a top-level key, or the pre-split parts of a
+    dotted path. A field mapped to None has neither.
+    """
+    compiled = []
+    for standard_field, raw_field_key in field_map.items():
+        if not raw_field_key:
+            compiled.append((standard_field, None, None))
+        elif '.' not in raw_field_key:
+            compiled.append((standard_field, raw_field_key, None))
+        else:
+            compiled.append((standard_field, raw_field_key, _compile_path(raw_field_key)))
+    return tuple(compiled)
+
+
+def _walk(value, path):
+    for key, index in path:
+        if isinstance(value, list):
+            if index is None:
+                return None
+            try:
+                value = value[index]
+            except IndexError:
+                return None
+        elif isinstance(value, dict):
+            value = value.get(key)
+        else:
+            return None
+    if isinstance(value, str) and not value.strip():
+        return None
+    return value
+
+
+def extract_fields(raw_product: dict, compiled_field_map: tuple) -> dict:
+    """
+    Reads every field of a compiled field map from a raw product, with the same results
+    as BaseDataCleaner._get_value field by field: top-level keys are read as they are,
+    dotted paths walk dicts and lists and turn blank strings into None.
+    """
+    get = raw_product.get
+    return {
+        standard_field: (
+            None if raw_field_key is None
+            else get(raw_field_key) if path is None
+            else _walk(raw_product, path)
+        )
+        for standard_field, raw_field_key, path in compiled_field_map
+    }
@@ -0,0 +1,159 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Headers that describe the bytes on the wire rather than the decoded body we store.
+_WIRE_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+
+def request_key(method, url, body=None) -> str:
+    """
+    Identifies a request by its method, its URL with the query parameters sorted and a
+    hash of its body, so the same request made in a different order still matches.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    url = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    body_hash = hashlib.sha1(body).hexdigest()[:16] if body else '-'
+    return f"{method.upper()} {url} {body_hash}"
+
+
+class Cassette:
+    """
+    A store of recorded HTTP responses, kept as one gzipped JSONL file: a first line of
+    metadata (e.g. what the scraper needs to be rebuilt for replay) and then one line
+    per response. Responses to a request that was made more than once are replayed in
+    the order they were recorded, and the last one is repeated after that.
+    """
+    def __init__(self, path: str, metadata: dict = None):
+        self.path = os.fspath(path)
+        self.metadata = metadata or {}
+        self._entries = {}
+        self._replayed = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        cassette = cls(path)
+        with gzip.open(cassette.path, 'rt', encoding='utf-8') as f:
+            cassette.metadata = json.loads(f.readline() or '{}')
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    cassette._entries.setdefault(entry['key'], []).append(entry)
+        return cassette
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock:
+            entries = [entry for responses in self._entries.values() for entry in responses]
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps(self.metadata) + '\n')
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+
+    def responses(self):
+        """Yields every recorded response entry, grouped by request."""
+        with self._lock:
+            entries = [entry for responses in self._entries.values() for entry in responses]
+        yield from entries
+
+    def __len__(self):
+        return sum(len(responses) for responses in self._entries.values())
+
+    def record(self, request, response, elapsed: float):
+        content = response.content
+        try:
+            body = {'text': content.decode('utf-8')}
+        except UnicodeDecodeError:
+            body = {'base64': base64.b64encode(content).decode('ascii')}
+        entry = {
+            'key': request_key(request.method, request.url, request.body),
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in _WIRE_HEADERS},
+            'elapsed': round(elapsed, 4),
+            **body,
+        }
+        with self._lock:
+            self._entries.setdefault(entry['key'], []).append(entry)
+
+    def next_entry(self, request):
+        """Returns the next recorded response for `request`, or None if it was never recorded."""
+        key = request_key(request.method, request.url, request.body)
+        with self._lock:
+            responses = self._entries.get(key)
+            if not responses:
+                return None
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            return responses[min(index, len(responses) - 1)]
+
+
+class RecordingTransport(HTTPAdapter):
+    """Sends requests to the network as usual and records every response in a Cassette."""
+    def __init__(self, cassette: Cassette, **kwargs):
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        started = time.monotonic()
+        response = super().send(request, **kwargs)
+        self.cassette.record(request, response, time.monotonic() - started)
+        return response
+
+
+class ReplayTransport(BaseAdapter):
+    """
+    Answers requests from a Cassette without touching the network. Each response is
+    delayed by `latency` seconds, or by the time it originally took with
+    `recorded_latency`. A request that was never recorded raises a ConnectionError,
+    as an unreachable host would.
+    """
+    def __init__(self, cassette: Cassette, latency: float = 0.0, recorded_latency: bool = False):
+        super().__init__()
+        self.cassette = cassette
+        self.latency = latency
+        self.recorded_latency = recorded_latency
+        self.replayed = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        entry = self.cassette.next_entry(request)
+        with self._lock:
+            if entry is None:
+                self.missed += 1
+            else:
+                self.replayed += 1
+        if entry is None:
+            raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {request.url}", request=request)
+
+        delay = entry.get('elapsed', 0) if self.recorded_latency else self.latency
+        if delay:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry['text'].encode('utf-8') if 'text' in entry else base64.b64decode(entry['base64'])
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
@@ -1,34 +1,130 @@
 import os
+import gzip
+import hashlib
 import json
 import shutil
 from datetime import datetime
 from django.conf import settings
 
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+# Encoded products are joined and handed to the file (or gzip stream) this many bytes at a time.
+BUFFER_SIZE = 1024 * 1024
+
+# gzip level for compressed output; 6 is within a few percent of 9's size at a fraction of the CPU.
+COMPRESS_LEVEL = 6
+
+MANIFEST_SUFFIX = '.manifest.json'
+
+_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+def encode_line(record: dict) -> bytes:
+    """Encodes a record as one compact UTF-8 JSON line, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            pass  # e.g. a Decimal or a non-string key; the standard encoder decides
+    return (_encoder.encode(record) + '\n').encode('utf-8')
+
+
+def manifest_path(file_path: str) -> str:
+    return file_path + MANIFEST_SUFFIX
+
+
+def read_manifest(file_path: str):
+    """Returns the sidecar manifest of `file_path`, or None if it has none or it cannot be read."""
+    try:
+        with open(manifest_path(file_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return None
+
+
+def write_manifest(file_path: str, manifest: dict):
+    path = manifest_path(file_path)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _HashingFile:
+    """Passes writes through to a file, hashing the bytes as they go."""
+    def __init__(self, file_handle):
+        self.file_handle = file_handle
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.file_handle.write(data)
+
+    def flush(self):
+        self.file_handle.flush()
+
+
 class JsonlWriter:
-    def __init__(self, company: str, store_name_slug: str, state: str, final_outbox_path: str = None):
+    """
+    Writes a store's products to a JSONL file in a temp directory, and moves it to the
+    outbox on commit. Lines are encoded compactly (with orjson if it is installed) and
+    written BUFFER_SIZE bytes at a time. With `compress`, the file is written straight
+    into a gzip stream as a .jsonl.gz, and commit() leaves a sidecar manifest next to it
+    with the product count, the first line's metadata and the sha256 of the compressed
+    file, so the uploader can send it as it is without reading it first.
+    """
+    def __init__(self, company: str, store_name_slug: str, state: str, final_outbox_path: str = None, compress: bool = False):
         self.temp_dir = os.path.join(settings.BASE_DIR, 'scraping', 'data', 'temp_outbox')
         if not os.path.exists(self.temp_dir):
             os.makedirs(self.temp_dir)
-        
+
         # Assign company and store_name_slug first
         self.company = company
         self.store_name_slug = store_name_slug
         self.state = state
+        self.compress = compress
 
         # Now use them to construct temp_file_path
         date_str = datetime.now().strftime('%Y-%m-%d')
-        self.temp_file_path = os.path.join(self.temp_dir, f"{self.company.lower()}-{self.store_name_slug.lower()}-{date_str}.jsonl")
-        
+        extension = '.jsonl.gz' if compress else '.jsonl'
+        self.temp_file_path = os.path.join(self.temp_dir, f"{self.company.lower()}-{self.store_name_slug.lower()}-{date_str}{extension}")
+
         if final_outbox_path:
             self.final_outbox_path = final_outbox_path
         else:
             self.final_outbox_path = os.fspath(settings.PIPELINE_DATA_DIR / 'outboxes' / 'product_outbox')
         self.temp_file_handle = None
         self.seen_product_keys = set()
+        self.products_written = 0
+        self.first_metadata = None
+        self._raw_file = None
+        self._hashing_file = None
+        self._buffer = []
+        self._buffered_bytes = 0
 
     def open(self):
         """Opens the  JSONL file for writing."""
-        self.temp_file_handle = open(self.temp_file_path, 'w', encoding='utf-8')
+        self._raw_file = open(self.temp_file_path, 'wb')
+        if self.compress:
+            self._hashing_file = _HashingFile(self._raw_file)
+            # No file name or time in the header, so the same products give the same bytes.
+            self.temp_file_handle = gzip.GzipFile(filename='', mode='wb', compresslevel=COMPRESS_LEVEL, fileobj=self._hashing_file, mtime=0)
+        else:
+            self.temp_file_handle = self._raw_file
+        self.products_written = 0
+        self.first_metadata = None
+        self._buffer = []
+        self._buffered_bytes = 0
 
     def write_product(self, product_data: dict, metadata: dict) -> bool:
         """
@@ -42,32 +138,81 @@ class JsonlWriter:
         product_key = product_data.get('normalized_name_brand_size')
         if product_key and product_key not in self.seen_product_keys:
             try:
-                json.dump({"product": product_data, "metadata": metadata}, self.temp_file_handle)
-                self.temp_file_handle.write('\n')
-                self.seen_product_keys.add(product_key)
-                return True
+                line = encode_line({"product": product_data, "metadata": metadata})
             except Exception as e:
                 # print(f"Error writing product to JSONL: {e}")
                 return False
+            self._buffer.append(line)
+            self._buffered_bytes += len(line)
+            if self._buffered_bytes >= BUFFER_SIZE:
+                self._write_buffer()
+            self.seen_product_keys.add(product_key)
+            if self.first_metadata is None:
+                self.first_metadata = metadata
+            self.products_written += 1
+            return True
         return False # Product was a duplicate or missing key
 
+    def _write_buffer(self):
+        if self._buffer:
+            self.temp_file_handle.write(b''.join(self._buffer))
+            self._buffer = []
+            self._buffered_bytes = 0
+
+    def flush(self):
+        """
+        Flushes what has been written so far through to disk. A compressed file is
+        sync-flushed, so everything up to here can be decompressed from a partial file.
+        """
+        if self.temp_file_handle:
+            self._write_buffer()
+            self.temp_file_handle.flush()
+            os.fsync(self._raw_file.fileno())
+
+    def keep_partial(self) -> str:
+        """
+        Closes the file and sets it aside as a .partial file in the temp directory, so an
+        interrupted scrape keeps what it wrote without it reaching the outbox.
+        Returns the path of the partial file.
+        """
+        self.close()
+        partial_path = self.temp_file_path + '.partial'
+        if os.path.exists(self.temp_file_path):
+            os.replace(self.temp_file_path, partial_path)
+        return partial_path
+
     def close(self):
-        """Closes the file handle if it's open."""
+        """Writes out the buffer and closes the file handle if it's open."""
         if self.temp_file_handle:
+            self._write_buffer()
             self.temp_file_handle.close()
+            if self._raw_file is not self.temp_file_handle:
+                self._raw_file.close()
             self.temp_file_handle = None
+            self._raw_file = None
+
+    def manifest(self) -> dict:
+        """The sidecar manifest of the closed, compressed file."""
+        return {
+            'products': self.products_written,
+            'metadata': self.first_metadata,
+            'sha256': self._hashing_file.digest.hexdigest(),
+            'bytes': os.path.getsize(self.temp_file_path),
+        }
 
     def commit(self):
-        """Moves the temporary file to the final inbox directory."""
+        """Moves the temporary file, and its manifest if it is compressed, to the final inbox directory."""
         self.close()
         if os.path.exists(self.temp_file_path):
             os.makedirs(self.final_outbox_path, exist_ok=True)
             destination_path = os.path.join(self.final_outbox_path, os.path.basename(self.temp_file_path))
+            manifest = self.manifest() if self._hashing_file else None
             shutil.move(self.temp_file_path, destination_path)
+            if manifest:
+                write_manifest(destination_path, manifest)
 
     def cleanup(self):
         """Closes and removes the temporary file."""
         self.close()
         if os.path.exists(self.temp_file_path):
             os.remove(self.temp_file_path)
-
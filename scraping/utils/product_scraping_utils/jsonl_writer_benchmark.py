@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+from scraping.utils.product_scraping_utils.jsonl_writer import JsonlWriter
+
+
+def synthetic_outbox_records(count: int = 20000) -> list:
+    """(product, metadata) pairs shaped like the lines a Woolworths store's file holds."""
+    metadata = {'company': 'Woolworths', 'store_id': '1234', 'store_name': 'Benchmark', 'state': 'nsw', 'scraped_date': '2025-06-01'}
+    return [
+        (
+            {
+                'name': f'Dairy Farmers Full Cream Milk {i}', 'brand': 'Dairy Farmers', 'size': '2L', 'sizes': ['2000ml'],
+                'barcode': '9300601000011', 'sku': str(100000 + i), 'price_current': 3.1, 'price_was': 3.5,
+                'is_on_special': True, 'unit_price': 1.55, 'unit_of_measure': '1L', 'per_unit_price_string': '$1.55 / 1L',
+                'is_available': True, 'url': f'https://www.woolworths.com.au/shop/productdetails/{100000 + i}/full-cream-milk',
+                'category_path': ['Dairy, Eggs & Fridge', 'Milk'], 'normalized_name_brand_size': f'dairyfarmers fullcreammilk{i} 2000ml',
+                'ingredients': 'Milk', 'country_of_origin': 'Australia', 'health_star_rating': '4',
+            },
+            metadata,
+        )
+        for i in range(count)
+    ]
+
+
+def load_outbox_records(path: str) -> list:
+    """Returns the (product, metadata) pairs of a scraped store .jsonl or .jsonl.gz file."""
+    opener = gzip.open if path.endswith('.gz') else open
+    records = []
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+                records.append((data['product'], data.get('metadata', {})))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+    return records
+
+
+def _write_plain_then_gzip(records, temp_dir):
+    """What a scrape and upload did before: json.dump each line, then gzip the whole file."""
+    path = os.path.join(temp_dir, 'plain.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        for product, metadata in records:
+            json.dump({'product': product, 'metadata': metadata}, f)
+            f.write('\n')
+    with open(path, 'rb') as f_in, gzip.open(path + '.gz', 'wb') as f_out:
+        f_out.writelines(f_in)
+    return path + '.gz', os.path.getsize(path) + os.path.getsize(path + '.gz')
+
+
+def _write_compressed(records, temp_dir):
+    outbox_path = os.path.join(temp_dir, 'outbox')
+    writer = JsonlWriter('benchmark', 'store', '', final_outbox_path=outbox_path, compress=True)
+    writer.temp_file_path = os.path.join(temp_dir, 'compressed.jsonl.gz')
+    writer.open()
+    for product, metadata in records:
+        writer.write_product(product, metadata)
+    writer.commit()
+    path = os.path.join(outbox_path, 'compressed.jsonl.gz')
+    return path, os.path.getsize(path)
+
+
+def _decoded(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def run_jsonl_writer_benchmark(records: list) -> list:
+    """
+    Writes the same products the way scrapes used to (json.dump into a plain file,
+    gzipped again by the uploader) and with the compressed JsonlWriter, reporting CPU
+    time and bytes written to disk per product, and whether both files decode to the
+    same lines. Products with the same normalized_name_brand_size are only written once.
+    """
+    unique_records = {}
+    for product, metadata in records:
+        unique_records.setdefault(product.get('normalized_name_brand_size'), (product, metadata))
+    records = [record for key, record in unique_records.items() if key]
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        outputs = {}
+        for run, write in (('json.dump + upload gzip', _write_plain_then_gzip), ('compressed writer', _write_compressed)):
+            start = time.process_time()
+            path, bytes_written = write(records, temp_dir)
+            seconds = time.process_time() - start
+            outputs[run] = _decoded(path)
+            results.append({
+                'run': run,
+                'products': len(records),
+                'seconds': seconds,
+                'us_per_product': seconds * 1_000_000 / len(records) if records else 0.0,
+                'bytes_per_product': bytes_written / len(records) if records else 0.0,
+            })
+    for result in results:
+        result['same_result'] = outputs[result['run']] == outputs[results[0]['run']]
+    return results
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from .product_normalizer import ProductNormalizer
+
+# Most normalisations kept in memory; a store has up to ~25k products, and most of
+# them are the same products in every store.
+DEFAULT_MAX_ENTRIES = 200_000
+
+# Normalisations written to the on-disk tier in one transaction.
+FLUSH_EVERY = 1000
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def translation_tables_version(brand_translations: dict, product_translations: dict) -> str:
+    """
+    A short hash of the translation tables. Normalisations are only reused under the
+    tables they were made with, so a new table quietly starts a fresh cache.
+    """
+    tables = json.dumps([brand_translations, product_translations], ensure_ascii=False)
+    return hashlib.sha1(tables.encode('utf-8')).hexdigest()[:16]
+
+
+def default_cache_path() -> str:
+    return os.path.join(settings.BASE_DIR, 'scraping', 'data', 'normalization_cache.sqlite3')
+
+
+class NormalizationCache:
+    """
+    Remembers what ProductNormalizer made of a product's name, brand and size under one
+    version of the translation tables: its normalized brand, its sizes and its
+    normalized_name_brand_size. The same products turn up in every store and every
+    day, so most products skip the regex and unicode passes entirely.
+
+    Entries live in an LRU of at most `max_entries`. With a `path`, they are also kept in
+    a SQLite file shared by scraper runs. Opening it loads its entries into memory in one
+    query; only if it holds more than fit are memory misses looked up there one by one.
+    New normalisations are written to it FLUSH_EVERY at a time and by flush(). Entries
+    made under other table versions are dropped when the file is opened. Safe to share
+    between threads.
+    """
+    def __init__(self, tables_version: str, max_entries: int = DEFAULT_MAX_ENTRIES, path: str = None):
+        self.tables_version = tables_version
+        self.max_entries = max_entries
+        self.path = os.fspath(path) if path else None
+        self._entries = OrderedDict()
+        self._unsaved = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.loaded = 0
+        self._db = None
+        self._all_in_memory = True
+        if self.path:
+            self._db = self._open_db()
+            self._load()
+
+    @classmethod
+    def shared(cls, tables_version: str, path: str = None) -> 'NormalizationCache':
+        """Returns the process-wide cache for these tables and path, so scrapers of several stores share it."""
+        with _shared_lock:
+            key = (tables_version, os.fspath(path) if path else None)
+            if key not in _shared:
+                _shared[key] = cls(tables_version, path=path)
+            return _shared[key]
+
+    def _open_db(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS normalized ('
+            ' version TEXT, name TEXT, brand TEXT, size TEXT,'
+            ' normalized_brand TEXT, sizes TEXT, normalized_name_brand_size TEXT,'
+            ' PRIMARY KEY (version, name, brand, size)) WITHOUT ROWID'
+        )
+        db.execute('DELETE FROM normalized WHERE version != ?', (self.tables_version,))
+        db.commit()
+        return db
+
+    def _load(self):
+        rows = self._db.execute(
+            'SELECT name, brand, size, normalized_brand, sizes, normalized_name_brand_size FROM normalized'
+            ' WHERE version = ? LIMIT ?',
+            (self.tables_version, self.max_entries + 1),
+        ).fetchall()
+        self._all_in_memory = len(rows) <= self.max_entries
+        for name, brand, size, normalized_brand, sizes, normalized_name_brand_size in rows[:self.max_entries]:
+            self._entries[(name, brand, size)] = (normalized_brand, tuple(json.loads(sizes)), normalized_name_brand_size)
+        self.loaded = len(self._entries)
+
+    def normalize(self, product: dict, brand_translations: dict, product_translations: dict) -> tuple:
+        """
+        Returns (normalized_brand, sizes, normalized_name_brand_size) for the product,
+        as ProductNormalizer would, normalising it only if it has not been seen before.
+        """
+        # The same conversions ProductNormalizer makes, so equal keys mean equal results.
+        raw_brand = product.get('brand')
+        key = (str(product.get('name', '')), str(raw_brand) if raw_brand else '', str(product.get('size', '')))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], list(entry[1]), entry[2]
+            entry = self._read(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self._remember(key, entry)
+                return entry[0], list(entry[1]), entry[2]
+
+        normalizer = ProductNormalizer(product, brand_translations=brand_translations, product_translations=product_translations)
+        entry = (
+            normalizer.get_normalized_brand_name(),
+            tuple(normalizer.standardized_sizes),
+            normalizer.get_normalized_name_brand_size_string(),
+        )
+        with self._lock:
+            self.misses += 1
+            self._remember(key, entry)
+            if self._db is not None:
+                self._unsaved.append((self.tables_version, *key, entry[0], json.dumps(entry[1]), entry[2]))
+                if len(self._unsaved) >= FLUSH_EVERY:
+                    self._write_unsaved()
+        return entry[0], list(entry[1]), entry[2]
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, key):
+        if self._db is None or self._all_in_memory:
+            return None
+        row = self._db.execute(
+            'SELECT normalized_brand, sizes, normalized_name_brand_size FROM normalized'
+            ' WHERE version = ? AND name = ? AND brand = ? AND size = ?',
+            (self.tables_version, *key),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], tuple(json.loads(row[1])), row[2]
+
+    def _write_unsaved(self):
+        if not self._unsaved:
+            return
+        self._db.executemany('INSERT OR REPLACE INTO normalized VALUES (?, ?, ?, ?, ?, ?, ?)', self._unsaved)
+        self._db.commit()
+        self._unsaved.clear()
+
+    def flush(self):
+        """Writes normalisations not yet on disk to the on-disk tier, if there is one."""
+        with self._lock:
+            if self._db is not None:
+                self._write_unsaved()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'lookups': lookups,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'loaded': self.loaded,
+            }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
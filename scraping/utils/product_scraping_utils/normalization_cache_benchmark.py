@@ -0,0 +1,91 @@
+import json
+import os
+import random
+import tempfile
+import time
+from scraping.utils.product_scraping_utils.normalization_cache import NormalizationCache
+from scraping.utils.product_scraping_utils.product_normalizer import ProductNormalizer
+
+_BRANDS = ['Coles', 'Woolworths', 'Dairy Farmers', 'Arnott\'s', 'Cadbury', 'Sanitarium', 'Kellogg\'s', 'Smith\'s', 'Bega', 'Heinz']
+_NAMES = ['Full Cream Milk', 'Wholemeal Bread', 'Tim Tam Chocolate Biscuits', 'Dairy Milk Block', 'Weet-Bix Cereal',
+          'Original Chips', 'Tasty Cheese Slices', 'Baked Beans In Tomato Sauce', 'Greek Style Yoghurt', 'Crunchy Peanut Butter']
+_SIZES = ['1L', '2L', '700g', '200g', '1.2kg', '175g', '10 Pack', '420g', '1kg', '375g', '6 x 150g', 'each']
+
+
+def synthetic_store_products(count: int = 20000, seed: int = 1) -> list:
+    """Products shaped like the ones in a store's JSONL file, for when no real file is given."""
+    rng = random.Random(seed)
+    return [
+        {
+            'name': f"{rng.choice(_BRANDS)} {rng.choice(_NAMES)} {rng.choice(['', 'Lite', 'Organic', 'Value Pack'])} {rng.choice(_SIZES)}".strip(),
+            'brand': rng.choice(_BRANDS),
+            'size': rng.choice(_SIZES),
+        }
+        for _ in range(count)
+    ]
+
+
+def load_store_products(path: str) -> list:
+    """Returns the name, brand and size of every product in a scraped store JSONL file."""
+    products = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                product = json.loads(line)['product']
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+            products.append({key: product.get(key) for key in ('name', 'brand', 'size') if product.get(key) is not None})
+    return products
+
+
+def _normalize_all(products, normalize):
+    start = time.process_time()
+    results = [normalize(product) for product in products]
+    return time.process_time() - start, results
+
+
+def run_normalization_cache_benchmark(products: list, brand_translations: dict = None, product_translations: dict = None) -> list:
+    """
+    Normalises the same products several ways and reports CPU time per product:
+    with ProductNormalizer directly, through an empty cache (the first store of a run),
+    through that cache again (every later store of the run), and through a new cache on
+    the same on-disk tier (the first store of the next run). Each result also says
+    whether its output matched ProductNormalizer's.
+    """
+    brand_translations = brand_translations or {}
+    product_translations = product_translations or {}
+
+    def uncached(product):
+        normalizer = ProductNormalizer(product, brand_translations=brand_translations, product_translations=product_translations)
+        return normalizer.get_normalized_brand_name(), normalizer.standardized_sizes, normalizer.get_normalized_name_brand_size_string()
+
+    seconds, expected = _normalize_all(products, uncached)
+    results = [{'run': 'ProductNormalizer', 'seconds': seconds, 'hit_rate': None, 'same_result': True}]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'normalization_cache.sqlite3')
+        caches = {}
+        for run in ('cold cache', 'warm cache', 'next run (from disk)'):
+            if run != 'warm cache':
+                if caches:
+                    caches['cache'].close()
+                caches['cache'] = NormalizationCache('benchmark', path=path)
+            cache = caches['cache']
+            before = cache.stats()
+            seconds, normalized = _normalize_all(products, lambda p: cache.normalize(p, brand_translations, product_translations))
+            cache.flush()
+            after = cache.stats()
+            lookups = after['lookups'] - before['lookups']
+            hits = after['hits'] + after['disk_hits'] - before['hits'] - before['disk_hits']
+            results.append({
+                'run': run,
+                'seconds': seconds,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'same_result': normalized == expected,
+            })
+        caches['cache'].close()
+
+    for result in results:
+        result['products'] = len(products)
+        result['us_per_product'] = result['seconds'] * 1_000_000 / len(products) if products else 0.0
+    return results
@@ -31,5 +31,24 @@ class ScraperOutput:
     def log_error(self, message):
         self.command.stderr.write(f"{colorama.Fore.RED}ERROR: {message}{colorama.Style.RESET_ALL}")
 
+    def report_request_rate(self, stats):
+        rate = stats['requests_per_second']
+        final_rate = f"{rate:.1f} req/s" if rate else "unlimited"
+        self.command.stdout.write(
+            f"Requests: {stats['requests']} at {stats['achieved_requests_per_second']:.2f} req/s achieved, "
+            f"{stats['throttled']} throttled (final rate {final_rate}, concurrency {stats['concurrency']})\n"
+        )
+
+    def report_normalization_cache(self, stats):
+        self.command.stdout.write(
+            f"Normalization cache: {stats['hit_rate']:.0%} hit rate over {stats['lookups']} products "
+            f"({stats['misses']} normalized; {stats['loaded']} normalisations loaded from the last run)\n"
+        )
+
+    def report_carried_forward(self, carried_forward, fetched):
+        self.command.stdout.write(
+            f"Categories: {carried_forward} unchanged and carried forward, {fetched} fetched in full\n"
+        )
+
     def finalize(self):
         self.command.stdout.write("\n")
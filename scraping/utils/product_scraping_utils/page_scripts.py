@@ -0,0 +1,59 @@
+import re
+from bs4 import BeautifulSoup
+
+# Opening tags of the two kinds of script we read from Coles pages. Attribute values
+# may be double quoted, single quoted or unquoted, and other attributes may come first.
+# Tag and attribute names are case-insensitive, values are not (as in BeautifulSoup).
+_NEXT_DATA_OPEN = re.compile(r'''<script\b[^>]*?\sid\s*=\s*["']?(?-i:__NEXT_DATA__)(?=["'\s>])[^>]*>''', re.IGNORECASE)
+_LD_JSON_OPEN = re.compile(r'''<script\b[^>]*?\stype\s*=\s*["']?(?-i:application/ld\+json)(?=["'\s>])[^>]*>''', re.IGNORECASE)
+_SCRIPT_CLOSE = re.compile(r'</script\s*>', re.IGNORECASE)
+
+
+class _UnexpectedMarkup(Exception):
+    pass
+
+
+def _script_text(html, open_match):
+    """Returns the text between an opening script tag and its closing tag, or None if empty."""
+    # Script contents are raw text, so the first closing tag ends them.
+    close_match = _SCRIPT_CLOSE.search(html, open_match.end())
+    if not close_match:
+        raise _UnexpectedMarkup()
+    return html[open_match.end():close_match.start()] or None
+
+
+def extract_next_data(html: str) -> str | None:
+    """
+    Returns the text of the page's <script id="__NEXT_DATA__"> tag, as
+    BeautifulSoup's `.string` would, or None if there is no such script or it is empty.
+
+    The tag is found with a targeted scan instead of parsing the whole page. If the
+    page mentions __NEXT_DATA__ but the scan can't make sense of it, BeautifulSoup is used.
+    """
+    if '__NEXT_DATA__' not in html:
+        return None
+    try:
+        open_match = _NEXT_DATA_OPEN.search(html)
+        if not open_match:
+            raise _UnexpectedMarkup()
+        return _script_text(html, open_match)
+    except _UnexpectedMarkup:
+        element = BeautifulSoup(html, 'html.parser').find('script', {'id': '__NEXT_DATA__'})
+        return element.string if element else None
+
+
+def extract_ld_json(html: str) -> list:
+    """
+    Returns the texts of the page's <script type="application/ld+json"> tags in page
+    order, skipping empty ones. Falls back to BeautifulSoup like extract_next_data.
+    """
+    if 'application/ld+json' not in html:
+        return []
+    try:
+        texts = [_script_text(html, open_match) for open_match in _LD_JSON_OPEN.finditer(html)]
+        if not texts:
+            raise _UnexpectedMarkup()
+        return [text for text in texts if text]
+    except _UnexpectedMarkup:
+        scripts = BeautifulSoup(html, 'html.parser').find_all('script', {'type': 'application/ld+json'})
+        return [script.string for script in scripts if script.string]
@@ -0,0 +1,99 @@
+import json
+import os
+import time
+from bs4 import BeautifulSoup
+from scraping.utils.product_scraping_utils.page_scripts import extract_ld_json, extract_next_data
+
+DEFAULT_REPEAT = 20
+
+
+def synthetic_coles_page(products: int = 48) -> str:
+    """
+    Builds a page shaped like a Coles browse page: a head full of tags, a body of
+    nested product tiles, an ld+json block and a large __NEXT_DATA__ payload at the end.
+    """
+    results = [
+        {
+            "id": i, "name": f"Product {i}", "brand": "Coles", "size": "500g",
+            "pricing": {"now": 4.5, "was": 5.0, "comparable": "$0.90 per 100g"},
+            "imageUris": [{"uri": f"/{i}/{i}-th.jpg", "type": "default"}] * 4,
+            "onlineHeirs": [{"aisle": "Pantry", "category": "Snacks", "subCategory": "Chips"}],
+            "description": "A product description. " * 20,
+        }
+        for i in range(products)
+    ]
+    next_data = {
+        "props": {"pageProps": {"initStoreId": "401", "searchResults": {"noOfResults": products, "pageSize": 48, "results": results}}},
+        "page": "/browse/[...slug]", "buildId": "synthetic",
+    }
+    ld_json = {"@context": "https://schema.org", "@type": "BreadcrumbList", "itemListElement": []}
+
+    head = ''.join(
+        f'<link rel="preload" href="/_next/static/chunks/{i}.js" as="script"><script src="/_next/static/chunks/{i}.js" defer></script>'
+        for i in range(40)
+    )
+    tiles = ''.join(
+        f'<section class="product-tile" data-testid="product-tile-{i}"><div class="product__image"><img src="/{i}.jpg" alt="Product {i}"></div>'
+        f'<div class="product__details"><h2 class="product__title"><a href="/product/{i}">Product {i}</a></h2>'
+        f'<span class="price__value">$4.50</span><span class="price__calculation_method">$0.90 per 100g</span>'
+        f'<button class="add-to-trolley" aria-label="Add Product {i}">Add</button></div></section>'
+        for i in range(products)
+    )
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Browse | Coles</title>{head}'
+        f'<script type="application/ld+json">{json.dumps(ld_json)}</script></head>'
+        f'<body><div id="__next"><main><div class="product-grid">{tiles}</div></main></div>'
+        f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script></body></html>'
+    )
+
+
+def load_pages(directory: str) -> dict:
+    """Returns {file name: html} for every saved .html page in `directory`."""
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                pages[name] = f.read()
+    return pages
+
+
+def _extract_with_soup(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    element = soup.find('script', {'id': '__NEXT_DATA__'})
+    scripts = soup.find_all('script', {'type': 'application/ld+json'})
+    return element.string if element else None, [s.string for s in scripts if s.string]
+
+
+def _extract_with_scanner(html):
+    return extract_next_data(html), extract_ld_json(html)
+
+
+def _cpu_ms_per_page(extract, html, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        result = extract(html)
+    return (time.process_time() - start) * 1000 / repeat, result
+
+
+def run_page_scripts_benchmark(pages: dict = None, repeat: int = DEFAULT_REPEAT) -> list:
+    """
+    Times extracting __NEXT_DATA__ and the ld+json blocks from each page with a full
+    BeautifulSoup parse and with the script scanner, in CPU milliseconds per page, and
+    checks that both find the same scripts. `pages` is {name: html}; a synthetic Coles
+    browse page is used if none are given. Returns one result dict per page.
+    """
+    if not pages:
+        pages = {'synthetic browse page': synthetic_coles_page()}
+
+    results = []
+    for name, html in pages.items():
+        soup_ms, soup_result = _cpu_ms_per_page(_extract_with_soup, html, repeat)
+        scanner_ms, scanner_result = _cpu_ms_per_page(_extract_with_scanner, html, repeat)
+        results.append({
+            'page': name,
+            'bytes': len(html.encode('utf-8')),
+            'soup_ms': soup_ms,
+            'scanner_ms': scanner_ms,
+            'same_result': soup_result == scanner_result,
+        })
+    return results
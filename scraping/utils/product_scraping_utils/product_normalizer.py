@@ -172,10 +172,15 @@ class ProductNormalizer:
 
     def get_cleaned_barcode(self) -> str or None:
         """ Corresponds to clean_barcode.py logic. """
-        if not self.barcode:
+        return self.clean_barcode(self.barcode)
+
+    @staticmethod
+    def clean_barcode(barcode) -> str or None:
+        """ Returns the EAN-13 in a raw barcode string, or None if it has none. """
+        if not barcode:
             return None
 
-        barcode_str = str(self.barcode).strip().lower()
+        barcode_str = str(barcode).strip().lower()
 
         if barcode_str == 'notfound' or barcode_str == 'null' or barcode_str == '':
             return None
@@ -0,0 +1,53 @@
+import json
+import os
+
+
+class ProgressJournal:
+    """
+    An append-only JSONL journal of finished work, used to resume a scrape.
+
+    Entries are buffered and appended to the file `batch_size` at a time, in one
+    write that is fsynced, rather than reopening the file for every entry. A crash
+    can lose at most the unflushed batch, whose items are simply fetched again on
+    the next run. Call close() when done so the last batch is not lost.
+    """
+    def __init__(self, path: str, batch_size: int = 50):
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+
+    def read(self) -> list:
+        """Returns every entry already on disk, skipping any line cut short by a crash."""
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
+
+    def record(self, entry: dict):
+        self._buffer.append(json.dumps(entry) + '\n')
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(self._buffer))
+            f.flush()
+            os.fsync(f.fileno())
+        self._buffer.clear()
+
+    def close(self):
+        self.flush()
+
+    def remove(self):
+        """Drops any buffered entries and deletes the journal, once the work it tracks is done."""
+        self._buffer.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
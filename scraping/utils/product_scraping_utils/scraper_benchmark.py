@@ -0,0 +1,91 @@
+import os
+import tempfile
+import time
+from scraping.utils.product_scraping_utils.http_cassette import Cassette, ReplayTransport
+
+
+def find_cassettes(directory: str) -> list:
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.jsonl.gz')]
+
+
+def build_scraper(cassette: Cassette, command):
+    """Rebuilds the scraper a cassette was recorded from, using the metadata `scrape --record` saved."""
+    metadata = cassette.metadata
+    name = metadata.get('scraper')
+    store_id = metadata.get('store_id')
+
+    if name == 'aldi':
+        from scraping.scrapers.product_scraper_aldi import ProductScraperAldi
+        return ProductScraperAldi(command=command, company="Aldi", store_id=store_id, store_name="Aldi", state="")
+
+    if name == 'woolworths':
+        from scraping.scrapers.product_scraper_woolworths import ProductScraperWoolworths
+        return ProductScraperWoolworths(
+            command=command, company="Woolworths", store_id=store_id, store_name="Woolworths", state="",
+            categories_to_fetch=metadata.get('categories') or [],
+        )
+
+    if name == 'coles':
+        import requests
+        from scraping.scrapers.product_scraper_coles_v2 import ColesScraperV2
+        from scraping.utils.coles_session_manager import ColesSessionManager
+        # The session manager is only asked whether pages are blocked; no browser is started.
+        return ColesScraperV2(
+            command=command, company="Coles", store_id=store_id, store_name="Coles", state="",
+            categories_to_fetch=metadata.get('categories') or [],
+            session=requests.Session(), session_manager=ColesSessionManager(command),
+        )
+
+    raise ValueError(f"Don't know how to replay a cassette recorded from scraper {name!r}.")
+
+
+def _write_to(scraper, outbox_path):
+    """Points the scraper's JsonlWriter at `outbox_path` once setup() has created it."""
+    setup = scraper.setup
+
+    def setup_into_outbox():
+        if not setup():
+            return False
+        scraper.jsonl_writer.final_outbox_path = outbox_path
+        return True
+
+    scraper.setup = setup_into_outbox
+
+
+def run_scraper_benchmark(cassette_paths: list, command, latency: float = 0.0, recorded_latency: bool = False) -> list:
+    """
+    Replays each cassette through the scraper it was recorded from and measures pages
+    (responses replayed) per second, products per second and CPU time per product.
+    Responses come back after `latency` seconds, or as slowly as they were recorded with
+    `recorded_latency`. Request rate ceilings are lifted, since there is no server to
+    protect, but each scraper keeps its concurrency. Output goes to a temporary
+    directory that is deleted afterwards. Returns one result dict per cassette.
+    """
+    results = []
+    for path in cassette_paths:
+        cassette = Cassette.load(path)
+        scraper = build_scraper(cassette, command)
+        transport = ReplayTransport(cassette, latency=latency, recorded_latency=recorded_latency)
+        scraper.transport = transport
+        scraper.requests_per_second = None
+
+        with tempfile.TemporaryDirectory() as outbox_path:
+            _write_to(scraper, outbox_path)
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            scraper.run()
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.process_time() - cpu_start
+
+        products = scraper.output.new_products + scraper.output.duplicate_products
+        results.append({
+            'scraper': cassette.metadata.get('scraper'),
+            'cassette': path,
+            'pages': transport.replayed,
+            'missed': transport.missed,
+            'products': products,
+            'seconds': wall_seconds,
+            'pages_per_second': transport.replayed / wall_seconds if wall_seconds else 0.0,
+            'products_per_second': products / wall_seconds if wall_seconds else 0.0,
+            'cpu_ms_per_product': cpu_seconds * 1000 / products if products else None,
+        })
+    return results
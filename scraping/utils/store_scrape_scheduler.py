@@ -0,0 +1,119 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+COMPANIES = ('coles', 'woolworths', 'aldi')
+
+# Stores of each company scraped at once. Coles stores share one browser session, whose
+# store is switched with a cookie, so they can only be scraped one after another.
+DEFAULT_COMPANY_CONCURRENCY = {'coles': 1, 'woolworths': 2, 'aldi': 2}
+
+
+def load_store_list(path: str) -> list:
+    """
+    Reads the stores to scrape from a JSON list or a JSONL file of objects with a
+    'company' and a 'store_id', and optionally a 'store_name' and a 'state'.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    stripped = text.strip()
+    if stripped.startswith('['):
+        stores = json.loads(stripped)
+    else:
+        stores = [json.loads(line) for line in stripped.splitlines() if line.strip()]
+
+    for i, store in enumerate(stores, start=1):
+        company = str(store.get('company', '')).lower()
+        if company not in COMPANIES or not store.get('store_id'):
+            raise ValueError(f"Store {i} in {path} needs a company (one of {', '.join(COMPANIES)}) and a store_id: {store}")
+        store['company'] = company
+        store['store_id'] = str(store['store_id'])
+        store.setdefault('store_name', f"{company.title()} {store['store_id']}")
+        store.setdefault('state', '')
+    return stores
+
+
+class StoreScrapeScheduler:
+    """
+    Scrapes a list of stores, several at a time. Each company has its own cap on how
+    many of its stores are scraped at once, so one retailer is never hit by more than
+    that many scrapers; stores of different companies run side by side.
+
+    `scrape_store(store)` does the work for one store and returns its scraper once it
+    has run. A store that fails is reported and the rest carry on.
+    """
+    def __init__(self, command, scrape_store, company_concurrency: dict = None):
+        self.command = command
+        self.scrape_store = scrape_store
+        self.company_concurrency = {**DEFAULT_COMPANY_CONCURRENCY, **(company_concurrency or {})}
+        if self.company_concurrency['coles'] > 1:
+            self.command.stdout.write(self.command.style.WARNING(
+                "Coles stores share one browser session, so they are scraped one at a time."
+            ))
+            self.company_concurrency['coles'] = 1
+        self.results = []
+        self._results_lock = threading.Lock()
+
+    def run(self, stores: list) -> list:
+        """Scrapes every store and returns one result dict per store, in the order they finished."""
+        queues = {}
+        for store in stores:
+            queues.setdefault(store['company'], queue.SimpleQueue()).put(store)
+
+        workers = [
+            (company, store_queue)
+            for company, store_queue in queues.items()
+            for _ in range(max(1, self.company_concurrency.get(company, 1)))
+        ]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(workers) or 1) as executor:
+            for future in [executor.submit(self._work_through, store_queue) for _, store_queue in workers]:
+                future.result()
+        self.seconds = time.perf_counter() - start
+        return self.results
+
+    def _work_through(self, store_queue):
+        while True:
+            try:
+                store = store_queue.get_nowait()
+            except queue.Empty:
+                return
+            self._scrape(store)
+
+    def _scrape(self, store):
+        label = f"{store['company']} {store['store_id']} ({store['store_name']})"
+        self.command.stdout.write(f"--- Scraping {label} ---")
+        result = {'store': store, 'products': 0, 'seconds': 0.0, 'error': None}
+        start = time.perf_counter()
+        try:
+            scraper = self.scrape_store(store)
+            if scraper is not None:
+                result['products'] = scraper.output.new_products + scraper.output.duplicate_products
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+            self.command.stderr.write(self.command.style.ERROR(f"Scrape of {label} failed: {e}"))
+        result['seconds'] = time.perf_counter() - start
+        with self._results_lock:
+            self.results.append(result)
+
+    def write_report(self):
+        """Writes a line per store and the overall throughput to the command's stdout."""
+        seconds = getattr(self, 'seconds', 0.0)
+        products = sum(r['products'] for r in self.results)
+        failed = [r for r in self.results if r['error']]
+
+        self.command.stdout.write(self.command.style.SUCCESS(f"\n--- Scraped {len(self.results)} stores in {seconds:.0f}s ---"))
+        for r in self.results:
+            store = r['store']
+            status = f"FAILED ({r['error']})" if r['error'] else f"{r['products']} products"
+            self.command.stdout.write(f"  - {store['company']:<11}{store['store_id']:<12}{r['seconds']:>7.0f}s  {status}")
+        if seconds:
+            self.command.stdout.write(
+                f"  {products} products at {products / seconds:.1f} products/sec, "
+                f"{len(self.results) / seconds * 3600:.1f} stores/hour"
+            )
+        if failed:
+            self.command.stdout.write(self.command.style.WARNING(f"  {len(failed)} stores failed."))